@@ -0,0 +1 @@
+"""Benchmarks del pipeline de audio (ejecutar con `python -m benchmarks.run`)."""
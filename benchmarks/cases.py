@@ -0,0 +1,421 @@
+"""Pistas sintéticas y casos del pipeline de audio.
+
+Las pistas son tonos con armónicos y algo de ruido (determinista por
+semilla), generadas en memoria y escritas a disco solo para los casos que
+leen o etiquetan archivos.
+"""
+from __future__ import annotations
+
+import contextlib
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.harness import Scored, case
+from karioka_ok.audio import audio_processor
+from karioka_ok.audio.audio_processor import AudioData
+from karioka_ok.audio.buffers import array_to_segment
+
+# (segundos, canales, sample rate)
+QUICK_TRACKS: List[Tuple[int, int, int]] = [(5, 2, 44100), (5, 1, 22050)]
+FULL_TRACKS: List[Tuple[int, int, int]] = [(30, 2, 44100), (30, 1, 22050), (60, 2, 48000), (180, 2, 44100)]
+EXPORT_FORMATS = ("wav", "flac", "mp3", "ogg")
+
+# JPEG mínimo (cabecera SOI/APP0) para la carátula; mutagen no lo decodifica
+FAKE_JPEG = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00" + b"\x00" * 4096 + b"\xff\xd9"
+
+
+def synthetic_samples(seconds: float, channels: int, sample_rate: int, seed: int = 0) -> np.ndarray:
+    """Float32 `(canales, n)` en [-1, 1): tono de 220 Hz con armónicos y ruido."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    out = np.empty((channels, t.size), dtype=np.float32)
+    for ch in range(channels):
+        f0 = 220.0 * (1.0 + 0.5 * ch)
+        tone = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in (1, 2, 3))
+        out[ch] = 0.25 * tone + 0.01 * rng.standard_normal(t.size)
+    return out
+
+
+@dataclass
+class SyntheticTrack:
+    seconds: int
+    channels: int
+    sample_rate: int
+    workdir: str
+    _audio: Optional[AudioData] = field(default=None, repr=False)
+    _files: Dict[str, str] = field(default_factory=dict, repr=False)
+
+    @property
+    def params(self) -> Dict[str, int]:
+        return {"s": self.seconds, "ch": self.channels, "Hz": self.sample_rate}
+
+    @property
+    def audio(self) -> AudioData:
+        if self._audio is None:
+            seg = array_to_segment(synthetic_samples(self.seconds, self.channels, self.sample_rate), self.sample_rate)
+            self._audio = AudioData(segment=seg, sample_rate=self.sample_rate, channels=self.channels)
+        return self._audio
+
+    def file(self, fmt: str) -> Optional[str]:
+        """Ruta de la pista en `fmt` (se escribe una vez). None si no se puede codificar."""
+        if fmt not in self._files:
+            path = os.path.join(self.workdir, f"track_{self.seconds}_{self.channels}_{self.sample_rate}.{fmt}")
+            try:
+                if fmt == "wav":
+                    audio_processor.export_audio(self.audio, path, "wav")
+                else:
+                    import soundfile as sf
+
+                    data = synthetic_samples(self.seconds, self.channels, self.sample_rate).T
+                    sf.write(path, data, self.sample_rate, format=fmt.upper())
+            except Exception:
+                return None
+            self._files[fmt] = path
+        return self._files[fmt]
+
+    def scratch(self, name: str) -> str:
+        return os.path.join(self.workdir, name)
+
+
+@contextlib.contextmanager
+def tracks(specs: List[Tuple[int, int, int]]) -> Iterator[List[SyntheticTrack]]:
+    workdir = tempfile.mkdtemp(prefix="karioka_bench_")
+    try:
+        yield [SyntheticTrack(s, ch, sr, workdir) for s, ch, sr in specs]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def _resample_fallback() -> Iterator[None]:
+    """Fuerza el camino sin librosa de `change_pitch_semitones`."""
+    original = audio_processor._librosa
+    audio_processor._librosa = lambda: None  # type: ignore[assignment]
+    try:
+        yield
+    finally:
+        audio_processor._librosa = original  # type: ignore[assignment]
+
+
+def has_ffmpeg() -> bool:
+    from pydub import AudioSegment
+
+    return shutil.which(AudioSegment.converter) is not None
+
+
+# Casos
+@case("load_audio/wav", "load")
+def bench_load_wav(track: SyntheticTrack):
+    path = track.file("wav")
+    return lambda: audio_processor.load_audio(path).segment
+
+
+@case("load_audio/wav-lazy", "load")
+def bench_load_wav_lazy(track: SyntheticTrack):
+    path = track.file("wav")
+    return lambda: audio_processor.load_audio(path, lazy=True).raw_buffer()
+
+
+@case("load_audio/flac", "load")
+def bench_load_flac(track: SyntheticTrack):
+    path = track.file("flac")
+    if path is None or not has_ffmpeg():
+        return None
+    return lambda: audio_processor.load_audio(path)
+
+
+@case("change_pitch/librosa", "pitch")
+def bench_pitch_librosa(track: SyntheticTrack):
+    if not audio_processor.has_librosa():
+        return None
+    audio = track.audio
+    return lambda: audio_processor.change_pitch_semitones(audio, 2)
+
+
+@case("change_pitch/segmented", "pitch")
+def bench_pitch_segmented(track: SyntheticTrack):
+    """Segmentos en paralelo (uno por núcleo, al menos dos para medir también las uniones)."""
+    if not audio_processor.has_librosa():
+        return None
+    from karioka_ok.audio.buffers import audio_to_float
+    from karioka_ok.audio.pitch_parallel import pitch_shift_segmented, segment_workers
+
+    y, workers = audio_to_float(track.audio), segment_workers()
+    return lambda: pitch_shift_segmented(y, track.sample_rate, 2, workers=workers, segments=max(2, workers))
+
+
+@case("change_pitch/resample", "pitch")
+def bench_pitch_resample(track: SyntheticTrack):
+    audio = track.audio
+
+    def run():
+        with _resample_fallback():
+            return audio_processor.change_pitch_semitones(audio, 2)
+
+    return run
+
+
+@case("change_pitch/fast-tier", "pitch")
+def bench_pitch_resample_fast(track: SyntheticTrack):
+    audio = track.audio
+
+    def run():
+        with _resample_fallback():
+            return audio_processor.change_pitch_semitones(audio, 2, tier="fast")
+
+    return run
+
+
+# Resample solo (cambio de velocidad de +2 semitonos): el fallback anterior
+# con pydub frente a los niveles del motor NumPy, con velocidad y SNR.
+SNR_PROBE = (0.004, 0.03, 0.09, 0.17, 0.26)  # tonos de prueba, en fracciones de la frecuencia de muestreo
+SNR_SECONDS = 1.0
+
+
+def _probe(sample_rate: int) -> np.ndarray:
+    t = np.arange(int(SNR_SECONDS * sample_rate)) / sample_rate
+    return sum(0.15 * np.sin(2 * np.pi * f * sample_rate * t) for f in SNR_PROBE).astype(np.float32)[None, :]
+
+
+def snr_db(y: np.ndarray, sample_rate: int, freqs: List[float]) -> float:
+    """SNR de `y` frente a la mejor suma de senos en `freqs` (amplitud y fase libres), sin los bordes."""
+    edge = y.size // 20
+    y = np.asarray(y, dtype=np.float64)[edge:y.size - edge]
+    t = np.arange(edge, edge + y.size) / sample_rate
+    basis = np.stack([fn(2 * np.pi * f * t) for f in freqs for fn in (np.sin, np.cos)], axis=1)
+    fit = basis @ np.linalg.lstsq(basis, y, rcond=None)[0]
+    return float(10 * np.log10(np.sum(fit ** 2) / max(np.sum((y - fit) ** 2), 1e-30)))
+
+
+def _pydub_varispeed(audio: AudioData, semitones: float) -> AudioData:
+    """El fallback anterior de `_shift_pitch`: reinterpretar la frecuencia y `set_frame_rate`."""
+    seg = audio.segment
+    rate = int(seg.frame_rate * (2.0 ** (semitones / 12.0)))
+    shifted = seg._spawn(seg.raw_data, overrides={"frame_rate": rate}).set_frame_rate(seg.frame_rate)
+    return AudioData(segment=shifted, sample_rate=shifted.frame_rate, channels=shifted.channels)
+
+
+def _probe_audio(sample_rate: int) -> AudioData:
+    # PCM de 32 bits: el ruido de cuantización de 16 bits taparía al nivel hq
+    seg = array_to_segment(_probe(sample_rate), sample_rate, sample_width=4)
+    return AudioData(segment=seg, sample_rate=sample_rate, channels=1)
+
+
+@case("resample/pydub", "resample")
+def bench_resample_pydub(track: SyntheticTrack):
+    audio = track.audio
+
+    def score():
+        from karioka_ok.audio.buffers import audio_to_float
+
+        sr = track.sample_rate
+        ratio = int(sr * 2.0 ** (2 / 12)) / sr
+        y = audio_to_float(_pydub_varispeed(_probe_audio(sr), 2))[0]
+        return {"snr_db": snr_db(y, sr, [f * sr * ratio for f in SNR_PROBE])}
+
+    return Scored(lambda: _pydub_varispeed(audio, 2), score)
+
+
+def _resample_case(tier: str):
+    def bench(track: SyntheticTrack):
+        from karioka_ok.audio import resample
+
+        audio = track.audio
+
+        def score():
+            from karioka_ok.audio.buffers import audio_to_float
+
+            sr = track.sample_rate
+            up, down = resample.resample_ratio(sr * 2.0 ** (2 / 12), sr)
+            y = audio_to_float(resample.shift_pitch(_probe_audio(sr), 2, tier, preserve_duration=False))[0]
+            return {"snr_db": snr_db(y, sr, [f * sr * down / up for f in SNR_PROBE])}
+
+        return Scored(lambda: resample.shift_pitch(audio, 2, tier, preserve_duration=False), score)
+
+    return bench
+
+
+for _tier in ("fast", "hq"):
+    case(f"resample/{_tier}", "resample")(_resample_case(_tier))
+
+
+def _export_case(fmt: str):
+    def bench(track: SyntheticTrack):
+        if fmt != "wav" and not has_ffmpeg():
+            return None
+        audio, out = track.audio, track.scratch(f"export.{fmt}")
+        return lambda: audio_processor.export_audio(audio, out, fmt)
+
+    return bench
+
+
+for _fmt in EXPORT_FORMATS:
+    case(f"export_audio/{_fmt}", "export")(_export_case(_fmt))
+
+
+def _metadata_case(fmt: str):
+    def bench(track: SyntheticTrack):
+        from karioka_ok.metadata.metadata_editor import TrackMetadata, set_metadata
+
+        path = track.file(fmt)
+        if path is None:
+            return None
+        cover = track.scratch("cover.jpg")
+        with open(cover, "wb") as f:
+            f.write(FAKE_JPEG)
+        meta = TrackMetadata(description="Benchmark", cover_image_path=cover)
+        return lambda: set_metadata(path, meta)
+
+    return bench
+
+
+for _fmt in ("mp3", "flac"):
+    case(f"set_metadata/{_fmt}", "metadata")(_metadata_case(_fmt))
+
+
+TAG_BATCH = 16  # archivos por ejecución en los casos de etiquetado por lotes
+
+
+def _photo_cover(path: str, size: int = 2400) -> Optional[str]:
+    """JPEG grande tipo foto (degradado con ruido), como las carátulas que llegan de internet."""
+    try:
+        from PySide6 import QtGui
+    except ImportError:
+        return None
+    rng = np.random.default_rng(1)
+    x, y = np.meshgrid(np.linspace(0, 200, size), np.linspace(0, 200, size))
+    rgb = np.stack([x, y, np.full_like(x, 120.0)], axis=-1) + rng.normal(0, 12, (size, size, 3))
+    rgb = np.ascontiguousarray(np.clip(rgb, 0, 255).astype(np.uint8))
+    image = QtGui.QImage(rgb.data, size, size, 3 * size, QtGui.QImage.Format_RGB888)
+    return path if image.save(path, "JPG", 95) else None
+
+
+class _RawCovers:
+    """Comportamiento anterior: releer la imagen para cada archivo e incrustarla tal cual."""
+
+    def load(self, path: str):
+        from karioka_ok.metadata.covers import read_cover
+
+        return read_cover(path)
+
+
+def _tag_batch_case(fmt: str, batched: bool):
+    def bench(track: SyntheticTrack):
+        from karioka_ok.metadata.covers import CoverCache
+        from karioka_ok.metadata.metadata_editor import TrackMetadata, set_metadata, set_metadata_many
+
+        source = track.file(fmt)
+        cover = _photo_cover(track.scratch("photo.jpg"))
+        if source is None or cover is None:
+            return None
+        paths = []
+        for i in range(TAG_BATCH):
+            paths.append(track.scratch(f"tag_{'many' if batched else 'loop'}_{i}.{fmt}"))
+            shutil.copyfile(source, paths[-1])
+        meta = TrackMetadata(description="Benchmark", cover_image_path=cover)
+        if batched:
+            covers = CoverCache(track.scratch("covers"))
+            return lambda: set_metadata_many([(p, meta) for p in paths], covers=covers)
+        raw = _RawCovers()
+        return lambda: [set_metadata(p, meta, covers=raw) for p in paths]
+
+    return bench
+
+
+for _fmt in ("mp3", "flac"):
+    case(f"tag_batch/loop-{_fmt}", "metadata")(_tag_batch_case(_fmt, batched=False))
+    case(f"tag_batch/many-{_fmt}", "metadata")(_tag_batch_case(_fmt, batched=True))
+
+
+@case("align_lyrics/features", "lyrics")
+def bench_align_features(track: SyntheticTrack):
+    from karioka_ok.lyrics.align import compute_features
+
+    audio = track.audio
+    return lambda: compute_features(audio)
+
+
+@case("align_lyrics/dp", "lyrics")
+def bench_align_dp(track: SyntheticTrack):
+    from karioka_ok.lyrics.align import align_lyrics, compute_features
+
+    audio = track.audio
+    features = compute_features(audio)
+    # Una línea de 8 sílabas cada ~4 s, como una canción típica
+    text = "\n".join("la la la la la la la la" for _ in range(max(1, track.seconds // 4)))
+    return lambda: align_lyrics(audio, text, features=features)
+
+
+def _vocals_case(mode: str):
+    def bench(track: SyntheticTrack):
+        from karioka_ok.audio.vocals import reduce_vocals
+
+        if track.channels != 2:
+            return None
+        audio = track.audio
+        return lambda: reduce_vocals(audio, mode)
+
+    return bench
+
+
+for _mode in ("center", "mask"):
+    case(f"reduce_vocals/{_mode}", "vocals")(_vocals_case(_mode))
+
+
+def _graph_case(fused: bool):
+    """Tono + quitar voz (centro) + normalizar: en una cadena o llamada por llamada."""
+
+    def bench(track: SyntheticTrack):
+        from karioka_ok.audio.graph import Gain, Graph, Normalize, PitchShift, VocalReduction
+        from karioka_ok.audio.vocals import reduce_vocals
+
+        if track.channels != 2:
+            return None
+        audio = track.audio
+        if fused:
+            graph = Graph([PitchShift(2), VocalReduction("center"), Normalize(-14.0)])
+            return lambda: graph.render(audio)
+
+        def separate():
+            shifted = Graph([PitchShift(2)]).render(audio)
+            reduced = reduce_vocals(shifted, "center")
+            return Graph([Gain(0.0), Normalize(-14.0)]).render(reduced)
+
+        return separate
+
+    return bench
+
+
+case("graph/fused", "graph")(_graph_case(True))
+case("graph/separate", "graph")(_graph_case(False))
+
+
+@case("loudness/measure", "loudness")
+def bench_loudness(track: SyntheticTrack):
+    from karioka_ok.audio.loudness import measure_loudness
+
+    audio = track.audio
+    return lambda: measure_loudness(audio)
+
+
+@case("key/detect", "key")
+def bench_key(track: SyntheticTrack):
+    from karioka_ok.audio.key import detect_key
+
+    audio = track.audio
+    return lambda: detect_key(audio)
+
+
+@case("library/fingerprint", "fingerprint")
+def bench_fingerprint(track: SyntheticTrack):
+    from karioka_ok.library.fingerprint import fingerprint_file
+
+    path = track.file("flac")
+    if path is None:
+        return None
+    return lambda: fingerprint_file(path)
@@ -0,0 +1,204 @@
+"""Medición, registro de casos y comparación contra una línea base.
+
+Cada caso es una función `fn(track) -> callable`: prepara lo necesario
+(fuera del tiempo medido) y devuelve la operación a cronometrar. Se mide:
+
+- `seconds`: mejor tiempo de `repeat` ejecuciones (el menos ruidoso).
+- `mean_seconds`: media de esas ejecuciones.
+- `peak_bytes`: pico de memoria Python/NumPy asignada durante una ejecución
+  aparte bajo `tracemalloc` (no incluye subprocesos como ffmpeg).
+
+Un caso puede devolver `Scored(fn, score)` para agregar métricas de calidad
+(p. ej. SNR en dB): `score()` se llama una vez, fuera del tiempo medido, y
+sus valores quedan en `scores` (se guardan y se muestran, no se comparan).
+
+Los resultados se guardan en JSON; `compare()` marca como regresión toda
+métrica que empeore más que `threshold` respecto de la línea base.
+"""
+from __future__ import annotations
+
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+METRICS = ("seconds", "peak_bytes")
+DEFAULT_THRESHOLD = 0.10
+
+
+@dataclass
+class Measurement:
+    id: str
+    case: str
+    params: Dict[str, Any]
+    seconds: float
+    mean_seconds: float
+    peak_bytes: int
+    repeat: int
+    scores: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class Comparison:
+    id: str
+    metric: str
+    baseline: Optional[float]
+    current: Optional[float]
+    threshold: float
+
+    @property
+    def ratio(self) -> Optional[float]:
+        if not self.baseline or self.current is None:
+            return None
+        return self.current / self.baseline
+
+    @property
+    def regressed(self) -> bool:
+        ratio = self.ratio
+        return ratio is not None and ratio > 1.0 + self.threshold
+
+    @property
+    def status(self) -> str:
+        if self.baseline is None:
+            return "nuevo"
+        if self.current is None:
+            return "ausente"
+        return "REGRESIÓN" if self.regressed else "ok"
+
+
+@dataclass
+class Case:
+    name: str
+    fn: Callable[[Any], Optional[Callable[[], Any]]]
+    tags: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Scored:
+    """Operación a cronometrar más métricas de calidad calculadas aparte."""
+    fn: Callable[[], Any]
+    score: Callable[[], Dict[str, float]]
+
+
+CASES: Dict[str, Case] = {}
+
+
+def case(name: str, *tags: str) -> Callable:
+    """Registra un caso de benchmark bajo `name`."""
+
+    def decorator(fn: Callable) -> Callable:
+        CASES[name] = Case(name, fn, list(tags))
+        return fn
+
+    return decorator
+
+
+def measure(fn: Callable[[], Any], repeat: int = 3) -> Dict[str, float]:
+    """Cronometra `fn` `repeat` veces y mide su pico de memoria en una pasada extra."""
+    times = []
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "mean_seconds": sum(times) / len(times), "peak_bytes": peak}
+
+
+def run_case(c: Case, track: Any, params: Dict[str, Any], repeat: int = 3) -> Optional[Measurement]:
+    """Prepara y mide un caso. None si el caso no aplica (p. ej. falta ffmpeg)."""
+    fn = c.fn(track)
+    if fn is None:
+        return None
+    scores: Dict[str, float] = {}
+    if isinstance(fn, Scored):
+        scores = {k: float(v) for k, v in fn.score().items()}
+        fn = fn.fn
+    label = "-".join(f"{v}{k}" for k, v in params.items())
+    stats = measure(fn, repeat)
+    return Measurement(
+        id=f"{c.name}[{label}]", case=c.name, params=dict(params),
+        seconds=stats["seconds"], mean_seconds=stats["mean_seconds"],
+        peak_bytes=int(stats["peak_bytes"]), repeat=repeat, scores=scores,
+    )
+
+
+# Persistencia
+def environment() -> Dict[str, str]:
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def save_results(path: str, results: Iterable[Measurement]) -> None:
+    data = {"environment": environment(), "results": [asdict(r) for r in results]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    """Lee un JSON de resultados y lo indexa por `id`."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {r["id"]: r for r in data.get("results", [])}
+
+
+# Comparación
+def compare(
+    baseline: Dict[str, Dict[str, Any]],
+    current: Dict[str, Dict[str, Any]],
+    threshold: float = DEFAULT_THRESHOLD,
+    metrics: Iterable[str] = METRICS,
+) -> List[Comparison]:
+    """Compara métrica a métrica los casos de ambas ejecuciones (por `id`)."""
+    out = []
+    for id_ in sorted(set(baseline) | set(current)):
+        base, cur = baseline.get(id_), current.get(id_)
+        for metric in metrics:
+            out.append(Comparison(
+                id_, metric,
+                base.get(metric) if base else None,
+                cur.get(metric) if cur else None,
+                threshold,
+            ))
+    return out
+
+
+def format_comparison(rows: Iterable[Comparison]) -> str:
+    lines = []
+    for r in rows:
+        ratio = f"{r.ratio:6.2f}x" if r.ratio is not None else "      -"
+        lines.append(f"{r.status:10} {ratio}  {r.metric:11} {r.id}")
+    return "\n".join(lines)
+
+
+def throughput(m: Measurement) -> Optional[float]:
+    """Segundos de audio procesados por segundo de reloj (si el caso usa una pista)."""
+    audio_seconds = m.params.get("s")
+    if not audio_seconds or m.seconds <= 0:
+        return None
+    return float(audio_seconds) / m.seconds
+
+
+def format_results(results: Iterable[Measurement]) -> str:
+    lines = []
+    for r in results:
+        rate = throughput(r)
+        rate_text = f"{rate:9.0f} s/s" if rate is not None else " " * 13
+        scores = "".join(f"  {k}={v:.1f}" for k, v in r.scores.items())
+        lines.append(f"{r.seconds * 1000:10.1f} ms  {r.peak_bytes / 1024 ** 2:8.1f} MiB  {rate_text}  {r.id}{scores}")
+    return "\n".join(lines)
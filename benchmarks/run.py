@@ -0,0 +1,72 @@
+"""Ejecuta los benchmarks del pipeline y opcionalmente compara con una línea base.
+
+    python -m benchmarks.run --quick --out bench.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --threshold 0.15
+
+Sale con código 1 si alguna métrica empeora más que el umbral.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _p in (ROOT, os.path.join(ROOT, "src")):
+    if _p not in sys.path:
+        sys.path.insert(0, _p)
+
+from benchmarks import cases  # noqa: E402  (registra los casos)
+from benchmarks.harness import (  # noqa: E402
+    CASES,
+    DEFAULT_THRESHOLD,
+    compare,
+    format_comparison,
+    format_results,
+    load_results,
+    run_case,
+    save_results,
+)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline de audio de Karioka.ok")
+    parser.add_argument("--quick", action="store_true", help="Pistas cortas (para CI o pruebas rápidas)")
+    parser.add_argument("--filter", default="", help="Solo casos cuyo nombre contenga este texto")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por caso (se toma la mejor)")
+    parser.add_argument("--out", default=None, help="Guardar resultados en este JSON")
+    parser.add_argument("--compare", default=None, help="JSON de línea base contra el que comparar")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Empeoramiento relativo tolerado (0.10 = 10%%)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    specs = cases.QUICK_TRACKS if args.quick else cases.FULL_TRACKS
+    selected = [c for name, c in sorted(CASES.items()) if args.filter in name]
+
+    results = []
+    with cases.tracks(specs) as tracks:
+        for c in selected:
+            for track in tracks:
+                m = run_case(c, track, track.params, args.repeat)
+                if m is not None:
+                    results.append(m)
+                    print(format_results([m]), flush=True)
+
+    if args.out:
+        save_results(args.out, results)
+    if args.compare:
+        current = {r.id: vars(r) for r in results}
+        baseline = {k: v for k, v in load_results(args.compare).items() if args.filter in v.get("case", k)}
+        rows = compare(baseline, current, args.threshold)
+        print()
+        print(format_comparison(rows))
+        if any(r.regressed for r in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,17 @@
 Punto de entrada de Karioka.ok
 - Si se ejecuta sin argumentos: inicia la GUI (PySide6).
 - Opción --no-gui: ejecuta un flujo mínimo de CLI para verificación del entorno.
+- Subcomando `batch`: transpone y exporta un directorio o manifiesto CSV/JSON
+  en paralelo (ver `karioka_ok.jobs.batch`).
+- Subcomando `loudness`: mide la sonoridad (EBU R128) de un catálogo y la
+  guarda en el índice (ver `karioka_ok.jobs.analysis`).
+- Subcomando `key`: estima la tonalidad de un catálogo y sugiere la
+  transposición para un rango de voz o una tonalidad (ver
+  `karioka_ok.audio.key`).
+- Subcomando `library`: indexa carpetas en la biblioteca y busca en ella
+  (ver `karioka_ok.library.index`).
+- Subcomando `serve`: servicio HTTP local que recibe pedidos de transposición
+  y los procesa en cola (ver `karioka_ok.jobs.server`).
 
 Este archivo añade `src/` al sys.path para cargar el paquete `karioka_ok`.
 """
@@ -31,14 +42,128 @@ def run_cli() -> None:
     print("- ffmpeg debería estar instalado para exportación a MP3/FLAC.")
 
 
-if __name__ == "__main__":
+def run_batch(args: argparse.Namespace) -> int:
+    from karioka_ok.jobs.batch import run_batch_command
+
+    return run_batch_command(args)
+
+
+def run_loudness(args: argparse.Namespace) -> int:
+    from karioka_ok.jobs.analysis import run_loudness_command
+
+    return run_loudness_command(args)
+
+
+def run_key(args: argparse.Namespace) -> int:
+    from karioka_ok.jobs.analysis import run_key_command
+
+    return run_key_command(args)
+
+
+def run_library(args: argparse.Namespace) -> int:
+    from karioka_ok.library.index import run_library_command
+
+    return run_library_command(args)
+
+
+def run_serve(args: argparse.Namespace) -> int:
+    from karioka_ok.jobs.server import run_serve_command
+
+    return run_serve_command(args)
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Karioka.ok - MVP")
     parser.add_argument(
         "--no-gui", action="store_true", help="No iniciar GUI; ejecutar comprobaciones básicas."
     )
-    args = parser.parse_args()
+    sub = parser.add_subparsers(dest="command")
+
+    batch = sub.add_parser("batch", help="Transponer y exportar un lote de pistas sin GUI.")
+    batch.add_argument("source", help="Directorio de audios o manifiesto .csv/.json")
+    batch.add_argument("--out", required=True, help="Directorio de salida")
+    batch.add_argument("--semitones", type=int, default=0, help="Semitonos por defecto (-12..12)")
+    batch.add_argument("--formats", default="mp3", help="Formatos por defecto, p. ej. mp3;flac")
+    batch.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (por defecto, núcleos)")
+    batch.add_argument("--force", action="store_true", help="Rehacer aunque las salidas estén al día")
+    batch.add_argument("--cache-dir", default=None, help="Reutilizar renders de una caché en disco")
+    batch.add_argument(
+        "--vocals", choices=("center", "mask"), default=None,
+        help="Quitar la voz: center (rápido) o mask (STFT, conserva graves)",
+    )
+    batch.add_argument(
+        "--chain", default=None,
+        help="Efectos extra tras tono y voz: .json guardado desde la GUI o p. ej. 'trim_silence'",
+    )
+    batch.add_argument(
+        "--loudness", type=float, default=None, metavar="LUFS",
+        help="Normalizar la sonoridad al exportar (p. ej. -14), sin pasar de -1 dBTP",
+    )
+    batch.add_argument(
+        "--tier", choices=("fast", "hq"), default="hq",
+        help="Calidad del cambio de tono sin librosa: fast (borradores) o hq (exportación final)",
+    )
+    batch.add_argument(
+        "--dedupe", action="store_true",
+        help="Procesar una sola vez las pistas que suenan igual (por huella acústica)",
+    )
+
+    loudness = sub.add_parser("loudness", help="Medir la sonoridad (LUFS, LRA, pico verdadero) de un catálogo.")
+    loudness.add_argument("sources", nargs="+", help="Directorios o archivos de audio")
+    loudness.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (por defecto, núcleos)")
+    loudness.add_argument("--index", default=None, help="Índice SQLite (por defecto, en la caché de la app)")
+    loudness.add_argument("--force", action="store_true", help="Volver a medir aunque el índice esté al día")
+    loudness.add_argument("--csv", default=None, help="Guardar un informe CSV con una fila por pista")
+
+    key = sub.add_parser("key", help="Estimar la tonalidad de un catálogo y sugerir cuántos semitonos transponer.")
+    key.add_argument("sources", nargs="+", help="Directorios o archivos de audio")
+    key.add_argument(
+        "--target", default=None, metavar="RANGO|TONO",
+        help="Rango de voz (A2-E4), tonalidad (Do, Am) o ambos separados por coma, para sugerir semitonos",
+    )
+    key.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (por defecto, núcleos)")
+    key.add_argument("--index", default=None, help="Índice SQLite (por defecto, en la caché de la app)")
+    key.add_argument("--force", action="store_true", help="Volver a analizar aunque el índice esté al día")
+    key.add_argument("--csv", default=None, help="Guardar un informe CSV con una fila por pista")
+
+    library = sub.add_parser("library", help="Indexar carpetas en la biblioteca y buscar pistas.")
+    library.add_argument("sources", nargs="*", help="Directorios a escanear (incremental)")
+    library.add_argument("--search", default=None, metavar="TEXTO", help="Listar las pistas que coinciden")
+    library.add_argument("--limit", type=int, default=50, help="Máximo de pistas a listar")
+    library.add_argument("--workers", type=int, default=None, help="Hilos para inspeccionar archivos")
+    library.add_argument("--fingerprint", action="store_true",
+                         help="Calcular las huellas acústicas que falten (en paralelo, por procesos)")
+    library.add_argument("--duplicates", action="store_true", help="Listar las pistas que suenan igual")
+    library.add_argument("--db", default=None, help="Base SQLite (por defecto, en la caché de la app)")
+
+    serve = sub.add_parser("serve", help="Servicio HTTP local: cola de pedidos de transposición.")
+    serve.add_argument("--out", required=True, help="Directorio de salidas y subidas")
+    serve.add_argument("--host", default="127.0.0.1", help="Interfaz (0.0.0.0 para toda la red local)")
+    serve.add_argument("--port", type=int, default=8765, help="Puerto TCP")
+    serve.add_argument("--workers", type=int, default=None, help="Trabajos en paralelo (por defecto, núcleos)")
+    serve.add_argument("--max-queue", type=int, default=256, help="Trabajos esperando antes de responder 503")
+    serve.add_argument("--cache-dir", default=None, help="Reutilizar renders de una caché en disco")
+    serve.add_argument(
+        "--root", action="append", default=None, metavar="DIR",
+        help="Directorio del que se aceptan rutas (audio, carátula, letra); repetible. Sin él, solo subidas",
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
 
-    if args.no_gui:
+    if args.command == "batch":
+        sys.exit(run_batch(args))
+    elif args.command == "loudness":
+        sys.exit(run_loudness(args))
+    elif args.command == "key":
+        sys.exit(run_key(args))
+    elif args.command == "library":
+        sys.exit(run_library(args))
+    elif args.command == "serve":
+        sys.exit(run_serve(args))
+    elif args.no_gui:
         run_cli()
     else:
         run_gui()
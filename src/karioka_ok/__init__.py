@@ -3,8 +3,9 @@
 Arquitectura monolítica modular con submódulos:
 - audio: carga, cambio de tonalidad, exportación.
 - metadata: edición de carátula y descripción.
-- lyrics: carga de letra desde .txt.
+- lyrics: carga de letra desde .txt y letra sincronizada (LRC).
 - files: utilidades de diálogo/rutas.
+- library: índice SQLite de pistas y renders (biblioteca).
 - gui: interfaz de usuario PySide6.
 - utils: utilidades generales y configuración de logging.
 """
@@ -13,6 +14,7 @@ __all__ = [
     "metadata",
     "lyrics",
     "files",
+    "library",
     "gui",
     "utils",
 ]
@@ -2,22 +2,25 @@
 
 Implementa funciones mínimas usando librosa/pydub. En un MVP, priorizamos
 claridad y manejo de errores. Para producción, optimizar y manejar más casos.
+
+librosa, NumPy y pydub se importan en el primer uso (no al importar este
+módulo) para que la GUI y la CLI arranquen sin cargar la pila de DSP.
+`has_librosa()` hace la comprobación de disponibilidad una sola vez.
 """
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Sequence, Tuple, Union
+
+from karioka_ok.utils import instrumentation
 
-from pydub import AudioSegment
+if TYPE_CHECKING:
+    from pydub import AudioSegment
 
-try:
-    import librosa
-    import numpy as np
-    HAS_LIBROSA = True
-except Exception:  # pragma: no cover - el entorno podría no tener dependencias aún
-    HAS_LIBROSA = False
-    librosa = None  # type: ignore
-    np = None  # type: ignore
+    from karioka_ok.audio.render_cache import RenderCache
+    from karioka_ok.metadata.metadata_editor import TrackMetadata
 
 
 @dataclass
@@ -27,52 +30,196 @@ class AudioData:
     sample_rate: int
     channels: int
     path: Optional[str] = None
+    _content_hash: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def sample_width(self) -> int:
+        return self.segment.sample_width
+
+    @property
+    def frame_count(self) -> int:
+        return int(self.segment.frame_count())
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.segment.duration_seconds
+
+    def raw_buffer(self):
+        """PCM entero intercalado (objeto con protocolo buffer, sin copiar)."""
+        return self.segment.raw_data
 
+    def content_hash(self) -> str:
+        """Hash del PCM y su formato; se calcula una sola vez por instancia."""
+        if self._content_hash is None:
+            from karioka_ok.utils.hashing import hash_bytes
 
-def load_audio(path: str) -> AudioData:
+            header = f"{self.sample_rate}:{self.channels}:{self.sample_width}:".encode("ascii")
+            self._content_hash = hash_bytes(header, self.raw_buffer())
+        return self._content_hash
+
+
+def load_audio(path: str, lazy: bool = False) -> AudioData:
     """Carga un archivo de audio en AudioSegment.
 
     Args:
         path: Ruta del archivo de audio
+        lazy: Si es True, solo se lee la cabecera; el PCM se mapea en memoria
+            (o se decodifica a un temporal) la primera vez que se necesita.
+            Ver `karioka_ok.audio.lazy`.
     Returns:
         AudioData con metadata básica
     """
-    seg = AudioSegment.from_file(path)
-    return AudioData(segment=seg, sample_rate=seg.frame_rate, channels=seg.channels, path=path)
+    with instrumentation.stage("audio.load", lazy=lazy) as st:
+        if lazy:
+            from karioka_ok.audio.lazy import load_audio_lazy
+
+            return load_audio_lazy(path)
+        from pydub import AudioSegment
+
+        seg = AudioSegment.from_file(path)
+        st.add_bytes(len(seg.raw_data))
+        return AudioData(segment=seg, sample_rate=seg.frame_rate, channels=seg.channels, path=path)
+
+
+@lru_cache(maxsize=None)
+def _librosa() -> Any:
+    """Importa librosa la primera vez; None si no está disponible."""
+    try:
+        import librosa
 
+        return librosa
+    except Exception:  # pragma: no cover - el entorno podría no tener dependencias aún
+        return None
 
-def change_pitch_semitones(audio: AudioData, semitones: int) -> AudioData:
+
+def has_librosa() -> bool:
+    """True si librosa se puede usar (se importa en la primera llamada)."""
+    return _librosa() is not None
+
+
+def __getattr__(name: str) -> Any:
+    # Compatibilidad: `audio_processor.HAS_LIBROSA` sigue funcionando, pero perezoso
+    if name == "HAS_LIBROSA":
+        return has_librosa()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def pitch_algorithm(tier: Optional[str] = None) -> str:
+    """Identificador del algoritmo de cambio de tono activo (parte de las claves de caché).
+
+    Sin librosa incluye el nivel de calidad del motor NumPy (`tier`), que
+    cambia el resultado; con librosa el nivel no interviene.
+    """
+    if has_librosa():
+        return f"librosa-pitch_shift-{_librosa().__version__}"
+    from karioka_ok.audio.resample import DEFAULT_TIER, RESAMPLE_VERSION
+
+    return f"numpy-vocoder-{tier or DEFAULT_TIER}-{RESAMPLE_VERSION}"
+
+
+def change_pitch_semitones(
+    audio: AudioData,
+    semitones: int,
+    cache: Optional["RenderCache"] = None,
+    workers: int = 1,
+    tier: Optional[str] = None,
+) -> AudioData:
     """Cambia la tonalidad de la pista en semitonos usando librosa si está disponible.
 
-    Si librosa no está disponible, se aplica un cambio de velocidad/resample básico
-    con pydub como stub (no mantiene duración con fidelidad).
+    Si se pasa `cache`, se consulta antes de cualquier DSP y el resultado
+    calculado se guarda en ella.
+
+    Con `workers > 1` las pistas largas se dividen en segmentos que se
+    transponen en paralelo (`karioka_ok.audio.pitch_parallel`); el resultado
+    equivale al de una sola llamada y comparte las entradas de caché.
+
+    Si librosa no está disponible, se usa el motor NumPy de
+    `karioka_ok.audio.resample` (phase vocoder + resample polifásico), que
+    también conserva la duración; `tier` elige su calidad ("fast" para
+    vista previa, "hq" por defecto para exportar).
     """
     if semitones == 0:
         return audio
 
-    if HAS_LIBROSA:
-        # Convertir a np.ndarray (float32), procesar con librosa, volver a AudioSegment
-        import soundfile as sf
-        import io
+    with instrumentation.stage("audio.pitch_shift", semitones=semitones) as st:
+        st.add_bytes(memoryview(audio.raw_buffer()).nbytes)
+        key = None
+        if cache is not None:
+            from karioka_ok.audio.render_cache import RenderKey
+
+            key = RenderKey(audio.content_hash(), semitones, pitch_algorithm(tier), audio.sample_rate)
+            hit = cache.get(key, path=audio.path)
+            st.set(cache_hit=hit is not None)
+            if hit is not None:
+                instrumentation.count("render_cache.hit")
+                return hit
+            instrumentation.count("render_cache.miss")
+
+        st.set(algorithm=pitch_algorithm(tier))
+        shifted = None
+        if workers > 1 and has_librosa():
+            from karioka_ok.audio.pitch_parallel import shift_segmented
+
+            shifted = shift_segmented(audio, semitones, workers)  # None si la pista es corta
+        if shifted is None and tier is not None and not has_librosa():
+            from karioka_ok.audio.resample import shift_pitch
+
+            shifted = shift_pitch(audio, semitones, tier)
+        if shifted is None:
+            shifted = _shift_pitch(audio, semitones)
+        if cache is not None and key is not None:
+            cache.put(key, shifted)
+        return shifted
+
+
+def process_audio(
+    audio: AudioData,
+    semitones: int = 0,
+    vocals: Optional[str] = None,
+    cache: Optional["RenderCache"] = None,
+    tier: Optional[str] = None,
+) -> AudioData:
+    """Cadena de exportación: cambio de tono (con caché) y, si se pide, reducción de voz.
+
+    `vocals` es un modo de `karioka_ok.audio.vocals` ("center" o "mask") o None.
+    `tier` es la calidad del cambio de tono sin librosa (ver `change_pitch_semitones`).
+    La voz se quita después del cambio de tono para reutilizar los renders
+    en caché; todo ocurre en memoria, sin codificar/decodificar entre etapas.
+    """
+    processed = change_pitch_semitones(audio, semitones, cache=cache, tier=tier)
+    if vocals:
+        from karioka_ok.audio.vocals import reduce_vocals
+
+        processed = reduce_vocals(processed, vocals)
+    return processed
+
 
-        # Exportar el segmento a bytes WAV
-        buf = io.BytesIO()
-        audio.segment.export(buf, format="wav")
-        buf.seek(0)
-        y, sr = sf.read(buf, dtype="float32")
-        y_shifted = librosa.effects.pitch_shift(y, sr=sr, n_steps=float(semitones))
+def timing_factor(original: AudioData, processed: AudioData) -> float:
+    """Duración de `processed` relativa a `original`, para reescalar letra sincronizada.
 
-        # Guardar de vuelta a WAV en memoria y re-crear AudioSegment
-        out_buf = io.BytesIO()
-        sf.write(out_buf, y_shifted, sr, format="WAV")
-        out_buf.seek(0)
-        shifted = AudioSegment.from_file(out_buf, format="wav")
-        return AudioData(segment=shifted, sample_rate=shifted.frame_rate, channels=shifted.channels, path=audio.path)
+    Es 1.0 con librosa o el motor NumPy (ambos conservan el tempo); solo
+    difiere si el procesamiento cambió la duración (p. ej. un cambio de
+    velocidad con `resample.shift_pitch(..., preserve_duration=False)`).
+    """
+    if processed is original or not original.frame_count:
+        return 1.0
+    return processed.duration_seconds / original.duration_seconds
+
+
+def _shift_pitch(audio: AudioData, semitones: int) -> AudioData:
+    librosa = _librosa()
+    if librosa is not None:
+        # Vista directa sobre raw_data -> float32 (canales, n) -> librosa -> PCM
+        from karioka_ok.audio.buffers import audio_to_float, float_to_audio
 
-    # Fallback simple: cambiar velocidad (afecta tono y duración)
-    new_frame_rate = int(audio.segment.frame_rate * (2.0 ** (semitones / 12.0)))
-    shifted = audio.segment._spawn(audio.segment.raw_data, overrides={"frame_rate": new_frame_rate}).set_frame_rate(audio.segment.frame_rate)
-    return AudioData(segment=shifted, sample_rate=shifted.frame_rate, channels=shifted.channels, path=audio.path)
+        y = audio_to_float(audio)
+        y_shifted = librosa.effects.pitch_shift(y, sr=audio.sample_rate, n_steps=float(semitones))
+        return float_to_audio(y_shifted, like=audio)
+
+    # Sin librosa: phase vocoder + resample polifásico en NumPy (conserva la duración)
+    from karioka_ok.audio.resample import shift_pitch
+
+    return shift_pitch(audio, semitones)
 
 
 def export_audio(audio: AudioData, out_path: str, format_hint: Optional[str] = None) -> None:
@@ -81,4 +228,46 @@ def export_audio(audio: AudioData, out_path: str, format_hint: Optional[str] = N
     Requiere ffmpeg para MP3/FLAC en la mayoría de plataformas.
     """
     fmt = format_hint or (out_path.split(".")[-1].lower() if "." in out_path else "wav")
-    audio.segment.export(out_path, format=fmt)
+    with instrumentation.stage("audio.export", format=fmt) as st:
+        audio.segment.export(out_path, format=fmt)
+        if instrumentation.enabled():
+            st.add_bytes(os.path.getsize(out_path))
+
+
+def export_many(
+    audio: AudioData,
+    targets: Sequence[Union[str, Tuple[str, str]]],
+    semitones: int = 0,
+    cache: Optional["RenderCache"] = None,
+    meta: Optional["TrackMetadata"] = None,
+    progress: Optional[Callable[[float], None]] = None,
+    vocals: Optional[str] = None,
+    tier: Optional[str] = None,
+) -> List[str]:
+    """Exporta a varios formatos calculando el PCM procesado una sola vez.
+
+    `targets` son rutas (formato por extensión) o tuplas `(ruta, formato)`.
+    El procesamiento es `process_audio` (tono con calidad `tier` y, con
+    `vocals`, reducción de voz).
+    Los codificadores corren en paralelo alimentados desde el mismo buffer;
+    después se escriben los metadatos de cada salida si se pasa `meta` (con
+    la letra sincronizada reescalada a la duración procesada).
+    """
+    from karioka_ok.audio.encoders import encode_parallel
+
+    pairs = [
+        (t, t.split(".")[-1].lower() if "." in t else "wav") if isinstance(t, str) else (t[0], t[1].lower())
+        for t in targets
+    ]
+    processed = process_audio(audio, semitones, vocals=vocals, cache=cache, tier=tier)
+    with instrumentation.stage("audio.encode", formats=[fmt for _, fmt in pairs]) as st:
+        st.add_bytes(memoryview(processed.raw_buffer()).nbytes)
+        paths = encode_parallel(processed, pairs, progress=progress)
+    if meta is not None:
+        from karioka_ok.metadata.metadata_editor import set_metadata_many
+
+        meta = meta.retimed(timing_factor(audio, processed))
+        for error in set_metadata_many([(path, meta) for path in paths]):
+            if error is not None:
+                raise error
+    return paths
@@ -0,0 +1,130 @@
+"""Puente entre AudioSegment (pydub) y arreglos NumPy.
+
+pydub guarda el audio como PCM entero intercalado en `segment.raw_data`.
+Este módulo expone ese buffer como un arreglo `(canales, muestras)` sin copiar
+(vista transpuesta sobre los mismos bytes) y reconstruye un AudioSegment
+directamente desde un arreglo procesado, evitando ida y vuelta por WAV.
+
+Convenciones:
+- Los arreglos de trabajo tienen forma `(canales, muestras)`, igual que librosa.
+- Las vistas enteras son de solo lectura: apuntan a los bytes inmutables del segmento.
+- Los arreglos float32 están normalizados a [-1.0, 1.0).
+"""
+from __future__ import annotations
+
+from typing import Iterator, Optional
+
+import numpy as np
+from pydub import AudioSegment
+
+from karioka_ok.audio.audio_processor import AudioData
+
+# pydub convierte 8 bits a enteros con signo y 24 bits a 32 bits al cargar
+SAMPLE_DTYPES = {
+    1: np.dtype("<i1"),
+    2: np.dtype("<i2"),
+    4: np.dtype("<i4"),
+}
+
+
+def sample_dtype(sample_width: int) -> np.dtype:
+    """Devuelve el dtype NumPy correspondiente a un ancho de muestra de pydub."""
+    try:
+        return SAMPLE_DTYPES[sample_width]
+    except KeyError:
+        raise ValueError(f"Ancho de muestra no soportado: {sample_width} bytes") from None
+
+
+def full_scale(sample_width: int) -> float:
+    """Valor de escala completa para enteros con signo del ancho dado."""
+    return float(2 ** (8 * sample_width - 1))
+
+
+def buffer_to_array(data, channels: int, sample_width: int) -> np.ndarray:
+    """Vista entera `(canales, muestras)` sobre PCM intercalado, sin copiar."""
+    interleaved = np.frombuffer(data, dtype=sample_dtype(sample_width))
+    # (muestras, canales) -> (canales, muestras) como vista con strides
+    return interleaved.reshape(-1, channels).T
+
+
+def segment_to_array(segment: AudioSegment) -> np.ndarray:
+    """Vista entera `(canales, muestras)` sobre `segment.raw_data`, sin copiar.
+
+    La vista es de solo lectura y comparte memoria con el segmento.
+    """
+    return buffer_to_array(segment.raw_data, segment.channels, segment.sample_width)
+
+
+def audio_to_array(audio: AudioData) -> np.ndarray:
+    """Como `segment_to_array`, pero sobre `audio.raw_buffer()`.
+
+    Con `LazyAudioData` la vista apunta al PCM mapeado en memoria, sin
+    materializar el AudioSegment.
+    """
+    return buffer_to_array(audio.raw_buffer(), audio.channels, audio.sample_width)
+
+
+def ints_to_float(ints: np.ndarray, sample_width: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Escala muestras enteras a float32 en [-1, 1); `out` permite reutilizar un buffer."""
+    if out is None:
+        out = np.empty(ints.shape, dtype=np.float32)
+    np.multiply(ints, np.float32(1.0 / full_scale(sample_width)), out=out, casting="unsafe")
+    return out
+
+
+def segment_to_float(segment: AudioSegment, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Convierte el segmento a float32 `(canales, muestras)` en [-1, 1).
+
+    Es la única copia necesaria para DSP; `out` permite reutilizar un buffer.
+    """
+    return ints_to_float(segment_to_array(segment), segment.sample_width, out)
+
+
+def iter_audio_blocks(audio: AudioData, block_size: int) -> Iterator[np.ndarray]:
+    """Recorre `audio.raw_buffer()` en bloques float32 `(canales, <=block_size)`.
+
+    Solo se convierte un bloque a la vez: la memoria extra es O(block_size),
+    también con audio perezoso.
+    """
+    ints = audio_to_array(audio)
+    scale = np.float32(1.0 / full_scale(audio.sample_width))
+    for start in range(0, ints.shape[1], block_size):
+        yield np.multiply(ints[:, start:start + block_size], scale, dtype=np.float32)
+
+
+def float_to_pcm_bytes(samples: np.ndarray, sample_width: int = 2) -> bytes:
+    """Convierte float `(canales, muestras)` a PCM entero intercalado (bytes)."""
+    dtype = sample_dtype(sample_width)
+    scale = full_scale(sample_width)
+    samples = np.atleast_2d(samples)
+    # Escribir ya intercalado (muestras, canales) para que tobytes() no reordene
+    scaled = np.multiply(samples.T, scale, dtype=np.float64 if sample_width == 4 else np.float32, order="C")
+    np.rint(scaled, out=scaled)
+    np.clip(scaled, -scale, scale - 1, out=scaled)
+    return scaled.astype(dtype, copy=False).tobytes()
+
+
+def array_to_segment(samples: np.ndarray, frame_rate: int, sample_width: int = 2) -> AudioSegment:
+    """Construye un AudioSegment desde un arreglo `(canales, muestras)`.
+
+    Acepta float (normalizado) o enteros del dtype del ancho de muestra.
+    """
+    samples = np.atleast_2d(samples)
+    channels = samples.shape[0]
+    if np.issubdtype(samples.dtype, np.floating):
+        data = float_to_pcm_bytes(samples, sample_width)
+    else:
+        dtype = sample_dtype(sample_width)
+        data = np.ascontiguousarray(samples.T, dtype=dtype).tobytes()
+    return AudioSegment(data=data, sample_width=sample_width, frame_rate=frame_rate, channels=channels)
+
+
+def audio_to_float(audio: AudioData) -> np.ndarray:
+    """Atajo: audio de AudioData a float32 `(canales, muestras)`."""
+    return ints_to_float(audio_to_array(audio), audio.sample_width)
+
+
+def float_to_audio(samples: np.ndarray, like: AudioData) -> AudioData:
+    """Crea un AudioData a partir de un arreglo procesado, conservando formato de `like`."""
+    seg = array_to_segment(samples, like.sample_rate, like.sample_width)
+    return AudioData(segment=seg, sample_rate=seg.frame_rate, channels=seg.channels, path=like.path)
@@ -0,0 +1,310 @@
+"""Codificadores incrementales de PCM a archivo.
+
+Permiten exportar audio bloque a bloque sin tener la pista completa en
+memoria: WAV se escribe directamente con el módulo `wave`; el resto de
+formatos (MP3, FLAC, OGG...) se codifica con un subproceso de ffmpeg que
+recibe PCM crudo por stdin.
+
+Ningún codificador trunca el destino: escriben en un temporal de la misma
+carpeta y lo mueven con `os.replace` al cerrar. El destino puede ser la
+pista de origen, mapeada en memoria por `karioka_ok.audio.lazy`; truncarla
+mientras se lee mataría el proceso (SIGBUS), reemplazarla no.
+"""
+from __future__ import annotations
+
+import os
+import queue
+import subprocess
+import threading
+import uuid
+import wave
+from typing import IO, TYPE_CHECKING, Callable, Iterator, List, Optional, Sequence, Tuple
+
+from pydub import AudioSegment
+
+if TYPE_CHECKING:
+    from karioka_ok.audio.audio_processor import AudioData
+
+# Formato crudo de ffmpeg para cada ancho de muestra (PCM con signo, little endian)
+FFMPEG_PCM_FORMATS = {1: "s8", 2: "s16le", 4: "s32le"}
+
+
+class EncoderError(RuntimeError):
+    """Fallo al codificar (p. ej. ffmpeg ausente o con error)."""
+
+
+class PCMEncoder:
+    """Interfaz mínima: `write(bytes)` con PCM intercalado y `close()`."""
+
+    out_path: str
+
+    def write(self, pcm: bytes) -> None:  # pragma: no cover - interfaz
+        raise NotImplementedError
+
+    def close(self) -> None:  # pragma: no cover - interfaz
+        raise NotImplementedError
+
+    def __enter__(self) -> "PCMEncoder":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def abort(self) -> None:
+        """Libera recursos sin garantizar un archivo válido."""
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    # Temporal junto al destino
+    def _begin(self, out_path: str) -> str:
+        """Ruta temporal (misma carpeta que `out_path`) donde escribir hasta `_commit`."""
+        self.out_path = out_path
+        folder, name = os.path.split(os.path.abspath(out_path))
+        self._tmp_path = os.path.join(folder, f".{name}.{uuid.uuid4().hex[:8]}.part")
+        self._committed = False
+        return self._tmp_path
+
+    def _commit(self) -> None:
+        os.replace(self._tmp_path, self.out_path)
+        self._committed = True
+
+    def _discard(self) -> None:
+        """Borra lo escrito: el temporal o, si ya se movió, la salida."""
+        _remove(self.out_path if self._committed else self._tmp_path)
+
+
+class WavEncoder(PCMEncoder):
+    """Escribe WAV PCM de forma incremental (sin ffmpeg)."""
+
+    def __init__(self, out_path: str, sample_rate: int, channels: int, sample_width: int = 2) -> None:
+        self._wav = wave.open(self._begin(out_path), "wb")
+        self._wav.setnchannels(channels)
+        self._wav.setsampwidth(sample_width)
+        self._wav.setframerate(sample_rate)
+        self._sample_width = sample_width
+
+    def write(self, pcm: bytes) -> None:
+        if self._sample_width == 1:
+            # WAV de 8 bits es sin signo; pydub trabaja con signo
+            import audioop
+
+            pcm = audioop.bias(pcm, 1, 128)
+        self._wav.writeframesraw(pcm)
+
+    def close(self) -> None:
+        self._wav.close()
+        self._commit()
+
+    def abort(self) -> None:
+        try:
+            self._wav.close()
+        except Exception:
+            pass
+        self._discard()
+
+
+class FFmpegEncoder(PCMEncoder):
+    """Codifica con un subproceso de ffmpeg alimentado por stdin."""
+
+    def __init__(
+        self,
+        out_path: str,
+        fmt: str,
+        sample_rate: int,
+        channels: int,
+        sample_width: int = 2,
+        extra_args: Optional[list] = None,
+    ) -> None:
+        cmd = [
+            AudioSegment.converter,
+            "-y",
+            "-loglevel", "error",
+            "-f", FFMPEG_PCM_FORMATS[sample_width],
+            "-ar", str(sample_rate),
+            "-ac", str(channels),
+            "-i", "pipe:0",
+            *(extra_args or []),
+            "-f", fmt,
+            self._begin(out_path),
+        ]
+        try:
+            self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            raise EncoderError(f"No se pudo iniciar ffmpeg ({AudioSegment.converter}): {e}") from e
+        self._stdin: IO[bytes] = self._proc.stdin  # type: ignore[assignment]
+
+    def write(self, pcm: bytes) -> None:
+        try:
+            self._stdin.write(pcm)
+        except BrokenPipeError:
+            self.close()
+
+    def close(self) -> None:
+        if not self._stdin.closed:
+            try:
+                self._stdin.close()
+            except BrokenPipeError:
+                pass
+        stderr = self._proc.stderr.read() if self._proc.stderr else b""
+        if self._proc.wait() != 0:
+            self._discard()
+            raise EncoderError(f"ffmpeg falló al exportar {self.out_path}: {stderr.decode(errors='replace').strip()}")
+        self._commit()
+
+    def abort(self) -> None:
+        self._proc.kill()
+        self._proc.wait()
+        self._discard()
+
+
+def open_encoder(out_path: str, fmt: str, sample_rate: int, channels: int, sample_width: int = 2) -> PCMEncoder:
+    """Devuelve el codificador incremental adecuado para `fmt`."""
+    fmt = fmt.lower()
+    if fmt == "wav":
+        return WavEncoder(out_path, sample_rate, channels, sample_width)
+    return FFmpegEncoder(out_path, fmt, sample_rate, channels, sample_width)
+
+
+def iter_pcm_chunks(audio: "AudioData", block_frames: int = 65536) -> Iterator[memoryview]:
+    """Recorre `audio.raw_buffer()` en trozos de `block_frames` frames, sin copiar.
+
+    Con audio perezoso los trozos son vistas sobre el archivo mapeado.
+    """
+    data = memoryview(audio.raw_buffer())
+    step = block_frames * audio.sample_width * audio.channels
+    for start in range(0, len(data), step):
+        yield data[start:start + step]
+
+
+class FanOutEncoder(PCMEncoder):
+    """Entrega el mismo PCM a varios codificadores, cada uno desde su hilo.
+
+    `write` deja el bloque en una cola acotada por codificador (el productor
+    va como mucho `max_pending` bloques por delante del más lento), así un
+    ffmpeg lento no frena a los demás. Los codificadores solo se cierran o
+    abortan después de que sus hilos hayan terminado.
+    """
+
+    def __init__(self, encoders: Sequence[PCMEncoder], max_pending: int = 4) -> None:
+        self.encoders = list(encoders)
+        self.written = [0] * len(self.encoders)  # bytes ya entregados a cada codificador
+        self._queues: List["queue.Queue[Optional[bytes]]"] = [queue.Queue(max_pending) for _ in self.encoders]
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self._threads = [
+            threading.Thread(target=self._feed, args=(i,), daemon=True) for i in range(len(self.encoders))
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _feed(self, i: int) -> None:
+        enc, q = self.encoders[i], self._queues[i]
+        while True:
+            pcm = q.get()
+            if pcm is None:
+                return
+            if self._stop.is_set():
+                continue  # abortando: vaciar hasta el centinela
+            try:
+                enc.write(pcm)
+                self.written[i] += len(pcm)
+            except BaseException as e:
+                self._errors.append(e)
+                self._stop.set()
+
+    def _put(self, q: "queue.Queue[Optional[bytes]]", item: Optional[bytes]) -> None:
+        while True:
+            if self._errors:
+                raise self._errors[0]
+            try:
+                q.put(item, timeout=0.05)
+                return
+            except queue.Full:
+                pass
+
+    def write(self, pcm: bytes) -> None:
+        for q in self._queues:
+            self._put(q, pcm)
+
+    def close(self) -> None:
+        try:
+            for q in self._queues:
+                self._put(q, None)
+            self._join()
+            if self._errors:
+                raise self._errors[0]
+            for enc in self.encoders:
+                enc.close()
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self) -> None:
+        """Detiene los hilos, los espera y después aborta (y borra) cada salida."""
+        self._stop.set()
+        for q in self._queues:
+            try:
+                while True:
+                    q.get_nowait()
+            except queue.Empty:
+                pass
+            q.put_nowait(None)
+        self._join()
+        for enc in self.encoders:
+            enc.abort()
+
+    def _join(self) -> None:
+        for t in self._threads:
+            t.join()
+
+
+def open_fan_out(
+    targets: Sequence[Tuple[str, str]], sample_rate: int, channels: int, sample_width: int = 2
+) -> FanOutEncoder:
+    """Abre un codificador por `(ruta, formato)` y los agrupa en un `FanOutEncoder`."""
+    encoders: List[PCMEncoder] = []
+    try:
+        for path, fmt in targets:
+            encoders.append(open_encoder(path, fmt, sample_rate, channels, sample_width))
+    except BaseException:
+        for enc in encoders:
+            enc.abort()
+        raise
+    return FanOutEncoder(encoders)
+
+
+def encode_parallel(
+    audio: "AudioData",
+    targets: Sequence[Tuple[str, str]],
+    block_frames: int = 65536,
+    progress: Optional[Callable[[float], None]] = None,
+) -> List[str]:
+    """Codifica el mismo PCM a varios `(ruta, formato)` a la vez.
+
+    Cada codificador (un ffmpeg por formato, o `wave` para WAV) se alimenta
+    desde su propio hilo (`FanOutEncoder`) con vistas del mismo
+    `raw_buffer()`, sin copiarlo. Si un destino falla, o `progress` lanza una
+    excepción (p. ej. cancelación), se abortan todos y se borran los
+    archivos parciales.
+    """
+    total = max(1, memoryview(audio.raw_buffer()).nbytes)
+    with open_fan_out(targets, audio.sample_rate, audio.channels, audio.sample_width) as fan:
+        if progress is not None:
+            progress(0.0)
+        for chunk in iter_pcm_chunks(audio, block_frames):
+            fan.write(chunk)
+            if progress is not None:
+                progress(min(fan.written) / total)
+    return [path for path, _ in targets]
+
+
+def _remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
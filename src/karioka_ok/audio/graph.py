@@ -0,0 +1,727 @@
+"""Cadena de procesamiento por bloques: AudioData -> nodos -> codificadores.
+
+En lugar de encadenar funciones que devuelven pistas completas (un pase y
+una copia por efecto), una `Graph` describe los nodos y los ejecuta bloque
+a bloque sobre float32 `(canales, n)`:
+
+    graph = Graph([PitchShift(2), VocalReduction("mask"), Normalize(-14.0)])
+    graph.export(audio, [("salida.mp3", "mp3"), ("salida.flac", "flac")])
+
+Antes de ejecutar, `plan()` simplifica la cadena:
+
+- quita nodos neutros (0 semitonos, 0 dB, resample a la misma frecuencia);
+- fusiona vecinos del mismo tipo (tonos se suman, ganancias se suman,
+  resamples consecutivos quedan en el último);
+- resuelve `Normalize` (RMS, pico o LUFS de `karioka_ok.audio.loudness`) a
+  una ganancia fija midiendo el nivel antes de ejecutar: si los nodos
+  previos no cambian el nivel se mide la entrada (barato, sobre el PCM
+  entero); si no, ese prefijo se ejecuta una vez, se mide su salida y la
+  cadena continúa desde ahí (sin repetir el prefijo);
+- agrupa nodos elemento a elemento contiguos (ganancia, cancelación del
+  centro) en una etapa que opera in situ sobre el mismo buffer.
+
+La conversión entero -> float reutiliza un único buffer por ejecución. Si
+el primer nodo es un cambio de tono y se pasa una `RenderCache`, se parte
+del render guardado (mapeado en memoria) y el nodo se omite; si no estaba,
+`plan()` lo ejecuta una vez escribiendo los bloques directo a la caché, con
+su propio `progress`, y la cadena continúa desde ahí (la próxima
+exportación de la misma pista en otro formato o con otros efectos no
+vuelve a transponer). Tras ejecutar, `Plan.time_mapping()`
+dice cuánto se movieron los tiempos (el silencio inicial que quitó
+`TrimSilence`), para que la letra sincronizada de las etiquetas siga a la
+pista.
+
+La descripción es serializable (`to_dict`/`to_json` y una forma compacta
+`"pitch_shift:semitones=2;vocals:mode=mask"`), así que la misma cadena se
+arma en la GUI y se pasa a `main.py batch --chain`.
+"""
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import asdict, dataclass, fields
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+
+import numpy as np
+
+from karioka_ok.audio.audio_processor import AudioData
+from karioka_ok.utils import instrumentation
+
+if TYPE_CHECKING:
+    from karioka_ok.audio.loudness import LoudnessIndex
+    from karioka_ok.audio.render_cache import RenderCache
+
+GRAPH_VERSION = 1
+DEFAULT_BLOCK_SIZE = 65536
+NORMALIZE_MODES = ("rms", "peak", "lufs")
+
+NODE_TYPES: Dict[str, Type["Node"]] = {}
+
+# Una etapa ejecutable: mismo protocolo que PitchShiftStream / VocalReducer
+Op = Callable[[np.ndarray], None]
+
+
+def node(kind: str) -> Callable[[Type["Node"]], Type["Node"]]:
+    """Registra un tipo de nodo bajo `kind` (nombre usado al serializar)."""
+
+    def register(cls: Type["Node"]) -> Type["Node"]:
+        cls.kind = kind
+        NODE_TYPES[kind] = cls
+        return cls
+
+    return register
+
+
+class Node:
+    """Descripción de un efecto. Las subclases son dataclasses serializables."""
+
+    kind: ClassVar[str] = ""
+    # True si el nodo no cambia el nivel (para medir Normalize sobre la entrada)
+    level_preserving: ClassVar[bool] = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": self.kind, **asdict(self)}  # type: ignore[call-overload]
+
+    def is_identity(self, sample_rate: int, channels: int) -> bool:
+        return False
+
+    def merge(self, other: "Node") -> Optional["Node"]:
+        """Nodo equivalente a `self` seguido de `other`, o None si no se fusionan."""
+        return None
+
+    def output_format(self, sample_rate: int, channels: int) -> Tuple[int, int]:
+        return sample_rate, channels
+
+    def inplace(self, sample_rate: int, channels: int) -> Optional[Op]:
+        """Operación elemento a elemento in situ, si el nodo la admite."""
+        return None
+
+    def processor(self, sample_rate: int, channels: int) -> Any:
+        """Procesador con estado (`process(block)` / `flush()`) para una ejecución."""
+        op = self.inplace(sample_rate, channels)
+        if op is None:  # pragma: no cover - toda subclase define una de las dos
+            raise NotImplementedError
+        return _Inplace([op])
+
+
+# Nodos
+@node("pitch_shift")
+@dataclass
+class PitchShift(Node):
+    """Cambio de tono conservando el tempo (`PitchShiftStream`).
+
+    `tier` es la calidad del resample sin librosa (`karioka_ok.audio.resample`).
+    """
+    semitones: float = 0.0
+    tier: str = "hq"
+
+    def is_identity(self, sample_rate: int, channels: int) -> bool:
+        return self.semitones == 0
+
+    def merge(self, other: Node) -> Optional[Node]:
+        if isinstance(other, PitchShift) and other.tier == self.tier:
+            return PitchShift(self.semitones + other.semitones, self.tier)
+        return None
+
+    def processor(self, sample_rate: int, channels: int) -> Any:
+        from karioka_ok.audio.audio_processor import has_librosa
+        from karioka_ok.audio.pitch_stream import PitchShiftStream
+
+        # Sin librosa, el mismo motor que `change_pitch_semitones` (renders en caché intercambiables)
+        engine = None if has_librosa() else "numpy"
+        return PitchShiftStream(sample_rate, self.semitones, channels=channels, tier=self.tier, engine=engine)
+
+
+@node("gain")
+@dataclass
+class Gain(Node):
+    db: float = 0.0
+    level_preserving: ClassVar[bool] = False
+
+    def is_identity(self, sample_rate: int, channels: int) -> bool:
+        return self.db == 0
+
+    def merge(self, other: Node) -> Optional[Node]:
+        if isinstance(other, Gain):
+            return Gain(self.db + other.db)
+        return None
+
+    def inplace(self, sample_rate: int, channels: int) -> Optional[Op]:
+        factor = np.float32(10.0 ** (self.db / 20.0))
+        return lambda block: np.multiply(block, factor, out=block)
+
+
+@node("normalize")
+@dataclass
+class Normalize(Node):
+    """Lleva la pista a `target_db` (dBFS RMS o pico, o LUFS integrados). Se resuelve a `Gain`.
+
+    En modo `lufs` la ganancia se limita para que el pico verdadero no pase
+    de `ceiling_db` dBTP.
+    """
+    target_db: float = -14.0
+    mode: str = "rms"
+    ceiling_db: float = -1.0
+    level_preserving: ClassVar[bool] = False
+
+    def __post_init__(self) -> None:
+        if self.mode not in NORMALIZE_MODES:
+            raise ValueError(f"Modo de normalización desconocido: {self.mode!r}")
+
+    def gain_for(self, level: float, peak: float) -> float:
+        """Ganancia (dB) dado el nivel medido y el pico (verdadero en modo `lufs`)."""
+        if not math.isfinite(level):
+            return 0.0
+        gain = self.target_db - level
+        if self.mode == "lufs" and math.isfinite(peak):
+            gain = min(gain, self.ceiling_db - peak)
+        return gain
+
+
+@node("trim_silence")
+@dataclass
+class TrimSilence(Node):
+    """Recorta el silencio inicial y final (bajo `threshold_db`), dejando `pad_ms`."""
+    threshold_db: float = -50.0
+    pad_ms: float = 100.0
+
+    def processor(self, sample_rate: int, channels: int) -> Any:
+        pad = int(sample_rate * self.pad_ms / 1000.0)
+        return _TrimSilence(sample_rate, channels, 10.0 ** (self.threshold_db / 20.0), pad)
+
+
+@node("resample")
+@dataclass
+class Resample(Node):
+    """Cambio de frecuencia de muestreo: soxr (`quality`) o, sin soxr, el nivel equivalente del motor NumPy."""
+    sample_rate: int = 44100
+    quality: str = "HQ"
+
+    def is_identity(self, sample_rate: int, channels: int) -> bool:
+        return int(self.sample_rate) == int(sample_rate)
+
+    def merge(self, other: Node) -> Optional[Node]:
+        return other if isinstance(other, Resample) else None
+
+    def output_format(self, sample_rate: int, channels: int) -> Tuple[int, int]:
+        return int(self.sample_rate), channels
+
+    def processor(self, sample_rate: int, channels: int) -> Any:
+        from karioka_ok.audio.resample import stream_resampler
+
+        return stream_resampler(sample_rate, int(self.sample_rate), channels, quality=self.quality)
+
+
+@node("vocals")
+@dataclass
+class VocalReduction(Node):
+    """Reducción de voz (`karioka_ok.audio.vocals`); solo estéreo."""
+    mode: str = "mask"
+    strength: float = 1.0
+    level_preserving: ClassVar[bool] = False
+
+    def is_identity(self, sample_rate: int, channels: int) -> bool:
+        return self.strength == 0
+
+    def inplace(self, sample_rate: int, channels: int) -> Optional[Op]:
+        if channels != 2:
+            raise ValueError("La reducción de voz requiere audio estéreo")
+        if self.mode != "center":
+            return None
+        half = np.float32(0.5 * self.strength)
+
+        def cancel(block: np.ndarray) -> None:
+            mid = (block[0] + block[1]) * half
+            block -= mid
+
+        return cancel
+
+    def processor(self, sample_rate: int, channels: int) -> Any:
+        op = self.inplace(sample_rate, channels)
+        if op is not None:
+            return _Inplace([op])
+        from karioka_ok.audio.vocals import VocalReducer
+
+        return VocalReducer(sample_rate, mode=self.mode, strength=self.strength)
+
+
+def node_from_dict(data: Dict[str, Any]) -> Node:
+    data = dict(data)
+    kind = data.pop("type", None)
+    cls = NODE_TYPES.get(kind or "")
+    if cls is None:
+        raise ValueError(f"Tipo de nodo desconocido: {kind!r} (opciones: {', '.join(sorted(NODE_TYPES))})")
+    known = {f.name: f for f in fields(cls)}  # type: ignore[arg-type]
+    unknown = set(data) - set(known)
+    if unknown:
+        raise ValueError(f"Parámetros desconocidos para {kind}: {', '.join(sorted(unknown))}")
+    return cls(**data)
+
+
+# Procesadores
+class _Inplace:
+    """Etapa fusionada: aplica varias operaciones elemento a elemento sobre el mismo buffer."""
+
+    def __init__(self, ops: List[Op]) -> None:
+        self.ops = ops
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        for op in self.ops:
+            op(block)
+        return block
+
+    def flush(self) -> np.ndarray:
+        return np.zeros((0, 0), dtype=np.float32)
+
+
+class _TrimSilence:
+    """Descarta el silencio inicial y final.
+
+    El silencio interno se retiene (copiado) hasta que vuelve a sonar algo,
+    porque hasta entonces no se sabe si es el final de la pista.
+    `trimmed` son los segundos descartados al principio.
+    """
+
+    def __init__(self, sample_rate: int, channels: int, threshold: float, pad: int) -> None:
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.threshold = threshold
+        self.pad = pad
+        self.trimmed = 0.0
+        self._seen = 0  # muestras de entrada antes del primer sonido
+        self._started = False
+        self._held: List[np.ndarray] = []  # antes de empezar: últimas `pad` muestras; después: silencio pendiente
+
+    def _empty(self) -> np.ndarray:
+        return np.zeros((self.channels, 0), dtype=np.float32)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        loud = np.flatnonzero(np.abs(block).max(axis=0) > self.threshold)
+        if not self._started:
+            if loud.size == 0:
+                self._seen += block.shape[1]
+                lead = np.concatenate(self._held + [block], axis=1)
+                self._held = [lead[:, max(0, lead.shape[1] - self.pad):].copy()] if self.pad else []
+                return self._empty()
+            self._started = True
+            first = int(loud[0])
+            lead = np.concatenate(self._held + [block[:, :first]], axis=1)
+            lead = lead[:, max(0, lead.shape[1] - self.pad):]
+            self.trimmed = (self._seen + first - lead.shape[1]) / self.sample_rate
+            self._held = []
+            block = np.concatenate([lead, block[:, first:]], axis=1)
+            loud = loud - first + lead.shape[1]
+        if loud.size == 0:
+            self._held.append(block.copy())
+            return self._empty()
+        end = int(loud[-1]) + 1
+        out = np.concatenate(self._held + [block[:, :end]], axis=1) if self._held else block[:, :end]
+        self._held = [block[:, end:].copy()] if end < block.shape[1] else []
+        return out
+
+    def flush(self) -> np.ndarray:
+        if not self._started or not self._held:
+            return self._empty()
+        tail = np.concatenate(self._held, axis=1)
+        self._held = []
+        return tail[:, : self.pad]
+
+
+# Grafo
+@dataclass
+class Plan:
+    """Cadena lista para ejecutar: nodos simplificados y formato de salida.
+
+    `time_mapping()` ubica en la salida un instante de la entrada (para la
+    letra sincronizada); lo recortado al principio solo se conoce después
+    de ejecutar el plan.
+    """
+    nodes: List[Node]
+    sample_rate: int
+    channels: int
+    source: AudioData
+    offset: float = 0.0  # segundos que ya movieron los prefijos ejecutados en `plan()`
+    trimmed: float = 0.0  # segundos recortados al principio en la última ejecución
+
+    def time_mapping(self) -> Tuple[float, float]:
+        """`(factor, offset)`: el instante `t` de la entrada cae en `t * factor + offset`.
+
+        El factor es 1 (todos los nodos conservan el tempo); el desplazamiento
+        es el silencio inicial que quitó `TrimSilence`.
+        """
+        return 1.0, self.offset - self.trimmed
+
+
+class Graph:
+    """Secuencia de nodos aplicada bloque a bloque."""
+
+    def __init__(self, nodes: Iterable[Node] = ()) -> None:
+        self.nodes: List[Node] = list(nodes)
+
+    def __repr__(self) -> str:
+        return f"Graph({self.to_spec()!r})"
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Graph) and self.nodes == other.nodes
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def then(self, *nodes: Node) -> "Graph":
+        return Graph(self.nodes + list(nodes))
+
+    @classmethod
+    def from_options(cls, semitones: float = 0, vocals: Optional[str] = None, tier: str = "hq") -> "Graph":
+        """La cadena clásica de exportación: tono y, opcionalmente, reducción de voz."""
+        nodes: List[Node] = []
+        if semitones:
+            nodes.append(PitchShift(semitones, tier))
+        if vocals:
+            nodes.append(VocalReduction(vocals))
+        return cls(nodes)
+
+    # Serialización
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": GRAPH_VERSION, "nodes": [n.to_dict() for n in self.nodes]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Graph":
+        if data.get("version", GRAPH_VERSION) != GRAPH_VERSION:
+            raise ValueError(f"Versión de cadena no soportada: {data.get('version')}")
+        return cls(node_from_dict(n) for n in data.get("nodes", []))
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    @classmethod
+    def from_json(cls, text: str) -> "Graph":
+        return cls.from_dict(json.loads(text))
+
+    def to_spec(self) -> str:
+        """Forma compacta: `tipo:clave=valor,clave=valor;tipo...`."""
+        parts = []
+        for n in self.nodes:
+            params = {k: v for k, v in n.to_dict().items() if k != "type"}
+            args = ",".join(f"{k}={v}" for k, v in params.items())
+            parts.append(f"{n.kind}:{args}" if args else n.kind)
+        return ";".join(parts)
+
+    @classmethod
+    def parse(cls, spec: str) -> "Graph":
+        """Inversa de `to_spec`; los valores numéricos se convierten al tipo del campo."""
+        nodes = []
+        for part in filter(None, (p.strip() for p in spec.split(";"))):
+            kind, _, args = part.partition(":")
+            cls_ = NODE_TYPES.get(kind.strip())
+            types = {f.name: f.type for f in fields(cls_)} if cls_ else {}  # type: ignore[arg-type]
+            data: Dict[str, Any] = {"type": kind.strip()}
+            for arg in filter(None, (a.strip() for a in args.split(","))):
+                key, sep, value = arg.partition("=")
+                if not sep:
+                    raise ValueError(f"Parámetro sin valor en la cadena: {arg!r}")
+                data[key.strip()] = _coerce(value.strip(), types.get(key.strip()))
+            nodes.append(node_from_dict(data))
+        return cls(nodes)
+
+    @classmethod
+    def load(cls, spec_or_path: str) -> "Graph":
+        """Cadena desde un archivo `.json` o desde la forma compacta."""
+        if spec_or_path.lower().endswith(".json"):
+            with open(spec_or_path, "r", encoding="utf-8") as f:
+                return cls.from_json(f.read())
+        return cls.parse(spec_or_path)
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json() + "\n")
+
+    # Planificación
+    def plan(
+        self,
+        audio: AudioData,
+        cache: Optional["RenderCache"] = None,
+        loudness: Optional["LoudnessIndex"] = None,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> Plan:
+        """Simplifica la cadena para `audio` (nodos neutros, fusiones, normalización).
+
+        `loudness` reutiliza mediciones LUFS guardadas para `Normalize(mode="lufs")`.
+        Si el cambio de tono inicial no está en `cache` se calcula aquí (es
+        la parte lenta de una exportación): `progress` recibe su avance y
+        puede lanzar una excepción para cancelar.
+        """
+        sr, ch = audio.sample_rate, audio.channels
+        source, offset = audio, 0.0
+        nodes = _simplify(self.nodes, sr, ch)
+
+        if cache is not None and nodes and isinstance(nodes[0], PitchShift):
+            hit = _cached_shift(audio, nodes[0], cache, progress)
+            if hit is not None:
+                source, nodes = hit, nodes[1:]
+
+        # Normalize -> Gain, de izquierda a derecha (cada medición ve la cadena ya resuelta)
+        while any(isinstance(n, Normalize) for n in nodes):
+            i = next(k for k, n in enumerate(nodes) if isinstance(n, Normalize))
+            norm, prefix = nodes[i], nodes[:i]
+            if not all(n.level_preserving or isinstance(n, Gain) for n in prefix):
+                # El prefijo cambia el nivel: se ejecuta una sola vez y se parte de su salida
+                done = Plan(prefix, sr, ch, source, offset)
+                source = _materialize(done)
+                offset = done.time_mapping()[1]
+                sr, ch = source.sample_rate, source.channels
+                nodes, i, prefix = nodes[i:], 0, []
+            level, peak = _measure(source, prefix, norm.mode, loudness)  # type: ignore[attr-defined]
+            gain = Gain(norm.gain_for(level, peak))  # type: ignore[attr-defined]
+            nodes = _simplify(prefix + [gain] + nodes[i + 1:], sr, ch)
+
+        for n in nodes:
+            sr, ch = n.output_format(sr, ch)
+        return Plan(nodes, sr, ch, source, offset)
+
+    def output_format(self, audio: AudioData) -> Tuple[int, int]:
+        sr, ch = audio.sample_rate, audio.channels
+        for n in self.nodes:
+            sr, ch = n.output_format(sr, ch)
+        return sr, ch
+
+    # Ejecución
+    def stream(
+        self,
+        audio: AudioData,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        cache: Optional["RenderCache"] = None,
+        progress: Optional[Callable[[float], None]] = None,
+        plan: Optional[Plan] = None,
+        loudness: Optional["LoudnessIndex"] = None,
+    ) -> Iterator[np.ndarray]:
+        """Bloques float32 `(canales, n)` de la salida.
+
+        Un bloque emitido puede ser el buffer reutilizado de la etapa anterior:
+        solo es válido hasta pedir el siguiente (copiarlo si se quiere guardar).
+        `progress` recibe la fracción de la entrada consumida (y puede lanzar
+        una excepción para cancelar).
+        """
+        plan = plan or self.plan(audio, cache, loudness)
+        return _run(plan, block_size, progress)
+
+    def render(
+        self,
+        audio: AudioData,
+        cache: Optional["RenderCache"] = None,
+        loudness: Optional["LoudnessIndex"] = None,
+    ) -> AudioData:
+        """Ejecuta la cadena en memoria y devuelve la pista procesada (mismo ancho de muestra)."""
+        return _materialize(self.plan(audio, cache, loudness))
+
+    def export(
+        self,
+        audio: AudioData,
+        targets: Sequence[Tuple[str, str]],
+        cache: Optional["RenderCache"] = None,
+        progress: Optional[Callable[[float], None]] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        loudness: Optional["LoudnessIndex"] = None,
+        plan: Optional[Plan] = None,
+    ) -> List[str]:
+        """Procesa y codifica a cada `(ruta, formato)` en un solo pase.
+
+        Cada bloque se convierte a PCM una vez y se entrega a todos los
+        codificadores, que trabajan en paralelo (`FanOutEncoder`); si algo
+        falla (o `progress` cancela) se abortan todos y se borran los archivos
+        parciales. Con un `plan` propio, al terminar su `time_mapping()` sirve
+        para reubicar la letra de las etiquetas.
+        """
+        from karioka_ok.audio.buffers import float_to_pcm_bytes
+        from karioka_ok.audio.encoders import open_fan_out
+
+        plan = plan or self.plan(audio, cache, loudness)
+        sw = audio.sample_width
+        with instrumentation.stage("audio.graph", nodes=[n.kind for n in plan.nodes],
+                                   formats=[fmt for _, fmt in targets]) as st:
+            with open_fan_out(targets, plan.sample_rate, plan.channels, sw) as fan:
+                for block in self.stream(audio, block_size, progress=progress, plan=plan):
+                    pcm = float_to_pcm_bytes(block, sw)
+                    st.add_bytes(len(pcm))
+                    fan.write(pcm)
+        return [path for path, _ in targets]
+
+
+def _coerce(value: str, annotation: Any) -> Any:
+    kind = annotation if isinstance(annotation, str) else getattr(annotation, "__name__", "")
+    if kind == "int":
+        return int(value)
+    if kind == "float":
+        return float(value)
+    return value
+
+
+def _simplify(nodes: Sequence[Node], sample_rate: int, channels: int) -> List[Node]:
+    out: List[Node] = []
+    sr, ch = sample_rate, channels
+    for n in nodes:
+        if n.is_identity(sr, ch):
+            continue
+        merged = out[-1].merge(n) if out else None
+        if merged is not None:
+            out.pop()
+            # El formato de entrada del nodo fusionado es el de antes del anterior
+            prev_sr, prev_ch = sample_rate, channels
+            for m in out:
+                prev_sr, prev_ch = m.output_format(prev_sr, prev_ch)
+            if not merged.is_identity(prev_sr, prev_ch):
+                out.append(merged)
+        else:
+            out.append(n)
+        sr, ch = sample_rate, channels
+        for m in out:
+            sr, ch = m.output_format(sr, ch)
+    return out
+
+
+def _cached_shift(
+    audio: AudioData,
+    shift: PitchShift,
+    cache: "RenderCache",
+    progress: Optional[Callable[[float], None]] = None,
+) -> Optional[AudioData]:
+    """`shift` aplicado a `audio` desde la caché; si falta, se calcula y se guarda (None: no cacheable).
+
+    Con librosa y varios núcleos (`KARIOKA_PITCH_WORKERS`), las pistas
+    largas se transponen por segmentos en paralelo
+    (`karioka_ok.audio.pitch_parallel`, mismo resultado que una sola
+    llamada). Si no, el cálculo escribe cada bloque en la caché a medida que
+    sale. En ambos casos se devuelve el render mapeado desde la caché.
+    """
+    from karioka_ok.audio.audio_processor import has_librosa, pitch_algorithm
+    from karioka_ok.audio.buffers import float_to_pcm_bytes
+    from karioka_ok.audio.pitch_parallel import segment_workers, shift_segmented
+    from karioka_ok.audio.render_cache import RenderKey
+
+    semitones = shift.semitones
+    if float(semitones) != int(semitones):
+        return None
+    key = RenderKey(audio.content_hash(), int(semitones), pitch_algorithm(shift.tier), audio.sample_rate)
+    hit = cache.get(key, path=audio.path)
+    instrumentation.count("render_cache.hit" if hit is not None else "render_cache.miss")
+    if hit is None:
+        workers = segment_workers()
+        shifted = shift_segmented(audio, semitones, workers, progress) if workers > 1 and has_librosa() else None
+        if shifted is not None:
+            cache.put(key, shifted)
+        else:
+            sw, sr, ch = audio.sample_width, audio.sample_rate, audio.channels
+            blocks = _run(Plan([shift], sr, ch, audio), DEFAULT_BLOCK_SIZE, progress)
+            cache.put_blocks(key, (float_to_pcm_bytes(b, sw) for b in blocks), sw, sr, ch)
+        hit = cache.get(key, path=audio.path)
+    return hit
+
+
+def _materialize(plan: Plan) -> AudioData:
+    """Ejecuta `plan` en memoria: PCM del mismo ancho de muestra que la fuente."""
+    from pydub import AudioSegment
+
+    from karioka_ok.audio.buffers import float_to_pcm_bytes
+
+    source = plan.source
+    if not plan.nodes:
+        return source
+    # Los bloques se unen una sola vez al final (sin buffer intermedio que crece y se copia)
+    parts = [float_to_pcm_bytes(block, source.sample_width) for block in _run(plan, DEFAULT_BLOCK_SIZE, None)]
+    sr, ch = source.sample_rate, source.channels
+    for n in plan.nodes:
+        sr, ch = n.output_format(sr, ch)
+    seg = AudioSegment(data=b"".join(parts), sample_width=source.sample_width, frame_rate=sr, channels=ch)
+    return AudioData(segment=seg, sample_rate=sr, channels=ch, path=source.path)
+
+
+def _measure(
+    audio: AudioData, prefix: List[Node], mode: str, loudness: Optional["LoudnessIndex"] = None
+) -> Tuple[float, float]:
+    """`(nivel, pico)` de `audio` tras `prefix` (solo ganancias y nodos que conservan el nivel).
+
+    El nivel es dBFS RMS o de pico, o LUFS integrados en modo `lufs` (con
+    el pico verdadero en dBTP).
+    """
+    from karioka_ok.audio.buffers import iter_audio_blocks
+
+    # Medir la entrada y sumar las ganancias del prefijo
+    gain_db = sum(n.db for n in prefix if isinstance(n, Gain))
+    if mode == "lufs":
+        from karioka_ok.audio.loudness import measure_loudness
+
+        stats = measure_loudness(audio, index=loudness)
+        return stats.integrated + gain_db, stats.true_peak + gain_db
+
+    peak, sq, count = 0.0, 0.0, 0
+    for block in iter_audio_blocks(audio, DEFAULT_BLOCK_SIZE):
+        if block.size:
+            peak = max(peak, float(np.abs(block).max()))
+            sq += float(np.einsum("ij,ij->", block, block, dtype=np.float64))
+            count += block.size
+    level = peak if mode == "peak" else math.sqrt(sq / count) if count else 0.0
+    peak_db = 20.0 * math.log10(peak) + gain_db if peak > 0 else -math.inf
+    return (20.0 * math.log10(level) + gain_db if level > 0 else -math.inf), peak_db
+
+
+def _stages(plan: Plan) -> List[Any]:
+    """Procesadores de la ejecución; los nodos in situ contiguos comparten una etapa."""
+    stages: List[Any] = []
+    sr, ch = plan.source.sample_rate, plan.source.channels
+    for n in plan.nodes:
+        op = n.inplace(sr, ch)
+        if op is not None and stages and isinstance(stages[-1], _Inplace):
+            stages[-1].ops.append(op)
+        elif op is not None:
+            stages.append(_Inplace([op]))
+        else:
+            stages.append(n.processor(sr, ch))
+        sr, ch = n.output_format(sr, ch)
+    return stages
+
+
+def _run(plan: Plan, block_size: int, progress: Optional[Callable[[float], None]]) -> Iterator[np.ndarray]:
+    from karioka_ok.audio.buffers import audio_to_array, ints_to_float
+
+    stages = _stages(plan)
+    plan.trimmed = 0.0
+    ints = audio_to_array(plan.source)
+    total = ints.shape[1]
+    buf = np.empty((ints.shape[0], min(block_size, max(total, 1))), dtype=np.float32)
+
+    def push(block: np.ndarray, k: int) -> np.ndarray:
+        for stage in stages[k:]:
+            if not block.shape[-1]:
+                break
+            block = stage.process(block)
+        return block
+
+    for start in range(0, total, block_size):
+        chunk = ints[:, start:start + block_size]
+        block = ints_to_float(chunk, plan.source.sample_width, out=buf[:, : chunk.shape[1]])
+        out = push(block, 0)
+        if out.shape[-1]:
+            yield out
+        if progress is not None:
+            progress(min(1.0, (start + chunk.shape[1]) / total))
+
+    # Vaciar cada etapa en orden: lo que suelta la etapa k pasa por las siguientes
+    for k, stage in enumerate(stages):
+        tail = stage.flush()
+        if tail.size:
+            out = push(tail, k + 1)
+            if out.shape[-1]:
+                yield out
+    plan.trimmed = sum(getattr(stage, "trimmed", 0.0) for stage in stages)
@@ -0,0 +1,362 @@
+"""Tonalidad de una pista y sugerencia de transposición para quien canta.
+
+`KeyAnalyzer` consume bloques float32 `(canales, n)` (el formato de
+`iter_audio_blocks`) y reduce cada ventana de ~370 ms (FFT de ~2,7 Hz por
+bin, sin solapamiento: para una estadística de toda la pista sobra) a las
+magnitudes de 80 Hz a 5,4 kHz; una pista de 4 minutos son unas 650
+ventanas, así que todo lo demás es álgebra sobre una matriz pequeña:
+
+- afinación: media circular de la fracción de semitono de cada bin,
+  ponderada por la energía (pistas afinadas a 432 Hz o con varispeed);
+- croma: cada bin suma en la clase de altura más cercana con peso
+  cos² de la distancia en semitonos; cada ventana se normaliza y se
+  promedia;
+- tonalidad: correlación con los perfiles de Krumhansl-Kessler en las 24
+  tonalidades mayores y menores; la confianza es la distancia entre la
+  mejor y la segunda;
+- melodía: suma de armónicos (1 a 5) por semitono de La2 a Do6 y el
+  semitono dominante de cada ventana; el histograma da un rango
+  aproximado de la melodía (en una mezcla, la voz suele dominar).
+
+`suggest_semitones` elige el desplazamiento que lleva la pista a una
+tonalidad pedida y/o encaja ese histograma en el rango de quien canta,
+con el menor cambio posible.
+
+`KeyIndex` guarda las estimaciones en SQLite por hash de contenido y por
+ruta + tamaño + mtime (la misma base que `LoudnessIndex`,
+`karioka_ok.utils.content_index`): cargar de nuevo una pista o
+reanalizar un catálogo sin cambios no vuelve a calcular nada.
+"""
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from karioka_ok.audio.audio_processor import AudioData
+from karioka_ok.utils import instrumentation
+from karioka_ok.utils.content_index import ContentIndex
+from karioka_ok.utils.logging_config import get_logger
+
+logger = get_logger("karioka_ok.audio.key")
+
+KEY_VERSION = 1
+DEFAULT_BLOCK_SIZE = 1 << 18
+BIN_HZ = 2.7  # resolución buscada: dos bins por semitono desde ~90 Hz
+BAND = (80.0, 5400.0)
+MELODY_LOW, MELODY_HIGH = 45, 84  # La2 a Do6 (MIDI)
+HARMONICS = 5
+HARMONIC_DECAY = 0.8
+MELODY_PERCENTILES = (10.0, 90.0)
+SILENCE = 1e-4  # ventanas con menos energía que esto por el máximo: fuera
+
+MAJOR, MINOR = "major", "minor"
+NOTE_NAMES = ("Do", "Do#", "Re", "Mib", "Mi", "Fa", "Fa#", "Sol", "Lab", "La", "Sib", "Si")
+SHORT_NAMES = ("C", "C#", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "Bb", "B")
+
+# Krumhansl y Kessler (1982), desde la tónica
+_PROFILES = {
+    MAJOR: (6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88),
+    MINOR: (6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17),
+}
+_LETTERS = {"c": 0, "d": 2, "e": 4, "f": 5, "g": 7, "a": 9, "b": 11,
+            "do": 0, "re": 2, "mi": 4, "fa": 5, "sol": 7, "la": 9, "si": 11}
+_NOTE = r"(do|re|mi|fa|sol|la|si|[a-g])\s*([#♯b♭]?)"
+_NOTE_RE = re.compile(rf"^{_NOTE}\s*(-?\d)$", re.IGNORECASE)
+_KEY_RE = re.compile(rf"^{_NOTE}\s*(m|min|minor|menor|maj|major|mayor)?$", re.IGNORECASE)
+
+
+@dataclass
+class KeyEstimate:
+    """Tonalidad estimada y distribución de la melodía (histograma por semitono desde `MELODY_LOW`)."""
+    tonic: int  # clase de altura, 0 = Do
+    mode: str  # MAJOR | MINOR
+    correlation: float
+    confidence: float  # mejor correlación menos la segunda
+    tuning: float  # centésimas respecto de La 440
+    duration: float  # segundos
+    melody: Tuple[float, ...] = ()
+
+    @property
+    def name(self) -> str:
+        return self.transposed_name(0)
+
+    @property
+    def short_name(self) -> str:
+        return SHORT_NAMES[self.tonic] + ("m" if self.mode == MINOR else "")
+
+    def transposed_name(self, semitones: int) -> str:
+        """Nombre de la tonalidad tras transponer `semitones`."""
+        tonic = (self.tonic + semitones) % 12
+        return f"{NOTE_NAMES[tonic]} {'mayor' if self.mode == MAJOR else 'menor'}"
+
+    def melody_range(self) -> Optional[Tuple[int, int]]:
+        """Notas MIDI entre las que está la mayor parte de la melodía (percentiles 10 y 90)."""
+        hist = np.asarray(self.melody, dtype=np.float64)
+        if not hist.size or hist.sum() <= 0:
+            return None
+        cdf = np.cumsum(hist) / hist.sum()
+        low, high = (int(np.searchsorted(cdf, p / 100.0)) for p in MELODY_PERCENTILES)
+        return MELODY_LOW + low, MELODY_LOW + high
+
+    def format(self) -> str:
+        text = f"{self.name} ({self.short_name}) · confianza {self.confidence:.2f}"
+        span = self.melody_range()
+        if span is not None:
+            text += f" · melodía {note_name(span[0])}–{note_name(span[1])}"
+        return text
+
+
+def note_name(midi: int) -> str:
+    """`La4` para 69 (Do4 = 60)."""
+    return f"{NOTE_NAMES[midi % 12]}{midi // 12 - 1}"
+
+
+def _semitone(name: str, accidental: str) -> int:
+    return _LETTERS[name.lower()] + {"#": 1, "♯": 1, "b": -1, "♭": -1}.get(accidental.lower(), 0)
+
+
+def parse_note(text: str) -> int:
+    """Nota con octava (`A2`, `Sib3`, `do#4`) a MIDI (Do4 = 60)."""
+    match = _NOTE_RE.match(text.strip())
+    if match is None:
+        raise ValueError(f"Nota no válida: {text!r} (ejemplos: A2, Sib3, Do#4)")
+    name, accidental, octave = match.groups()
+    return _semitone(name, accidental) + 12 * (int(octave) + 1)
+
+
+def parse_key(text: str) -> Tuple[int, Optional[str]]:
+    """`(tónica, modo)` desde `Am`, `Sib mayor`, `F# minor`...; el modo es None si no se indica."""
+    match = _KEY_RE.match(text.strip())
+    if match is None:
+        raise ValueError(f"Tonalidad no válida: {text!r} (ejemplos: Am, Do, Sib mayor)")
+    name, accidental, mode = match.groups()
+    if mode is not None:
+        mode = MAJOR if mode.lower() in ("maj", "major", "mayor") else MINOR
+    return _semitone(name, accidental) % 12, mode
+
+
+def parse_voice_range(text: str) -> Tuple[int, int]:
+    """`(grave, agudo)` en MIDI desde `A2-E4` o `La2 a Mi4`."""
+    parts = re.split(r"\s*(?:-|–|\ba\b|\bto\b)\s*", text.strip(), flags=re.IGNORECASE)
+    if len(parts) != 2:
+        raise ValueError(f"Rango no válido: {text!r} (ejemplo: A2-E4)")
+    low, high = parse_note(parts[0]), parse_note(parts[1])
+    if high <= low:
+        raise ValueError(f"Rango vacío: {text!r}")
+    return low, high
+
+
+def parse_target(text: str) -> Tuple[Optional[Tuple[int, Optional[str]]], Optional[Tuple[int, int]]]:
+    """`(tonalidad, rango)` desde lo que escribe el usuario: `A2-E4`, `Do`, o ambos separados por coma."""
+    target_key = voice_range = None
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        if _KEY_RE.match(part):
+            target_key = parse_key(part)
+        else:
+            voice_range = parse_voice_range(part)
+    if target_key is None and voice_range is None:
+        raise ValueError("Indica un rango (A2-E4) o una tonalidad (Do, Am)")
+    return target_key, voice_range
+
+
+def suggest_semitones(
+    estimate: KeyEstimate,
+    target_key: Optional[Tuple[int, Optional[str]]] = None,
+    voice_range: Optional[Tuple[int, int]] = None,
+    limit: int = 12,
+) -> int:
+    """Semitonos (entre -`limit` y `limit`) para cantar la pista en `target_key` y/o dentro de `voice_range`.
+
+    Con una tonalidad, solo valen los desplazamientos que llegan a ella (si
+    el modo pedido no es el de la pista, a su relativa); con un rango, gana
+    el que deja menos melodía fuera (en semitonos, ponderado por tiempo).
+    A igualdad, el cambio más pequeño y, entre +6 y -6, hacia abajo.
+    """
+    if target_key is None and voice_range is None:
+        raise ValueError("Hace falta una tonalidad o un rango de voz")
+    shifts = np.arange(-limit, limit + 1)
+    if target_key is not None:
+        tonic, mode = target_key
+        if mode is not None and mode != estimate.mode:
+            tonic += -3 if mode == MAJOR else 3  # relativa: Do mayor <-> La menor
+        shifts = shifts[(estimate.tonic + shifts - tonic) % 12 == 0]
+    cost = np.zeros(len(shifts))
+    hist = np.asarray(estimate.melody, dtype=np.float64)
+    if voice_range is not None and hist.size and hist.sum() > 0:
+        low, high = voice_range
+        pitches = MELODY_LOW + np.arange(hist.size)[None, :] + shifts[:, None]
+        outside = np.maximum(low - pitches, 0) + np.maximum(pitches - high, 0)
+        cost = outside @ (hist / hist.sum())
+    best = min(range(len(shifts)), key=lambda i: (round(float(cost[i]), 6), abs(int(shifts[i])), int(shifts[i])))
+    return int(shifts[best])
+
+
+@lru_cache(maxsize=8)
+def _spectral_layout(sample_rate: int) -> Tuple[int, int, int]:
+    """`(n_fft, primer bin, último bin)` de la banda analizada para `sample_rate`."""
+    n_fft = 1 << int(round(math.log2(sample_rate / BIN_HZ)))
+    first = int(math.ceil(BAND[0] * n_fft / sample_rate))
+    last = min(n_fft // 2, int(BAND[1] * n_fft / sample_rate)) + 1
+    return n_fft, first, last
+
+
+def _bin_pitches(sample_rate: int, tuning: float) -> np.ndarray:
+    """Altura MIDI (fraccionaria) de cada bin de la banda, corregida por `tuning` (centésimas)."""
+    n_fft, first, last = _spectral_layout(sample_rate)
+    freqs = np.arange(first, last) * sample_rate / n_fft
+    return 69.0 + 12.0 * np.log2(freqs / 440.0) - tuning / 100.0
+
+
+@lru_cache(maxsize=8)
+def _chroma_weights(sample_rate: int, tuning: float) -> np.ndarray:
+    """`(bins, 12)`: cada bin en su clase de altura más cercana, con peso cos² de la distancia."""
+    pitch = _bin_pitches(sample_rate, tuning)
+    nearest = np.rint(pitch)
+    weights = np.zeros((pitch.size, 12), dtype=np.float32)
+    weights[np.arange(pitch.size), nearest.astype(int) % 12] = np.cos(np.pi * (pitch - nearest)) ** 2
+    return weights
+
+
+@lru_cache(maxsize=8)
+def _salience_weights(sample_rate: int, tuning: float) -> np.ndarray:
+    """`(bins, semitonos)`: suma de armónicos para cada nota de `MELODY_LOW` a `MELODY_HIGH`."""
+    pitch = _bin_pitches(sample_rate, tuning)[:, None]
+    notes = np.arange(MELODY_LOW, MELODY_HIGH + 1)
+    weights = np.zeros((pitch.shape[0], notes.size), dtype=np.float32)
+    for h in range(1, HARMONICS + 1):
+        distance = pitch - (notes[None, :] + 12.0 * math.log2(h))
+        near = np.abs(distance) < 0.5
+        weights += np.where(near, HARMONIC_DECAY ** (h - 1) * np.cos(np.pi * distance) ** 2, 0.0).astype(np.float32)
+    return weights
+
+
+def _profiles() -> Tuple[List[Tuple[int, str]], np.ndarray]:
+    """Las 24 tonalidades y sus perfiles centrados y de norma 1, `(24, 12)`."""
+    keys, rows = [], []
+    for mode, profile in _PROFILES.items():
+        for tonic in range(12):
+            keys.append((tonic, mode))
+            rows.append(np.roll(profile, tonic))
+    rows = np.array(rows)
+    rows -= rows.mean(axis=1, keepdims=True)
+    return keys, rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+class KeyAnalyzer:
+    """Análisis en streaming: `process(block)` por cada bloque y `result()` al final."""
+
+    def __init__(self, sample_rate: int) -> None:
+        self.sample_rate = int(sample_rate)
+        self.n_fft, self._first, self._last = _spectral_layout(self.sample_rate)
+        self._window = np.hanning(self.n_fft).astype(np.float32)
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._frames: List[np.ndarray] = []  # magnitudes de la banda, `(ventanas, bins)`
+        self._samples = 0
+
+    def process(self, block: np.ndarray) -> None:
+        from scipy.fft import rfft
+
+        block = np.atleast_2d(np.asarray(block, dtype=np.float32))
+        self._samples += block.shape[1]
+        mono = block.mean(axis=0, dtype=np.float32)
+        if self._carry.size:
+            mono = np.concatenate([self._carry, mono])
+        count = mono.size // self.n_fft
+        self._carry = mono[count * self.n_fft:].copy()
+        if count:
+            frames = mono[:count * self.n_fft].reshape(count, self.n_fft) * self._window
+            self._frames.append(np.abs(rfft(frames, axis=1)[:, self._first:self._last]))
+
+    def result(self) -> KeyEstimate:
+        if self._carry.size * 2 >= self.n_fft or not self._frames:
+            # La última ventana incompleta cuenta si tiene al menos media ventana (pistas cortas)
+            tail = np.zeros(self.n_fft, dtype=np.float32)
+            tail[:self._carry.size] = self._carry
+            self._carry = np.zeros(0, dtype=np.float32)
+            self.process(tail[None, :])
+            self._samples -= self.n_fft
+        mag = np.concatenate(self._frames)
+        energy = mag.sum(axis=1)
+        voiced = energy > energy.max() * SILENCE
+        if not voiced.any():
+            raise ValueError("La pista no tiene contenido suficiente para estimar la tonalidad")
+        mag = mag[voiced]
+
+        # Afinación: fase media de la fracción de semitono, pesada por la energía
+        power = (mag * mag).sum(axis=0)
+        fraction = _bin_pitches(self.sample_rate, 0.0)
+        tuning = 100.0 * float(np.angle(np.dot(power, np.exp(2j * np.pi * fraction)))) / (2 * np.pi)
+        tuning = round(tuning)  # centésimas enteras: las matrices se reutilizan entre pistas
+
+        chroma = mag @ _chroma_weights(self.sample_rate, tuning)
+        chroma /= np.maximum(chroma.sum(axis=1, keepdims=True), 1e-12)
+        profile = chroma.mean(axis=0).astype(np.float64)
+        profile -= profile.mean()
+        keys, rows = _profiles()
+        corr = rows @ (profile / max(float(np.linalg.norm(profile)), 1e-12))
+        order = np.argsort(corr)[::-1]
+        tonic, mode = keys[order[0]]
+
+        salience = mag @ _salience_weights(self.sample_rate, tuning)
+        melody = np.bincount(salience.argmax(axis=1), minlength=salience.shape[1]).astype(np.float64)
+        return KeyEstimate(
+            tonic=tonic, mode=mode,
+            correlation=float(corr[order[0]]),
+            confidence=float(corr[order[0]] - corr[order[1]]),
+            tuning=float(tuning),
+            duration=self._samples / float(self.sample_rate),
+            melody=tuple(float(v) for v in melody / melody.sum()),
+        )
+
+
+def estimate_blocks(blocks: Iterable[np.ndarray], sample_rate: int) -> KeyEstimate:
+    analyzer = KeyAnalyzer(sample_rate)
+    for block in blocks:
+        analyzer.process(block)
+    return analyzer.result()
+
+
+def detect_key(
+    audio: AudioData,
+    index: Optional["KeyIndex"] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> KeyEstimate:
+    """Estima la tonalidad de `audio` por bloques; con `index`, la reutiliza (y guarda) por hash de contenido."""
+    from karioka_ok.audio.buffers import iter_audio_blocks
+
+    key = audio.content_hash() if index is not None else None
+    if key is not None:
+        cached = index.get(key)
+        instrumentation.count("key_index.hit" if cached is not None else "key_index.miss")
+        if cached is not None:
+            return cached
+    with instrumentation.stage("audio.key") as st:
+        st.add_bytes(memoryview(audio.raw_buffer()).nbytes)
+        estimate = estimate_blocks(iter_audio_blocks(audio, block_size), audio.sample_rate)
+        st.set(key=estimate.short_name)
+    if key is not None:
+        index.put(key, estimate)
+    return estimate
+
+
+class KeyIndex(ContentIndex[KeyEstimate]):
+    """Estimaciones en SQLite: por hash de contenido y, para catálogos, por ruta."""
+
+    NAME = "key"
+    TABLE = "keys"
+    COLUMNS = ("tonic INTEGER", "mode TEXT", "correlation REAL", "confidence REAL", "tuning REAL", "duration REAL",
+               "melody BLOB")
+    VERSION = KEY_VERSION
+
+    def _encode(self, e: KeyEstimate) -> Tuple:
+        return (e.tonic, e.mode, e.correlation, e.confidence, e.tuning, e.duration,
+                np.asarray(e.melody, dtype=np.float64).tobytes())
+
+    def _decode(self, row: Sequence) -> KeyEstimate:
+        *fields, melody = row
+        return KeyEstimate(*fields, melody=tuple(float(v) for v in np.frombuffer(melody, dtype=np.float64)))
@@ -0,0 +1,336 @@
+"""Carga perezosa de audio con PCM mapeado en memoria.
+
+`LazyPCM` lee solo la cabecera al abrir (duración, canales, sample rate) y
+decodifica la primera vez que se piden muestras:
+
+- WAV PCM de 16/32 bits: no hay decodificación; se mapea el bloque `data`
+  del propio archivo.
+- Otros formatos: se decodifica una vez a un archivo temporal de PCM crudo
+  (soundfile si lo soporta, si no ffmpeg) y se mapea ese archivo.
+
+`LazyAudioData` es un `AudioData` cuyo `segment` se materializa solo si
+alguien lo pide; el resto del pipeline usa `raw_buffer()` y las vistas por
+frames, que leen del mapa sin copiar la pista a la memoria del proceso.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import subprocess
+import tempfile
+import weakref
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from pydub import AudioSegment
+
+from karioka_ok.audio.audio_processor import AudioData
+
+DECODE_BLOCK_FRAMES = 1 << 16
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+@dataclass
+class AudioInfo:
+    """Datos de cabecera, obtenidos sin decodificar."""
+    sample_rate: int
+    channels: int
+    duration: float
+    sample_width: Optional[int] = None
+    frames: Optional[int] = None
+
+
+@dataclass
+class WavLayout:
+    """Formato y ubicación del bloque `data` de un WAV."""
+    format_tag: int
+    channels: int
+    sample_rate: int
+    bits: int
+    data_offset: int
+    data_size: int
+
+
+def _parse_wav(path: str) -> Optional[WavLayout]:
+    """Recorre los chunks RIFF para ubicar `fmt ` y `data`. None si no es WAV."""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(12)
+            if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+                return None
+            fmt = None
+            while True:
+                chunk = f.read(8)
+                if len(chunk) < 8:
+                    return None
+                cid, size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+                if cid == b"fmt ":
+                    body = f.read(size)
+                    tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                    if tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                        tag = struct.unpack("<H", body[24:26])[0]
+                    fmt = (tag, channels, rate, bits)
+                elif cid == b"data" and fmt is not None:
+                    offset = f.tell()
+                    size = min(size, os.fstat(f.fileno()).st_size - offset)
+                    return WavLayout(*fmt, data_offset=offset, data_size=size)
+                else:
+                    f.seek(size, os.SEEK_CUR)
+                if size % 2:
+                    f.seek(1, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None
+
+
+def direct_wav(path: str) -> Optional[WavLayout]:
+    """El layout de `path` si es WAV PCM de 16/32 bits (se lee tal cual, sin decodificar); si no, None."""
+    wav = _parse_wav(path)
+    return wav if _is_direct(wav) else None
+
+
+def _is_direct(wav: Optional[WavLayout]) -> bool:
+    return wav is not None and wav.format_tag == WAVE_FORMAT_PCM and wav.bits in (16, 32)
+
+
+def probe(path: str) -> AudioInfo:
+    """Duración y formato leyendo solo cabeceras (WAV, soundfile o mutagen)."""
+    wav = _parse_wav(path)
+    if wav is not None and wav.bits and wav.channels:
+        frames = wav.data_size // (wav.channels * wav.bits // 8)
+        return AudioInfo(wav.sample_rate, wav.channels, frames / float(wav.sample_rate), wav.bits // 8, frames)
+    try:
+        import soundfile as sf
+
+        info = sf.info(path)
+        return AudioInfo(info.samplerate, info.channels, info.frames / float(info.samplerate), None, info.frames)
+    except Exception:
+        pass
+    import mutagen
+
+    f = mutagen.File(path)
+    if f is None or f.info is None:
+        raise ValueError(f"Formato de audio no reconocido: {path}")
+    return AudioInfo(int(f.info.sample_rate), int(f.info.channels), float(f.info.length))
+
+
+class LazyPCM:
+    """PCM entero intercalado de un archivo, mapeado en memoria bajo demanda."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.info = probe(path)
+        self.sample_rate = self.info.sample_rate
+        self.channels = self.info.channels
+        self._wav = _parse_wav(path)
+        self._mmap: Optional[mmap.mmap] = None
+        self._offset = 0
+        self._size = 0
+        self._sample_width: Optional[int] = None
+        self._tmp_path: Optional[str] = None
+        self._finalizer: Optional[weakref.finalize] = None
+
+    # Estado
+    @property
+    def decoded(self) -> bool:
+        return self._mmap is not None
+
+    @property
+    def direct(self) -> bool:
+        """True si el archivo es WAV PCM mapeable tal cual (sin decodificar)."""
+        return _is_direct(self._wav)
+
+    @property
+    def sample_width(self) -> int:
+        if self._sample_width is None:
+            if self.direct:
+                return self._wav.bits // 8  # type: ignore[union-attr]
+            self.open()
+        return self._sample_width  # type: ignore[return-value]
+
+    @property
+    def frame_width(self) -> int:
+        return self.sample_width * self.channels
+
+    @property
+    def frame_count(self) -> int:
+        if not self.decoded and self.info.frames is not None:
+            return self.info.frames
+        self.open()
+        return self._size // self.frame_width
+
+    @property
+    def duration(self) -> float:
+        if not self.decoded:
+            return self.info.duration
+        return self.frame_count / float(self.sample_rate)
+
+    # Acceso a muestras
+    @property
+    def buffer(self) -> memoryview:
+        """Bytes PCM intercalados (vista sobre el mapa, sin copiar)."""
+        self.open()
+        return memoryview(self._mmap)[self._offset:self._offset + self._size]  # type: ignore[index]
+
+    def array(self):
+        """Vista NumPy `(canales, frames)` de solo lectura sobre el mapa."""
+        from karioka_ok.audio.buffers import sample_dtype
+
+        import numpy as np
+
+        data = np.frombuffer(self.buffer, dtype=sample_dtype(self.sample_width))
+        return data.reshape(-1, self.channels).T
+
+    def __getitem__(self, frames: slice):
+        """Frames `[a:b]` como vista `(canales, b - a)`."""
+        return self.array()[:, frames]
+
+    def to_segment(self) -> AudioSegment:
+        """Materializa un AudioSegment (copia los bytes del mapa)."""
+        return AudioSegment(
+            data=bytes(self.buffer), sample_width=self.sample_width, frame_rate=self.sample_rate, channels=self.channels
+        )
+
+    def close(self) -> None:
+        if self._finalizer is not None:
+            self._finalizer()
+        self._mmap = None
+
+    # Decodificación
+    def open(self) -> None:
+        """Mapea el PCM, decodificando a un temporal si hace falta (idempotente)."""
+        if self._mmap is not None:
+            return
+        if self.direct:
+            path, self._offset, self._size = self.path, self._wav.data_offset, self._wav.data_size  # type: ignore[union-attr]
+            self._sample_width = self._wav.bits // 8  # type: ignore[union-attr]
+        else:
+            path, self._sample_width = self._decode_to_temp()
+            self._offset, self._size = 0, os.path.getsize(path)
+        if self._size == 0:
+            self._mmap = _EmptyMap()  # type: ignore[assignment]
+            self._finalizer = weakref.finalize(self, _release, None, self._tmp_path)
+            return
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mmap = mm
+        self._size -= self._size % (self._sample_width * self.channels)
+        self._finalizer = weakref.finalize(self, _release, mm, self._tmp_path)
+
+    def _decode_to_temp(self) -> Tuple[str, int]:
+        fd, tmp = tempfile.mkstemp(prefix="karioka_pcm_", suffix=".raw")
+        self._tmp_path = tmp
+        try:
+            with os.fdopen(fd, "wb") as out:
+                width = _decode_soundfile(self.path, out)
+                if width is None:
+                    out.seek(0)
+                    out.truncate()
+                    width = _decode_ffmpeg(self.path, out, self.sample_rate, self.channels)
+        except BaseException:
+            _release(None, tmp)
+            raise
+        return tmp, width
+
+
+class _EmptyMap(bytes):
+    def close(self) -> None:
+        pass
+
+
+def _release(mm, tmp_path: Optional[str]) -> None:
+    if mm is not None:
+        try:
+            mm.close()
+        except (BufferError, ValueError):
+            # Todavía hay vistas vivas; el SO liberará el mapa al cerrar el proceso
+            pass
+    if tmp_path:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def _decode_soundfile(path: str, out) -> Optional[int]:
+    """Decodifica por bloques con soundfile. Devuelve el ancho de muestra o None."""
+    try:
+        import soundfile as sf
+
+        f = sf.SoundFile(path)
+    except Exception:
+        return None
+    with f:
+        width = 2 if f.subtype in ("PCM_16", "PCM_S8", "PCM_U8", "MPEG_LAYER_III", "VORBIS", "OPUS") else 4
+        dtype = "int16" if width == 2 else "int32"
+        for block in f.blocks(blocksize=DECODE_BLOCK_FRAMES, dtype=dtype, always_2d=True):
+            out.write(block.tobytes())
+    return width
+
+
+def _decode_ffmpeg(path: str, out, sample_rate: int, channels: int) -> int:
+    cmd = [
+        AudioSegment.converter, "-loglevel", "error", "-i", path,
+        "-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-ac", str(channels), "pipe:1",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert proc.stdout is not None
+    for chunk in iter(lambda: proc.stdout.read(1 << 20), b""):
+        out.write(chunk)
+    err = proc.stderr.read() if proc.stderr else b""
+    if proc.wait() != 0:
+        raise ValueError(f"ffmpeg no pudo decodificar {path}: {err.decode(errors='replace').strip()}")
+    return 2
+
+
+class LazyAudioData(AudioData):
+    """AudioData respaldado por `LazyPCM`; `segment` se crea solo si se accede."""
+
+    def __init__(self, pcm: LazyPCM, path: Optional[str] = None) -> None:
+        self.pcm = pcm
+        self._segment: Optional[AudioSegment] = None
+        self.sample_rate = pcm.sample_rate
+        self.channels = pcm.channels
+        self.path = path or pcm.path
+        self._content_hash = None
+
+    @property  # type: ignore[override]
+    def segment(self) -> AudioSegment:
+        if self._segment is None:
+            self._segment = self.pcm.to_segment()
+        return self._segment
+
+    @segment.setter
+    def segment(self, value: AudioSegment) -> None:
+        self._segment = value
+
+    @property
+    def sample_width(self) -> int:
+        return self.pcm.sample_width
+
+    @property
+    def frame_count(self) -> int:
+        return self.pcm.frame_count
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.pcm.duration
+
+    def map(self) -> "LazyAudioData":
+        """Decodifica/mapea ya (p. ej. en un hilo de trabajo) en lugar de al primer uso."""
+        self.pcm.open()
+        return self
+
+    def raw_buffer(self):
+        if self._segment is not None:
+            return self._segment.raw_data
+        return self.pcm.buffer
+
+    def __repr__(self) -> str:
+        return f"LazyAudioData(path={self.path!r}, sample_rate={self.sample_rate}, channels={self.channels})"
+
+
+def load_audio_lazy(path: str) -> LazyAudioData:
+    """Abre `path` leyendo solo la cabecera; decodifica al primer acceso a muestras."""
+    return LazyAudioData(LazyPCM(path), path)
@@ -0,0 +1,275 @@
+"""Sonoridad EBU R128 / ITU-R BS.1770: LUFS integrados, LRA y pico verdadero.
+
+`LoudnessMeter` consume bloques float32 `(canales, n)` (el mismo formato que
+`iter_audio_blocks` y los nodos de `karioka_ok.audio.graph`) y guarda solo
+la energía de cada paso de 100 ms, así que la memoria no depende del largo
+de la pista (10 valores por segundo y canal):
+
+- ponderación K: dos biquads (estante + pasa-altos) calculados para la
+  frecuencia de muestreo real, con `sosfilt` sobre todos los canales a la
+  vez y estado entre bloques;
+- sonoridad integrada: bloques de 400 ms con 75 % de solapamiento, puerta
+  absoluta de -70 LUFS y relativa de -10 LU;
+- rango de sonoridad (LRA, EBU Tech 3342): bloques de 3 s cada 100 ms,
+  puerta relativa de -20 LU, percentiles 10 a 95;
+- pico verdadero: sobremuestreo x4 (x2 desde 96 kHz) con un FIR polifásico
+  de 12 coeficientes por fase, aplicado como un producto de matrices por
+  bloque.
+
+`LoudnessIndex` guarda las mediciones en SQLite (modo WAL, seguro con
+varios procesos) por hash de contenido, y por ruta + tamaño + mtime para
+los análisis de catálogo: un archivo sin cambios no se vuelve a medir
+(ver `karioka_ok.utils.content_index`).
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import asdict, dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from karioka_ok.audio.audio_processor import AudioData
+from karioka_ok.utils import instrumentation
+from karioka_ok.utils.content_index import ContentIndex
+from karioka_ok.utils.logging_config import get_logger
+
+logger = get_logger("karioka_ok.audio.loudness")
+
+LOUDNESS_VERSION = 1
+DEFAULT_TARGET_LUFS = -14.0
+DEFAULT_CEILING_DBTP = -1.0
+DEFAULT_BLOCK_SIZE = 65536
+
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+LRA_RELATIVE_GATE = -20.0
+STEP_SECONDS = 0.1
+MOMENTARY_STEPS = 4  # 400 ms
+SHORT_TERM_STEPS = 30  # 3 s
+TRUE_PEAK_TAPS = 12  # coeficientes por fase
+
+
+@dataclass
+class LoudnessStats:
+    """Resultado de una medición (-inf en pistas silenciosas)."""
+    integrated: float  # LUFS
+    loudness_range: float  # LU
+    true_peak: float  # dBTP
+    sample_peak: float  # dBFS
+    duration: float  # segundos
+
+    def gain_to(self, target: float = DEFAULT_TARGET_LUFS, ceiling: Optional[float] = DEFAULT_CEILING_DBTP) -> float:
+        """Ganancia (dB) para llevar la pista a `target` LUFS sin pasar `ceiling` dBTP."""
+        if not math.isfinite(self.integrated):
+            return 0.0
+        gain = target - self.integrated
+        if ceiling is not None and math.isfinite(self.true_peak):
+            gain = min(gain, ceiling - self.true_peak)
+        return gain
+
+    def format(self) -> str:
+        return (f"{self.integrated:.1f} LUFS · LRA {self.loudness_range:.1f} LU · "
+                f"pico {self.true_peak:.1f} dBTP")
+
+
+def k_weighting(sample_rate: int) -> np.ndarray:
+    """Filtro de ponderación K como secciones de segundo orden `(2, 6)` para `sample_rate`."""
+    # Parámetros analógicos de BS.1770 (iguales a los de libebur128)
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / sample_rate)
+    vh = 10.0 ** (gain_db / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    shelf = [(vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0,
+             1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / sample_rate)
+    a0 = 1.0 + k / q + k * k
+    highpass = [1.0, -2.0, 1.0, 1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+    return np.array([shelf, highpass], dtype=np.float64)
+
+
+def channel_weights(channels: int) -> np.ndarray:
+    """Pesos por canal de BS.1770: 1.0, salvo 5.1 (LFE fuera, surround +1.5 dB)."""
+    if channels == 6:
+        return np.array([1.0, 1.0, 1.0, 0.0, 1.41, 1.41])
+    return np.ones(channels)
+
+
+def _oversampling(sample_rate: int) -> int:
+    return 4 if sample_rate < 96000 else 2 if sample_rate < 192000 else 1
+
+
+def _to_db(power: float, offset: float = 0.0) -> float:
+    return offset + 10.0 * math.log10(power) if power > 0 else -math.inf
+
+
+class LoudnessMeter:
+    """Medidor en streaming: `process(block)` por cada bloque y `result()` al final."""
+
+    def __init__(self, sample_rate: int, channels: int, true_peak: bool = True) -> None:
+        from scipy.signal import firwin
+
+        self.sample_rate = int(sample_rate)
+        self.channels = int(channels)
+        self._sos = k_weighting(self.sample_rate)
+        self._zi = np.zeros((self._sos.shape[0], self.channels, 2))
+        self._weights = channel_weights(self.channels)
+        self._step = max(1, int(round(STEP_SECONDS * self.sample_rate)))
+        self._acc = np.zeros(self.channels)  # energía del paso en curso
+        self._filled = 0
+        self._steps: List[np.ndarray] = []  # energía media por paso, `(canales,)`
+        self._frames = 0
+        self._sample_peak = 0.0
+
+        self._factor = _oversampling(self.sample_rate) if true_peak else 0
+        self._true_peak = 0.0
+        if self._factor > 1:
+            taps = firwin(TRUE_PEAK_TAPS * self._factor, 1.0 / self._factor, window=("kaiser", 8.0)) * self._factor
+            # Columna p: coeficientes de la fase p, en el orden de la ventana deslizante
+            self._phases = taps.reshape(TRUE_PEAK_TAPS, self._factor)[::-1].astype(np.float32)
+            self._history = np.zeros((self.channels, TRUE_PEAK_TAPS - 1), dtype=np.float32)
+
+    def process(self, block: np.ndarray) -> None:
+        from scipy.signal import sosfilt
+
+        block = np.asarray(block, dtype=np.float32).reshape(self.channels, -1)
+        n = block.shape[1]
+        if not n:
+            return
+        self._frames += n
+        peak = float(np.abs(block).max())
+        self._sample_peak = max(self._sample_peak, peak)
+        if self._factor > 1:
+            self._update_true_peak(block)
+        elif self._factor == 1:
+            self._true_peak = max(self._true_peak, peak)
+
+        filtered, self._zi = sosfilt(self._sos, block, axis=1, zi=self._zi)
+        energy = filtered * filtered
+        pos = 0
+        if self._filled:
+            take = min(n, self._step - self._filled)
+            self._acc += energy[:, :take].sum(axis=1)
+            self._filled += take
+            pos = take
+            if self._filled == self._step:
+                self._steps.append(self._acc / self._step)
+                self._acc = np.zeros(self.channels)
+                self._filled = 0
+        full = (n - pos) // self._step
+        if full:
+            chunk = energy[:, pos:pos + full * self._step].reshape(self.channels, full, self._step)
+            self._steps.extend((chunk.sum(axis=2) / self._step).T)
+            pos += full * self._step
+        if pos < n:
+            self._acc += energy[:, pos:].sum(axis=1)
+            self._filled += n - pos
+
+    def _update_true_peak(self, block: np.ndarray) -> None:
+        padded = np.concatenate([self._history, block], axis=1)
+        windows = np.lib.stride_tricks.sliding_window_view(padded, TRUE_PEAK_TAPS, axis=1)
+        upsampled = windows @ self._phases  # (canales, n, factor)
+        self._true_peak = max(self._true_peak, float(np.abs(upsampled).max()))
+        self._history = padded[:, -(TRUE_PEAK_TAPS - 1):]
+
+    def result(self) -> LoudnessStats:
+        """Mediciones con lo procesado hasta ahora (el paso incompleto final se descarta)."""
+        if self._factor > 1:
+            # Vaciar el filtro de sobremuestreo: la cola del último bloque
+            tail = self._history
+            self._update_true_peak(np.zeros_like(tail))
+            self._history = tail
+        steps = np.array(self._steps).reshape(-1, self.channels)
+        momentary = _block_powers(steps, MOMENTARY_STEPS, self._weights)
+        short_term = _block_powers(steps, SHORT_TERM_STEPS, self._weights)
+        return LoudnessStats(
+            integrated=_integrated(momentary),
+            loudness_range=_loudness_range(short_term),
+            true_peak=20.0 * math.log10(self._true_peak) if self._true_peak > 0 else -math.inf,
+            sample_peak=20.0 * math.log10(self._sample_peak) if self._sample_peak > 0 else -math.inf,
+            duration=self._frames / float(self.sample_rate),
+        )
+
+
+def _block_powers(steps: np.ndarray, width: int, weights: np.ndarray) -> np.ndarray:
+    """Potencia ponderada de cada bloque de `width` pasos (uno por paso, solapados)."""
+    if steps.shape[0] < width:
+        return np.zeros(0)
+    csum = np.concatenate([np.zeros((1, steps.shape[1])), np.cumsum(steps, axis=0)])
+    mean = (csum[width:] - csum[:-width]) / width
+    return np.maximum(mean, 0.0) @ weights
+
+
+def _loudness(power: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore"):
+        return -0.691 + 10.0 * np.log10(power)
+
+
+def _integrated(power: np.ndarray) -> float:
+    gated = power[_loudness(power) > ABSOLUTE_GATE]
+    if not gated.size:
+        return -math.inf
+    threshold = _to_db(float(gated.mean()), -0.691) + RELATIVE_GATE
+    gated = gated[_loudness(gated) > threshold]
+    return _to_db(float(gated.mean()), -0.691) if gated.size else -math.inf
+
+
+def _loudness_range(power: np.ndarray) -> float:
+    gated = power[_loudness(power) > ABSOLUTE_GATE]
+    if not gated.size:
+        return 0.0
+    threshold = _to_db(float(gated.mean()), -0.691) + LRA_RELATIVE_GATE
+    levels = _loudness(gated)
+    levels = levels[levels > threshold]
+    if not levels.size:
+        return 0.0
+    low, high = np.percentile(levels, [10, 95])
+    return float(high - low)
+
+
+def measure_blocks(blocks: Iterable[np.ndarray], sample_rate: int, channels: int) -> LoudnessStats:
+    meter = LoudnessMeter(sample_rate, channels)
+    for block in blocks:
+        meter.process(block)
+    return meter.result()
+
+
+def measure_loudness(
+    audio: AudioData,
+    index: Optional["LoudnessIndex"] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> LoudnessStats:
+    """Mide `audio` por bloques; con `index`, reutiliza (y guarda) la medición por hash de contenido."""
+    from karioka_ok.audio.buffers import iter_audio_blocks
+
+    key = audio.content_hash() if index is not None else None
+    if key is not None:
+        cached = index.get(key)
+        instrumentation.count("loudness_index.hit" if cached is not None else "loudness_index.miss")
+        if cached is not None:
+            return cached
+    with instrumentation.stage("audio.loudness") as st:
+        st.add_bytes(memoryview(audio.raw_buffer()).nbytes)
+        stats = measure_blocks(iter_audio_blocks(audio, block_size), audio.sample_rate, audio.channels)
+    if key is not None:
+        index.put(key, stats)
+    return stats
+
+
+class LoudnessIndex(ContentIndex[LoudnessStats]):
+    """Mediciones en SQLite: por hash de contenido y, para catálogos, por ruta."""
+
+    NAME = "loudness"
+    TABLE = "loudness"
+    COLUMNS = ("integrated REAL", "loudness_range REAL", "true_peak REAL", "sample_peak REAL", "duration REAL")
+    VERSION = LOUDNESS_VERSION
+
+    def _encode(self, stats: LoudnessStats) -> Tuple:
+        s = asdict(stats)
+        return s["integrated"], s["loudness_range"], s["true_peak"], s["sample_peak"], s["duration"]
+
+    def _decode(self, row: Sequence) -> LoudnessStats:
+        return LoudnessStats(*row)
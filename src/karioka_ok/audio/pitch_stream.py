@@ -0,0 +1,229 @@
+"""Cambio de tonalidad en streaming, por bloques y con memoria acotada.
+
+`PitchShiftStream` reproduce por bloques el algoritmo de
+`librosa.effects.pitch_shift`: STFT centrada -> phase vocoder (estirado en
+tiempo) -> ISTFT por overlap-add -> resample (soxr HQ o, sin soxr, el motor
+NumPy de `karioka_ok.audio.resample` con el nivel `tier`). El estado que cruza
+los bordes de bloque es pequeño y no depende del largo de la pista:
+
+- cola de entrada de a lo sumo `n_fft + hop` muestras,
+- las dos últimas columnas de análisis y el acumulador de fase,
+- el buffer de overlap-add (`n_fft` muestras) y el estado del resampler.
+
+Tolerancia frente al camino de una sola llamada (librosa): la salida coincide
+muestra a muestra salvo redondeo float32 (acumulación del overlap-add en
+float64); el error máximo absoluto es < 1e-4 para señales en [-1, 1],
+independiente del tamaño de bloque (ver `tests/test_pitch_stream.py`).
+Con el motor NumPy la diferencia frente a librosa es la del resampler.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+DEFAULT_N_FFT = 2048
+# Tolerancia documentada frente a librosa.effects.pitch_shift (error absoluto máximo)
+ONE_SHOT_TOLERANCE = 1e-4
+
+
+class PitchShiftStream:
+    """Motor de cambio de tonalidad que consume y produce bloques.
+
+    Los bloques son float32 de forma `(canales, n)`. Cada llamada a
+    `process` devuelve las muestras que ya son definitivas (puede ser un
+    bloque vacío); `flush` entrega el resto y ajusta la longitud total de
+    salida a la de entrada, igual que el camino de una sola llamada.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        semitones: float,
+        channels: int = 1,
+        n_fft: int = DEFAULT_N_FFT,
+        hop_length: Optional[int] = None,
+        quality: str = "HQ",
+        tier: Optional[str] = None,
+        engine: Optional[str] = None,
+    ) -> None:
+        from karioka_ok.audio.resample import stream_resampler
+
+        self.sample_rate = int(sample_rate)
+        self.semitones = float(semitones)
+        self.channels = int(channels)
+        self.n_fft = int(n_fft)
+        self.hop = int(hop_length or self.n_fft // 4)
+        self.rate = 2.0 ** (-self.semitones / 12.0)
+
+        # Hann periódica (= scipy.signal.get_window("hann", n_fft, fftbins=True))
+        self._window = 0.5 - 0.5 * np.cos(2.0 * np.pi * np.arange(self.n_fft) / self.n_fft)
+        n_bins = self.n_fft // 2 + 1
+        self._phi_advance = np.linspace(0, np.pi * self.hop, n_bins)
+
+        # Análisis: la STFT centrada rellena n_fft//2 ceros al inicio
+        self._in = np.zeros((self.channels, self.n_fft // 2), dtype=np.float32)
+        self._n_in = 0
+        self._n_frames = 0  # columnas de análisis calculadas
+        self._cols: dict = {}  # índice -> columna compleja (solo las vivas)
+        self._phase_acc: Optional[np.ndarray] = None
+
+        # Síntesis: frames del vocoder y overlap-add
+        self._t = 0
+        self._ola = np.zeros((self.channels, self.n_fft), dtype=np.float64)
+        self._wss = np.zeros(self.n_fft, dtype=np.float64)
+        self._ola_start = 0  # posición (con padding) de _ola[:, 0]
+        self._trim = self.n_fft // 2  # muestras de padding aún por descartar
+        self._stretched = np.zeros((self.channels, 0), dtype=np.float32)
+        self._n_stretch = 0  # muestras estiradas ya entregadas al resampler
+
+        self._resampler = stream_resampler(
+            self.sample_rate / self.rate, self.sample_rate, self.channels, quality=quality, tier=tier, engine=engine
+        )
+        self._pending = np.zeros((self.channels, 0), dtype=np.float32)
+        self._n_out = 0
+        self._finished = False
+
+    # API pública
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Procesa un bloque `(canales, n)` y devuelve la salida disponible."""
+        if self._finished:
+            raise RuntimeError("El stream ya fue finalizado con flush()")
+        block = np.asarray(block, dtype=np.float32).reshape(self.channels, -1)
+        self._n_in += block.shape[1]
+        self._in = np.concatenate([self._in, block], axis=1)
+        self._analyze()
+        stretched = self._synthesize(final=False)
+        return self._resample(stretched, last=False)
+
+    def flush(self) -> np.ndarray:
+        """Termina el stream y devuelve las muestras restantes."""
+        if self._finished:
+            return np.zeros((self.channels, 0), dtype=np.float32)
+        self._in = np.concatenate([self._in, np.zeros((self.channels, self.n_fft // 2), dtype=np.float32)], axis=1)
+        self._analyze()
+        stretched = self._synthesize(final=True)
+        out = self._resample(stretched, last=True)
+        self._finished = True
+        # Ajustar a la longitud de entrada (fix_length)
+        missing = self._n_in - self._n_out
+        if missing > 0:
+            out = np.concatenate([out, np.zeros((self.channels, missing), dtype=np.float32)], axis=1)
+            self._n_out += missing
+        return out
+
+    def stream(self, blocks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        """Generador: procesa `blocks` y emite bloques no vacíos de salida."""
+        for block in blocks:
+            out = self.process(block)
+            if out.shape[1]:
+                yield out
+        out = self.flush()
+        if out.shape[1]:
+            yield out
+
+    # Etapas internas
+    def _analyze(self) -> None:
+        n_fft, hop = self.n_fft, self.hop
+        start = 0
+        while self._in.shape[1] - start >= n_fft:
+            frame = self._in[:, start:start + n_fft] * self._window
+            self._cols[self._n_frames] = np.fft.rfft(frame, axis=-1).astype(np.complex64)
+            if self._phase_acc is None:
+                self._phase_acc = np.angle(self._cols[0])
+            self._n_frames += 1
+            start += hop
+        if start:
+            self._in = self._in[:, start:]
+
+    def _column(self, idx: int, final: bool) -> Optional[np.ndarray]:
+        col = self._cols.get(idx)
+        if col is None and final and idx >= self._n_frames:
+            col = np.zeros((self.channels, self.n_fft // 2 + 1), dtype=np.complex64)
+        return col
+
+    def _synthesize(self, final: bool) -> np.ndarray:
+        n_fft, hop, rate = self.n_fft, self.hop, self.rate
+        # Límite de frames de la ISTFT (librosa recorta según la longitud estirada)
+        len_stretch = int(round(self._n_in / rate))
+        istft_frames = int(np.ceil((len_stretch + 2 * (n_fft // 2)) / hop))
+        emitted: list = []
+
+        while self._phase_acc is not None:
+            step = self._t * rate
+            if final and step >= self._n_frames:
+                break
+            if self._t >= istft_frames:
+                break
+            i = int(step)
+            col0 = self._column(i, final)
+            col1 = self._column(i + 1, final)
+            if col0 is None or col1 is None:
+                break
+
+            # Phase vocoder (mismas operaciones y dtypes que librosa)
+            alpha = np.mod(step, 1.0)
+            mag = (1.0 - alpha) * np.abs(col0) + alpha * np.abs(col1)
+            frame = (mag * (np.cos(self._phase_acc) + 1j * np.sin(self._phase_acc))).astype(np.complex64)
+            dphase = np.angle(col1) - np.angle(col0) - self._phi_advance
+            dphase = dphase - 2.0 * np.pi * np.round(dphase / (2.0 * np.pi))
+            self._phase_acc += self._phi_advance + dphase
+
+            # ISTFT incremental: overlap-add del frame t en [t*hop, t*hop+n_fft)
+            emitted.append(self._overlap_add(frame))
+            self._t += 1
+            for old in [k for k in self._cols if k < int(self._t * rate)]:
+                del self._cols[old]
+
+        if final:
+            # Lo que queda en el buffer de OLA ya es definitivo
+            emitted.append(self._drain_ola(self._ola.shape[1]))
+        return self._take_stretched(emitted, len_stretch, final)
+
+    def _take_stretched(self, parts: list, len_stretch: int, final: bool) -> np.ndarray:
+        """Entrega el prefijo estirado que cabe en `len_stretch` (como `istft(length=...)`)."""
+        self._stretched = np.concatenate([self._stretched] + parts, axis=1)
+        n = min(self._stretched.shape[1], len_stretch - self._n_stretch)
+        ready, self._stretched = self._stretched[:, :n], self._stretched[:, n:]
+        if final and self._n_stretch + n < len_stretch:
+            # El OLA puede quedarse corto: completar con ceros
+            pad = np.zeros((self.channels, len_stretch - self._n_stretch - n), dtype=np.float32)
+            ready = np.concatenate([ready, pad], axis=1)
+        self._n_stretch += ready.shape[1]
+        return ready
+
+    def _overlap_add(self, frame: np.ndarray) -> np.ndarray:
+        ytmp = self._window * np.fft.irfft(frame, n=self.n_fft, axis=-1)
+        offset = self._t * self.hop - self._ola_start
+        self._ola[:, offset:offset + self.n_fft] += ytmp
+        self._wss[offset:offset + self.n_fft] += self._window ** 2
+        # Las muestras anteriores al próximo frame ya no cambiarán
+        return self._drain_ola(offset + self.hop)
+
+    def _drain_ola(self, n: int) -> np.ndarray:
+        n = min(n, self._ola.shape[1])
+        done = self._ola[:, :n].copy()
+        wss = self._wss[:n]
+        nonzero = wss > np.finfo(np.float32).tiny
+        done[:, nonzero] /= wss[nonzero]
+        self._ola = np.concatenate([self._ola[:, n:], np.zeros((self.channels, n))], axis=1)
+        self._wss = np.concatenate([self._wss[n:], np.zeros(n)])
+        self._ola_start += n
+        # Descartar el padding central del inicio
+        if self._trim:
+            cut = min(self._trim, done.shape[1])
+            done = done[:, cut:]
+            self._trim -= cut
+        return done.astype(np.float32)
+
+    def _resample(self, stretched: np.ndarray, last: bool) -> np.ndarray:
+        out = self._resampler.process(stretched)
+        if last:
+            out = np.concatenate([out, self._resampler.flush()], axis=1)
+        out = np.concatenate([self._pending, out], axis=1)
+        # Nunca emitir más muestras que las recibidas: la salida final mide lo mismo
+        limit = self._n_in - self._n_out
+        ready, self._pending = out[:, :limit], out[:, limit:]
+        self._n_out += ready.shape[1]
+        return np.ascontiguousarray(ready)
+
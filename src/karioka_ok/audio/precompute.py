@@ -0,0 +1,270 @@
+"""Precálculo en segundo plano de la escalera de transposiciones (±12).
+
+Tras cargar una pista, `LadderPrecomputer` renderiza las transposiciones más
+probables primero (de 0 hacia afuera: +1, -1, +2, -2, ...) en un pool de
+procesos y las deja en la `RenderCache`. Exportar o previsualizar una
+tonalidad ya calculada se vuelve una lectura de caché.
+
+- El PCM de origen se escribe una vez en un archivo temporal; los procesos lo
+  leen de disco en lugar de recibirlo serializado.
+- `prioritize(n)` adelanta una tonalidad (la elegida en la GUI).
+- `start()` con una pista nueva cancela lo pendiente de la anterior. Los
+  renders que ya corren no se pueden interrumpir: terminan en el mismo pool
+  (su resultado se descarta) y el temporal de su pista se borra cuando
+  acaba el último.
+- Núcleos y memoria se limitan con `max_workers` y `max_memory_bytes`: hay
+  un único pool de `max_workers` procesos para toda la vida del objeto, y el
+  número de trabajos simultáneos (contando los descartados que siguen
+  corriendo) se reduce si la estimación por trabajo no cabe en el presupuesto.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple
+
+from karioka_ok.audio.audio_processor import AudioData, change_pitch_semitones, pitch_algorithm
+from karioka_ok.audio.render_cache import RenderCache, RenderKey
+from karioka_ok.utils.logging_config import get_logger
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+logger = get_logger("karioka_ok.audio.precompute")
+
+# Memoria pico aproximada de librosa.pitch_shift por byte de PCM int16 de entrada
+MEMORY_FACTOR = 16
+DEFAULT_MAX_MEMORY = 2 * 1024 ** 3
+
+
+def ladder_order(low: int = -12, high: int = 12) -> List[int]:
+    """Semitonos de `low` a `high` (sin 0), ordenados del más cercano a 0 al más lejano."""
+    steps = [s for s in range(low, high + 1) if s != 0]
+    return sorted(steps, key=lambda s: (abs(s), s < 0))
+
+
+def default_workers() -> int:
+    """Deja un núcleo libre para la GUI."""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def _process_pool(max_workers: int):
+    # multiprocessing se importa al crear el pool, no al abrir la GUI
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=max_workers)
+
+
+def _render_job(
+    source_path: str,
+    sample_width: int,
+    frame_rate: int,
+    channels: int,
+    content_hash: str,
+    semitones: int,
+    cache_root: str,
+    cache_max_bytes: int,
+) -> int:
+    """Trabajo ejecutado en el proceso hijo: transponer y guardar en la caché."""
+    from pydub import AudioSegment
+
+    with open(source_path, "rb") as f:
+        data = f.read()
+    seg = AudioSegment(data=data, sample_width=sample_width, frame_rate=frame_rate, channels=channels)
+    audio = AudioData(segment=seg, sample_rate=frame_rate, channels=channels)
+    audio._content_hash = content_hash
+    change_pitch_semitones(audio, semitones, cache=RenderCache(cache_root, cache_max_bytes))
+    return semitones
+
+
+class LadderPrecomputer:
+    """Planificador de renders en segundo plano con prioridad y cancelación."""
+
+    def __init__(
+        self,
+        cache: RenderCache,
+        max_workers: Optional[int] = None,
+        max_memory_bytes: int = DEFAULT_MAX_MEMORY,
+        semitone_range: Tuple[int, int] = (-12, 12),
+        executor_factory: Optional[Callable[[int], object]] = None,
+        on_ready: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        self.cache = cache
+        self.max_workers = max_workers or default_workers()
+        self.max_memory_bytes = max_memory_bytes
+        self.semitone_range = semitone_range
+        self.on_ready = on_ready
+        self._executor_factory = executor_factory or _process_pool
+        self._executor = None
+
+        # Reentrante: un Future ya resuelto ejecuta su callback dentro de submit()
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._heap: List[Tuple[int, int, int]] = []
+        self._priority: Dict[int, int] = {}
+        self._counter = itertools.count()
+        self._inflight: Dict[int, "Future"] = {}
+        self._done: Set[int] = set()
+        self._limit = 1
+        self._job_args: Optional[tuple] = None
+        # Por generación: trabajos enviados sin terminar y temporal con el PCM de origen
+        self._running: Dict[int, int] = {}
+        self._tmpdirs: Dict[int, str] = {}
+        self._idle = threading.Event()
+        self._idle.set()
+
+    # API pública
+    def start(self, audio: AudioData) -> None:
+        """Empieza a precalcular `audio`, cancelando cualquier pista anterior."""
+        self.cancel()
+        data = memoryview(audio.raw_buffer())
+        tmpdir = tempfile.mkdtemp(prefix="karioka_ladder_")
+        source_path = os.path.join(tmpdir, "source.pcm")
+        with open(source_path, "wb") as f:
+            f.write(data)
+
+        per_job = max(1, data.nbytes * MEMORY_FACTOR)
+        limit = max(1, min(self.max_workers, self.max_memory_bytes // per_job))
+        with self._lock:
+            self._generation += 1
+            self._tmpdirs[self._generation] = tmpdir
+            self._limit = limit
+            self._job_args = (
+                source_path, audio.sample_width, audio.sample_rate, audio.channels,
+                audio.content_hash(), self.cache.root.as_posix(), self.cache.max_bytes,
+            )
+            self._done = set()
+            self._heap = []
+            self._priority = {}
+            for rank, semis in enumerate(ladder_order(*self.semitone_range)):
+                key = RenderKey(audio.content_hash(), semis, pitch_algorithm(), audio.sample_rate)
+                if self.cache.contains(key):
+                    self._done.add(semis)
+                else:
+                    self._push(semis, rank)
+            if self._priority:
+                self._idle.clear()
+        logger.info("Precálculo iniciado (%d trabajos simultáneos)", limit)
+        self._pump()
+
+    def prioritize(self, semitones: int) -> None:
+        """Adelanta `semitones` al frente de la cola si aún no se calculó."""
+        with self._lock:
+            if self._job_args is None or semitones == 0:
+                return
+            if semitones in self._done or semitones in self._inflight:
+                return
+            self._push(semitones, -next(self._counter) - 1)
+        self._pump()
+
+    def cancel(self) -> None:
+        """Descarta el trabajo pendiente de la pista actual.
+
+        Lo encolado en el pool se cancela; lo que ya corre termina solo (no
+        se bloquea la GUI) y su temporal se borra al acabar.
+        """
+        with self._lock:
+            old = self._generation
+            self._generation += 1
+            self._heap = []
+            self._priority = {}
+            self._job_args = None
+            inflight = list(self._inflight.values())
+            self._inflight = {}
+            self._idle.set()
+        for fut in inflight:
+            fut.cancel()
+        self._release(old)
+
+    def shutdown(self) -> None:
+        """Cancela y cierra el pool (sin esperar a los renders en curso)."""
+        self.cancel()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que termine la escalera actual. Devuelve False si vence `timeout`."""
+        return self._idle.wait(timeout)
+
+    def is_ready(self, semitones: int) -> bool:
+        with self._lock:
+            return semitones in self._done
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._priority) + len(self._inflight)
+
+    # Internos
+    def _push(self, semitones: int, priority: int) -> None:
+        # Reinsertar con nueva prioridad; las entradas viejas se ignoran al sacar
+        self._priority[semitones] = priority
+        heapq.heappush(self._heap, (priority, next(self._counter), semitones))
+
+    def _pop(self) -> Optional[int]:
+        while self._heap:
+            priority, _, semis = heapq.heappop(self._heap)
+            if self._priority.get(semis) == priority:
+                del self._priority[semis]
+                return semis
+        return None
+
+    def _pump(self) -> None:
+        with self._lock:
+            if self._job_args is None:
+                return
+            # Los renders descartados que siguen corriendo también ocupan núcleo y memoria
+            while sum(self._running.values()) < self._limit:
+                semis = self._pop()
+                if semis is None:
+                    break
+                if self._executor is None:
+                    self._executor = self._executor_factory(self.max_workers)
+                args = self._job_args[:5] + (semis,) + self._job_args[5:]
+                fut = self._executor.submit(_render_job, *args)
+                generation = self._generation
+                self._inflight[semis] = fut
+                self._running[generation] = self._running.get(generation, 0) + 1
+                fut.add_done_callback(lambda f, s=semis, g=generation: self._on_done(f, s, g))
+
+    def _release(self, generation: int) -> None:
+        """Borra el temporal de `generation` si ya no le quedan trabajos en el pool."""
+        with self._lock:
+            if self._running.get(generation, 0):
+                return
+            self._running.pop(generation, None)
+            tmpdir = self._tmpdirs.pop(generation, None)
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def _on_done(self, fut: "Future", semitones: int, generation: int) -> None:
+        with self._lock:
+            self._running[generation] -= 1
+            stale = generation != self._generation
+            if not stale:
+                self._inflight.pop(semitones, None)
+                if not fut.cancelled() and fut.exception() is None:
+                    self._done.add(semitones)
+                elif not fut.cancelled():
+                    logger.warning("Falló el precálculo de %+d semitonos: %s", semitones, fut.exception())
+                finished = not self._inflight and not self._priority
+                if finished:
+                    self._idle.set()
+        if stale:
+            # Resultado descartado; libera su hueco y, si era el último, su temporal
+            self._release(generation)
+            self._pump()
+            return
+        if not fut.cancelled() and fut.exception() is None and self.on_ready is not None:
+            self.on_ready(semitones)
+        if finished:
+            logger.info("Precálculo completo")
+            self._release(generation)
+        else:
+            self._pump()
@@ -0,0 +1,426 @@
+"""Vista previa en tiempo real con la transposición aplicada en vivo.
+
+`PreviewEngine` reproduce un `AudioData` por bloques pequeños:
+
+    fuente (vista PCM, sin decodificar de nuevo) -> PitchShiftStream -> RingBuffer -> salida
+
+- Un hilo productor lee la fuente desde la posición actual, transpone con
+  `PitchShiftStream` y llena el ring buffer (unos pocos bloques, ~90 ms a 44.1 kHz).
+  Sin soxr, el resample usa el nivel rápido (`PREVIEW_TIER`) del motor NumPy.
+- Un hilo consumidor entrega un bloque por periodo a la salida; si el ring no
+  tiene un bloque completo, rellena con silencio y cuenta un *underrun*.
+- `set_semitones()` vacía el ring y reinicia el stream en la posición que se
+  está escuchando: el cambio se oye tras el calentamiento del stream, sin
+  reiniciar la reproducción. `seek()` solo mueve el índice de lectura.
+
+Las salidas son intercambiables (`OutputBackend`): `NullSink` (sin audio,
+con ritmo de tiempo real opcional) y `FileSink` (WAV) permiten medir latencia
+y underruns sin tarjeta de sonido; `SoundDeviceSink` usa `sounddevice` si
+está instalado.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+
+from karioka_ok.audio.audio_processor import AudioData
+from karioka_ok.audio.buffers import audio_to_array, float_to_pcm_bytes, full_scale
+from karioka_ok.utils.logging_config import get_logger
+
+logger = get_logger("karioka_ok.audio.preview")
+
+DEFAULT_BLOCK_SIZE = 1024
+DEFAULT_RING_BLOCKS = 4
+
+
+# Salidas
+class OutputBackend:
+    """Destino de los bloques float32 `(canales, n)` de la vista previa.
+
+    `write` puede bloquear: es lo que marca el ritmo del consumidor.
+    """
+
+    def open(self, sample_rate: int, channels: int, block_size: int) -> None:
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.block_size = block_size
+
+    def write(self, block: np.ndarray) -> None:  # pragma: no cover - interfaz
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class NullSink(OutputBackend):
+    """Descarta el audio; con `realtime` espera lo que duraría cada bloque."""
+
+    def __init__(self, realtime: bool = True, keep: bool = False) -> None:
+        self.realtime = realtime
+        self.keep = keep
+        self.frames = 0
+        self.blocks: list = []
+        self._next = 0.0
+
+    def open(self, sample_rate: int, channels: int, block_size: int) -> None:
+        super().open(sample_rate, channels, block_size)
+        self._next = time.perf_counter()
+
+    def write(self, block: np.ndarray) -> None:
+        self.frames += block.shape[1]
+        if self.keep:
+            self.blocks.append(block.copy())
+        if self.realtime:
+            self._next += block.shape[1] / float(self.sample_rate)
+            delay = self._next - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self._next = time.perf_counter()
+
+
+class FileSink(NullSink):
+    """Escribe lo reproducido a un WAV de 16 bits (útil para escuchar o comparar)."""
+
+    def __init__(self, path: str, realtime: bool = False) -> None:
+        super().__init__(realtime=realtime)
+        self.path = path
+        self._enc = None
+
+    def open(self, sample_rate: int, channels: int, block_size: int) -> None:
+        from karioka_ok.audio.encoders import WavEncoder
+
+        super().open(sample_rate, channels, block_size)
+        self._enc = WavEncoder(self.path, sample_rate, channels, 2)
+
+    def write(self, block: np.ndarray) -> None:
+        self._enc.write(float_to_pcm_bytes(block, 2))  # type: ignore[union-attr]
+        super().write(block)
+
+    def close(self) -> None:
+        if self._enc is not None:
+            self._enc.close()
+            self._enc = None
+
+
+class SoundDeviceSink(OutputBackend):
+    """Salida a la tarjeta de sonido con `sounddevice` (dependencia opcional)."""
+
+    def __init__(self, device=None, latency: str = "low") -> None:
+        self.device = device
+        self.latency = latency
+        self._stream = None
+
+    def open(self, sample_rate: int, channels: int, block_size: int) -> None:
+        try:
+            import sounddevice as sd
+        except ImportError as e:
+            raise RuntimeError("La vista previa con audio requiere el paquete 'sounddevice'") from e
+        super().open(sample_rate, channels, block_size)
+        self._stream = sd.OutputStream(
+            samplerate=sample_rate, channels=channels, dtype="float32",
+            blocksize=block_size, latency=self.latency, device=self.device,
+        )
+        self._stream.start()
+
+    def write(self, block: np.ndarray) -> None:
+        self._stream.write(np.ascontiguousarray(block.T))  # type: ignore[union-attr]
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+def default_backend() -> Optional[OutputBackend]:
+    """`SoundDeviceSink` si `sounddevice` está instalado; si no, None."""
+    try:
+        import sounddevice  # noqa: F401
+    except Exception:
+        return None
+    return SoundDeviceSink()
+
+
+# Ring buffer
+class RingBuffer:
+    """Cola circular de frames float32 `(canales, capacidad)`. No es thread-safe."""
+
+    def __init__(self, channels: int, capacity: int) -> None:
+        self._buf = np.zeros((channels, capacity), dtype=np.float32)
+        self.capacity = capacity
+        self._read = 0
+        self.available = 0
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self.available
+
+    def write(self, samples: np.ndarray) -> int:
+        n = min(samples.shape[1], self.free)
+        start = (self._read + self.available) % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[:, start:start + first] = samples[:, :first]
+        self._buf[:, :n - first] = samples[:, first:n]
+        self.available += n
+        return n
+
+    def read(self, n: int) -> np.ndarray:
+        n = min(n, self.available)
+        first = min(n, self.capacity - self._read)
+        out = np.concatenate([self._buf[:, self._read:self._read + first], self._buf[:, :n - first]], axis=1)
+        self._read = (self._read + n) % self.capacity
+        self.available -= n
+        return out
+
+    def clear(self) -> None:
+        self._read = 0
+        self.available = 0
+
+
+@dataclass
+class PreviewStats:
+    blocks: int = 0
+    frames: int = 0
+    underruns: int = 0
+    # Segundos entre set_semitones()/seek() y el primer bloque entregado con el cambio
+    last_change_latency: Optional[float] = None
+
+
+class PreviewEngine:
+    """Reproductor de vista previa con transposición en vivo."""
+
+    def __init__(
+        self,
+        audio: AudioData,
+        backend: OutputBackend,
+        semitones: float = 0,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        ring_blocks: int = DEFAULT_RING_BLOCKS,
+        on_finished: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.audio = audio
+        self.backend = backend
+        self.block_size = int(block_size)
+        self.sample_rate = audio.sample_rate
+        self.channels = audio.channels
+        self.on_finished = on_finished
+        self.stats = PreviewStats()
+
+        # Vista entera sobre el PCM (mapa de LazyAudioData o raw_data): seek sin decodificar
+        self._source = audio_to_array(audio)
+        self._scale = np.float32(1.0 / full_scale(audio.sample_width))
+        self._ring = RingBuffer(self.channels, self.block_size * (ring_blocks + 2))
+        self._ring_target = self.block_size * ring_blocks
+
+        self._lock = threading.Lock()
+        self._space = threading.Condition(self._lock)
+        self._generation = 0
+        self._semitones = float(semitones)
+        self._read_pos = 0  # próximo frame de la fuente a procesar
+        self._play_pos = 0  # frame de la fuente que corresponde a lo próximo que suena
+        self._stream = None
+        self._source_done = False
+        self._change_time: Optional[float] = None
+        self._reset_stream(0)
+        if self._stream is None:
+            # Cargar el resampler ahora y no en el primer cambio de tono (que debe ser inmediato)
+            self._warm_up()
+
+        self._running = False
+        self._threads: list = []
+
+    # Control
+    @property
+    def semitones(self) -> float:
+        return self._semitones
+
+    @property
+    def position(self) -> float:
+        """Segundos de la fuente que se están escuchando."""
+        return self._play_pos / float(self.sample_rate)
+
+    @property
+    def duration(self) -> float:
+        return self._source.shape[1] / float(self.sample_rate)
+
+    @property
+    def playing(self) -> bool:
+        return self._running
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self.backend.open(self.sample_rate, self.channels, self.block_size)
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._produce_loop, name="preview-producer", daemon=True),
+            threading.Thread(target=self._consume_loop, name="preview-consumer", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._running = False
+            self._space.notify_all()
+        for t in self._threads:
+            if t is not threading.current_thread():
+                t.join()
+        self._threads = []
+        self.backend.close()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que termine la reproducción. False si vence `timeout`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for t in list(self._threads):
+            t.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if t.is_alive():
+                return False
+        return True
+
+    def set_semitones(self, semitones: float) -> None:
+        """Cambia la transposición sin detener la reproducción."""
+        with self._lock:
+            if float(semitones) == self._semitones:
+                return
+            self._semitones = float(semitones)
+            self._restart_at(self._play_pos)
+
+    def seek(self, seconds: float) -> None:
+        """Salta a `seconds` sin decodificar de nuevo (solo mueve el índice)."""
+        frame = int(min(max(seconds, 0.0), self.duration) * self.sample_rate)
+        with self._lock:
+            self._play_pos = frame
+            self._restart_at(frame)
+
+    # Procesamiento sincrónico (sin hilos): útil para pruebas y exportar lo previsualizado
+    def render(self, frames: int) -> np.ndarray:
+        """Produce y consume `frames` frames en el hilo actual; devuelve lo que sonaría."""
+        out = []
+        remaining = frames
+        while remaining > 0:
+            while self._fill_once():
+                pass
+            with self._lock:
+                block = self._take(min(self.block_size, remaining))
+            if block is None:
+                break
+            out.append(block)
+            remaining -= block.shape[1]
+        return np.concatenate(out, axis=1) if out else np.zeros((self.channels, 0), dtype=np.float32)
+
+    # Internos
+    def _reset_stream(self, frame: int) -> None:
+        from karioka_ok.audio.pitch_stream import PitchShiftStream
+        from karioka_ok.audio.resample import PREVIEW_TIER
+
+        self._read_pos = frame
+        self._source_done = frame >= self._source.shape[1]
+        self._carry: Optional[np.ndarray] = None  # salida que no entró en el ring
+        self._stream = (
+            PitchShiftStream(self.sample_rate, self._semitones, channels=self.channels, tier=PREVIEW_TIER)
+            if self._semitones else None
+        )
+
+    def _warm_up(self) -> None:
+        from karioka_ok.audio.pitch_stream import PitchShiftStream
+        from karioka_ok.audio.resample import PREVIEW_TIER
+
+        PitchShiftStream(self.sample_rate, 1, channels=self.channels, tier=PREVIEW_TIER)
+
+    def _restart_at(self, frame: int) -> None:
+        # Llamar con el lock tomado
+        self._generation += 1
+        self._ring.clear()
+        self._reset_stream(frame)
+        self._change_time = time.perf_counter()
+        self._space.notify_all()
+
+    def _fill_once(self) -> bool:
+        """Procesa un bloque de la fuente si hay lugar en el ring. False si no hizo nada."""
+        with self._lock:
+            if self._ring.available >= self._ring_target:
+                return False
+            if self._carry is not None:
+                n = self._ring.write(self._carry)
+                self._carry = self._carry[:, n:] if n < self._carry.shape[1] else None
+                return True
+            if self._source_done:
+                return False
+            generation, stream, start = self._generation, self._stream, self._read_pos
+            stop = min(start + self.block_size, self._source.shape[1])
+            self._read_pos = stop
+        block = np.multiply(self._source[:, start:stop], self._scale, dtype=np.float32)
+        last = stop >= self._source.shape[1]
+        if stream is not None:
+            out = stream.process(block)
+            if last:
+                out = np.concatenate([out, stream.flush()], axis=1)
+        else:
+            out = block
+        with self._lock:
+            if generation != self._generation:
+                return True  # hubo cambio de tono o seek mientras se procesaba
+            n = self._ring.write(out)
+            if n < out.shape[1]:
+                self._carry = out[:, n:]
+            if last:
+                self._source_done = True
+        return True
+
+    def _take(self, n: int) -> Optional[np.ndarray]:
+        # Llamar con el lock tomado. None si ya no queda nada por sonar
+        drained = self._source_done and self._carry is None
+        if self._ring.available == 0 and drained:
+            return None
+        block = self._ring.read(n)
+        if block.shape[1] < n and not drained:
+            self.stats.underruns += 1
+            block = np.concatenate([block, np.zeros((self.channels, n - block.shape[1]), dtype=np.float32)], axis=1)
+        self._play_pos = min(self._play_pos + n, self._source.shape[1])
+        if self._change_time is not None:
+            self.stats.last_change_latency = time.perf_counter() - self._change_time
+            self._change_time = None
+        self.stats.blocks += 1
+        self.stats.frames += block.shape[1]
+        self._space.notify_all()
+        return block
+
+    def _produce_loop(self) -> None:
+        try:
+            while self._running:
+                if not self._fill_once():
+                    with self._lock:
+                        idle = self._source_done and self._carry is None
+                        if self._running and (idle or self._ring.available >= self._ring_target):
+                            self._space.wait(timeout=0.05)
+        except Exception:
+            logger.exception("Falló el productor de la vista previa")
+            with self._lock:
+                self._source_done = True
+
+    def _consume_loop(self) -> None:
+        # Esperar a que el productor llene el ring antes del primer bloque
+        deadline = time.perf_counter() + 0.5
+        while self._running and time.perf_counter() < deadline:
+            with self._lock:
+                if self._ring.available >= self._ring_target or self._source_done:
+                    break
+            time.sleep(0.001)
+        while self._running:
+            with self._lock:
+                block = self._take(self.block_size)
+            if block is None:
+                break
+            self.backend.write(block)
+        finished = self._running
+        with self._lock:
+            self._running = False
+            self._space.notify_all()
+        if finished and self.on_finished is not None:
+            self.on_finished()
@@ -0,0 +1,157 @@
+"""Caché en disco de renders transpuestos, direccionada por contenido.
+
+Cada render se guarda como WAV PCM (`<clave>.wav`). La clave combina el
+hash del audio de origen, los semitonos, el algoritmo/versión y la
+frecuencia de muestreo, así que cambiar cualquiera de ellos produce una
+entrada nueva. Un acierto es un `LazyAudioData` que mapea el bloque `data`
+del archivo en memoria (`karioka_ok.audio.lazy`): no se copia el render.
+
+La expulsión es LRU por tamaño: cada acierto actualiza el mtime del archivo
+y, al superar el presupuesto de bytes, se borran primero los menos usados.
+Las escrituras son atómicas (archivo temporal + `os.replace`), por lo que
+varios procesos pueden compartir el mismo directorio y un render ya mapeado
+sigue siendo válido aunque otro proceso lo reemplace o lo expulse.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+from karioka_ok.audio.audio_processor import AudioData
+from karioka_ok.utils.hashing import hash_bytes
+from karioka_ok.utils.logging_config import get_logger
+from karioka_ok.utils.paths import cache_dir
+
+logger = get_logger("karioka_ok.audio.render_cache")
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 2 GiB
+
+
+@dataclass(frozen=True)
+class RenderKey:
+    """Identifica un render: (hash de contenido, semitonos, algoritmo, sample rate)."""
+    content_hash: str
+    semitones: float
+    algorithm: str
+    sample_rate: int
+
+    def digest(self) -> str:
+        raw = f"{self.content_hash}|{float(self.semitones)!r}|{self.algorithm}|{int(self.sample_rate)}"
+        return hash_bytes(raw.encode("utf-8"))
+
+
+class RenderCache:
+    """Caché LRU de renders WAV en disco con presupuesto de bytes configurable."""
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.root = Path(root) if root else cache_dir("renders")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        # Formato anterior (PCM crudo + JSON): ya no se lee
+        for p in list(self.root.glob("*.pcm")) + list(self.root.glob("*.json")):
+            _unlink(p)
+
+    @classmethod
+    def default(cls) -> "RenderCache":
+        """Caché en la ruta estándar; `KARIOKA_RENDER_CACHE_BYTES` fija el presupuesto."""
+        budget = int(os.environ.get("KARIOKA_RENDER_CACHE_BYTES", DEFAULT_MAX_BYTES))
+        return cls(max_bytes=budget)
+
+    # Rutas
+    def _path(self, key: RenderKey) -> Path:
+        return self.root / f"{key.digest()}.wav"
+
+    # Lectura
+    def contains(self, key: RenderKey) -> bool:
+        return self._path(key).exists()
+
+    def get(self, key: RenderKey, path: Optional[str] = None) -> Optional[AudioData]:
+        """Devuelve el render mapeado en memoria (sin copiarlo) o None si no está."""
+        from karioka_ok.audio.lazy import LazyAudioData, LazyPCM
+
+        wav_path = self._path(key)
+        if not wav_path.is_file():
+            return None
+        try:
+            pcm = LazyPCM(str(wav_path))
+            pcm.open()
+        except (OSError, ValueError):
+            return None
+        self._touch(wav_path)
+        audio = LazyAudioData(pcm)
+        audio.path = path
+        return audio
+
+    # Escritura
+    def put(self, key: RenderKey, audio: AudioData) -> None:
+        """Guarda el PCM de `audio` bajo `key`."""
+        self.put_blocks(key, [audio.raw_buffer()], audio.sample_width, audio.sample_rate, audio.channels)
+
+    def put_blocks(
+        self, key: RenderKey, blocks: Iterable[bytes], sample_width: int, frame_rate: int, channels: int
+    ) -> None:
+        """Guarda un render a partir de bloques de PCM intercalado, sin juntarlos en memoria."""
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f, wave.open(f, "wb") as wav:
+                wav.setnchannels(channels)
+                wav.setsampwidth(sample_width)
+                wav.setframerate(frame_rate)
+                for block in blocks:
+                    wav.writeframesraw(_unsigned(block) if sample_width == 1 else block)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            _unlink(tmp)
+            raise
+        self.evict()
+
+    # Mantenimiento
+    def total_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self.root.glob("*.wav"))
+
+    def evict(self) -> None:
+        """Borra los renders menos usados hasta entrar en el presupuesto."""
+        entries = []
+        for p in self.root.glob("*.wav"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            _unlink(p)
+            total -= size
+            logger.info("Render expulsado de la caché: %s", p.name)
+
+    def clear(self) -> None:
+        for p in self.root.glob("*.wav"):
+            _unlink(p)
+
+    @staticmethod
+    def _touch(*paths: Path) -> None:
+        for p in paths:
+            try:
+                os.utime(p)
+            except OSError:
+                pass
+
+
+def _unlink(path) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _unsigned(block) -> bytes:
+    """PCM de 8 bits con signo (pydub) -> sin signo (WAV)."""
+    import numpy as np
+
+    return (np.frombuffer(block, dtype=np.uint8) ^ 0x80).tobytes()
@@ -0,0 +1,236 @@
+"""Resample y cambio de tono propios, en NumPy, por bloques y en dos niveles de calidad.
+
+Sin librosa, el cambio de tono no puede depender de
+`pydub.set_frame_rate`, que cambia la duración y remuestrea con
+interpolación lineal (alias audible en agudos). `PolyphaseResampler` es un
+resampler racional P/Q con sinc enventanada (Kaiser), fase por fase desde
+una tabla precalculada, que consume y produce bloques `(canales, n)`
+float32 o int16 con el mismo protocolo que los nodos de
+`karioka_ok.audio.graph` (`process` / `flush`). Dos niveles (`TIERS`):
+
+- `fast`: 32 coeficientes por muestra de salida, ~70 dB fuera de banda y
+  banda de paso hasta el 76 % de Nyquist; para vista previa;
+- `hq`: 128 coeficientes, ~110 dB y banda de paso hasta el 90 %; para
+  exportar.
+
+`stream_resampler` elige soxr si está instalado (más rápido y mejor que
+ambos niveles) y este motor si no. `shift_pitch` transpone un `AudioData`
+conservando la duración (phase vocoder de `PitchShiftStream` con este
+resampler) o, con `preserve_duration=False`, como cambio de velocidad.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from fractions import Fraction
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from karioka_ok.audio.audio_processor import AudioData
+
+RESAMPLE_VERSION = 1
+DEFAULT_TIER = "hq"
+PREVIEW_TIER = "fast"
+MAX_RATIO_DENOMINATOR = 1024  # razones irracionales (2^(s/12)): error < 0.01 centésimas
+CHUNK = 8192  # salidas por producto: acota la memoria de las ventanas reunidas
+
+
+@dataclass(frozen=True)
+class Tier:
+    taps: int  # coeficientes por muestra de salida (par)
+    beta: float  # Kaiser: atenuación fuera de banda
+    cutoff: float  # fracción de la Nyquist más baja
+
+
+TIERS: Dict[str, Tier] = {
+    "fast": Tier(taps=32, beta=6.0, cutoff=0.88),
+    "hq": Tier(taps=128, beta=10.0, cutoff=0.95),
+}
+# Calidades de soxr -> nivel equivalente de este motor
+_SOXR_TIERS = {"QQ": "fast", "LQ": "fast", "MQ": "fast", "HQ": "hq", "VHQ": "hq"}
+
+
+def parse_tier(name: str) -> str:
+    """Nombre de nivel normalizado (`"fast"`, `"hq"`; acepta las calidades de soxr)."""
+    text = str(name).strip()
+    tier = text.lower() if text.lower() in TIERS else _SOXR_TIERS.get(text.upper())
+    if tier is None:
+        raise ValueError(f"Calidad de resample desconocida: {name!r} (opciones: {', '.join(TIERS)})")
+    return tier
+
+
+def get_tier(name: str) -> Tier:
+    return TIERS[parse_tier(name)]
+
+
+def resample_ratio(in_rate: float, out_rate: float) -> Tuple[int, int]:
+    """`(P, Q)` con `out/in ≈ P/Q`: exacta entre frecuencias enteras, aproximada si no."""
+    if float(in_rate) == int(in_rate) and float(out_rate) == int(out_rate):
+        ratio = Fraction(int(out_rate), int(in_rate))
+    else:
+        ratio = Fraction(float(out_rate) / float(in_rate)).limit_denominator(MAX_RATIO_DENOMINATOR)
+    return ratio.numerator, ratio.denominator
+
+
+@lru_cache(maxsize=16)
+def _phase_table(up: int, down: int, taps: int, beta: float, cutoff: float) -> np.ndarray:
+    """`(P, taps)`: coeficientes de cada fase; la salida j usa la fase `(j*Q) % P`."""
+    # Frecuencia de corte en ciclos por muestra de entrada (se achica al bajar la frecuencia)
+    fc = 0.5 * cutoff * min(1.0, up / down)
+    half = taps // 2
+    # Distancia (en muestras de entrada) entre la posición exacta y cada coeficiente
+    t = (np.arange(up)[:, None] / up) + (half - 1 - np.arange(taps))[None, :]
+    window = np.kaiser(2 * half + 1, beta)
+    # Ventana de Kaiser continua: interpolada en |t| / half
+    w = np.interp(t, np.linspace(-half, half, 2 * half + 1), window)
+    table = 2.0 * fc * np.sinc(2.0 * fc * t) * w
+    # Ganancia unitaria en continua para cada fase (evita rizado por fase)
+    table /= table.sum(axis=1, keepdims=True)
+    return table.astype(np.float32)
+
+
+class PolyphaseResampler:
+    """Resampler racional por bloques: `process(block)` y `flush()` al final.
+
+    Los bloques son `(canales, n)` float o int16; la salida tiene el mismo
+    dtype. La salida total mide `round(n_in * P / Q)` muestras, sin retardo:
+    la muestra j corresponde a la posición `j * Q / P` de la entrada.
+    """
+
+    def __init__(self, in_rate: float, out_rate: float, channels: int = 1, tier: str = DEFAULT_TIER) -> None:
+        spec = get_tier(tier)
+        self.channels = int(channels)
+        self.up, self.down = resample_ratio(in_rate, out_rate)
+        self.taps = spec.taps
+        self._half = spec.taps // 2
+        self._table = _phase_table(self.up, self.down, spec.taps, spec.beta, spec.cutoff)
+        # Historia: ceros antes de la primera muestra; `_base` es el índice de entrada de `_buf[:, 0]`
+        self._buf = np.zeros((self.channels, self._half - 1), dtype=np.float32)
+        self._base = -(self._half - 1)
+        self._n_in = 0
+        self._j = 0  # próxima muestra de salida
+        self._dtype: Optional[np.dtype] = None
+        self._finished = False
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        if self._finished:
+            raise RuntimeError("El resampler ya fue finalizado con flush()")
+        block = np.asarray(block).reshape(self.channels, -1)
+        if self._dtype is None:
+            self._dtype = block.dtype
+        self._n_in += block.shape[1]
+        self._buf = np.concatenate([self._buf, self._to_float(block)], axis=1)
+        # Salidas cuya ventana ya está entera: floor(j*Q/P) + half <= última muestra disponible
+        last = self._base + self._buf.shape[1] - 1 - self._half
+        return self._emit(((last + 1) * self.up + self.down - 1) // self.down if last >= 0 else 0)
+
+    def flush(self) -> np.ndarray:
+        if self._finished:
+            return np.zeros((self.channels, 0), dtype=self._dtype or np.float32)
+        self._buf = np.concatenate([self._buf, np.zeros((self.channels, self._half + 1), dtype=np.float32)], axis=1)
+        self._finished = True
+        return self._emit((2 * self._n_in * self.up + self.down) // (2 * self.down))
+
+    def _emit(self, end: int) -> np.ndarray:
+        parts = []
+        if end > self._j:
+            windows = np.lib.stride_tricks.sliding_window_view(self._buf, self.taps, axis=1)
+        for start in range(self._j, end, CHUNK):
+            j = np.arange(start, min(end, start + CHUNK), dtype=np.int64)
+            pos = j * self.down
+            first = pos // self.up - (self._half - 1) - self._base
+            parts.append(np.einsum("cnk,nk->cn", windows[:, first], self._table[pos % self.up]))
+        if end > self._j:
+            self._j = end
+        # Descartar la entrada que ya no usa ninguna salida futura
+        keep = (self._j * self.down) // self.up - (self._half - 1) - self._base
+        if keep > 0:
+            self._buf = self._buf[:, keep:]
+            self._base += keep
+        out = np.concatenate(parts, axis=1) if parts else np.zeros((self.channels, 0), dtype=np.float32)
+        return self._from_float(out)
+
+    def _to_float(self, block: np.ndarray) -> np.ndarray:
+        if np.issubdtype(block.dtype, np.integer):
+            return block.astype(np.float32) / np.float32(-np.iinfo(block.dtype).min)
+        return block.astype(np.float32, copy=False)
+
+    def _from_float(self, out: np.ndarray) -> np.ndarray:
+        dtype = self._dtype
+        if dtype is None or not np.issubdtype(dtype, np.integer):
+            return out
+        info = np.iinfo(dtype)
+        return np.clip(np.rint(out * np.float32(-info.min)), info.min, info.max).astype(dtype)
+
+
+def resample(samples: np.ndarray, in_rate: float, out_rate: float, tier: str = DEFAULT_TIER) -> np.ndarray:
+    """Remuestrea `(canales, n)` (o `(n,)`) de una vez."""
+    x = np.asarray(samples)
+    r = PolyphaseResampler(in_rate, out_rate, 1 if x.ndim == 1 else x.shape[0], tier)
+    out = np.concatenate([r.process(x), r.flush()], axis=1)
+    return out[0] if x.ndim == 1 else out
+
+
+class SoxrResampler:
+    """`soxr.ResampleStream` con el protocolo de bloques `(canales, n)`."""
+
+    def __init__(self, in_rate: float, out_rate: float, channels: int, quality: str = "HQ") -> None:
+        import soxr
+
+        self.channels = int(channels)
+        self._stream = soxr.ResampleStream(in_rate, out_rate, self.channels, dtype="float32", quality=quality)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        return self._stream.resample_chunk(np.ascontiguousarray(block.T), last=False).T
+
+    def flush(self) -> np.ndarray:
+        empty = np.zeros((0, self.channels), dtype=np.float32)
+        return self._stream.resample_chunk(empty, last=True).T
+
+
+def stream_resampler(
+    in_rate: float, out_rate: float, channels: int, quality: str = "HQ", tier: Optional[str] = None,
+    engine: Optional[str] = None,
+) -> Any:
+    """Resampler por bloques: soxr (`quality`) si está instalado, si no este motor (`tier`).
+
+    `engine="numpy"` fuerza este motor; sin `tier`, se usa el equivalente a `quality`.
+    """
+    if engine not in (None, "soxr", "numpy"):
+        raise ValueError(f"Motor de resample desconocido: {engine!r}")
+    if engine != "numpy":
+        try:
+            return SoxrResampler(in_rate, out_rate, channels, quality)
+        except ImportError:
+            if engine == "soxr":
+                raise
+    return PolyphaseResampler(in_rate, out_rate, channels, tier or _SOXR_TIERS.get(quality.upper(), DEFAULT_TIER))
+
+
+def shift_pitch(
+    audio: AudioData, semitones: float, tier: str = DEFAULT_TIER, preserve_duration: bool = True,
+    block_size: int = 65536,
+) -> AudioData:
+    """Transpone `audio` con este motor (sin librosa ni soxr).
+
+    Con `preserve_duration` se estira en el tiempo (phase vocoder) y se
+    remuestrea, como librosa; si no, solo se remuestrea: cambian tono y
+    duración a la vez (como reproducir a otra velocidad).
+    """
+    from karioka_ok.audio.buffers import float_to_audio, iter_audio_blocks
+
+    get_tier(tier)
+    ratio = 2.0 ** (float(semitones) / 12.0)
+    if preserve_duration:
+        from karioka_ok.audio.pitch_stream import PitchShiftStream
+
+        stream: Any = PitchShiftStream(audio.sample_rate, semitones, channels=audio.channels, tier=tier,
+                                       engine="numpy")
+        parts = list(stream.stream(iter_audio_blocks(audio, block_size)))
+    else:
+        stream = PolyphaseResampler(audio.sample_rate * ratio, audio.sample_rate, audio.channels, tier)
+        parts = [stream.process(block) for block in iter_audio_blocks(audio, block_size)]
+        parts.append(stream.flush())
+    y = np.concatenate(parts, axis=1) if parts else np.zeros((audio.channels, 0), dtype=np.float32)
+    return float_to_audio(y, like=audio)
@@ -0,0 +1,240 @@
+"""Pirámide de picos (min/max/RMS) para dibujar la forma de onda.
+
+Se calcula una vez por pista, vectorizada con NumPy y por trozos (memoria
+acotada aunque la pista sea larga o esté mapeada con `LazyAudioData`):
+
+- nivel 0: un bucket cada `base_bucket` frames (256 por defecto), mezclando
+  canales (min de mínimos, max de máximos, RMS de la media cuadrática);
+- nivel k: cada bucket agrupa dos del nivel k-1 (zoom en potencias de dos).
+
+`query(inicio, fin, pixeles)` elige el nivel más grueso cuyo bucket no supera
+los frames por píxel y agrega como mucho ~2 buckets por píxel: el costo es
+O(píxeles) sin importar el largo de la pista ni el zoom.
+
+La pirámide se guarda en un sidecar binario compacto (int16 por valor) en
+`~/.cache/karioka_ok/waveforms/<hash de contenido>-<bucket>.peaks`.
+"""
+from __future__ import annotations
+
+import os
+import struct
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from karioka_ok.audio.audio_processor import AudioData
+from karioka_ok.audio.buffers import audio_to_array, full_scale
+from karioka_ok.utils.logging_config import get_logger
+from karioka_ok.utils.paths import cache_dir
+
+logger = get_logger("karioka_ok.audio.waveform")
+
+DEFAULT_BASE_BUCKET = 256
+CHUNK_BUCKETS = 4096  # buckets de nivel 0 por trozo al construir
+MAGIC = b"KPKS"
+VERSION = 1
+_HEADER = struct.Struct("<4sHIIQH")  # magic, versión, base_bucket, sample_rate, frames, niveles
+_QUANT = 32767.0
+
+
+@dataclass
+class PeakLevel:
+    """Un nivel de la pirámide: arreglos float32 normalizados a [-1, 1]."""
+    bucket: int  # frames por bucket
+    mins: np.ndarray
+    maxs: np.ndarray
+    rms: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.mins.shape[0])
+
+
+class WaveformPyramid:
+    """Picos multirresolución de una pista y consultas por rango visible."""
+
+    def __init__(self, levels: List[PeakLevel], sample_rate: int, frames: int) -> None:
+        self.levels = levels
+        self.sample_rate = int(sample_rate)
+        self.frames = int(frames)
+
+    @property
+    def base_bucket(self) -> int:
+        return self.levels[0].bucket
+
+    @property
+    def duration(self) -> float:
+        return self.frames / float(self.sample_rate)
+
+    def level_for(self, frames_per_pixel: float) -> PeakLevel:
+        """Nivel más grueso cuyo bucket no supera `frames_per_pixel`."""
+        chosen = self.levels[0]
+        for level in self.levels:
+            if level.bucket <= frames_per_pixel:
+                chosen = level
+            else:
+                break
+        return chosen
+
+    def query(self, start: int, end: int, pixels: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(mins, maxs, rms) de `pixels` columnas para los frames `[start, end)`."""
+        pixels = max(1, int(pixels))
+        start = max(0, int(start))
+        end = min(self.frames, int(end))
+        if end <= start or not len(self.levels[0]):
+            zeros = np.zeros(pixels, dtype=np.float32)
+            return zeros, zeros.copy(), zeros.copy()
+
+        level = self.level_for((end - start) / pixels)
+        # Borde de cada píxel en índices de bucket del nivel elegido
+        edges = np.linspace(start, end, pixels + 1) / level.bucket
+        first = np.floor(edges[:-1]).astype(np.int64)
+        last = np.maximum(np.ceil(edges[1:]).astype(np.int64), first + 1)
+        first = np.minimum(first, len(level) - 1)
+        last = np.minimum(last, len(level))
+
+        # reduceat agrega [first_i, first_i+1) (o solo first_i si se repite): a lo
+        # sumo ~2 buckets por píxel porque el nivel se eligió con bucket <= frames/píxel
+        lo, hi = int(first[0]), int(last[-1])
+        offsets = first - lo
+        mins = np.minimum.reduceat(level.mins[lo:hi], offsets)
+        maxs = np.maximum.reduceat(level.maxs[lo:hi], offsets)
+        sq = np.add.reduceat(level.rms[lo:hi].astype(np.float64) ** 2, offsets)
+        counts = np.diff(np.append(offsets, hi - lo))
+        rms = np.sqrt(sq / np.maximum(counts, 1)).astype(np.float32)
+        return mins, maxs, rms
+
+    # Serialización
+    def to_bytes(self) -> bytes:
+        parts = [_HEADER.pack(MAGIC, VERSION, self.base_bucket, self.sample_rate, self.frames, len(self.levels))]
+        for level in self.levels:
+            parts.append(struct.pack("<I", len(level)))
+            for arr in (level.mins, level.maxs, level.rms):
+                parts.append(_quantize(arr).tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "WaveformPyramid":
+        magic, version, base, sample_rate, frames, n_levels = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Sidecar de forma de onda inválido o de otra versión")
+        pos = _HEADER.size
+        levels = []
+        for k in range(n_levels):
+            (count,) = struct.unpack_from("<I", data, pos)
+            pos += 4
+            arrays = []
+            for _ in range(3):
+                q = np.frombuffer(data, dtype="<i2", count=count, offset=pos)
+                arrays.append(q.astype(np.float32) / _QUANT)
+                pos += 2 * count
+            levels.append(PeakLevel(base << k, *arrays))
+        return cls(levels, sample_rate, frames)
+
+    def save(self, path: str) -> None:
+        """Escritura atómica (temporal + `os.replace`)."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.to_bytes())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "WaveformPyramid":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def _quantize(arr: np.ndarray) -> np.ndarray:
+    return np.clip(np.rint(arr * _QUANT), -_QUANT, _QUANT).astype("<i2")
+
+
+def _level0_chunk(ints: np.ndarray, bucket: int, scale: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """min/max/RMS por bucket de un trozo `(canales, n)` (el último bucket puede ser parcial)."""
+    channels, n = ints.shape
+    full = n // bucket
+    mins, maxs, ms = [], [], []
+    if full:
+        body = ints[:, :full * bucket].reshape(channels, full, bucket)
+        mins.append(body.min(axis=(0, 2)) * scale)
+        maxs.append(body.max(axis=(0, 2)) * scale)
+        f = body.astype(np.float32) * np.float32(scale)
+        ms.append(np.einsum("cbk,cbk->b", f, f) / (channels * bucket))
+    if n > full * bucket:
+        tail = ints[:, full * bucket:].astype(np.float32) * np.float32(scale)
+        mins.append(np.array([tail.min()]))
+        maxs.append(np.array([tail.max()]))
+        ms.append(np.array([np.mean(tail * tail)]))
+    cat = lambda xs: np.concatenate(xs).astype(np.float32)  # noqa: E731
+    return cat(mins), cat(maxs), np.sqrt(cat(ms))
+
+
+def _reduce(level: PeakLevel) -> PeakLevel:
+    """Nivel siguiente: agrupa buckets de a dos (el último impar queda solo)."""
+    n = len(level)
+    pad = n % 2
+
+    def pairs(a: np.ndarray) -> np.ndarray:
+        return (np.append(a, a[-1]) if pad else a).reshape(-1, 2)
+
+    mins = pairs(level.mins).min(axis=1)
+    maxs = pairs(level.maxs).max(axis=1)
+    sq = level.rms.astype(np.float64) ** 2
+    if pad:
+        sq = np.append(sq, sq[-1])
+    rms = np.sqrt(sq.reshape(-1, 2).mean(axis=1)).astype(np.float32)
+    return PeakLevel(level.bucket * 2, mins, maxs, rms)
+
+
+def build_pyramid(audio: AudioData, base_bucket: int = DEFAULT_BASE_BUCKET) -> WaveformPyramid:
+    """Calcula la pirámide completa de `audio` (por trozos, sin copiar la pista)."""
+    ints = audio_to_array(audio)
+    frames = ints.shape[1]
+    scale = 1.0 / full_scale(audio.sample_width)
+    step = base_bucket * CHUNK_BUCKETS
+    chunks = [_level0_chunk(ints[:, i:i + step], base_bucket, scale) for i in range(0, frames, step)]
+    if chunks:
+        level = PeakLevel(base_bucket, *(np.concatenate(parts) for parts in zip(*chunks)))
+    else:
+        empty = np.zeros(0, dtype=np.float32)
+        level = PeakLevel(base_bucket, empty, empty, empty)
+    levels = [level]
+    while len(levels[-1]) > 1:
+        levels.append(_reduce(levels[-1]))
+    return WaveformPyramid(levels, audio.sample_rate, frames)
+
+
+class WaveformCache:
+    """Sidecars `<hash>.peaks` por contenido; se reconstruyen si faltan o están dañados."""
+
+    def __init__(self, root: Optional[str] = None, base_bucket: int = DEFAULT_BASE_BUCKET) -> None:
+        self.root = Path(root) if root else cache_dir("waveforms")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.base_bucket = base_bucket
+
+    def path_for(self, audio: AudioData) -> Path:
+        return self.root / f"{audio.content_hash()}-{self.base_bucket}.peaks"
+
+    def get_or_build(self, audio: AudioData) -> WaveformPyramid:
+        path = self.path_for(audio)
+        try:
+            return WaveformPyramid.load(str(path))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning("Sidecar de forma de onda ilegible, se recalcula: %s", e)
+        pyramid = build_pyramid(audio, self.base_bucket)
+        try:
+            pyramid.save(str(path))
+        except OSError as e:
+            logger.warning("No se pudo guardar la forma de onda en caché: %s", e)
+        return pyramid
@@ -16,6 +16,8 @@ class FileFilters:
     audio: str = "Audio Files (*.mp3 *.wav *.flac)"
     image: str = "Images (*.png *.jpg *.jpeg)"
     text: str = "Text Files (*.txt)"
+    lyrics: str = "Lyrics (*.lrc *.txt)"
+    chain: str = "Effect chains (*.json)"
     any: str = "All Files (*.*)"
 
 
@@ -40,3 +42,12 @@ def save_file_dialog(
         parent, caption, suggested_name, filter_str
     )
     return file_path or None
+
+
+def select_directory_dialog(
+    parent: Optional[QtWidgets.QWidget] = None,
+    caption: str = "Seleccionar carpeta",
+) -> Optional[str]:
+    """Abre un diálogo para elegir un directorio y devuelve la ruta."""
+    directory = QtWidgets.QFileDialog.getExistingDirectory(parent, caption, "")
+    return directory or None
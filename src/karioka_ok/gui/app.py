@@ -5,26 +5,66 @@ cambio de tonalidad, metadatos (carátula y descripción), letra y exportación.
 """
 from __future__ import annotations
 
-from typing import Optional
+import os
+import sqlite3
+from dataclasses import replace
+from typing import TYPE_CHECKING, Optional
 
-from PySide6 import QtWidgets, QtGui
+from PySide6 import QtCore, QtWidgets, QtGui
 
 from karioka_ok.utils.logging_config import get_logger
 from karioka_ok.files.file_dialogs import FileFilters, open_file_dialog, save_file_dialog
-from karioka_ok.audio.audio_processor import (
-    AudioData,
-    load_audio,
-    change_pitch_semitones,
-    export_audio,
-)
-from karioka_ok.metadata.metadata_editor import TrackMetadata, set_metadata
+from karioka_ok.audio.audio_processor import AudioData
+from karioka_ok.audio.render_cache import RenderCache
+from karioka_ok.audio.precompute import LadderPrecomputer
+from karioka_ok.metadata.metadata_editor import TrackMetadata
 from karioka_ok.lyrics.lyrics_loader import Lyrics, load_lyrics
+from karioka_ok.jobs.core import Progress
+from karioka_ok.jobs.tasks import (
+    ExportResult,
+    align_lyrics_job,
+    graph_export_job,
+    key_job,
+    load_audio_job,
+    loudness_job,
+    waveform_job,
+)
+from karioka_ok.gui.workers import JobRunnable, JobRunner
+from karioka_ok.gui.waveform_widget import WaveformWidget
+
+if TYPE_CHECKING:
+    from karioka_ok.audio.graph import Graph
+    from karioka_ok.audio.key import KeyEstimate, KeyIndex
+    from karioka_ok.audio.loudness import LoudnessIndex, LoudnessStats
+    from karioka_ok.audio.preview import PreviewEngine
+    from karioka_ok.audio.waveform import WaveformCache, WaveformPyramid
+    from karioka_ok.library.index import Library
+    from karioka_ok.lyrics.align import FeatureCache
+
+ALL_FORMATS = ("wav", "mp3", "flac")
+STAGE_LABELS = {
+    "decode": "Decodificando",
+    "shift": "Cambiando tono",
+    "encode": "Codificando",
+    "tag": "Etiquetando",
+    "align": "Sincronizando letra",
+    "vocals": "Quitando voz",
+    "render": "Procesando y codificando",
+    "loudness": "Midiendo sonoridad",
+    "key": "Estimando tonalidad",
+    "scan": "Escaneando biblioteca",
+}
+# (etiqueta, modo de karioka_ok.audio.vocals)
+VOCAL_OPTIONS = (("Conservar voz", None), ("Quitar voz (rápido)", "center"), ("Quitar voz (máscara)", "mask"))
 
 
 logger = get_logger("karioka_ok.gui")
 
 
 class MainWindow(QtWidgets.QMainWindow):
+    # Emitida desde el hilo de la vista previa; llega encolada al hilo de la GUI
+    preview_finished = QtCore.Signal()
+
     def __init__(self) -> None:
         super().__init__()
         self.setWindowTitle("Karioka.ok")
@@ -38,8 +78,56 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # Estado de la app
         self.original_audio: Optional[AudioData] = None
+        self.preview: Optional["PreviewEngine"] = None
         self.lyrics: Optional[Lyrics] = None
+        # Efectos extra cargados de un archivo de cadena (se aplican tras tono y voz)
+        self.extra_chain: Optional["Graph"] = None
         self.meta = TrackMetadata()
+        try:
+            self.render_cache: Optional[RenderCache] = RenderCache.default()
+        except OSError as e:
+            logger.warning("Caché de renders deshabilitada: %s", e)
+            self.render_cache = None
+        try:
+            from karioka_ok.audio.waveform import WaveformCache
+
+            self.waveform_cache: Optional["WaveformCache"] = WaveformCache()
+        except OSError as e:
+            logger.warning("Caché de formas de onda deshabilitada: %s", e)
+            self.waveform_cache = None
+        try:
+            from karioka_ok.lyrics.align import FeatureCache
+
+            self.align_cache: Optional["FeatureCache"] = FeatureCache()
+        except OSError as e:
+            logger.warning("Caché de alineación de letra deshabilitada: %s", e)
+            self.align_cache = None
+        from karioka_ok.audio.loudness import DEFAULT_TARGET_LUFS, LoudnessIndex
+
+        self.target_lufs = DEFAULT_TARGET_LUFS
+        try:
+            self.loudness_index: Optional["LoudnessIndex"] = LoudnessIndex()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Índice de sonoridad deshabilitado: %s", e)
+            self.loudness_index = None
+        try:
+            from karioka_ok.audio.key import KeyIndex
+
+            self.key_index: Optional["KeyIndex"] = KeyIndex()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Índice de tonalidades deshabilitado: %s", e)
+            self.key_index = None
+        self.key_estimate: Optional["KeyEstimate"] = None
+        try:
+            from karioka_ok.library.index import Library
+
+            self.library: Optional["Library"] = Library()
+        except (OSError, sqlite3.Error, RuntimeError) as e:
+            logger.warning("Biblioteca deshabilitada: %s", e)
+            self.library = None
+        self.precomputer: Optional[LadderPrecomputer] = (
+            LadderPrecomputer(self.render_cache) if self.render_cache is not None else None
+        )
 
         # Widgets principales
         central = QtWidgets.QWidget(self)
@@ -48,10 +136,25 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # Sección: carga de audio
         self.btn_load_audio = QtWidgets.QPushButton("Cargar audio…")
+        self.btn_library = QtWidgets.QPushButton("Biblioteca…")
+        self.btn_library.setToolTip("Buscar en las carpetas indexadas y abrir una pista")
+        self.btn_library.setEnabled(self.library is not None)
         self.lbl_audio = QtWidgets.QLabel("Ningún archivo cargado")
         self.lbl_audio.setStyleSheet("color: #a0a4c0")
-        layout.addWidget(self.btn_load_audio)
+        load_layout = QtWidgets.QHBoxLayout()
+        load_layout.addWidget(self.btn_load_audio, 1)
+        load_layout.addWidget(self.btn_library)
+        layout.addLayout(load_layout)
         layout.addWidget(self.lbl_audio)
+        self.lbl_loudness = QtWidgets.QLabel("")
+        self.lbl_loudness.setStyleSheet("color: #a0a4c0")
+        layout.addWidget(self.lbl_loudness)
+        self.lbl_key = QtWidgets.QLabel("")
+        self.lbl_key.setStyleSheet("color: #a0a4c0")
+        layout.addWidget(self.lbl_key)
+        self.waveform = WaveformWidget()
+        self.waveform.setToolTip("Rueda: desplazar · Ctrl+rueda: zoom · Clic: ir a la posición")
+        layout.addWidget(self.waveform)
 
         # Sección: cambio de tonalidad
         pitch_layout = QtWidgets.QHBoxLayout()
@@ -61,6 +164,35 @@ class MainWindow(QtWidgets.QMainWindow):
         self.spin_semitones.setToolTip("Define el cambio de tono que se aplicará al exportar")
         pitch_layout.addWidget(QtWidgets.QLabel("Semitonos:"))
         pitch_layout.addWidget(self.spin_semitones)
+        self.txt_voice = QtWidgets.QLineEdit()
+        self.txt_voice.setPlaceholderText("Rango (A2-E4) o tono (Do)")
+        self.txt_voice.setToolTip("Rango de voz, tonalidad deseada o ambos separados por coma")
+        self.btn_suggest = QtWidgets.QPushButton("Sugerir")
+        self.btn_suggest.setToolTip("Elige los semitonos según la tonalidad estimada de la pista")
+        self.btn_suggest.setEnabled(False)
+        pitch_layout.addWidget(self.txt_voice)
+        pitch_layout.addWidget(self.btn_suggest)
+        self.btn_preview = QtWidgets.QPushButton("▶ Escuchar")
+        self.btn_preview.setToolTip("Reproduce la pista con el cambio de tono aplicado en vivo")
+        pitch_layout.addWidget(self.btn_preview)
+        self.combo_vocals = QtWidgets.QComboBox()
+        for label, mode in VOCAL_OPTIONS:
+            self.combo_vocals.addItem(label, mode)
+        self.combo_vocals.setToolTip("Atenúa la voz mezclada al centro al exportar (solo estéreo)")
+        pitch_layout.addWidget(self.combo_vocals)
+        self.btn_load_chain = QtWidgets.QPushButton("Cargar cadena…")
+        self.btn_load_chain.setToolTip("Efectos adicionales (ganancia, normalización, recorte...) desde un .json")
+        self.btn_save_chain = QtWidgets.QPushButton("Guardar cadena…")
+        self.btn_save_chain.setToolTip("Guarda la cadena actual para usarla con `main.py batch --chain`")
+        self.chk_normalize = QtWidgets.QCheckBox(f"Normalizar a {self.target_lufs:g} LUFS")
+        self.chk_normalize.setToolTip("Iguala la sonoridad (EBU R128) al exportar, sin pasar de -1 dBTP")
+        pitch_layout.addWidget(self.chk_normalize)
+        pitch_layout.addWidget(self.btn_load_chain)
+        pitch_layout.addWidget(self.btn_save_chain)
+        self.chk_precompute = QtWidgets.QCheckBox("Precalcular tonos en segundo plano")
+        self.chk_precompute.setToolTip("Tras cargar, calcula ±12 semitonos para exportar al instante")
+        self.chk_precompute.setEnabled(self.precomputer is not None)
+        pitch_layout.addWidget(self.chk_precompute)
         layout.addLayout(pitch_layout)
 
         # Sección: metadatos
@@ -74,12 +206,24 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # Sección: letra
         lyrics_layout = QtWidgets.QHBoxLayout()
-        self.btn_load_lyrics = QtWidgets.QPushButton("Cargar letra (.txt)…")
+        self.btn_load_lyrics = QtWidgets.QPushButton("Cargar letra (.txt/.lrc)…")
         self.lbl_lyrics = QtWidgets.QLabel("Sin letra")
         self.lbl_lyrics.setStyleSheet("color: #a0a4c0")
+        self.btn_align_lyrics = QtWidgets.QPushButton("Sincronizar letra")
+        self.btn_align_lyrics.setToolTip("Asigna tiempos aproximados a cada línea de una letra .txt")
+        self.btn_save_lrc = QtWidgets.QPushButton("Guardar .lrc…")
         lyrics_layout.addWidget(self.btn_load_lyrics)
         lyrics_layout.addWidget(self.lbl_lyrics)
+        lyrics_layout.addWidget(self.btn_align_lyrics)
+        lyrics_layout.addWidget(self.btn_save_lrc)
         layout.addLayout(lyrics_layout)
+        # Línea activa de la letra sincronizada durante la vista previa
+        self.lbl_current_line = QtWidgets.QLabel("")
+        self.lbl_current_line.setAlignment(QtCore.Qt.AlignCenter)
+        self.lbl_current_line.setStyleSheet("color: #80ffdb; font-size: 18px")
+        layout.addWidget(self.lbl_current_line)
+        self.position_timer = QtCore.QTimer(self)
+        self.position_timer.setInterval(100)
 
         # Sección: exportación
         export_layout = QtWidgets.QHBoxLayout()
@@ -87,13 +231,32 @@ class MainWindow(QtWidgets.QMainWindow):
         self.btn_export_mp3 = QtWidgets.QPushButton("Exportar MP3")
         self.btn_export_flac = QtWidgets.QPushButton("Exportar FLAC")
         self.btn_export_original = QtWidgets.QPushButton("Exportar Original")
+        self.btn_export_all = QtWidgets.QPushButton("Exportar todos los formatos")
         export_layout.addWidget(self.btn_export_wav)
         export_layout.addWidget(self.btn_export_mp3)
         export_layout.addWidget(self.btn_export_flac)
         export_layout.addWidget(self.btn_export_original)
+        export_layout.addWidget(self.btn_export_all)
         layout.addLayout(export_layout)
 
+        # Sección: progreso de trabajos en segundo plano
+        progress_layout = QtWidgets.QHBoxLayout()
+        self.progress = QtWidgets.QProgressBar()
+        self.progress.setRange(0, 1000)
+        self.progress.setTextVisible(False)
+        self.lbl_progress = QtWidgets.QLabel("")
+        self.lbl_progress.setStyleSheet("color: #a0a4c0")
+        self.btn_cancel = QtWidgets.QPushButton("Cancelar")
+        self.btn_cancel.setEnabled(False)
+        progress_layout.addWidget(self.progress)
+        progress_layout.addWidget(self.lbl_progress)
+        progress_layout.addWidget(self.btn_cancel)
+        layout.addLayout(progress_layout)
+
         self.setCentralWidget(central)
+        self.jobs = JobRunner(self)
+        # Trabajo que ocupa la barra de progreso (el que cancela "Cancelar")
+        self.foreground_job: Optional[JobRunnable] = None
 
         # Estilos minimalistas
         self.setStyleSheet(
@@ -108,24 +271,214 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # Conexiones
         self.btn_load_audio.clicked.connect(self.on_load_audio)
+        self.btn_library.clicked.connect(self.on_open_library)
         self.btn_select_cover.clicked.connect(self.on_select_cover)
         self.btn_load_lyrics.clicked.connect(self.on_load_lyrics)
+        self.btn_align_lyrics.clicked.connect(self.on_align_lyrics)
+        self.btn_load_chain.clicked.connect(self.on_load_chain)
+        self.btn_save_chain.clicked.connect(self.on_save_chain)
+        self.btn_save_lrc.clicked.connect(self.on_save_lrc)
         self.btn_export_wav.clicked.connect(lambda: self.on_export("wav"))
         self.btn_export_mp3.clicked.connect(lambda: self.on_export("mp3"))
         self.btn_export_flac.clicked.connect(lambda: self.on_export("flac"))
         self.btn_export_original.clicked.connect(self.on_export_original)
+        self.btn_export_all.clicked.connect(self.on_export_all)
+        self.spin_semitones.valueChanged.connect(self.on_semitones_changed)
+        self.btn_suggest.clicked.connect(self.on_suggest_semitones)
+        self.txt_voice.returnPressed.connect(self.on_suggest_semitones)
+        self.btn_cancel.clicked.connect(self.on_cancel_job)
+        self.btn_preview.clicked.connect(self.on_toggle_preview)
+        self.preview_finished.connect(self.on_preview_finished)
+        self.waveform.position_clicked.connect(self.on_waveform_clicked)
+        self.position_timer.timeout.connect(self.on_position_tick)
+
+    # Trabajos en segundo plano
+    def _set_busy(self, busy: bool) -> None:
+        for btn in (
+            self.btn_load_audio,
+            self.btn_library,
+            self.btn_align_lyrics,
+            self.btn_export_wav,
+            self.btn_export_mp3,
+            self.btn_export_flac,
+            self.btn_export_original,
+            self.btn_export_all,
+        ):
+            btn.setEnabled(not busy)
+        self.btn_cancel.setEnabled(busy)
+        if not busy:
+            self.foreground_job = None
+            self.progress.setValue(0)
+            self.lbl_progress.setText("")
+
+    def on_job_progress(self, p: Progress) -> None:
+        self.progress.setValue(int(p.overall * 1000))
+        self.lbl_progress.setText(STAGE_LABELS.get(p.stage, p.stage))
+
+    def on_cancel_job(self) -> None:
+        # Solo el trabajo en primer plano: forma de onda, tonalidad y sonoridad siguen
+        if self.foreground_job is not None:
+            self.foreground_job.job.cancel()
+
+    def on_job_cancelled(self) -> None:
+        self._set_busy(False)
+        logger.info("Trabajo cancelado")
 
     # Slots
     def on_load_audio(self) -> None:
         path = open_file_dialog(self, "Seleccionar audio", FileFilters.audio)
-        if not path:
+        if path:
+            self.load_path(path)
+
+    def on_open_library(self) -> None:
+        from karioka_ok.gui.library_widget import LibraryDialog
+
+        dialog = LibraryDialog(self.library, self.jobs, self)
+        dialog.track_activated.connect(self.load_path)
+        dialog.exec()
+
+    def load_path(self, path: str) -> None:
+        self._set_busy(True)
+        self.foreground_job = self.jobs.submit(
+            load_audio_job(path),
+            on_finished=self.on_audio_loaded,
+            on_failed=self.on_load_failed,
+            on_progress=self.on_job_progress,
+            on_cancelled=self.on_job_cancelled,
+        )
+
+    def on_audio_loaded(self, audio: AudioData) -> None:
+        self._set_busy(False)
+        self.stop_preview()
+        self.original_audio = audio
+        minutes, seconds = divmod(int(audio.duration_seconds), 60)
+        self.lbl_audio.setText(f"Cargado: {audio.path} ({minutes}:{seconds:02d})")
+        logger.info("Audio cargado: %s", audio.path)
+        self.waveform.set_pyramid(None)
+        self.jobs.submit(
+            waveform_job(audio, self.waveform_cache),
+            on_finished=lambda pyramid, a=audio: self.on_waveform_ready(pyramid, a),
+            on_failed=lambda e: logger.warning("No se pudo calcular la forma de onda: %s", e),
+        )
+        self.lbl_loudness.setText("")
+        self.lbl_key.setText("")
+        self.key_estimate = None
+        self.btn_suggest.setEnabled(False)
+        self.jobs.submit(
+            key_job(audio, self.key_index),
+            on_finished=lambda estimate, a=audio: self.on_key_ready(estimate, a),
+            on_failed=lambda e: logger.warning("No se pudo estimar la tonalidad: %s", e),
+        )
+        self.jobs.submit(
+            loudness_job(audio, self.loudness_index),
+            on_finished=lambda stats, a=audio: self.on_loudness_ready(stats, a),
+            on_failed=lambda e: logger.warning("No se pudo medir la sonoridad: %s", e),
+        )
+        if self.precomputer is not None:
+            if self.chk_precompute.isChecked():
+                self.precomputer.start(self.original_audio)
+                self.precomputer.prioritize(int(self.spin_semitones.value()))
+            else:
+                self.precomputer.cancel()
+
+    def on_waveform_ready(self, pyramid: "WaveformPyramid", audio: AudioData) -> None:
+        # Ignorar resultados de una pista que ya se reemplazó
+        if audio is self.original_audio:
+            self.waveform.set_pyramid(pyramid)
+
+    def on_loudness_ready(self, stats: "LoudnessStats", audio: AudioData) -> None:
+        if audio is self.original_audio:
+            self.lbl_loudness.setText(f"Sonoridad: {stats.format()}")
+
+    def on_key_ready(self, estimate: "KeyEstimate", audio: AudioData) -> None:
+        if audio is self.original_audio:
+            self.key_estimate = estimate
+            self.btn_suggest.setEnabled(True)
+            self.lbl_key.setText(f"Tonalidad: {estimate.format()}")
+
+    def on_suggest_semitones(self) -> None:
+        from karioka_ok.audio.key import parse_target, suggest_semitones
+
+        if self.key_estimate is None:
+            return
+        try:
+            target_key, voice_range = parse_target(self.txt_voice.text())
+        except ValueError as e:
+            QtWidgets.QMessageBox.warning(self, "Atención", str(e))
+            return
+        semitones = suggest_semitones(self.key_estimate, target_key, voice_range)
+        self.spin_semitones.setValue(semitones)
+        self.lbl_key.setText(f"Tonalidad: {self.key_estimate.format()} · "
+                             f"sugerencia {semitones:+d} → {self.key_estimate.transposed_name(semitones)}")
+
+    def on_waveform_clicked(self, seconds: float) -> None:
+        self.waveform.set_cursor(seconds)
+        if self.preview is not None:
+            self.preview.seek(seconds)
+
+    def on_load_failed(self, e: Exception) -> None:
+        self._set_busy(False)
+        QtWidgets.QMessageBox.critical(self, "Error", f"No se pudo cargar el audio:\n{e}")
+
+    def on_semitones_changed(self, value: int) -> None:
+        if self.precomputer is not None:
+            self.precomputer.prioritize(int(value))
+        if self.preview is not None:
+            self.preview.set_semitones(int(value))
+
+    # Vista previa
+    def on_toggle_preview(self) -> None:
+        if self.preview is not None:
+            self.stop_preview()
+            return
+        if not self.original_audio:
+            QtWidgets.QMessageBox.warning(self, "Atención", "Carga un audio primero.")
+            return
+        from karioka_ok.audio.preview import PreviewEngine, default_backend
+
+        backend = default_backend()
+        if backend is None:
+            QtWidgets.QMessageBox.information(
+                self, "Vista previa", "Instala el paquete 'sounddevice' para escuchar la vista previa."
+            )
             return
         try:
-            self.original_audio = load_audio(path)
-            self.lbl_audio.setText(f"Cargado: {path}")
-            logger.info("Audio cargado: %s", path)
+            self.preview = PreviewEngine(
+                self.original_audio,
+                backend,
+                semitones=int(self.spin_semitones.value()),
+                on_finished=self.preview_finished.emit,
+            )
+            self.preview.start()
         except Exception as e:
-            QtWidgets.QMessageBox.critical(self, "Error", f"No se pudo cargar el audio:\n{e}")
+            self.preview = None
+            logger.error("No se pudo iniciar la vista previa: %s", e)
+            QtWidgets.QMessageBox.critical(self, "Error", f"No se pudo iniciar la vista previa:\n{e}")
+            return
+        self.btn_preview.setText("■ Detener")
+        self.position_timer.start()
+
+    def on_preview_finished(self) -> None:
+        self.stop_preview()
+
+    def stop_preview(self) -> None:
+        self.position_timer.stop()
+        preview, self.preview = self.preview, None
+        if preview is not None:
+            preview.stop()
+            logger.info("Vista previa: %d underruns", preview.stats.underruns)
+        self.btn_preview.setText("▶ Escuchar")
+
+    def on_position_tick(self) -> None:
+        if self.preview is None:
+            return
+        seconds = self.preview.position
+        self.waveform.set_cursor(seconds)
+        timed = self.lyrics.timed if self.lyrics is not None else None
+        if timed is not None:
+            # La vista previa conserva el tempo: los tiempos de la letra valen tal cual
+            i = timed.line_at(seconds)
+            self.lbl_current_line.setText(timed.line(i) if i >= 0 else "")
 
     def on_select_cover(self) -> None:
         path = open_file_dialog(self, "Seleccionar carátula", FileFilters.image)
@@ -135,52 +488,164 @@ class MainWindow(QtWidgets.QMainWindow):
         logger.info("Carátula seleccionada: %s", path)
 
     def on_load_lyrics(self) -> None:
-        path = open_file_dialog(self, "Seleccionar letra (.txt)", FileFilters.text)
+        path = open_file_dialog(self, "Seleccionar letra (.txt/.lrc)", FileFilters.lyrics)
         if not path:
             return
         try:
-            self.lyrics = load_lyrics(path)
-            self.lbl_lyrics.setText(f"Letra: {path}")
+            self.set_lyrics(load_lyrics(path))
             logger.info("Letra cargada: %s", path)
         except Exception as e:
             QtWidgets.QMessageBox.critical(self, "Error", f"No se pudo cargar la letra:\n{e}")
 
-    def on_export(self, fmt: str) -> None:
-        if not self.original_audio:
-            QtWidgets.QMessageBox.warning(self, "Atención", "Carga un audio primero.")
+    def set_lyrics(self, lyrics: Lyrics) -> None:
+        self.lyrics = lyrics
+        self.meta.lyrics = lyrics
+        synced = f" ({len(lyrics.timed)} líneas sincronizadas)" if lyrics.timed is not None else ""
+        self.lbl_lyrics.setText(f"Letra: {lyrics.path or 'sin archivo'}{synced}")
+        self.lbl_current_line.setText("")
+
+    def on_align_lyrics(self) -> None:
+        if not self.original_audio or self.lyrics is None:
+            QtWidgets.QMessageBox.warning(self, "Atención", "Carga un audio y una letra primero.")
             return
+        self._set_busy(True)
+        self.foreground_job = self.jobs.submit(
+            align_lyrics_job(self.original_audio, self.lyrics, self.align_cache),
+            on_finished=self.on_lyrics_aligned,
+            on_failed=self.on_align_failed,
+            on_progress=self.on_job_progress,
+            on_cancelled=self.on_job_cancelled,
+        )
 
-        # Actualizar descripción desde la UI
+    def on_lyrics_aligned(self, lyrics: Lyrics) -> None:
+        self._set_busy(False)
+        self.set_lyrics(lyrics)
+        logger.info("Letra sincronizada: %d líneas", len(lyrics.timed or ()))
+
+    def on_align_failed(self, e: Exception) -> None:
+        self._set_busy(False)
+        logger.error("No se pudo sincronizar la letra: %s", e)
+        QtWidgets.QMessageBox.critical(self, "Error", f"No se pudo sincronizar la letra:\n{e}")
+
+    def on_save_lrc(self) -> None:
+        if self.lyrics is None or self.lyrics.timed is None:
+            QtWidgets.QMessageBox.warning(self, "Atención", "Carga o sincroniza una letra primero.")
+            return
+        path = save_file_dialog(self, "Guardar letra sincronizada", "letra.lrc", "*.lrc")
+        if not path:
+            return
+        try:
+            self.lyrics.timed.save_lrc(path)
+        except OSError as e:
+            QtWidgets.QMessageBox.critical(self, "Error", f"No se pudo guardar la letra:\n{e}")
+
+    def export_graph(self) -> "Graph":
+        """Cadena de exportación según la UI: tono, voz y los efectos cargados."""
+        from karioka_ok.audio.graph import Graph, Normalize
+
+        graph = Graph.from_options(int(self.spin_semitones.value()), self.combo_vocals.currentData())
+        if self.extra_chain is not None:
+            graph = graph.then(*self.extra_chain.nodes)
+        if self.chk_normalize.isChecked():
+            graph = graph.then(Normalize(self.target_lufs, "lufs"))
+        return graph
+
+    def on_load_chain(self) -> None:
+        path = open_file_dialog(self, "Cargar cadena de efectos", FileFilters.chain)
+        if not path:
+            return
+        from karioka_ok.audio.graph import Graph
+
+        try:
+            self.extra_chain = Graph.load(path)
+        except (OSError, ValueError, TypeError) as e:
+            QtWidgets.QMessageBox.critical(self, "Error", f"No se pudo cargar la cadena:\n{e}")
+            return
+        self.btn_load_chain.setToolTip(f"Efectos adicionales: {self.extra_chain.to_spec() or 'ninguno'}")
+        logger.info("Cadena cargada: %s", self.extra_chain.to_spec())
+
+    def on_save_chain(self) -> None:
+        path = save_file_dialog(self, "Guardar cadena de efectos", "cadena.json", FileFilters.chain)
+        if not path:
+            return
+        try:
+            self.export_graph().save(path)
+        except OSError as e:
+            QtWidgets.QMessageBox.critical(self, "Error", f"No se pudo guardar la cadena:\n{e}")
+
+    def _submit_export(self, targets: list, on_finished) -> None:
+        # La cadena es no destructiva: siempre parte del audio original
+        graph = self.export_graph()
+        if self.original_audio.channels != 2 and any(n.kind == "vocals" for n in graph.nodes):
+            QtWidgets.QMessageBox.warning(self, "Atención", "Quitar la voz requiere una pista estéreo.")
+            return
         self.meta.description = self.txt_description.text().strip() or None
+        logger.info("Exportando con la cadena: %s", graph.to_spec() or "sin efectos")
+        job = graph_export_job(self.original_audio, graph, targets, meta=replace(self.meta), cache=self.render_cache,
+                               loudness=self.loudness_index)
+        source = self.original_audio.path
+
+        def finished(results: list) -> None:
+            self._record_renders(source, graph, targets)
+            on_finished(results)
+
+        self._set_busy(True)
+        self.foreground_job = self.jobs.submit(
+            job,
+            on_finished=finished,
+            on_failed=self.on_export_failed,
+            on_progress=self.on_job_progress,
+            on_cancelled=self.on_job_cancelled,
+        )
 
+    def _record_renders(self, source: Optional[str], graph: "Graph", targets: list) -> None:
+        """Anota las salidas en la biblioteca (si la pista viene de un archivo)."""
+        if self.library is None or not source:
+            return
+        from karioka_ok.audio.graph import PitchShift, VocalReduction
+
+        semitones = sum(n.semitones for n in graph.nodes if isinstance(n, PitchShift))
+        vocals = next((n.mode for n in graph.nodes if isinstance(n, VocalReduction)), None)
+        try:
+            for out_path, fmt in targets:
+                self.library.add_render(source, out_path, fmt, semitones, vocals, graph.to_spec())
+        except (OSError, ValueError, sqlite3.Error) as e:
+            logger.warning("No se pudo anotar la exportación en la biblioteca: %s", e)
+
+    def on_export(self, fmt: str) -> None:
+        if not self.original_audio:
+            QtWidgets.QMessageBox.warning(self, "Atención", "Carga un audio primero.")
+            return
         out_path = save_file_dialog(self, f"Exportar {fmt.upper()}", "salida." + fmt, f"*.{fmt}")
         if not out_path:
             return
+        self._submit_export([(out_path, fmt)], lambda results: self.on_export_finished(results[0]))
 
-        try:
-            # Determinar si hay que aplicar cambio de tono
-            audio_to_export = self.original_audio
-            semitones = int(self.spin_semitones.value())
-
-            if semitones != 0:
-                logger.info("Aplicando cambio de %d semitonos para la exportación...", semitones)
-                # Aplicar el cambio de forma no destructiva, desde el audio original
-                audio_to_export = change_pitch_semitones(self.original_audio, semitones)
-
-            # Exportar el audio (original o modificado)
-            export_audio(audio_to_export, out_path, format_hint=fmt)
-
-            # Escribir metadatos si corresponde
-            try:
-                set_metadata(out_path, self.meta)
-            except Exception as meta_err:
-                logger.warning("No se pudieron escribir metadatos: %s", meta_err)
-
-            QtWidgets.QMessageBox.information(self, "Listo", f"Archivo exportado en {out_path}")
-            logger.info("Exportado: %s", out_path)
-        except Exception as e:
-            logger.critical("No se pudo exportar el audio: %s", e, exc_info=True)
-            QtWidgets.QMessageBox.critical(self, "Error", f"No se pudo exportar:\n{e}")
+    def on_export_all(self) -> None:
+        if not self.original_audio:
+            QtWidgets.QMessageBox.warning(self, "Atención", "Carga un audio primero.")
+            return
+        base = save_file_dialog(self, "Exportar todos los formatos", "salida", FileFilters.any)
+        if not base:
+            return
+        base = os.path.splitext(base)[0]
+        self._submit_export([(f"{base}.{fmt}", fmt) for fmt in ALL_FORMATS], self.on_export_all_finished)
+
+    def on_export_all_finished(self, results: list) -> None:
+        self._set_busy(False)
+        paths = "\n".join(r.out_path for r in results)
+        QtWidgets.QMessageBox.information(self, "Listo", f"Archivos exportados:\n{paths}")
+        logger.info("Exportados: %s", ", ".join(r.out_path for r in results))
+
+    def on_export_finished(self, result: ExportResult) -> None:
+        self._set_busy(False)
+        QtWidgets.QMessageBox.information(self, "Listo", f"Archivo exportado en {result.out_path}")
+        logger.info("Exportado: %s", result.out_path)
+
+    def on_export_failed(self, e: Exception) -> None:
+        self._set_busy(False)
+        logger.critical("No se pudo exportar el audio: %s", e, exc_info=e)
+        QtWidgets.QMessageBox.critical(self, "Error", f"No se pudo exportar:\n{e}")
 
     def on_export_original(self) -> None:
         if not self.original_audio or not self.original_audio.path:
@@ -190,6 +655,14 @@ class MainWindow(QtWidgets.QMainWindow):
         ext = self.original_audio.path.split(".")[-1].lower()
         self.on_export(ext)
 
+    def closeEvent(self, event: QtGui.QCloseEvent) -> None:
+        self.stop_preview()
+        self.jobs.cancel_all()
+        self.jobs.wait_for_done()
+        if self.precomputer is not None:
+            self.precomputer.shutdown()
+        super().closeEvent(event)
+
 
 def run() -> None:
     app = QtWidgets.QApplication([])
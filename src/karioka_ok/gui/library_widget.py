@@ -0,0 +1,168 @@
+"""Navegador de la biblioteca (`karioka_ok.library.index.Library`).
+
+El modelo carga las filas por páginas a medida que la vista se desplaza
+(`canFetchMore` / `fetchMore`), así que abrir o filtrar un catálogo grande
+solo consulta la primera página. La búsqueda espera a que se deje de
+escribir (150 ms) antes de consultar.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, List, Optional
+
+from PySide6 import QtCore, QtWidgets
+
+from karioka_ok.files.file_dialogs import select_directory_dialog
+
+if TYPE_CHECKING:
+    from karioka_ok.gui.workers import JobRunner
+    from karioka_ok.library.index import Library, ScanSummary, TrackRecord
+
+PAGE_SIZE = 256
+SEARCH_DELAY_MS = 150
+COLUMNS = ("Título", "Duración", "Formato", "Letra", "Renders", "Descripción")
+
+
+class LibraryModel(QtCore.QAbstractTableModel):
+    """Pistas de la biblioteca, cargadas por páginas."""
+
+    def __init__(self, library: "Library", parent: Optional[QtCore.QObject] = None) -> None:
+        super().__init__(parent)
+        self.library = library
+        self.query = ""
+        self.total = 0
+        self.rows: List["TrackRecord"] = []
+
+    def set_query(self, query: str) -> None:
+        self.beginResetModel()
+        self.query = query
+        self.total = self.library.count(query)
+        self.rows = self.library.tracks(query, limit=PAGE_SIZE)
+        self.endResetModel()
+
+    def track(self, row: int) -> "TrackRecord":
+        return self.rows[row]
+
+    # API de Qt
+    def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def canFetchMore(self, parent: QtCore.QModelIndex) -> bool:
+        return not parent.isValid() and len(self.rows) < self.total
+
+    def fetchMore(self, parent: QtCore.QModelIndex) -> None:
+        page = self.library.tracks(self.query, limit=PAGE_SIZE, offset=len(self.rows))
+        if not page:
+            self.total = len(self.rows)
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def headerData(self, section: int, orientation: QtCore.Qt.Orientation, role: int = QtCore.Qt.DisplayRole) -> Any:
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index: QtCore.QModelIndex, role: int = QtCore.Qt.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        t = self.rows[index.row()]
+        if role == QtCore.Qt.ToolTipRole:
+            return t.path
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        column = index.column()
+        if column == 0:
+            return t.title
+        if column == 1:
+            minutes, seconds = divmod(int(t.duration or 0), 60)
+            return f"{minutes}:{seconds:02d}"
+        if column == 2:
+            channels = {1: "mono", 2: "estéreo"}.get(t.channels or 0, f"{t.channels} canales")
+            return f"{(t.sample_rate or 0) / 1000:g} kHz {channels}"
+        if column == 3:
+            return "sí" if t.lyrics_path else ""
+        if column == 4:
+            return t.render_count or ""
+        return t.description or ""
+
+
+class LibraryDialog(QtWidgets.QDialog):
+    """Buscar y abrir pistas de la biblioteca; agregar carpetas (escaneo incremental)."""
+
+    track_activated = QtCore.Signal(str)  # ruta de la pista elegida
+
+    def __init__(self, library: "Library", jobs: "JobRunner", parent: Optional[QtWidgets.QWidget] = None) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Biblioteca")
+        self.resize(820, 520)
+        self.library = library
+        self.jobs = jobs
+
+        self.txt_search = QtWidgets.QLineEdit()
+        self.txt_search.setPlaceholderText("Buscar por nombre, carpeta o descripción")
+        self.btn_add_folder = QtWidgets.QPushButton("Agregar carpeta…")
+        self.lbl_status = QtWidgets.QLabel("")
+        self.lbl_status.setStyleSheet("color: #a0a4c0")
+
+        self.model = LibraryModel(library, self)
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setStretchLastSection(True)
+
+        top = QtWidgets.QHBoxLayout()
+        top.addWidget(self.txt_search)
+        top.addWidget(self.btn_add_folder)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(top)
+        layout.addWidget(self.table)
+        layout.addWidget(self.lbl_status)
+
+        self._search_timer = QtCore.QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(SEARCH_DELAY_MS)
+        self._search_timer.timeout.connect(self.refresh)
+        self.txt_search.textChanged.connect(lambda _text: self._search_timer.start())
+        self.table.doubleClicked.connect(self.on_activated)
+        self.btn_add_folder.clicked.connect(self.on_add_folder)
+        self.refresh()
+
+    def refresh(self) -> None:
+        self.model.set_query(self.txt_search.text().strip())
+        self.lbl_status.setText(f"{self.model.total} pistas")
+
+    def on_activated(self, index: QtCore.QModelIndex) -> None:
+        self.track_activated.emit(self.model.track(index.row()).path)
+        self.accept()
+
+    def on_add_folder(self) -> None:
+        directory = select_directory_dialog(self, "Agregar carpeta a la biblioteca")
+        if directory:
+            self.scan([directory])
+
+    def scan(self, roots: List[str]) -> None:
+        from karioka_ok.jobs.tasks import library_scan_job
+
+        self.btn_add_folder.setEnabled(False)
+        self.lbl_status.setText("Escaneando…")
+        self.jobs.submit(
+            library_scan_job(self.library, roots),
+            on_finished=self.on_scan_finished,
+            on_failed=self.on_scan_failed,
+            on_progress=lambda p: self.lbl_status.setText(f"Escaneando… {int(p.overall * 100)} %"),
+        )
+
+    def on_scan_finished(self, summary: "ScanSummary") -> None:
+        self.btn_add_folder.setEnabled(True)
+        self.refresh()
+        self.lbl_status.setText(f"{self.model.total} pistas — {summary.format()}")
+
+    def on_scan_failed(self, e: Exception) -> None:
+        self.btn_add_folder.setEnabled(True)
+        self.lbl_status.setText(f"No se pudo escanear: {e}")
@@ -0,0 +1,106 @@
+"""Widget de forma de onda sobre `WaveformPyramid`.
+
+Cada repintado consulta solo el rango visible al ancho del widget en
+píxeles (`pyramid.query`), así que el costo no depende del largo de la
+pista. Rueda: desplazar; Ctrl+rueda: zoom centrado en el cursor.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+
+from PySide6 import QtCore, QtGui, QtWidgets
+
+if TYPE_CHECKING:
+    from karioka_ok.audio.waveform import WaveformPyramid
+
+MIN_VISIBLE_FRAMES = 64
+
+
+class WaveformWidget(QtWidgets.QWidget):
+    """Dibuja min/max (envolvente) y RMS (banda interior) del rango visible."""
+
+    # Emitida con el segundo clicado (p. ej. para ubicar una línea de la letra)
+    position_clicked = QtCore.Signal(float)
+
+    def __init__(self, parent: Optional[QtWidgets.QWidget] = None) -> None:
+        super().__init__(parent)
+        self.pyramid: Optional["WaveformPyramid"] = None
+        self.view_start = 0
+        self.view_end = 0
+        self.cursor_seconds: Optional[float] = None
+        self.setMinimumHeight(90)
+        self.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
+        self._peak_color = QtGui.QColor("#5e60ce")
+        self._rms_color = QtGui.QColor("#80ffdb")
+        self._bg_color = QtGui.QColor("#2c2f52")
+
+    # API
+    def set_pyramid(self, pyramid: Optional["WaveformPyramid"]) -> None:
+        self.pyramid = pyramid
+        self.view_start = 0
+        self.view_end = pyramid.frames if pyramid is not None else 0
+        self.update()
+
+    def set_view(self, start: int, end: int) -> None:
+        if self.pyramid is None:
+            return
+        total = self.pyramid.frames
+        span = max(MIN_VISIBLE_FRAMES, min(total, int(end - start)))
+        start = max(0, min(int(start), total - span))
+        self.view_start, self.view_end = start, start + span
+        self.update()
+
+    def zoom(self, factor: float, anchor_frame: Optional[int] = None) -> None:
+        """`factor` < 1 acerca, > 1 aleja; `anchor_frame` queda fijo en pantalla."""
+        span = self.view_end - self.view_start
+        anchor = self.view_start + span // 2 if anchor_frame is None else anchor_frame
+        new_span = span * factor
+        ratio = (anchor - self.view_start) / span if span else 0.5
+        self.set_view(int(anchor - ratio * new_span), int(anchor - ratio * new_span + new_span))
+
+    def set_cursor(self, seconds: Optional[float]) -> None:
+        self.cursor_seconds = seconds
+        self.update()
+
+    # Eventos
+    def _frame_at(self, x: float) -> int:
+        span = self.view_end - self.view_start
+        return int(self.view_start + span * x / max(1, self.width()))
+
+    def wheelEvent(self, event: QtGui.QWheelEvent) -> None:
+        if self.pyramid is None:
+            return
+        steps = event.angleDelta().y() / 120.0
+        if event.modifiers() & QtCore.Qt.ControlModifier:
+            self.zoom(0.8 ** steps, self._frame_at(event.position().x()))
+        else:
+            shift = int(-steps * 0.1 * (self.view_end - self.view_start))
+            self.set_view(self.view_start + shift, self.view_end + shift)
+
+    def mousePressEvent(self, event: QtGui.QMouseEvent) -> None:
+        if self.pyramid is not None:
+            self.position_clicked.emit(self._frame_at(event.position().x()) / float(self.pyramid.sample_rate))
+
+    def paintEvent(self, event: QtGui.QPaintEvent) -> None:
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), self._bg_color)
+        if self.pyramid is None or self.view_end <= self.view_start:
+            return
+        width, height = self.width(), self.height()
+        mid = height / 2.0
+        mins, maxs, rms = self.pyramid.query(self.view_start, self.view_end, width)
+
+        painter.setPen(self._peak_color)
+        painter.drawLines([
+            QtCore.QLineF(x, mid - float(hi) * mid, x, mid - float(lo) * mid)
+            for x, (lo, hi) in enumerate(zip(mins, maxs))
+        ])
+        painter.setPen(self._rms_color)
+        painter.drawLines([QtCore.QLineF(x, mid - float(r) * mid, x, mid + float(r) * mid) for x, r in enumerate(rms)])
+
+        if self.cursor_seconds is not None:
+            frame = self.cursor_seconds * self.pyramid.sample_rate
+            x = (frame - self.view_start) / (self.view_end - self.view_start) * width
+            if 0 <= x <= width:
+                painter.setPen(QtGui.QColor("#ffffff"))
+                painter.drawLine(QtCore.QLineF(x, 0, x, height))
@@ -0,0 +1,93 @@
+"""Ejecución de trabajos fuera del hilo de la GUI con QThreadPool.
+
+`JobRunner` envuelve un `karioka_ok.jobs.core.Job` en un `QRunnable` y
+reenvía progreso, resultado y errores como señales Qt, que llegan al hilo
+principal por conexión encolada. El progreso ya viene limitado a ~60 Hz
+desde `JobContext`, así que la GUI no se satura durante exportaciones largas.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Optional
+
+from PySide6 import QtCore
+
+from karioka_ok.jobs.core import Job, JobCancelled, Progress
+from karioka_ok.utils.logging_config import get_logger
+
+logger = get_logger("karioka_ok.gui.workers")
+
+
+class JobSignals(QtCore.QObject):
+    progress = QtCore.Signal(object)  # Progress
+    finished = QtCore.Signal(object)  # resultado del trabajo
+    failed = QtCore.Signal(object)  # excepción
+    cancelled = QtCore.Signal()
+    done = QtCore.Signal()  # siempre, al final
+
+
+class JobRunnable(QtCore.QRunnable):
+    """Adaptador QRunnable -> Job."""
+
+    def __init__(self, job: Job) -> None:
+        super().__init__()
+        self.job = job
+        self.signals = JobSignals()
+        self.setAutoDelete(False)
+
+    def run(self) -> None:
+        try:
+            result = self.job.run(on_progress=self.signals.progress.emit)
+        except JobCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            logger.error("Trabajo '%s' falló: %s", self.job.name, e, exc_info=True)
+            self.signals.failed.emit(e)
+        else:
+            self.signals.finished.emit(result)
+        finally:
+            self.signals.done.emit()
+
+
+class JobRunner(QtCore.QObject):
+    """Lanza trabajos en un QThreadPool y lleva la cuenta de los activos."""
+
+    def __init__(self, parent: Optional[QtCore.QObject] = None, pool: Optional[QtCore.QThreadPool] = None) -> None:
+        super().__init__(parent)
+        self.pool = pool or QtCore.QThreadPool.globalInstance()
+        self._active: dict = {}
+
+    def submit(
+        self,
+        job: Job,
+        on_finished: Optional[Callable[[Any], None]] = None,
+        on_failed: Optional[Callable[[Exception], None]] = None,
+        on_progress: Optional[Callable[[Progress], None]] = None,
+        on_cancelled: Optional[Callable[[], None]] = None,
+    ) -> JobRunnable:
+        runnable = JobRunnable(job)
+        if on_finished:
+            runnable.signals.finished.connect(on_finished)
+        if on_failed:
+            runnable.signals.failed.connect(on_failed)
+        if on_progress:
+            runnable.signals.progress.connect(on_progress)
+        if on_cancelled:
+            runnable.signals.cancelled.connect(on_cancelled)
+        runnable.signals.done.connect(lambda r=runnable: self._active.pop(id(r), None))
+        self._active[id(runnable)] = runnable
+        self.pool.start(runnable)
+        return runnable
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._active)
+
+    def cancel_all(self) -> None:
+        for runnable in list(self._active.values()):
+            runnable.job.cancel()
+
+    def wait_for_done(self, msecs: int = -1) -> bool:
+        """Espera a que terminen los trabajos (útil en pruebas y al cerrar)."""
+        ok = self.pool.waitForDone(msecs)
+        QtCore.QCoreApplication.processEvents()
+        return ok
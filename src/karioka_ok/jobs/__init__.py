@@ -0,0 +1 @@
+# Job execution layer (progress, cancellation) for Karioka.ok
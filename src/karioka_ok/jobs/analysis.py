@@ -0,0 +1,229 @@
+"""Análisis de sonoridad (EBU R128) y tonalidad de un catálogo en un pool de procesos.
+
+Cada archivo se mide en un proceso del pool (`karioka_ok.audio.loudness`,
+o `karioka_ok.audio.key` con `analyze_key_file` y un `KeyIndex`);
+el proceso principal consulta y actualiza el `LoudnessIndex`, así que los
+archivos sin cambios (misma ruta, tamaño y mtime) no se vuelven a medir y
+las exportaciones con normalización reutilizan la medición por hash de
+contenido. Los resultados se guardan por tandas: un análisis interrumpido
+conserva lo ya medido.
+"""
+from __future__ import annotations
+
+import csv
+import math
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional, Tuple, Union
+
+from karioka_ok.utils.logging_config import get_logger
+
+if TYPE_CHECKING:
+    from karioka_ok.audio.key import KeyEstimate, KeyIndex
+    from karioka_ok.audio.loudness import LoudnessIndex, LoudnessStats
+
+logger = get_logger("karioka_ok.analysis")
+
+SAVE_EVERY = 64  # resultados por transacción del índice
+
+
+@dataclass
+class AnalysisResult:
+    path: str
+    status: str  # "ok" | "cached" | "failed"
+    stats: Optional[Union["LoudnessStats", "KeyEstimate"]] = None
+    error: Optional[str] = None
+
+
+def analyze_file(path: str) -> Tuple[str, int, int, str, "LoudnessStats"]:
+    """Mide un archivo: `(ruta, tamaño, mtime_ns, hash, medición)`. Corre en el pool."""
+    from karioka_ok.audio.audio_processor import load_audio
+    from karioka_ok.audio.loudness import measure_loudness
+
+    st = os.stat(path)  # antes de leer: si cambia durante la medición, la próxima vez no coincide
+    audio = load_audio(path, lazy=True)
+    return path, st.st_size, st.st_mtime_ns, audio.content_hash(), measure_loudness(audio)
+
+
+def analyze_key_file(path: str) -> Tuple[str, int, int, str, "KeyEstimate"]:
+    """Estima la tonalidad de un archivo: `(ruta, tamaño, mtime_ns, hash, estimación)`. Corre en el pool."""
+    from karioka_ok.audio.audio_processor import load_audio
+    from karioka_ok.audio.key import detect_key
+
+    st = os.stat(path)
+    audio = load_audio(path, lazy=True)
+    return path, st.st_size, st.st_mtime_ns, audio.content_hash(), detect_key(audio)
+
+
+def analyze_catalog(
+    paths: Iterable[str],
+    index: Union["LoudnessIndex", "KeyIndex"],
+    workers: Optional[int] = None,
+    force: bool = False,
+    on_result: Optional[Callable[[AnalysisResult], None]] = None,
+    analyze: Callable[[str], Tuple] = analyze_file,
+) -> List[AnalysisResult]:
+    """Analiza con `analyze` los archivos que no estén al día en `index`; un resultado por ruta, en orden."""
+    paths = [str(p) for p in paths]
+    results: List[AnalysisResult] = []
+    pending: List[str] = []
+    for path in paths:
+        hit = None if force else index.lookup(path)
+        if hit is None:
+            pending.append(path)
+        else:
+            results.append(AnalysisResult(path, "cached", hit[1]))
+            if on_result is not None:
+                on_result(results[-1])
+
+    rows = []
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            futures = {pool.submit(analyze, path): path for path in pending}
+            for fut in as_completed(futures):
+                try:
+                    row = fut.result()
+                    rows.append(row)
+                    result = AnalysisResult(futures[fut], "ok", row[4])
+                except Exception as e:
+                    result = AnalysisResult(futures[fut], "failed", error=f"{type(e).__name__}: {e}")
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+                if len(rows) >= SAVE_EVERY:
+                    index.put_files(rows)
+                    rows = []
+    if rows:
+        index.put_files(rows)
+
+    order = {path: i for i, path in enumerate(paths)}
+    results.sort(key=lambda r: order.get(r.path, 0))
+    return results
+
+
+def write_report(results: Iterable[AnalysisResult], path: str) -> None:
+    """CSV con una fila por pista (vacío en las que fallaron)."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["path", "status", "integrated_lufs", "loudness_range_lu", "true_peak_dbtp",
+                         "sample_peak_dbfs", "duration_s"])
+        for r in results:
+            s = r.stats
+            values = [s.integrated, s.loudness_range, s.true_peak, s.sample_peak, s.duration] if s else []
+            writer.writerow([r.path, r.status, *(f"{v:.2f}" for v in values)])
+
+
+def write_key_report(results: Iterable[AnalysisResult], path: str, suggest: Optional[Callable] = None) -> None:
+    """CSV de tonalidades; con `suggest` (estimación -> semitonos), una columna con la sugerencia."""
+    from karioka_ok.audio.key import note_name
+
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["path", "status", "key", "confidence", "tuning_cents", "melody_low", "melody_high",
+                         "suggested_semitones"])
+        for r in results:
+            e = r.stats
+            if e is None:
+                writer.writerow([r.path, r.status])
+                continue
+            span = e.melody_range() or (None, None)
+            writer.writerow([r.path, r.status, e.short_name, f"{e.confidence:.3f}", f"{e.tuning:.0f}",
+                             *(note_name(n) if n is not None else "" for n in span),
+                             suggest(e) if suggest is not None else ""])
+
+
+def _count_lines(results: List[AnalysisResult], wall_seconds: float) -> List[str]:
+    count = {status: sum(1 for r in results if r.status == status) for status in ("ok", "cached", "failed")}
+    return [
+        f"Pistas: {len(results)} (medidas {count['ok']}, del índice {count['cached']}, fallidas {count['failed']})",
+        f"Tiempo: {wall_seconds:.1f} s",
+    ]
+
+
+def format_summary(results: List[AnalysisResult], wall_seconds: float) -> str:
+    lines = _count_lines(results, wall_seconds)
+    levels = [r.stats.integrated for r in results if r.stats and math.isfinite(r.stats.integrated)]
+    if levels:
+        lines.append(f"Sonoridad integrada: {min(levels):.1f} a {max(levels):.1f} LUFS "
+                     f"(media {sum(levels) / len(levels):.1f})")
+    for r in results:
+        if r.status == "failed":
+            lines.append(f"  FALLÓ {r.path}: {r.error}")
+    return "\n".join(lines)
+
+
+def _catalog_paths(sources: Iterable[str]) -> List[str]:
+    from karioka_ok.jobs.batch import find_audio_files
+
+    paths: List[str] = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(str(p) for p in find_audio_files(source))
+        else:
+            paths.append(source)
+    return paths
+
+
+def run_loudness_command(args) -> int:
+    """Punto de entrada del subcomando `loudness` de main.py. Devuelve el código de salida."""
+    from karioka_ok.audio.loudness import LoudnessIndex
+
+    paths = _catalog_paths(args.sources)
+    if not paths:
+        print("No se encontraron pistas")
+        return 1
+
+    def report(r: AnalysisResult) -> None:
+        logger.info("[%s] %s %s", r.status, r.path, r.stats.format() if r.stats else r.error)
+
+    start = time.perf_counter()
+    results = analyze_catalog(paths, LoudnessIndex(args.index), workers=args.workers, force=args.force,
+                              on_result=report)
+    if args.csv:
+        write_report(results, args.csv)
+    print(format_summary(results, time.perf_counter() - start))
+    return 1 if any(r.status == "failed" for r in results) else 0
+
+
+def run_key_command(args) -> int:
+    """Punto de entrada del subcomando `key` de main.py. Devuelve el código de salida."""
+    from karioka_ok.audio.key import KeyIndex, parse_target, suggest_semitones
+
+    suggest = None
+    if args.target:
+        try:
+            target_key, voice_range = parse_target(args.target)
+        except ValueError as e:
+            print(e)
+            return 2
+
+        def suggest(estimate: "KeyEstimate") -> int:
+            return suggest_semitones(estimate, target_key, voice_range)
+
+    paths = _catalog_paths(args.sources)
+    if not paths:
+        print("No se encontraron pistas")
+        return 1
+
+    def report(r: AnalysisResult) -> None:
+        if r.stats is None:
+            logger.info("[%s] %s %s", r.status, r.path, r.error)
+            return
+        extra = f" · sugerencia {suggest(r.stats):+d} st" if suggest is not None else ""
+        logger.info("[%s] %s %s%s", r.status, r.path, r.stats.format(), extra)
+
+    start = time.perf_counter()
+    results = analyze_catalog(paths, KeyIndex(args.index), workers=args.workers, force=args.force,
+                              on_result=report, analyze=analyze_key_file)
+    if args.csv:
+        write_key_report(results, args.csv, suggest)
+    lines = _count_lines(results, time.perf_counter() - start)
+    keys = Counter(r.stats.short_name for r in results if r.stats)
+    if keys:
+        lines.append("Tonalidades: " + ", ".join(f"{k} ({n})" for k, n in keys.most_common()))
+    lines.extend(f"  FALLÓ {r.path}: {r.error}" for r in results if r.status == "failed")
+    print("\n".join(lines))
+    return 1 if any(r.status == "failed" for r in results) else 0
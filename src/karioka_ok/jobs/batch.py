@@ -0,0 +1,500 @@
+"""Transposición por lotes sin GUI, repartida en un pool de procesos.
+
+Entrada: un directorio (todos los audios con los mismos semitonos/formatos)
+o un manifiesto CSV/JSON con una fila por pista:
+
+    path, semitones, formats, description, cover, lyrics, vocals, chain, loudness, tier
+
+`formats` admite varios valores separados por `;` o `,` (p. ej. `mp3;flac`).
+`vocals` ("center" o "mask", ver `karioka_ok.audio.vocals`) quita la voz en
+la misma pasada que el cambio de tono; las salidas llevan el sufijo `_karaoke`.
+`chain` agrega efectos tras el tono y la voz: un `.json` guardado desde la GUI
+o la forma compacta de `karioka_ok.audio.graph` (p. ej. `trim_silence`).
+`loudness` (LUFS, p. ej. `-14`) normaliza la sonoridad al final de la cadena;
+las mediciones se reutilizan desde el índice de `karioka_ok.audio.loudness`.
+`tier` ("fast" o "hq", por defecto) es la calidad del cambio de tono cuando
+no hay librosa (`karioka_ok.audio.resample`).
+Las rutas relativas se resuelven respecto del manifiesto; una fila inválida
+(p. ej. semitonos fuera de -12..12) detiene la carga con un error que la
+identifica. Las salidas
+replican las subcarpetas de cada fuente (respecto del directorio o del
+manifiesto) dentro del directorio de salida, que no se escanea aunque
+esté dentro de la fuente; si aun así dos pistas producirían el mismo
+archivo, solo se procesa la primera y la otra queda como fallida.
+
+Cada pista corre load -> shift -> export -> tag en un proceso del pool (el
+cambio de tono se calcula una vez y se codifica a todos los formatos a la vez); un
+fallo queda registrado en su resultado sin afectar al resto. Las salidas
+ya al día (más nuevas que el audio, la carátula y la letra, y hechas con los
+mismos ajustes) se omiten, lo que permite reanudar un lote interrumpido.
+Los ajustes de cada salida quedan como hash en un archivo oculto junto a
+ella (`.<nombre>.render`).
+
+Con `dedupe`, antes de repartir el lote se busca la misma canción llegada
+de fuentes distintas por huella acústica (`karioka_ok.library.fingerprint`,
+cacheadas en la biblioteca): de cada grupo con los mismos ajustes de render
+se procesa solo la primera pista; las demás quedan como `duplicate` y
+apuntan a sus salidas.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from karioka_ok.utils.logging_config import get_logger
+
+if TYPE_CHECKING:
+    from karioka_ok.library.index import Library
+
+logger = get_logger("karioka_ok.batch")
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".flac", ".ogg", ".m4a", ".aac")
+DEFAULT_FORMATS = ("mp3",)
+SEMITONE_RANGE = (-12, 12)
+
+
+@dataclass
+class BatchItem:
+    """Una pista del lote y lo que hay que producir a partir de ella."""
+    path: str
+    semitones: int = 0
+    formats: List[str] = field(default_factory=lambda: list(DEFAULT_FORMATS))
+    description: Optional[str] = None
+    cover: Optional[str] = None
+    lyrics: Optional[str] = None
+    vocals: Optional[str] = None
+    chain: Optional[str] = None
+    loudness: Optional[float] = None
+    tier: str = "hq"
+    subdir: str = ""  # carpeta relativa de la fuente, replicada dentro de `out_dir`
+
+    def output_dir(self, out_dir: str) -> str:
+        return os.path.join(out_dir, self.subdir) if self.subdir else out_dir
+
+    def output_paths(self, out_dir: str) -> Dict[str, str]:
+        """Ruta de salida por formato: `<subdir>/<nombre>[_+N][_karaoke].<fmt>` dentro de `out_dir`."""
+        stem = Path(self.path).stem
+        if self.semitones:
+            stem = f"{stem}_{self.semitones:+d}"
+        if self.vocals:
+            stem = f"{stem}_karaoke"
+        folder = self.output_dir(out_dir)
+        return {fmt: os.path.join(folder, f"{stem}.{fmt}") for fmt in self.formats}
+
+    def render_key(self) -> Tuple:
+        """Lo que determina el audio de salida: dos copias con la misma clave se renderizan igual."""
+        return (self.semitones, tuple(sorted(self.formats)), self.vocals, self.chain, self.loudness, self.tier)
+
+    def settings_hash(self) -> str:
+        """Hash de los ajustes que cambian las salidas (render y etiquetas), para `is_up_to_date`."""
+        from karioka_ok.utils.hashing import hash_bytes
+
+        settings = [self.render_key(), self.description, self.cover, self.lyrics]
+        return hash_bytes(json.dumps(settings, default=str).encode("utf-8"))
+
+    def inputs(self) -> List[str]:
+        chain_file = self.chain if self.chain and self.chain.lower().endswith(".json") else None
+        return [p for p in (self.path, self.cover, self.lyrics, chain_file) if p]
+
+
+@dataclass
+class ItemResult:
+    path: str
+    status: str  # "ok" | "skipped" | "duplicate" | "failed"
+    outputs: List[str] = field(default_factory=list)
+    audio_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    error: Optional[str] = None
+    duplicate_of: Optional[str] = None
+
+
+@dataclass
+class BatchSummary:
+    results: List[ItemResult]
+    wall_seconds: float
+
+    def count(self, status: str) -> int:
+        return sum(1 for r in self.results if r.status == status)
+
+    @property
+    def audio_seconds(self) -> float:
+        return sum(r.audio_seconds for r in self.results if r.status == "ok")
+
+    @property
+    def tracks_per_minute(self) -> float:
+        return 60.0 * self.count("ok") / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+    @property
+    def realtime_factor(self) -> float:
+        """Segundos de audio procesados por segundo de reloj."""
+        return self.audio_seconds / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+    def format(self) -> str:
+        lines = [
+            f"Pistas: {len(self.results)} (ok {self.count('ok')}, omitidas {self.count('skipped')}, "
+            f"duplicadas {self.count('duplicate')}, fallidas {self.count('failed')})",
+            f"Tiempo: {self.wall_seconds:.1f} s | {self.tracks_per_minute:.1f} pistas/min | "
+            f"{self.realtime_factor:.1f} s de audio por segundo",
+        ]
+        for r in self.results:
+            if r.status == "failed":
+                lines.append(f"  FALLÓ {r.path}: {r.error}")
+            elif r.status == "duplicate":
+                lines.append(f"  DUPLICADA {r.path} -> {r.duplicate_of}")
+        return "\n".join(lines)
+
+
+# Construcción del lote
+def _split_formats(value) -> List[str]:
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip().lower().lstrip(".") for v in value if str(v).strip()]
+    parts = str(value or "").replace(",", ";").split(";")
+    return [p.strip().lower().lstrip(".") for p in parts if p.strip()]
+
+
+def _parse_semitones(value) -> int:
+    """Semitonos enteros dentro de `SEMITONE_RANGE`; acepta `"2"`, `"2.0"` o `2.0`."""
+    number = float(value)
+    low, high = SEMITONE_RANGE
+    if not number.is_integer() or not low <= number <= high:
+        raise ValueError(f"semitonos inválidos {value!r}: deben ser un entero entre {low} y {high}")
+    return int(number)
+
+
+def _resolve(base: Path, value) -> Optional[str]:
+    if not value:
+        return None
+    p = Path(str(value)).expanduser()
+    return str(p if p.is_absolute() else base / p)
+
+
+def _subdir(path: str, base: Path) -> str:
+    """Carpeta de `path` relativa a `base` ("" si está en `base` o fuera de ella)."""
+    try:
+        rel = Path(path).resolve().parent.relative_to(base.resolve())
+    except ValueError:
+        return ""
+    return "" if rel == Path(".") else str(rel)
+
+
+def _item_from_row(
+    row: dict,
+    base: Path,
+    default_semitones: int,
+    default_formats: Sequence[str],
+    default_vocals: Optional[str] = None,
+    default_chain: Optional[str] = None,
+    default_loudness: Optional[float] = None,
+    default_tier: str = "hq",
+) -> BatchItem:
+    from karioka_ok.audio.resample import parse_tier
+
+    semis = row.get("semitones")
+    loudness = row.get("loudness")
+    chain = row.get("chain")
+    if chain and str(chain).lower().endswith(".json"):
+        chain = _resolve(base, chain)
+    path = _resolve(base, row["path"]) or ""
+    return BatchItem(
+        path=path,
+        semitones=_parse_semitones(semis) if semis not in (None, "") else default_semitones,
+        formats=_split_formats(row.get("formats")) or list(default_formats),
+        description=row.get("description") or None,
+        cover=_resolve(base, row.get("cover")),
+        lyrics=_resolve(base, row.get("lyrics")),
+        vocals=(row.get("vocals") or default_vocals or None),
+        chain=(chain or default_chain or None),
+        loudness=float(loudness) if loudness not in (None, "") else default_loudness,
+        tier=parse_tier(row.get("tier") or default_tier),
+        subdir=_subdir(path, base),
+    )
+
+
+def load_manifest(
+    path: str,
+    default_semitones: int = 0,
+    default_formats: Sequence[str] = DEFAULT_FORMATS,
+    default_vocals: Optional[str] = None,
+    default_chain: Optional[str] = None,
+    default_loudness: Optional[float] = None,
+    default_tier: str = "hq",
+) -> List[BatchItem]:
+    """Lee un manifiesto CSV o JSON (lista de objetos o `{"items": [...]}`).
+
+    Lanza ValueError con el número de fila (la primera tras la cabecera es la 1)
+    si alguna no se puede interpretar.
+    """
+    base = Path(path).resolve().parent
+    if path.lower().endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        rows = data.get("items", []) if isinstance(data, dict) else data
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+    items = []
+    for number, row in enumerate(rows, start=1):
+        try:
+            items.append(_item_from_row(
+                row, base, default_semitones, default_formats, default_vocals, default_chain, default_loudness,
+                default_tier,
+            ))
+        except (KeyError, TypeError, ValueError) as e:
+            detail = f"falta la columna {e}" if isinstance(e, KeyError) else str(e)
+            raise ValueError(f"{path}, fila {number}: {detail}") from e
+    return items
+
+
+def find_audio_files(directory: str, recursive: bool = True, exclude: Optional[str] = None) -> List[Path]:
+    """Audios del directorio (por extensión), en orden estable.
+
+    `exclude` (p. ej. el directorio de salida dentro de la fuente) no se recorre.
+    """
+    pattern = "**/*" if recursive else "*"
+    skip = Path(exclude).resolve() if exclude else None
+    return sorted(
+        p for p in Path(directory).glob(pattern)
+        if p.suffix.lower() in AUDIO_EXTENSIONS and not (skip and p.resolve().is_relative_to(skip))
+    )
+
+
+def scan_directory(
+    directory: str,
+    semitones: int = 0,
+    formats: Sequence[str] = DEFAULT_FORMATS,
+    recursive: bool = True,
+    vocals: Optional[str] = None,
+    chain: Optional[str] = None,
+    loudness: Optional[float] = None,
+    tier: str = "hq",
+    exclude: Optional[str] = None,
+) -> List[BatchItem]:
+    """Un BatchItem por cada audio del directorio, en orden estable.
+
+    Las salidas replican las subcarpetas de la fuente (`a/tema.mp3` y
+    `b/tema.flac` no se pisan); `exclude` se salta, ver `find_audio_files`.
+    """
+    base = Path(directory)
+    paths = find_audio_files(directory, recursive, exclude)
+    return [
+        BatchItem(path=str(p), semitones=semitones, formats=list(formats), vocals=vocals, chain=chain,
+                  loudness=loudness, tier=tier, subdir=_subdir(str(p), base))
+        for p in paths
+    ]
+
+
+def build_items(
+    source: str,
+    semitones: int = 0,
+    formats: Sequence[str] = DEFAULT_FORMATS,
+    vocals: Optional[str] = None,
+    chain: Optional[str] = None,
+    loudness: Optional[float] = None,
+    tier: str = "hq",
+    exclude: Optional[str] = None,
+) -> List[BatchItem]:
+    """Directorio o manifiesto -> lista de BatchItem (`exclude`: ver `scan_directory`)."""
+    if os.path.isdir(source):
+        return scan_directory(source, semitones, formats, vocals=vocals, chain=chain, loudness=loudness, tier=tier,
+                              exclude=exclude)
+    return load_manifest(source, semitones, formats, vocals, chain, loudness, tier)
+
+
+# Ejecución
+def _settings_path(out_path: str) -> str:
+    folder, name = os.path.split(out_path)
+    return os.path.join(folder, f".{name}.render")
+
+
+def is_up_to_date(item: BatchItem, out_dir: str) -> bool:
+    """True si todas las salidas existen, son más nuevas que sus entradas y se hicieron con los mismos ajustes."""
+    settings = item.settings_hash()
+    try:
+        newest_input = max(os.path.getmtime(p) for p in item.inputs())
+        for p in item.output_paths(out_dir).values():
+            if os.path.getmtime(p) < newest_input:
+                return False
+            with open(_settings_path(p), "r", encoding="utf-8") as f:
+                if f.read().strip() != settings:
+                    return False
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def process_item(item: BatchItem, out_dir: str, force: bool = False, cache_dir: Optional[str] = None) -> ItemResult:
+    """load -> shift -> export -> tag de una pista. Nunca lanza: los errores van al resultado."""
+    start = time.perf_counter()
+    outputs = item.output_paths(out_dir)
+    if not force and is_up_to_date(item, out_dir):
+        return ItemResult(item.path, "skipped", list(outputs.values()))
+    try:
+        from karioka_ok.audio.audio_processor import export_many, load_audio
+        from karioka_ok.metadata.metadata_editor import TrackMetadata
+
+        cache = None
+        if cache_dir:
+            from karioka_ok.audio.render_cache import RenderCache
+
+            cache = RenderCache(cache_dir)
+        audio = load_audio(item.path, lazy=True)
+        lyrics = None
+        if item.lyrics:
+            from karioka_ok.lyrics.lyrics_loader import load_lyrics
+
+            lyrics = load_lyrics(item.lyrics)
+        meta = TrackMetadata(description=item.description, cover_image_path=item.cover, lyrics=lyrics)
+        os.makedirs(item.output_dir(out_dir), exist_ok=True)
+        # Escribir a temporales y renombrar: una salida a medias nunca parece "al día"
+        partials = {fmt: f"{os.path.splitext(p)[0]}.partial.{fmt}" for fmt, p in outputs.items()}
+        targets = [(p, fmt) for fmt, p in partials.items()]
+        if item.chain or item.loudness is not None:
+            from karioka_ok.audio.graph import Graph, Normalize
+            from karioka_ok.audio.loudness import LoudnessIndex
+            from karioka_ok.metadata.metadata_editor import set_metadata_many
+
+            graph = Graph.from_options(item.semitones, item.vocals, item.tier)
+            if item.chain:
+                graph = graph.then(*Graph.load(item.chain).nodes)
+            index = None
+            if item.loudness is not None:
+                graph = graph.then(Normalize(item.loudness, "lufs"))
+                index = LoudnessIndex()
+            plan = graph.plan(audio, cache, index)
+            graph.export(audio, targets, plan=plan)
+            retimed = meta.retimed(*plan.time_mapping())
+            for error in set_metadata_many([(path, retimed) for path, _ in targets]):
+                if error is not None:
+                    raise error
+        else:
+            export_many(audio, targets, item.semitones, cache=cache, meta=meta, vocals=item.vocals, tier=item.tier)
+        settings = item.settings_hash()
+        for fmt, out_path in outputs.items():
+            os.replace(partials[fmt], out_path)
+            with open(_settings_path(out_path), "w", encoding="utf-8") as f:
+                f.write(settings)
+            if item.lyrics:
+                ext = os.path.splitext(item.lyrics)[1].lower() or ".txt"
+                shutil.copyfile(item.lyrics, os.path.splitext(out_path)[0] + ext)
+        seconds = audio.duration_seconds
+        return ItemResult(item.path, "ok", list(outputs.values()), seconds, time.perf_counter() - start)
+    except Exception as e:
+        return ItemResult(item.path, "failed", error=f"{type(e).__name__}: {e}",
+                          wall_seconds=time.perf_counter() - start)
+
+
+def find_duplicates(
+    items: Sequence[BatchItem],
+    library: Optional["Library"] = None,
+    workers: Optional[int] = None,
+    max_distance: Optional[int] = None,
+) -> Dict[int, int]:
+    """`{i: j}`: el ítem `i` es la misma canción que el `j` (anterior) y se renderiza igual.
+
+    Las huellas se toman de `library` (o de la biblioteca por defecto) y
+    las que falten se calculan en un pool de procesos y quedan guardadas.
+    """
+    from karioka_ok.library.fingerprint import DEFAULT_MAX_DISTANCE, group_duplicates
+    from karioka_ok.library.index import Library
+
+    library = library if library is not None else Library()
+    prints = library.fingerprint_files([item.path for item in items], workers)
+    entries = []
+    for i, item in enumerate(items):
+        found = prints.get(os.path.abspath(item.path))
+        if found is not None:
+            entries.append((i, found[0], found[1]))
+    duplicates: Dict[int, int] = {}
+    for group in group_duplicates(entries, DEFAULT_MAX_DISTANCE if max_distance is None else max_distance):
+        first: Dict[Tuple, int] = {}
+        for i in group:
+            j = first.setdefault(items[i].render_key(), i)
+            if j != i:
+                duplicates[i] = j
+    return duplicates
+
+
+def run_batch(
+    items: Iterable[BatchItem],
+    out_dir: str,
+    workers: Optional[int] = None,
+    force: bool = False,
+    cache_dir: Optional[str] = None,
+    on_result: Optional[Callable[[ItemResult], None]] = None,
+    dedupe: bool = False,
+    library: Optional["Library"] = None,
+) -> BatchSummary:
+    """Procesa el lote en un ProcessPoolExecutor del tamaño de los núcleos.
+
+    Con `dedupe`, las pistas que suenan igual que otra anterior del lote
+    (con los mismos ajustes) no se procesan: ver `find_duplicates`.
+    """
+    items = list(items)
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    results: List[ItemResult] = []
+    duplicates = find_duplicates(items, library, workers) if dedupe else {}
+    for i, j in duplicates.items():
+        original = items[j]
+        results.append(ItemResult(items[i].path, "duplicate", list(original.output_paths(out_dir).values()),
+                                  duplicate_of=original.path))
+        if on_result is not None:
+            on_result(results[-1])
+    pending = []
+    claimed: Dict[str, str] = {}  # salida -> fuente que la produce
+    for i, item in enumerate(items):
+        if i in duplicates:
+            continue
+        outputs = [os.path.normcase(os.path.abspath(p)) for p in item.output_paths(out_dir).values()]
+        owner = next((claimed[p] for p in outputs if p in claimed), None)
+        if owner is not None:
+            # Dos procesos escribirían el mismo archivo: solo se hace el primero
+            results.append(ItemResult(item.path, "failed", error=f"Sus salidas coinciden con las de {owner}"))
+            if on_result is not None:
+                on_result(results[-1])
+            continue
+        claimed.update((p, item.path) for p in outputs)
+        pending.append(item)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_item, item, out_dir, force, cache_dir): item for item in pending}
+        for fut in as_completed(futures):
+            try:
+                result = fut.result()
+            except Exception as e:  # p. ej. el proceso hijo murió
+                result = ItemResult(futures[fut].path, "failed", error=f"{type(e).__name__}: {e}")
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    order = {item.path: i for i, item in enumerate(items)}
+    results.sort(key=lambda r: order.get(r.path, 0))
+    return BatchSummary(results, time.perf_counter() - start)
+
+
+def run_batch_command(args) -> int:
+    """Punto de entrada del subcomando `batch` de main.py. Devuelve el código de salida."""
+    formats = _split_formats(args.formats) or list(DEFAULT_FORMATS)
+    try:
+        items = build_items(args.source, args.semitones, formats, getattr(args, "vocals", None),
+                            getattr(args, "chain", None), getattr(args, "loudness", None),
+                            getattr(args, "tier", "hq"), exclude=args.out)
+    except ValueError as e:
+        print(f"Manifiesto inválido: {e}")
+        return 1
+    if not items:
+        print(f"No se encontraron pistas en {args.source}")
+        return 1
+
+    def report(r: ItemResult) -> None:
+        logger.info("[%s] %s", r.status, r.path)
+
+    summary = run_batch(items, args.out, workers=args.workers, force=args.force,
+                        cache_dir=args.cache_dir, on_result=report, dedupe=getattr(args, "dedupe", False))
+    print(summary.format())
+    return 1 if summary.count("failed") else 0
@@ -0,0 +1,136 @@
+"""API de trabajos en Python puro: etapas, progreso y cancelación.
+
+No depende de Qt, así que los trabajos se pueden probar y reutilizar desde la
+CLI. La GUI los ejecuta en un `QThreadPool` (ver `karioka_ok.gui.workers`).
+
+Un `Job` declara sus etapas con un peso relativo; la función del trabajo
+recibe un `JobContext` y avanza con `ctx.stage(nombre)` y `ctx.update(frac)`.
+La cancelación es cooperativa: `ctx.check()` lanza `JobCancelled` si se
+pidió cancelar, y las etapas lo invocan entre bloques de trabajo.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from karioka_ok.utils import instrumentation
+
+# Una actualización por cuadro a 60 fps es suficiente para la barra de progreso
+DEFAULT_MIN_INTERVAL = 1.0 / 60.0
+
+
+class JobCancelled(Exception):
+    """El trabajo fue cancelado antes de terminar."""
+
+
+class CancelToken:
+    """Bandera de cancelación compartida entre hilos."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise JobCancelled()
+
+
+@dataclass(frozen=True)
+class Progress:
+    """Instantánea de progreso: etapa actual, avance en la etapa y total (0..1)."""
+    job: str
+    stage: str
+    stage_fraction: float
+    overall: float
+
+
+ProgressCallback = Callable[[Progress], None]
+
+
+class JobContext:
+    """Contexto que recibe la función de un trabajo mientras se ejecuta."""
+
+    def __init__(
+        self,
+        name: str,
+        stages: Sequence[Tuple[str, float]],
+        token: CancelToken,
+        on_progress: Optional[ProgressCallback] = None,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+    ) -> None:
+        self.name = name
+        self.token = token
+        self._on_progress = on_progress
+        self._min_interval = min_interval
+        total = sum(w for _, w in stages) or 1.0
+        self._offsets: Dict[str, Tuple[float, float]] = {}
+        acc = 0.0
+        for stage, weight in stages:
+            self._offsets[stage] = (acc / total, weight / total)
+            acc += weight
+        self._stage = ""
+        self._last_emit = 0.0
+
+    def check(self) -> None:
+        """Punto de cancelación cooperativa."""
+        self.token.raise_if_cancelled()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator["JobContext"]:
+        """Marca el inicio y fin de una etapa declarada."""
+        self.check()
+        self._stage = name
+        self.update(0.0, force=True)
+        with instrumentation.stage(f"job.{name}"):
+            yield self
+        self.check()
+        self.update(1.0, force=True)
+
+    def update(self, fraction: float, force: bool = False) -> None:
+        """Informa el avance dentro de la etapa actual (limitado en frecuencia)."""
+        if self._on_progress is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_emit < self._min_interval:
+            return
+        self._last_emit = now
+        fraction = min(max(fraction, 0.0), 1.0)
+        offset, weight = self._offsets.get(self._stage, (0.0, 0.0))
+        self._on_progress(Progress(self.name, self._stage, fraction, offset + weight * fraction))
+
+
+class Job:
+    """Unidad de trabajo con etapas ponderadas, ejecutable en cualquier hilo."""
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[JobContext], Any],
+        stages: Sequence[Tuple[str, float]],
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.stages = list(stages)
+        self.token = CancelToken()
+
+    def cancel(self) -> None:
+        self.token.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.cancelled
+
+    def run(self, on_progress: Optional[ProgressCallback] = None) -> Any:
+        """Ejecuta el trabajo en el hilo actual. Lanza `JobCancelled` si se cancela."""
+        ctx = JobContext(self.name, self.stages, self.token, on_progress)
+        with instrumentation.job_scope(self.name):
+            return self.fn(ctx)
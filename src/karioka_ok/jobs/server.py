@@ -0,0 +1,607 @@
+"""Servicio HTTP local de transposición: una cola de trabajos con concurrencia acotada.
+
+`python main.py serve --out salida/` escucha (asyncio, sin dependencias
+externas) y acepta trabajos de otras máquinas de la red local:
+
+    POST /jobs                    JSON con `path`, `semitones`, `formats`, `description`,
+                                  `cover`, `lyrics`, `vocals`, `chain`, `loudness`, `tier`
+    POST /jobs?filename=tema.wav&semitones=2&formats=mp3;flac
+                                  subida: el cuerpo es el audio; los campos van en la query
+    GET  /jobs                    trabajos recientes
+    GET  /jobs/<id>               estado: queued | running | done | failed
+    GET  /jobs/<id>/files/<fmt>   la salida, con soporte de `Range` (206 / 416)
+    GET  /metrics                 profundidad de la cola, contadores y latencias
+
+Cada trabajo es un `BatchItem` que corre `process_item` (ver
+`karioka_ok.jobs.batch`) en un ProcessPoolExecutor: como mucho `workers`
+a la vez y `max_queue` esperando (después, 503 con `Retry-After`). Un pedido
+idéntico a otro que está en cola o en proceso (misma fuente, por ruta, tamaño
+y fecha, y mismos ajustes) devuelve ese trabajo en lugar de encolar otro.
+
+Las subidas se guardan por hash de contenido en `uploads/` dentro del
+directorio de salida (la misma subida dos veces es la misma fuente). Las
+salidas de cada trabajo van a `jobs/<clave>/`: repetir un pedido ya
+terminado solo comprueba que sus archivos sigan al día. Ambas viven lo
+mismo que el historial (`HISTORY` trabajos terminados): lo que ya no es de
+ningún trabajo recordado se borra pasada una hora sin cambios, incluidos
+los restos de una ejecución anterior. Con la cola llena, una subida se
+rechaza antes de leer el cuerpo.
+
+El servicio no autentica: `path`, `cover` y `lyrics` solo pueden apuntar a
+subidas o a los directorios de `--root` (sin `--root`, solo subidas), las
+carátulas tienen que ser imágenes de verdad y `chain` solo admite la forma
+compacta (nunca la ruta de un `.json`).
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, quote, unquote, urlsplit
+
+from karioka_ok.jobs.batch import AUDIO_EXTENSIONS, DEFAULT_FORMATS, BatchItem, ItemResult, _split_formats, process_item
+from karioka_ok.utils.hashing import hash_bytes, new_hasher
+from karioka_ok.utils.logging_config import get_logger
+
+logger = get_logger("karioka_ok.server")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_QUEUE = 256
+MAX_JSON_BYTES = 1 << 20
+MAX_UPLOAD_BYTES = 2 * 1024 ** 3
+MAX_HEADER_BYTES = 64 * 1024
+UPLOAD_CHUNK = 1 << 20
+# Trabajos terminados que se recuerdan (estado y descargas) y muestras de latencia
+HISTORY = 1000
+ORPHAN_GRACE_SECONDS = 3600  # subidas y salidas sin trabajo recordado: se borran tras este tiempo sin cambios
+LATENCY_WINDOW = 512
+RETRY_AFTER_SECONDS = 5
+
+CONTENT_TYPES = {
+    "mp3": "audio/mpeg", "flac": "audio/flac", "wav": "audio/wav", "ogg": "audio/ogg",
+    "m4a": "audio/mp4", "aac": "audio/aac",
+}
+REASONS = {
+    200: "OK", 202: "Accepted", 206: "Partial Content", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 409: "Conflict", 411: "Length Required", 413: "Payload Too Large",
+    416: "Range Not Satisfiable", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class HttpError(Exception):
+    """Respuesta de error: `status` y el mensaje como `{"error": ...}`."""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class QueueFull(RuntimeError):
+    """La cola ya tiene `max_queue` trabajos esperando."""
+
+
+# Pedidos
+LYRICS_EXTENSIONS = (".txt", ".lrc")
+COVER_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif")
+
+
+def _inside(path: str, roots: Sequence[str]) -> bool:
+    real = os.path.realpath(path)
+    return any(os.path.commonpath([real, root]) == root for root in roots)
+
+
+def _allowed_file(name: str, value: str, roots: Sequence[str], extensions: Sequence[str]) -> str:
+    """Ruta absoluta de `value` si es un archivo con extensión válida dentro de `roots`."""
+    if os.path.splitext(value)[1].lower() not in extensions:
+        raise ValueError(f"'{name}' debe terminar en {', '.join(extensions)}")
+    if not _inside(value, roots):
+        raise ValueError(f"'{name}' está fuera de los directorios permitidos: {value}")
+    if not os.path.isfile(value):
+        raise ValueError(f"No existe el archivo de '{name}': {value}")
+    return os.path.abspath(value)
+
+
+def item_from_fields(fields: dict, path: Optional[str] = None, roots: Sequence[str] = ()) -> BatchItem:
+    """Valida los campos de un pedido y arma su `BatchItem` (ValueError si no son válidos).
+
+    `path` es una subida ya guardada por el servicio; las rutas que llegan en
+    `fields` tienen que estar dentro de `roots` (rutas reales, sin enlaces).
+    """
+    roots = [os.path.realpath(root) for root in roots]
+    source = path or fields.get("path")
+    if not source:
+        raise ValueError("Falta 'path' (o subir el audio en el cuerpo del pedido)")
+    if path is None:
+        source = _allowed_file("path", str(source), roots, AUDIO_EXTENSIONS)
+    elif not os.path.isfile(source):
+        raise ValueError(f"No existe el archivo: {source}")
+    try:
+        semitones = int(fields.get("semitones") or 0)
+        loudness = fields.get("loudness")
+        loudness = float(loudness) if loudness not in (None, "") else None
+    except (TypeError, ValueError):
+        raise ValueError("'semitones' debe ser entero y 'loudness' un número") from None
+    if not -12 <= semitones <= 12:
+        raise ValueError("'semitones' debe estar entre -12 y 12")
+    formats = _split_formats(fields.get("formats")) or list(DEFAULT_FORMATS)
+    if not all(fmt.isalnum() for fmt in formats):
+        raise ValueError(f"Formato no válido: {formats}")
+    vocals = fields.get("vocals") or None
+    if vocals not in (None, "center", "mask"):
+        raise ValueError("'vocals' debe ser 'center' o 'mask'")
+    from karioka_ok.audio.resample import parse_tier
+
+    tier = parse_tier(fields.get("tier") or "hq")
+    cover = fields.get("cover") or None
+    if cover is not None:
+        from karioka_ok.metadata.covers import read_cover
+
+        cover = _allowed_file("cover", str(cover), roots, COVER_EXTENSIONS)
+        if not read_cover(cover).width:
+            raise ValueError(f"'cover' no es una imagen JPEG, PNG o GIF: {cover}")
+    lyrics = fields.get("lyrics") or None
+    if lyrics is not None:
+        lyrics = _allowed_file("lyrics", str(lyrics), roots, LYRICS_EXTENSIONS)
+    chain = fields.get("chain") or None
+    if chain is not None:
+        from karioka_ok.audio.graph import Graph
+
+        if str(chain).strip().lower().endswith(".json"):
+            raise ValueError("'chain' solo admite la forma compacta, no la ruta de un .json")
+        Graph.parse(str(chain))  # ValueError si no es válida
+    return BatchItem(
+        path=os.path.abspath(source), semitones=semitones, formats=formats,
+        description=fields.get("description") or None, cover=cover,
+        lyrics=lyrics, vocals=vocals, chain=chain, loudness=loudness, tier=tier,
+    )
+
+
+def job_key(item: BatchItem) -> str:
+    """Identidad de un pedido: sus entradas (ruta, tamaño, fecha) y todo lo que cambia la salida."""
+    inputs = []
+    for path in item.inputs():
+        try:
+            info = os.stat(path)
+            inputs.append([os.path.abspath(path), info.st_size, info.st_mtime_ns])
+        except OSError:
+            inputs.append([os.path.abspath(path), None, None])
+    identity = [inputs, list(item.render_key()), item.description]
+    return hash_bytes(json.dumps(identity, sort_keys=True, default=str).encode("utf-8"))
+
+
+# Cola
+@dataclass
+class ServiceJob:
+    id: str
+    key: str
+    item: BatchItem
+    created: float = field(default_factory=time.time)
+    status: str = "queued"  # "queued" | "running" | "done" | "failed"
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Optional[ItemResult] = None
+    requests: int = 1
+
+    def outputs(self) -> Dict[str, str]:
+        """Formato -> ruta de cada salida terminada."""
+        if self.status != "done" or self.result is None:
+            return {}
+        return {os.path.splitext(p)[1][1:].lower(): p for p in self.result.outputs}
+
+    def to_json(self) -> dict:
+        now = time.time()
+        return {
+            "id": self.id,
+            "status": self.status,
+            "source": self.item.path,
+            "semitones": self.item.semitones,
+            "formats": self.item.formats,
+            "requests": self.requests,
+            "wait_seconds": round((self.started or now) - self.created, 3),
+            "run_seconds": round((self.finished or now) - self.started, 3) if self.started else None,
+            "files": {fmt: f"/jobs/{self.id}/files/{fmt}" for fmt in self.outputs()},
+            "error": self.result.error if self.result is not None else None,
+        }
+
+
+def _latency_summary(values: Deque[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    return {"count": len(ordered), "mean": round(sum(ordered) / len(ordered), 3),
+            "p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1], 3)}
+
+
+def _process_pool(max_workers: int):
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=max_workers)
+
+
+class TranspositionQueue:
+    """Cola de trabajos de transposición. Se usa desde un solo event loop."""
+
+    def __init__(
+        self,
+        out_dir: str,
+        workers: Optional[int] = None,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        cache_dir: Optional[str] = None,
+        executor_factory: Optional[Callable[[int], object]] = None,
+        roots: Sequence[str] = (),
+    ) -> None:
+        self.out_dir = os.path.abspath(out_dir)
+        self.upload_dir = os.path.join(self.out_dir, "uploads")
+        os.makedirs(self.upload_dir, exist_ok=True)
+        # Directorios de los que se aceptan rutas en los pedidos (además de las subidas)
+        self.roots = [os.path.abspath(root) for root in roots] + [self.upload_dir]
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.cache_dir = cache_dir
+        self._executor_factory = executor_factory or _process_pool
+        self._executor = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._jobs: "OrderedDict[str, ServiceJob]" = OrderedDict()
+        self._inflight: Dict[str, ServiceJob] = {}
+        self._tasks: set = set()
+        self.counters = {"submitted": 0, "deduplicated": 0, "rejected": 0, "completed": 0, "failed": 0}
+        self._latency: Dict[str, Deque[float]] = {
+            name: deque(maxlen=LATENCY_WINDOW) for name in ("wait", "run", "total")
+        }
+        self.started = time.time()
+        self._sweep()
+
+    # Estado
+    def get(self, job_id: str) -> Optional[ServiceJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self, limit: int = 100) -> List[ServiceJob]:
+        """Los trabajos más recientes primero."""
+        return list(reversed(self._jobs.values()))[:limit]
+
+    def count(self, status: str) -> int:
+        return sum(1 for job in self._inflight.values() if job.status == status)
+
+    def metrics(self) -> dict:
+        return {
+            "queued": self.count("queued"),
+            "running": self.count("running"),
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            **self.counters,
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "latency_seconds": {name: _latency_summary(v) for name, v in self._latency.items()},
+        }
+
+    def job_dir(self, job: ServiceJob) -> str:
+        return os.path.join(self.out_dir, "jobs", job.key[:16])
+
+    # Trabajos
+    def check_capacity(self) -> None:
+        """`QueueFull` si no cabe otro trabajo en espera."""
+        if self.count("queued") >= self.max_queue:
+            self.counters["rejected"] += 1
+            raise QueueFull(f"La cola está llena ({self.max_queue} trabajos esperando)")
+
+    def submit(self, item: BatchItem) -> Tuple[ServiceJob, bool]:
+        """Encola `item`; `(trabajo, True)` si ya había uno idéntico en curso."""
+        self.counters["submitted"] += 1
+        key = job_key(item)
+        job = self._inflight.get(key)
+        if job is not None:
+            job.requests += 1
+            self.counters["deduplicated"] += 1
+            return job, True
+        self.check_capacity()
+        job = ServiceJob(uuid.uuid4().hex[:16], key, item)
+        self._jobs[job.id] = job
+        self._inflight[key] = job
+        task = asyncio.get_running_loop().create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job, False
+
+    async def _run(self, job: ServiceJob) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        if self._executor is None:
+            self._executor = self._executor_factory(self.workers)
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            job.status, job.started = "running", time.time()
+            try:
+                result = await loop.run_in_executor(
+                    self._executor, process_item, job.item, self.job_dir(job), False, self.cache_dir
+                )
+            except Exception as e:  # p. ej. el proceso hijo murió
+                result = ItemResult(job.item.path, "failed", error=f"{type(e).__name__}: {e}")
+        job.finished, job.result = time.time(), result
+        job.status = "failed" if result.status == "failed" else "done"
+        del self._inflight[job.key]
+        self.counters["failed" if job.status == "failed" else "completed"] += 1
+        self._latency["wait"].append(job.started - job.created)
+        self._latency["run"].append(job.finished - job.started)
+        self._latency["total"].append(job.finished - job.created)
+        logger.info("[%s] %s (%.1f s)", job.status, job.item.path, job.finished - job.created)
+        self._prune()
+
+    def _prune(self) -> None:
+        """Olvida los trabajos terminados más viejos y borra sus subidas y salidas."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished is not None]
+        for job_id in finished[:max(0, len(finished) - HISTORY)]:
+            del self._jobs[job_id]
+        self._sweep()
+
+    def _sweep(self) -> None:
+        """Borra de `uploads/` y `jobs/` lo que no es de ningún trabajo recordado (ni reciente)."""
+        keep = set()
+        for job in list(self._jobs.values()) + list(self._inflight.values()):
+            keep.add(self.job_dir(job))
+            keep.add(os.path.dirname(os.path.abspath(job.item.path)))
+        cutoff = time.time() - ORPHAN_GRACE_SECONDS
+        for parent in (self.upload_dir, os.path.join(self.out_dir, "jobs")):
+            try:
+                with os.scandir(parent) as it:
+                    entries = [e for e in it if e.path not in keep]
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    # Una subida en curso (`.part`) o recién guardada cambia su fecha al escribirse
+                    if entry.stat(follow_symlinks=False).st_mtime > cutoff:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entry.path)
+                    else:
+                        os.unlink(entry.path)
+                except OSError as e:
+                    logger.warning("No se pudo borrar %s: %s", entry.path, e)
+
+    async def close(self) -> None:
+        """Cancela lo pendiente y cierra el pool (los renders en curso se abandonan)."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# HTTP
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """`(inicio, fin)` inclusivos de un `Range: bytes=...` de un tramo; None = archivo entero.
+
+    Los rangos malformados o de varios tramos se ignoran (se sirve el archivo
+    entero, como permite RFC 9110); uno fuera del archivo es un 416.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    first, sep, last = spec.strip().partition("-")
+    if unit.strip().lower() != "bytes" or "," in spec or not sep:
+        return None
+    try:
+        if first == "":  # sufijo: los últimos N bytes
+            suffix = int(last)
+            start, end = (max(0, size - suffix) if suffix > 0 else size), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HttpError(416, "Rango fuera del archivo", {"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def _head(status: int, headers: Dict[str, str]) -> bytes:
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    lines += [f"{name}: {value}" for name, value in {**headers, "Connection": "close"}.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def _content_disposition(name: str) -> str:
+    """`attachment` con un `filename` ASCII de respaldo y el nombre real en `filename*` (RFC 6266).
+
+    Del respaldo se quitan comillas, barras invertidas y controles (CR/LF
+    inyectarían cabeceras) y lo que no es ASCII pasa a `_`; `filename*` va
+    en UTF-8 con escapes `%XX`.
+    """
+    kept = (c for c in name if ord(c) >= 32 and ord(c) != 127 and c not in '"\\')
+    fallback = "".join(c if ord(c) < 128 else "_" for c in kept)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(name, safe='')}"
+
+
+async def _send_json(writer: asyncio.StreamWriter, status: int, data, headers: Optional[Dict[str, str]] = None) -> None:
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    writer.write(_head(status, {**(headers or {}), "Content-Type": "application/json; charset=utf-8",
+                                "Content-Length": str(len(body))}) + body)
+    await writer.drain()
+
+
+class TranspositionServer:
+    """Frente HTTP/1.1 mínimo (una petición por conexión) sobre una `TranspositionQueue`."""
+
+    def __init__(self, queue: TranspositionQueue) -> None:
+        self.queue = queue
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._handle, host, port, limit=MAX_HEADER_BYTES)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            await self._dispatch(reader, writer)
+        except HttpError as e:
+            with contextlib.suppress(ConnectionError):
+                await _send_json(writer, e.status, {"error": str(e)}, e.headers)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.exception("Error atendiendo una petición")
+            with contextlib.suppress(ConnectionError):
+                await _send_json(writer, 500, {"error": f"{type(e).__name__}: {e}"})
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _dispatch(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+        request_line, *header_lines = head.split("\r\n")
+        try:
+            method, target, _ = request_line.split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "Línea de petición no válida") from None
+        headers = {}
+        for line in header_lines:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+
+        if parts == ["jobs"] and method == "POST":
+            await self._submit(reader, writer, headers, query)
+        elif parts == ["jobs"] and method == "GET":
+            await _send_json(writer, 200, {"jobs": [job.to_json() for job in self.queue.jobs()]})
+        elif len(parts) == 2 and parts[0] == "jobs" and method == "GET":
+            await _send_json(writer, 200, self._job(parts[1]).to_json())
+        elif len(parts) == 4 and parts[0] == "jobs" and parts[2] == "files" and method in ("GET", "HEAD"):
+            await self._send_file(writer, self._job(parts[1]), parts[3], headers.get("range"), method == "HEAD")
+        elif parts == ["metrics"] and method == "GET":
+            await _send_json(writer, 200, self.queue.metrics())
+        elif parts and parts[0] in ("jobs", "metrics"):
+            raise HttpError(405, f"Método no permitido: {method}")
+        else:
+            raise HttpError(404, f"No existe: {url.path}")
+
+    def _job(self, job_id: str) -> ServiceJob:
+        job = self.queue.get(job_id)
+        if job is None:
+            raise HttpError(404, f"No existe el trabajo {job_id}")
+        return job
+
+    async def _submit(self, reader, writer, headers: Dict[str, str], query: Dict[str, str]) -> None:
+        if "transfer-encoding" in headers:
+            raise HttpError(411, "Se requiere Content-Length")
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HttpError(400, "Content-Length no válido") from None
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        try:
+            if content_type == "application/json":
+                if length > MAX_JSON_BYTES:
+                    raise HttpError(413, "Pedido JSON demasiado grande")
+                try:
+                    fields = json.loads(await reader.readexactly(length) or b"{}")
+                except ValueError:
+                    raise HttpError(400, "JSON no válido") from None
+                if not isinstance(fields, dict):
+                    raise HttpError(400, "Se esperaba un objeto JSON")
+                item = item_from_fields(fields, roots=self.queue.roots)
+            else:
+                self.queue.check_capacity()  # antes de leer (y guardar) un cuerpo que se descartaría
+                path = await self._store_upload(reader, length, query.get("filename"))
+                item = item_from_fields(query, path=path, roots=self.queue.roots)
+            job, deduplicated = self.queue.submit(item)
+        except ValueError as e:
+            raise HttpError(400, str(e)) from None
+        except QueueFull as e:
+            raise HttpError(503, str(e), {"Retry-After": str(RETRY_AFTER_SECONDS)}) from None
+        await _send_json(writer, 202, {**job.to_json(), "deduplicated": deduplicated},
+                         {"Location": f"/jobs/{job.id}"})
+
+    async def _store_upload(self, reader: asyncio.StreamReader, length: int, filename: Optional[str]) -> str:
+        """Guarda el cuerpo en `uploads/<hash>/<nombre>` y devuelve la ruta."""
+        name = os.path.basename(filename or "")
+        if os.path.splitext(name)[1].lower() not in AUDIO_EXTENSIONS:
+            raise HttpError(400, f"'filename' debe terminar en {', '.join(AUDIO_EXTENSIONS)}")
+        if length <= 0:
+            raise HttpError(400, "Falta el audio en el cuerpo del pedido")
+        if length > MAX_UPLOAD_BYTES:
+            raise HttpError(413, "El archivo es demasiado grande")
+        hasher = new_hasher()
+        fd, tmp = tempfile.mkstemp(dir=self.queue.upload_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                remaining = length
+                while remaining:
+                    chunk = await reader.readexactly(min(UPLOAD_CHUNK, remaining))
+                    hasher.update(chunk)
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            folder = os.path.join(self.queue.upload_dir, hasher.hexdigest())
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, name)
+            if os.path.exists(path):
+                os.unlink(tmp)  # misma subida: se conserva la anterior (y su fecha)
+            else:
+                os.replace(tmp, path)
+            return path
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+            raise
+
+    async def _send_file(self, writer, job: ServiceJob, fmt: str, range_header: Optional[str], head_only: bool) -> None:
+        if job.status in ("queued", "running"):
+            raise HttpError(409, f"El trabajo {job.id} aún no terminó ({job.status})")
+        path = job.outputs().get(fmt.lower())
+        if path is None or not os.path.isfile(path):
+            raise HttpError(404, f"El trabajo {job.id} no tiene salida en {fmt}")
+        size = os.path.getsize(path)
+        span = parse_range(range_header, size)
+        start, end = span or (0, size - 1)
+        headers = {
+            "Content-Type": CONTENT_TYPES.get(fmt.lower(), "application/octet-stream"),
+            "Content-Length": str(end - start + 1),
+            "Accept-Ranges": "bytes",
+            "Content-Disposition": _content_disposition(os.path.basename(path)),
+        }
+        if span:
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        writer.write(_head(206 if span else 200, headers))
+        await writer.drain()
+        if head_only or end < start:
+            return
+        with open(path, "rb") as f:
+            await asyncio.get_running_loop().sendfile(writer.transport, f, start, end - start + 1)
+
+
+def run_serve_command(args) -> int:
+    """Punto de entrada del subcomando `serve` de main.py (hasta Ctrl+C)."""
+    queue = TranspositionQueue(args.out, workers=args.workers, max_queue=args.max_queue, cache_dir=args.cache_dir,
+                               roots=args.root or ())
+
+    async def main() -> None:
+        server = await TranspositionServer(queue).start(args.host, args.port)
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"Escuchando en http://{host}:{port} ({queue.workers} procesos, salidas en {queue.out_dir})",
+              flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await queue.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("Servicio detenido")
+    return 0
@@ -0,0 +1,164 @@
+"""Trabajos concretos de la app: cargar, transponer, quitar la voz, codificar y etiquetar.
+
+Cada fábrica devuelve un `Job` con etapas declaradas para que la GUI muestre
+el progreso por etapa (decode, render, tag, ...) y pueda cancelarlo. Las
+exportaciones pasan todas por `graph_export_job`: la cadena de
+`karioka_ok.audio.graph` transpone, quita la voz y codifica en un solo pase.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+
+from karioka_ok.jobs.core import Job, JobContext
+from karioka_ok.utils.logging_config import get_logger
+
+if TYPE_CHECKING:
+    from karioka_ok.audio.audio_processor import AudioData
+    from karioka_ok.audio.graph import Graph
+    from karioka_ok.audio.key import KeyEstimate, KeyIndex
+    from karioka_ok.audio.loudness import LoudnessIndex, LoudnessStats
+    from karioka_ok.audio.render_cache import RenderCache
+    from karioka_ok.audio.waveform import WaveformCache, WaveformPyramid
+    from karioka_ok.library.index import Library, ScanSummary
+    from karioka_ok.lyrics.align import FeatureCache
+    from karioka_ok.lyrics.lyrics_loader import Lyrics
+    from karioka_ok.metadata.metadata_editor import TrackMetadata
+
+logger = get_logger("karioka_ok.jobs")
+
+
+@dataclass
+class ExportResult:
+    out_path: str
+    metadata_error: Optional[str] = None
+
+
+def load_audio_job(path: str, lazy: bool = True) -> Job:
+    """Trabajo de carga (etapa `decode`).
+
+    Con `lazy` el PCM queda mapeado en memoria (WAV) o decodificado a un
+    temporal, dentro de este mismo trabajo y no en el hilo que lo use después.
+    """
+
+    def run(ctx: JobContext) -> "AudioData":
+        from karioka_ok.audio.audio_processor import load_audio
+
+        with ctx.stage("decode"):
+            audio = load_audio(path, lazy=lazy)
+            if lazy:
+                audio.map()  # type: ignore[attr-defined]
+            return audio
+
+    return Job(f"Cargar {os.path.basename(path)}", run, [("decode", 1.0)])
+
+
+def waveform_job(audio: "AudioData", cache: Optional["WaveformCache"] = None) -> Job:
+    """Trabajo que carga (o calcula y guarda) la pirámide de picos de `audio`."""
+
+    def run(ctx: JobContext) -> "WaveformPyramid":
+        from karioka_ok.audio.waveform import build_pyramid
+
+        with ctx.stage("peaks"):
+            return cache.get_or_build(audio) if cache is not None else build_pyramid(audio)
+
+    return Job("Forma de onda", run, [("peaks", 1.0)])
+
+
+def loudness_job(audio: "AudioData", index: Optional["LoudnessIndex"] = None) -> Job:
+    """Trabajo que mide la sonoridad de `audio` (etapa `loudness`), reutilizando `index`."""
+
+    def run(ctx: JobContext) -> "LoudnessStats":
+        from karioka_ok.audio.loudness import measure_loudness
+
+        with ctx.stage("loudness"):
+            return measure_loudness(audio, index=index)
+
+    return Job("Medir sonoridad", run, [("loudness", 1.0)])
+
+
+def key_job(audio: "AudioData", index: Optional["KeyIndex"] = None) -> Job:
+    """Trabajo que estima la tonalidad de `audio` (etapa `key`), reutilizando `index`."""
+
+    def run(ctx: JobContext) -> "KeyEstimate":
+        from karioka_ok.audio.key import detect_key
+
+        with ctx.stage("key"):
+            return detect_key(audio, index=index)
+
+    return Job("Estimar tonalidad", run, [("key", 1.0)])
+
+
+def library_scan_job(library: "Library", roots: Sequence[str]) -> Job:
+    """Trabajo que sincroniza la biblioteca con `roots` (etapa `scan`, incremental)."""
+
+    def run(ctx: JobContext) -> "ScanSummary":
+        with ctx.stage("scan"):
+
+            def progress(fraction: float) -> None:
+                ctx.check()
+                ctx.update(fraction)
+
+            return library.scan(roots, progress=progress)
+
+    return Job("Escanear biblioteca", run, [("scan", 1.0)])
+
+
+def align_lyrics_job(audio: "AudioData", lyrics: "Lyrics", cache: Optional["FeatureCache"] = None) -> Job:
+    """Trabajo que sincroniza una letra plana con `audio` (etapa `align`)."""
+
+    def run(ctx: JobContext) -> "Lyrics":
+        from karioka_ok.lyrics.align import align_lyrics
+        from karioka_ok.lyrics.lyrics_loader import Lyrics
+
+        with ctx.stage("align"):
+            timed = align_lyrics(audio, lyrics, cache=cache)
+            return Lyrics(text=timed.plain_text(), path=lyrics.path, timed=timed)
+
+    return Job("Sincronizar letra", run, [("align", 1.0)])
+
+
+def _tag_results(results: List[ExportResult], meta: "TrackMetadata") -> None:
+    """Etiqueta todas las salidas de una vez; los errores quedan en cada resultado."""
+    from karioka_ok.metadata.metadata_editor import set_metadata_many
+
+    for result, error in zip(results, set_metadata_many([(r.out_path, meta) for r in results])):
+        if error is not None:
+            logger.warning("No se pudieron escribir metadatos en %s: %s", result.out_path, error)
+            result.metadata_error = str(error)
+
+
+def graph_export_job(
+    audio: "AudioData",
+    graph: "Graph",
+    targets: Sequence[Tuple[str, str]],
+    meta: Optional["TrackMetadata"] = None,
+    cache: Optional["RenderCache"] = None,
+    loudness: Optional["LoudnessIndex"] = None,
+) -> Job:
+    """Procesa con `graph` y codifica a cada `(ruta, formato)` en un solo pase.
+
+    Etapas: `shift` (el cambio de tono que falta en `cache`, que queda
+    guardado), `render` (el resto de la cadena y la codificación) y `tag`.
+    """
+
+    def run(ctx: JobContext) -> List[ExportResult]:
+        def progress(fraction: float) -> None:
+            ctx.check()
+            ctx.update(fraction)
+
+        with ctx.stage("shift"):
+            plan = graph.plan(audio, cache, loudness, progress=progress)
+        with ctx.stage("render"):
+            paths = graph.export(audio, targets, progress=progress, plan=plan)
+        results = [ExportResult(p) for p in paths]
+        with ctx.stage("tag"):
+            if meta is not None:
+                # La letra sigue a la pista: p. ej. `trim_silence` adelanta todo lo recortado
+                _tag_results(results, meta.retimed(*plan.time_mapping()))
+        return results
+
+    name = os.path.basename(targets[0][0]) if len(targets) == 1 else f"{len(targets)} formatos"
+    return Job(f"Exportar {name}", run, [("shift", 4.5), ("render", 4.5), ("tag", 0.5)])
+
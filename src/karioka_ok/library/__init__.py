@@ -0,0 +1 @@
+# Persistent track library (SQLite index) for Karioka.ok
@@ -0,0 +1,625 @@
+"""Biblioteca persistente: índice SQLite de pistas, metadatos y renders.
+
+Una base SQLite en modo WAL (`~/.cache/karioka_ok/library/library.sqlite`)
+recuerda entre sesiones:
+
+- `tracks`: cada archivo de audio por ruta, con tamaño, mtime, hash del
+  archivo, duración, sample rate, canales, descripción y carátula
+  embebidas (`metadata_editor.read_metadata`) y la letra al lado (`.lrc`
+  o `.txt` con el mismo nombre);
+- `renders`: lo exportado desde cada pista (semitonos, voz, cadena,
+  formato y ruta de salida);
+- `fingerprints`: huella acústica por hash de contenido
+  (`karioka_ok.library.fingerprint`), para encontrar la misma canción
+  llegada de fuentes distintas.
+
+`scan()` es incremental: recorre los directorios con `os.scandir`, compara
+tamaño, mtime y letra con lo guardado en una sola consulta por raíz, y
+solo vuelve a inspeccionar (cabecera, hash, etiquetas) los archivos nuevos
+o modificados, en un pool de hilos (es E/S). Los archivos que
+desaparecieron se quitan junto con sus renders; no cuenta como desaparecido
+lo que no se pudo recorrer (una raíz que no existe o un directorio
+ilegible, ni las subcarpetas en un escaneo no recursivo). Con `fingerprint=True`,
+después se calculan las huellas que falten en un pool de procesos (es
+decodificación y FFT); se guardan por hash, así que mover o copiar un
+archivo no obliga a recalcularla.
+
+Las consultas para la GUI recorren el índice por título y paginan con
+`LIMIT`: una página sale en menos de un milisegundo aunque el catálogo
+tenga decenas de miles de pistas (el filtro por texto descarta filas
+mientras recorre el índice y se detiene al llenar la página). Cada operación abre
+su propia conexión: la biblioteca se usa desde el hilo de la GUI y desde
+trabajos en segundo plano a la vez.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import closing
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from karioka_ok.jobs.batch import AUDIO_EXTENSIONS
+from karioka_ok.utils import instrumentation
+from karioka_ok.utils.logging_config import get_logger
+from karioka_ok.utils.paths import cache_dir
+
+logger = get_logger("karioka_ok.library")
+
+SCHEMA_VERSION = 2
+LYRICS_EXTENSIONS = (".lrc", ".txt")  # en orden de preferencia
+WRITE_BATCH = 500  # filas por transacción durante un escaneo
+FINGERPRINT_BATCH = 64  # huellas por transacción
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS tracks (
+        id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL UNIQUE,
+        title TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        content_hash TEXT,
+        duration REAL,
+        sample_rate INTEGER,
+        channels INTEGER,
+        description TEXT,
+        cover_mime TEXT,
+        lyrics_path TEXT,
+        search TEXT NOT NULL,
+        scanned_at REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS tracks_title ON tracks (title COLLATE NOCASE, id)",
+    "CREATE INDEX IF NOT EXISTS tracks_hash ON tracks (content_hash)",
+    """CREATE TABLE IF NOT EXISTS renders (
+        id INTEGER PRIMARY KEY,
+        track_id INTEGER NOT NULL REFERENCES tracks (id) ON DELETE CASCADE,
+        out_path TEXT NOT NULL UNIQUE,
+        format TEXT NOT NULL,
+        semitones REAL NOT NULL DEFAULT 0,
+        vocals TEXT,
+        chain TEXT,
+        created_at REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS renders_track ON renders (track_id)",
+    """CREATE TABLE IF NOT EXISTS fingerprints (
+        content_hash TEXT PRIMARY KEY,
+        version INTEGER NOT NULL,
+        fingerprint BLOB NOT NULL,
+        duration REAL
+    ) WITHOUT ROWID""",
+)
+
+_TRACK_FIELDS = (
+    "id", "path", "title", "size", "mtime_ns", "content_hash", "duration", "sample_rate", "channels",
+    "description", "cover_mime", "lyrics_path",
+)
+_TRACK_COLUMNS = ", ".join(f"t.{name}" for name in _TRACK_FIELDS)
+
+
+@dataclass
+class TrackRecord:
+    id: int
+    path: str
+    title: str
+    size: int
+    mtime_ns: int
+    content_hash: Optional[str]
+    duration: Optional[float]
+    sample_rate: Optional[int]
+    channels: Optional[int]
+    description: Optional[str]
+    cover_mime: Optional[str]
+    lyrics_path: Optional[str]
+    render_count: int = 0
+
+    @property
+    def has_cover(self) -> bool:
+        return self.cover_mime is not None
+
+
+@dataclass
+class RenderRecord:
+    id: int
+    track_id: int
+    out_path: str
+    format: str
+    semitones: float
+    vocals: Optional[str]
+    chain: Optional[str]
+    created_at: float
+
+
+@dataclass
+class ScanSummary:
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    fingerprinted: int = 0
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+    wall_seconds: float = 0.0
+
+    def format(self) -> str:
+        prints = f", {self.fingerprinted} huellas" if self.fingerprinted else ""
+        return (f"Biblioteca: {self.added} nuevas, {self.updated} actualizadas, {self.removed} quitadas, "
+                f"{self.unchanged} sin cambios{prints}, {len(self.failed)} con error ({self.wall_seconds:.1f} s)")
+
+
+@dataclass
+class _Entry:
+    """Archivo visto en el recorrido: lo necesario para decidir si cambió."""
+    path: str
+    size: int
+    mtime_ns: int
+    lyrics_path: Optional[str]
+
+
+def _walk(root: str, recursive: bool = True, unreadable: Optional[List[str]] = None) -> Iterator[_Entry]:
+    """Audios bajo `root` (por extensión) con su letra al lado, vía `os.scandir`.
+
+    Los directorios que no se pudieron leer se agregan a `unreadable`.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError as e:
+            logger.warning("No se pudo leer %s: %s", directory, e)
+            if unreadable is not None:
+                unreadable.append(os.path.abspath(directory))
+            continue
+        lyrics: Dict[str, str] = {}
+        for ext in reversed(LYRICS_EXTENSIONS):  # el preferido queda al final y gana
+            for e in entries:
+                stem, suffix = os.path.splitext(e.name)
+                if suffix.lower() == ext:
+                    lyrics[stem] = e.path
+        for e in entries:
+            try:
+                if e.is_dir(follow_symlinks=False):
+                    if recursive:
+                        stack.append(e.path)
+                    continue
+                stem, suffix = os.path.splitext(e.name)
+                if suffix.lower() not in AUDIO_EXTENSIONS:
+                    continue
+                st = e.stat()
+            except OSError:
+                continue
+            yield _Entry(os.path.abspath(e.path), st.st_size, st.st_mtime_ns, lyrics.get(stem))
+
+
+def inspect_file(path: str) -> Dict[str, object]:
+    """Cabecera, hash y etiquetas de un archivo (sin decodificar el audio)."""
+    from karioka_ok.audio.lazy import probe
+    from karioka_ok.metadata.metadata_editor import read_metadata
+    from karioka_ok.utils.hashing import hash_file
+
+    info = probe(path)
+    try:
+        embedded = read_metadata(path)
+        description, cover_mime = embedded.description, embedded.cover_mime
+    except Exception as e:  # etiquetas corruptas: la pista se indexa igual
+        logger.warning("No se pudieron leer las etiquetas de %s: %s", path, e)
+        description, cover_mime = None, None
+    return {
+        "content_hash": hash_file(path),
+        "duration": info.duration,
+        "sample_rate": info.sample_rate,
+        "channels": info.channels,
+        "description": description,
+        "cover_mime": cover_mime,
+    }
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _prefix_range(root: str) -> Tuple[str, str]:
+    """Rango `[lo, hi)` de rutas bajo `root` (usa el índice único de `path`)."""
+    prefix = os.path.join(os.path.abspath(root), "")
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _gone(known: Dict[str, Tuple], root: str, recursive: bool, unreadable: List[str]) -> List[str]:
+    """Rutas de `known` (no vistas al recorrer `root`) que sí desaparecieron.
+
+    Sin `recursive` solo se recorrieron los hijos directos de `root`; lo que
+    está bajo un directorio ilegible tampoco se vio. Ambas se conservan.
+    """
+    top = os.path.abspath(root)
+    skipped = [_prefix_range(d) for d in unreadable]
+    return [
+        p for p in known
+        if (recursive or os.path.dirname(p) == top)
+        and not any(lo <= p < hi for lo, hi in skipped)
+    ]
+
+
+class Library:
+    """Índice SQLite de la biblioteca de pistas."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = Path(path) if path else cache_dir("library") / "library.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, 1, SCHEMA_VERSION):  # de la 1 a la 2 solo se agrega `fingerprints`
+                raise RuntimeError(f"Versión de biblioteca no soportada: {version}")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30.0)
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA synchronous=NORMAL")  # suficiente con WAL: no se corrompe ante un corte
+        return conn
+
+    # Escaneo
+    def scan(
+        self,
+        roots: Sequence[str],
+        recursive: bool = True,
+        workers: Optional[int] = None,
+        progress: Optional[Callable[[float], None]] = None,
+        fingerprint: bool = False,
+    ) -> ScanSummary:
+        """Sincroniza la biblioteca con los audios bajo `roots`; solo inspecciona lo que cambió.
+
+        `progress` recibe la fracción de archivos modificados ya inspeccionados
+        (y puede lanzar una excepción para cancelar; lo ya escrito se conserva).
+        Con `fingerprint`, después calcula las huellas que falten (ver
+        `fingerprint_tracks`) y el progreso se reparte entre ambas fases.
+        """
+        index_progress, print_progress = progress, None
+        if fingerprint and progress is not None:
+            index_progress = lambda f: progress(0.5 * f)  # noqa: E731
+            print_progress = lambda f: progress(0.5 + 0.5 * f)  # noqa: E731
+        start = time.perf_counter()
+        summary = ScanSummary()
+        with instrumentation.stage("library.scan", roots=len(roots)) as st:
+            changed: List[Tuple[_Entry, bool]] = []  # (entrada, ya estaba en la biblioteca)
+            with closing(self._connect()) as conn:
+                for root in roots:
+                    if not os.path.isdir(root):
+                        # Disco sin montar o ruta mal escrita: no es que las pistas hayan desaparecido
+                        logger.warning("No se encontró el directorio %s; se conservan sus pistas", root)
+                        summary.failed.append((root, "No es un directorio"))
+                        continue
+                    lo, hi = _prefix_range(root)
+                    known = {
+                        row[0]: row[1:]
+                        for row in conn.execute(
+                            "SELECT path, size, mtime_ns, lyrics_path FROM tracks WHERE path >= ? AND path < ?",
+                            (lo, hi),
+                        )
+                    }
+                    unreadable: List[str] = []
+                    for entry in _walk(root, recursive, unreadable):
+                        previous = known.pop(entry.path, None)
+                        if previous == (entry.size, entry.mtime_ns, entry.lyrics_path):
+                            summary.unchanged += 1
+                        else:
+                            changed.append((entry, previous is not None))
+                    known = _gone(known, root, recursive, unreadable)
+                    if known:
+                        conn.executemany("DELETE FROM tracks WHERE path = ?", ((p,) for p in known))
+                        summary.removed += len(known)
+                conn.commit()
+            st.set(changed=len(changed), unchanged=summary.unchanged, removed=summary.removed)
+            self._index_entries(changed, summary, workers, index_progress)
+        if fingerprint:
+            summary.fingerprinted, failed = self.fingerprint_tracks(progress=print_progress)
+            summary.failed.extend(failed)
+        summary.wall_seconds = time.perf_counter() - start
+        return summary
+
+    def _index_entries(
+        self,
+        changed: List[Tuple[_Entry, bool]],
+        summary: ScanSummary,
+        workers: Optional[int],
+        progress: Optional[Callable[[float], None]],
+    ) -> None:
+        if not changed:
+            return
+        rows = []
+        with ThreadPoolExecutor(max_workers=workers or min(16, (os.cpu_count() or 1) * 2)) as pool:
+            futures = [(entry, existed, pool.submit(inspect_file, entry.path)) for entry, existed in changed]
+            try:
+                for done, (entry, existed, fut) in enumerate(futures, 1):
+                    try:
+                        rows.append(self._row(entry, fut.result()))
+                        if existed:
+                            summary.updated += 1
+                        else:
+                            summary.added += 1
+                    except Exception as e:
+                        summary.failed.append((entry.path, f"{type(e).__name__}: {e}"))
+                    if len(rows) >= WRITE_BATCH:
+                        self._upsert(rows)
+                        rows = []
+                    if progress is not None:
+                        progress(done / len(futures))
+            finally:
+                for _, _, fut in futures:
+                    fut.cancel()
+                if rows:
+                    self._upsert(rows)
+
+    @staticmethod
+    def _row(entry: _Entry, info: Dict[str, object]) -> Tuple:
+        title = Path(entry.path).stem
+        search = " ".join(filter(None, (entry.path, info["description"]))).lower()  # type: ignore[arg-type]
+        return (entry.path, title, entry.size, entry.mtime_ns, info["content_hash"], info["duration"],
+                info["sample_rate"], info["channels"], info["description"], info["cover_mime"],
+                entry.lyrics_path, search, time.time())
+
+    def _upsert(self, rows: Iterable[Tuple]) -> None:
+        # ON CONFLICT conserva el id (y con él los renders de la pista)
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                "INSERT INTO tracks (path, title, size, mtime_ns, content_hash, duration, sample_rate, channels,"
+                " description, cover_mime, lyrics_path, search, scanned_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (path) DO UPDATE SET title=excluded.title, size=excluded.size,"
+                " mtime_ns=excluded.mtime_ns, content_hash=excluded.content_hash, duration=excluded.duration,"
+                " sample_rate=excluded.sample_rate, channels=excluded.channels, description=excluded.description,"
+                " cover_mime=excluded.cover_mime, lyrics_path=excluded.lyrics_path, search=excluded.search,"
+                " scanned_at=excluded.scanned_at",
+                rows,
+            )
+            conn.commit()
+
+    def add_file(self, path: str) -> TrackRecord:
+        """Indexa (o actualiza) un solo archivo, p. ej. uno abierto desde la GUI."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        stem = os.path.splitext(path)[0]
+        lyrics = next((stem + ext for ext in LYRICS_EXTENSIONS if os.path.exists(stem + ext)), None)
+        entry = _Entry(path, st.st_size, st.st_mtime_ns, lyrics)
+        current = self.get(path)
+        if current is None or (current.size, current.mtime_ns, current.lyrics_path) != (
+            entry.size, entry.mtime_ns, entry.lyrics_path
+        ):
+            self._upsert([self._row(entry, inspect_file(path))])
+        record = self.get(path)
+        assert record is not None
+        return record
+
+    # Consultas
+    def _where(self, query: str) -> Tuple[str, Tuple]:
+        terms = query.lower().split()
+        if not terms:
+            return "", ()
+        clause = " AND ".join("t.search LIKE ? ESCAPE '\\'" for _ in terms)
+        return f"WHERE {clause}", tuple(f"%{_escape_like(t)}%" for t in terms)
+
+    def count(self, query: str = "") -> int:
+        where, params = self._where(query)
+        with closing(self._connect()) as conn:
+            return int(conn.execute(f"SELECT COUNT(*) FROM tracks t {where}", params).fetchone()[0])
+
+    def tracks(self, query: str = "", limit: int = 200, offset: int = 0) -> List[TrackRecord]:
+        """Página de pistas ordenadas por título; `query`: palabras que deben aparecer en ruta o descripción."""
+        where, params = self._where(query)
+        sql = (
+            f"SELECT {_TRACK_COLUMNS}, (SELECT COUNT(*) FROM renders r WHERE r.track_id = t.id)"
+            f" FROM tracks t {where} ORDER BY t.title COLLATE NOCASE, t.id LIMIT ? OFFSET ?"
+        )
+        with closing(self._connect()) as conn:
+            return [TrackRecord(*row) for row in conn.execute(sql, params + (int(limit), int(offset)))]
+
+    def get(self, path: str) -> Optional[TrackRecord]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(f"SELECT {_TRACK_COLUMNS} FROM tracks t WHERE t.path = ?",
+                               (os.path.abspath(path),)).fetchone()
+        return TrackRecord(*row) if row else None
+
+    def find_by_hash(self, content_hash: str) -> List[TrackRecord]:
+        """Pistas con el mismo contenido (copias del mismo archivo)."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT {_TRACK_COLUMNS} FROM tracks t WHERE t.content_hash = ? ORDER BY t.path",
+                                (content_hash,)).fetchall()
+        return [TrackRecord(*row) for row in rows]
+
+    # Renders
+    def add_render(
+        self,
+        source_path: str,
+        out_path: str,
+        fmt: str,
+        semitones: float = 0,
+        vocals: Optional[str] = None,
+        chain: Optional[str] = None,
+    ) -> None:
+        """Registra una exportación de `source_path` (que se indexa si todavía no lo está)."""
+        track = self.get(source_path) or self.add_file(source_path)
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO renders (track_id, out_path, format, semitones, vocals, chain, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (out_path) DO UPDATE SET track_id=excluded.track_id, format=excluded.format,"
+                " semitones=excluded.semitones, vocals=excluded.vocals, chain=excluded.chain,"
+                " created_at=excluded.created_at",
+                (track.id, os.path.abspath(out_path), fmt, float(semitones), vocals, chain or None, time.time()),
+            )
+            conn.commit()
+
+    # Huellas acústicas
+    def fingerprint_tracks(
+        self, workers: Optional[int] = None, progress: Optional[Callable[[float], None]] = None
+    ) -> Tuple[int, List[Tuple[str, str]]]:
+        """Calcula las huellas que falten en la biblioteca. Devuelve `(calculadas, [(ruta, error)])`."""
+        from karioka_ok.library.fingerprint import FINGERPRINT_VERSION
+
+        with closing(self._connect()) as conn:
+            pending = dict(conn.execute(
+                "SELECT t.content_hash, MIN(t.path) FROM tracks t LEFT JOIN fingerprints f"
+                " ON f.content_hash = t.content_hash AND f.version = ?"
+                " WHERE t.content_hash IS NOT NULL AND f.content_hash IS NULL GROUP BY t.content_hash",
+                (FINGERPRINT_VERSION,),
+            ).fetchall())
+        failed: List[Tuple[str, str]] = []
+        return self._compute_fingerprints(pending, workers, progress, failed), failed
+
+    def fingerprint_files(
+        self, paths: Iterable[str], workers: Optional[int] = None
+    ) -> Dict[str, Tuple[int, Optional[float]]]:
+        """`{ruta absoluta: (huella, duración)}` de archivos estén o no en la biblioteca.
+
+        Los hashes se calculan en un pool de hilos; las huellas se toman de
+        la base por hash y solo las que falten se calculan (y guardan). Los
+        archivos ilegibles o sin contenido suficiente no aparecen.
+        """
+        from karioka_ok.utils.hashing import hash_file
+
+        def safe_hash(path: str) -> Optional[str]:
+            try:
+                return hash_file(path)
+            except OSError as e:
+                logger.warning("No se pudo leer %s: %s", path, e)
+                return None
+
+        paths = [os.path.abspath(p) for p in paths]
+        with ThreadPoolExecutor(max_workers=min(16, (os.cpu_count() or 1) * 2)) as pool:
+            hashes = {p: h for p, h in zip(paths, pool.map(safe_hash, paths)) if h}
+        known = self._load_fingerprints(set(hashes.values()))
+        pending = {h: p for p, h in hashes.items() if h not in known}
+        failed: List[Tuple[str, str]] = []
+        if self._compute_fingerprints(pending, workers, None, failed):
+            known = self._load_fingerprints(set(hashes.values()))
+        for path, error in failed:
+            logger.warning("Sin huella para %s: %s", path, error)
+        return {p: known[h] for p, h in hashes.items() if h in known}
+
+    def _compute_fingerprints(
+        self,
+        pending: Dict[str, str],
+        workers: Optional[int],
+        progress: Optional[Callable[[float], None]],
+        failed: List[Tuple[str, str]],
+    ) -> int:
+        """Huellas de `{hash: ruta}` en un pool de procesos, guardadas por tandas."""
+        from karioka_ok.library.fingerprint import FINGERPRINT_VERSION, fingerprint_file, to_bytes
+
+        if not pending:
+            return 0
+        done, rows = 0, []
+        with instrumentation.stage("library.fingerprint", files=len(pending)):
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+                futures = {pool.submit(fingerprint_file, path): h for h, path in pending.items()}
+                try:
+                    for i, fut in enumerate(as_completed(futures), 1):
+                        h = futures[fut]
+                        try:
+                            _, fingerprint, duration = fut.result()
+                            rows.append((h, FINGERPRINT_VERSION, to_bytes(fingerprint), duration))
+                            done += 1
+                        except Exception as e:
+                            failed.append((pending[h], f"{type(e).__name__}: {e}"))
+                        if len(rows) >= FINGERPRINT_BATCH:
+                            self._store_fingerprints(rows)
+                            rows = []
+                        if progress is not None:
+                            progress(i / len(futures))
+                finally:
+                    for fut in futures:
+                        fut.cancel()
+                    if rows:
+                        self._store_fingerprints(rows)
+        return done
+
+    def _store_fingerprints(self, rows: Iterable[Tuple]) -> None:
+        with closing(self._connect()) as conn:
+            conn.executemany("INSERT OR REPLACE INTO fingerprints (content_hash, version, fingerprint, duration)"
+                             " VALUES (?, ?, ?, ?)", rows)
+            conn.commit()
+
+    def _load_fingerprints(self, hashes: Iterable[str]) -> Dict[str, Tuple[int, Optional[float]]]:
+        from karioka_ok.library.fingerprint import FINGERPRINT_VERSION, from_bytes
+
+        hashes = list(hashes)
+        found: Dict[str, Tuple[int, Optional[float]]] = {}
+        with closing(self._connect()) as conn:
+            for i in range(0, len(hashes), WRITE_BATCH):
+                chunk = hashes[i:i + WRITE_BATCH]
+                rows = conn.execute(
+                    f"SELECT content_hash, fingerprint, duration FROM fingerprints"
+                    f" WHERE version = ? AND content_hash IN ({', '.join('?' * len(chunk))})",
+                    (FINGERPRINT_VERSION, *chunk),
+                )
+                found.update((h, (from_bytes(fp), duration)) for h, fp, duration in rows)
+        return found
+
+    def duplicates(self, max_distance: Optional[int] = None) -> List[List[TrackRecord]]:
+        """Grupos de pistas que suenan igual (copias exactas o de otra fuente), por huella.
+
+        Solo cuentan las pistas con huella (`scan(fingerprint=True)` o
+        `fingerprint_tracks`). Dentro de cada grupo, orden por ruta.
+        """
+        from karioka_ok.library.fingerprint import (
+            DEFAULT_MAX_DISTANCE,
+            FINGERPRINT_VERSION,
+            from_bytes,
+            group_duplicates,
+        )
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT {_TRACK_COLUMNS}, f.fingerprint FROM tracks t"
+                " JOIN fingerprints f ON f.content_hash = t.content_hash AND f.version = ? ORDER BY t.path",
+                (FINGERPRINT_VERSION,),
+            ).fetchall()
+        records = {row[0]: TrackRecord(*row[:-1]) for row in rows}
+        groups = group_duplicates(
+            ((row[0], from_bytes(row[-1]), records[row[0]].duration) for row in rows),
+            DEFAULT_MAX_DISTANCE if max_distance is None else max_distance,
+        )
+        return [[records[track_id] for track_id in group] for group in groups]
+
+    def renders(self, source_path: str) -> List[RenderRecord]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT r.id, r.track_id, r.out_path, r.format, r.semitones, r.vocals, r.chain, r.created_at"
+                " FROM renders r JOIN tracks t ON t.id = r.track_id WHERE t.path = ? ORDER BY r.created_at",
+                (os.path.abspath(source_path),),
+            ).fetchall()
+        return [RenderRecord(*row) for row in rows]
+
+
+def run_library_command(args) -> int:
+    """Punto de entrada del subcomando `library` de main.py. Devuelve el código de salida."""
+    library = Library(args.db)
+    if args.sources:
+        summary = library.scan(args.sources, workers=args.workers, fingerprint=args.fingerprint)
+        for path, error in summary.failed:
+            logger.warning("No se pudo indexar %s: %s", path, error)
+        print(summary.format())
+    elif args.fingerprint:
+        done, failed = library.fingerprint_tracks()
+        for path, error in failed:
+            logger.warning("Sin huella para %s: %s", path, error)
+        print(f"Huellas calculadas: {done}")
+    if args.search is not None:
+        for t in library.tracks(args.search, limit=args.limit):
+            minutes, seconds = divmod(int(t.duration or 0), 60)
+            print(f"{minutes:3d}:{seconds:02d}  {t.path}")
+    if args.duplicates:
+        groups = library.duplicates()
+        for group in groups:
+            print(f"Duplicadas ({len(group)}):")
+            for t in group:
+                print(f"  {t.path}")
+        print(f"{len(groups)} grupos de duplicados")
+    print(f"{library.count()} pistas en {library.path}")
+    return 1 if args.sources and summary.failed else 0
@@ -0,0 +1,255 @@
+"""Alineación automática de letra plana (.txt) con el audio.
+
+Asigna un tiempo de inicio aproximado a cada línea no vacía de
+`Lyrics.text` a partir de dos rasgos por cuadro (20 ms por defecto):
+
+- energía en la banda de la voz (200-3500 Hz, dB) -> actividad vocal;
+- flujo espectral positivo en esa banda (fuerza de ataque / onset).
+
+Los rasgos se calculan por bloques con NumPy (memoria acotada en pistas
+largas) y se guardan por hash de contenido en
+`~/.cache/karioka_ok/align/<hash>-v<versión>-<hop>.npz`.
+
+La alineación es programación dinámica sobre candidatos a inicio de línea
+(máximos locales de ataque + subida de energía): minimiza la diferencia
+entre los cuadros con voz de cada línea y su duración esperada (sílabas ×
+segundos por sílaba de la pista) y premia empezar en un ataque. Cada
+transición solo considera los candidatos anteriores cuya voz intermedia
+cae en una banda alrededor de la duración esperada (entre 1/3 y el triple),
+y K se acota por la duración de la pista: con n líneas y B candidatos por
+banda el costo es O(n·K·B) vectorizado, muy por debajo del tiempo real. El resultado es aproximado: pensado como punto de partida
+para corregir a mano, no como sincronía exacta.
+"""
+from __future__ import annotations
+
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+
+from karioka_ok.audio.audio_processor import AudioData
+from karioka_ok.audio.buffers import audio_to_array, ints_to_float
+from karioka_ok.lyrics.lyrics_loader import Lyrics
+from karioka_ok.lyrics.timed import TimedLyrics
+from karioka_ok.utils import instrumentation
+from karioka_ok.utils.logging_config import get_logger
+from karioka_ok.utils.paths import cache_dir
+
+logger = get_logger("karioka_ok.lyrics.align")
+
+FEATURE_VERSION = 1
+DEFAULT_HOP_SECONDS = 0.02
+BLOCK_FRAMES = 2048  # cuadros por bloque al calcular rasgos
+VOICE_BAND = (200.0, 3500.0)
+MIN_CANDIDATE_GAP = 0.2  # segundos entre candidatos a inicio de línea
+DURATION_WEIGHT = 1.0
+ONSET_WEIGHT = 0.6
+DURATION_BAND = 3.0  # una línea dura entre 1/3 y 3 veces lo esperado
+CANDIDATES_PER_SECOND = 2.0
+
+_VOWELS = re.compile(r"[aeiouyáéíóúüàèìòùâêîôûäëïö]+", re.IGNORECASE)
+
+
+@dataclass
+class AlignFeatures:
+    """Rasgos por cuadro: energía de la banda vocal (dB) y fuerza de ataque."""
+    hop_seconds: float
+    energy: np.ndarray
+    onset: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.energy.shape[0])
+
+
+def compute_features(audio: AudioData, hop_seconds: float = DEFAULT_HOP_SECONDS) -> AlignFeatures:
+    """Energía y flujo espectral de la banda vocal, por bloques de `BLOCK_FRAMES` cuadros."""
+    sr = audio.sample_rate
+    hop = max(1, int(round(hop_seconds * sr)))
+    n_fft = 1 << int(np.ceil(np.log2(2 * hop)))
+    ints = audio_to_array(audio)
+    n = ints.shape[1]
+    total = max(1, -(-n // hop))
+
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sr)
+    band = (freqs >= VOICE_BAND[0]) & (freqs <= VOICE_BAND[1])
+    window = np.hanning(n_fft).astype(np.float32)
+    energy = np.empty(total, dtype=np.float32)
+    onset = np.empty(total, dtype=np.float32)
+    prev: Optional[np.ndarray] = None
+
+    for t0 in range(0, total, BLOCK_FRAMES):
+        t1 = min(total, t0 + BLOCK_FRAMES)
+        lo, hi = t0 * hop, min(n, (t1 - 1) * hop + n_fft)
+        mono = ints_to_float(np.ascontiguousarray(ints[:, lo:hi]), audio.sample_width).mean(axis=0)
+        need = (t1 - 1 - t0) * hop + n_fft
+        if mono.shape[0] < need:
+            mono = np.pad(mono, (0, need - mono.shape[0]))
+        frames = np.lib.stride_tricks.sliding_window_view(mono, n_fft)[::hop][: t1 - t0]
+        mag = np.abs(np.fft.rfft(frames * window, axis=1))[:, band]
+        energy[t0:t1] = 10.0 * np.log10(np.mean(mag * mag, axis=1) + 1e-10)
+        logmag = np.log1p(100.0 * mag)
+        previous = np.vstack([logmag[:1] if prev is None else prev, logmag[:-1]])
+        onset[t0:t1] = np.maximum(logmag - previous, 0.0).mean(axis=1)
+        prev = logmag[-1:]
+    return AlignFeatures(hop / float(sr), energy, onset)
+
+
+class FeatureCache:
+    """Rasgos de alineación en `.npz` por hash de contenido."""
+
+    def __init__(self, root: Optional[str] = None, hop_seconds: float = DEFAULT_HOP_SECONDS) -> None:
+        self.root = Path(root) if root else cache_dir("align")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.hop_seconds = hop_seconds
+
+    def path_for(self, audio: AudioData) -> Path:
+        hop_ms = int(round(self.hop_seconds * 1000))
+        return self.root / f"{audio.content_hash()}-v{FEATURE_VERSION}-{hop_ms}.npz"
+
+    def get_or_compute(self, audio: AudioData) -> AlignFeatures:
+        path = self.path_for(audio)
+        try:
+            with np.load(path) as data:
+                return AlignFeatures(float(data["hop_seconds"]), data["energy"], data["onset"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Rasgos de alineación ilegibles, se recalculan: %s", e)
+        features = compute_features(audio, self.hop_seconds)
+        try:
+            fd, tmp = tempfile.mkstemp(dir=str(self.root), suffix=".npz")
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, hop_seconds=features.hop_seconds, energy=features.energy, onset=features.onset)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("No se pudieron guardar los rasgos de alineación: %s", e)
+        return features
+
+
+def syllables(line: str) -> int:
+    """Estimación de sílabas: grupos de vocales (mínimo 1)."""
+    return max(1, len(_VOWELS.findall(line)))
+
+
+def _smooth(x: np.ndarray, width: int) -> np.ndarray:
+    if width <= 1:
+        return x
+    kernel = np.ones(width, dtype=np.float32) / width
+    return np.convolve(x, kernel, mode="same")
+
+
+def _voiced(energy: np.ndarray, frames_per_second: float) -> np.ndarray:
+    """Máscara de actividad vocal: energía sobre un umbral relativo a la pista."""
+    lo, hi = np.percentile(energy, [10, 90])
+    smooth = _smooth(energy, max(1, int(0.1 * frames_per_second)))
+    return smooth > lo + 0.35 * (hi - lo)
+
+
+def _start_score(features: AlignFeatures, voiced: np.ndarray) -> np.ndarray:
+    """Ataque normalizado + subida de actividad vocal (antes vs. después del cuadro)."""
+    onset = features.onset / (np.percentile(features.onset, 99) + 1e-9)
+    width = max(1, int(0.3 / features.hop_seconds))
+    v = voiced.astype(np.float32)
+    csum = np.concatenate([[0.0], np.cumsum(v)])
+    idx = np.arange(v.shape[0])
+    after = (csum[np.minimum(idx + width, v.shape[0])] - csum[idx]) / width
+    before = (csum[idx] - csum[np.maximum(idx - width, 0)]) / width
+    return np.minimum(onset, 1.5) + (after - before)
+
+
+def _candidates(score: np.ndarray, hop_seconds: float, limit: int) -> np.ndarray:
+    """Máximos locales de `score` separados al menos `MIN_CANDIDATE_GAP`, los `limit` mejores."""
+    gap = max(1, int(MIN_CANDIDATE_GAP / hop_seconds))
+    padded = np.pad(score, gap, mode="constant", constant_values=-np.inf)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * gap + 1)
+    peaks = np.flatnonzero((score >= windows.max(axis=1)) & (score > 0))
+    if peaks.shape[0] > limit:
+        peaks = np.sort(peaks[np.argsort(score[peaks])[::-1][:limit]])
+    return peaks
+
+
+def align_lyrics(
+    audio: AudioData,
+    lyrics: Union[Lyrics, str],
+    cache: Optional[FeatureCache] = None,
+    features: Optional[AlignFeatures] = None,
+) -> TimedLyrics:
+    """Tiempos de inicio aproximados para cada línea no vacía de la letra."""
+    text = lyrics.text if isinstance(lyrics, Lyrics) else lyrics
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines:
+        return TimedLyrics.from_lines([])
+
+    with instrumentation.stage("lyrics.align", lines=len(lines)) as st:
+        if features is None:
+            features = cache.get_or_compute(audio) if cache is not None else compute_features(audio)
+        starts = _align(features, [syllables(line) for line in lines])
+        st.set(frames=len(features))
+        return TimedLyrics.from_lines(zip((float(s) for s in starts), lines))
+
+
+def _align(features: AlignFeatures, weights: List[int]) -> np.ndarray:
+    """Segundos de inicio por línea (programación dinámica sobre candidatos)."""
+    hop = features.hop_seconds
+    n_lines = len(weights)
+    voiced = _voiced(features.energy, 1.0 / hop)
+    cum_voiced = np.concatenate([[0.0], np.cumsum(voiced)])
+    total_voiced = max(1.0, float(cum_voiced[-1]))
+    expected = np.asarray(weights, dtype=np.float64) * total_voiced / float(sum(weights))
+
+    score = _start_score(features, voiced)
+    limit = min(max(12 * n_lines + 50, 200), max(n_lines, int(CANDIDATES_PER_SECOND * len(features) * hop)))
+    cand = _candidates(score, hop, limit)
+    if cand.shape[0] < n_lines:
+        # Pocos ataques (audio casi plano): repartir por duración esperada
+        return _spread(voiced, expected, hop)
+
+    n_cand = cand.shape[0]
+    vc = cum_voiced[cand]  # voz acumulada hasta cada candidato (no decrece)
+    bonus = ONSET_WEIGHT * score[cand]
+    cols = np.arange(n_cand)
+    # Banda: para llegar al candidato k, solo los j anteriores con voz entre ambos
+    # dentro de [e / DURATION_BAND, e * DURATION_BAND] para alguna línea
+    lo = np.searchsorted(vc, vc - expected.max() * DURATION_BAND, side="left")
+    hi = np.minimum(np.searchsorted(vc, vc - expected.min() / DURATION_BAND, side="right") - 1, cols - 1)
+    width = max(1, int((hi - lo).max()) + 1)
+    rows = lo[None, :] + np.arange(width)[:, None]  # (banda, K): candidato j de cada transición
+    in_band = rows <= hi[None, :]
+    rows = np.minimum(rows, n_cand - 1)
+    seg = vc[None, :] - vc[rows]  # voz entre j y k
+
+    # Voz antes de la primera línea: cantada sin letra asignada
+    cost = DURATION_WEIGHT * vc / expected.mean() - bonus
+    back = np.empty((n_lines, n_cand), dtype=np.int64)
+    for i in range(1, n_lines):
+        e = expected[i - 1]
+        ok = in_band & (seg >= e / DURATION_BAND) & (seg <= e * DURATION_BAND)
+        step = np.where(ok, cost[rows] + DURATION_WEIGHT * ((seg - e) / e) ** 2, np.inf)
+        best = np.argmin(step, axis=0)
+        back[i] = rows[best, cols]
+        cost = step[best, cols] - bonus
+    # La última línea se extiende hasta el final de la pista
+    tail = cum_voiced[-1] - vc
+    cost = cost + DURATION_WEIGHT * ((tail - expected[-1]) / expected[-1]) ** 2
+    if not np.isfinite(cost).any():
+        # Ninguna asignación respeta la banda (duraciones muy dispares)
+        return _spread(voiced, expected, hop)
+
+    k = int(np.argmin(cost))
+    path = [k]
+    for i in range(n_lines - 1, 0, -1):
+        k = int(back[i, k])
+        path.append(k)
+    return cand[np.array(path[::-1])] * hop
+
+
+def _spread(voiced: np.ndarray, expected: np.ndarray, hop: float) -> np.ndarray:
+    """Inicios repartidos por duración esperada entre la primera y la última voz."""
+    bounds = np.concatenate([[0.0], np.cumsum(expected)])[:-1] / max(1.0, float(expected.sum()))
+    active = np.flatnonzero(voiced)
+    first, last = (active[0], active[-1]) if active.size else (0, voiced.shape[0] - 1)
+    return (first + bounds * (last - first)) * hop
@@ -1,19 +1,44 @@
-"""Carga y asociación de letra desde un archivo .txt.
+"""Carga y asociación de letra desde un archivo .txt o .lrc.
 
-El MVP guarda la letra como string en memoria asociada a una pista.
+La letra se guarda como string en memoria asociada a una pista. Si el
+archivo es LRC (por extensión o por contenido), además se parsea a
+`TimedLyrics` (ver `karioka_ok.lyrics.timed`) para mostrarla sincronizada y
+embeberla al exportar.
 """
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass
 from typing import Optional
 
+from karioka_ok.lyrics.timed import TimedLyrics, load_lrc, looks_like_lrc, parse_lrc
+from karioka_ok.utils import instrumentation
+
 
 @dataclass
 class Lyrics:
     text: str
     path: Optional[str] = None
+    timed: Optional[TimedLyrics] = None
+
+    def scaled(self, factor: float, offset: float = 0.0) -> "Lyrics":
+        """Misma letra con tiempos `t * factor + offset` (sin tiempos: igual)."""
+        if self.timed is None or (abs(factor - 1.0) < 1e-9 and offset == 0.0):
+            return self
+        return Lyrics(text=self.text, path=self.path, timed=self.timed.scaled(factor, offset))
 
 
 def load_lyrics(path: str, encoding: str = "utf-8") -> Lyrics:
-    with open(path, "r", encoding=encoding) as f:
-        return Lyrics(text=f.read(), path=path)
+    with instrumentation.stage("lyrics.load") as st:
+        if path.lower().endswith(".lrc"):
+            # LRC: parseo en streaming, sin leer el archivo entero
+            st.add_bytes(os.path.getsize(path))
+            timed = load_lrc(path, encoding="utf-8-sig" if encoding == "utf-8" else encoding)
+            return Lyrics(text=timed.plain_text(), path=path, timed=timed)
+        with open(path, "r", encoding=encoding) as f:
+            text = f.read()
+        st.add_bytes(len(text.encode(encoding)))
+        if looks_like_lrc(text):
+            timed = parse_lrc(text.splitlines())
+            return Lyrics(text=timed.plain_text(), path=path, timed=timed)
+        return Lyrics(text=text, path=path)
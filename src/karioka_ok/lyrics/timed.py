@@ -0,0 +1,297 @@
+"""Letra sincronizada (LRC y LRC extendido con tiempos por palabra).
+
+Representación compacta: un único buffer de texto y arreglos (`array`)
+ordenados con los tiempos de inicio y los desplazamientos de cada línea y
+palabra dentro de ese buffer. "¿Qué línea/palabra suena en t?" es una
+búsqueda binaria (`bisect`), O(log n), sin objetos por línea.
+
+    [ar:Artista]
+    [00:12.30]Primera línea
+    [00:15.00]<00:15.00>Palabra <00:15.40>por <00:15.80>palabra
+
+El parser consume el archivo línea a línea (no lo lee entero) y admite
+varias marcas por línea (`[00:10.00][01:20.00]Estribillo`) y el tag
+`[offset:±ms]`, que se aplica a los tiempos al cargar.
+"""
+from __future__ import annotations
+
+import re
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+_TIME_TAG = re.compile(r"\[(\d+):(\d{1,2})(?:[.:](\d{1,3}))?\]")
+_WORD_TAG = re.compile(r"<(\d+):(\d{1,2})(?:[.:](\d{1,3}))?>")
+_META_TAG = re.compile(r"^\[([A-Za-z#]+):(.*)\]\s*$")
+
+
+def _seconds(minutes: str, seconds: str, fraction: Optional[str]) -> float:
+    value = int(minutes) * 60 + int(seconds)
+    if fraction:
+        value += int(fraction) / (10.0 ** len(fraction))
+    return float(value)
+
+
+def format_timestamp(seconds: float) -> str:
+    """`mm:ss.cc` (centésimas), como en LRC."""
+    cs = max(0, int(round(seconds * 100)))
+    minutes, cs = divmod(cs, 6000)
+    return f"{minutes:02d}:{cs // 100:02d}.{cs % 100:02d}"
+
+
+class TimedLyrics:
+    """Líneas y palabras con tiempo de inicio sobre un único buffer de texto.
+
+    - `line_times[i]`: inicio de la línea i (segundos, orden creciente).
+    - `line_offsets[i]:line_offsets[i+1]`: texto de la línea i en `text`.
+    - `line_words[i]:line_words[i+1]`: índices de sus palabras (vacío si la
+      línea no tiene tiempos por palabra).
+    - `word_times[j]`, `word_offsets[j]`: inicio y comienzo en `text` de la
+      palabra j; termina donde empieza la siguiente de su línea (o la línea).
+    """
+
+    __slots__ = ("text", "line_times", "line_offsets", "line_words", "word_times", "word_offsets", "tags")
+
+    def __init__(
+        self,
+        text: str,
+        line_times: array,
+        line_offsets: array,
+        line_words: array,
+        word_times: array,
+        word_offsets: array,
+        tags: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.text = text
+        self.line_times = line_times
+        self.line_offsets = line_offsets
+        self.line_words = line_words
+        self.word_times = word_times
+        self.word_offsets = word_offsets
+        self.tags: Dict[str, str] = dict(tags or {})
+
+    @classmethod
+    def from_lines(
+        cls,
+        lines: Iterable[Tuple[float, str]],
+        words: Optional[Iterable[List[Tuple[float, str]]]] = None,
+        tags: Optional[Dict[str, str]] = None,
+    ) -> "TimedLyrics":
+        """Construye desde `(inicio, texto)` (y opcionalmente las palabras de cada línea).
+
+        Las líneas se ordenan por tiempo (orden estable) si no vienen ordenadas.
+        """
+        builder = _Builder()
+        word_iter = iter(words) if words is not None else None
+        for start, line_text in lines:
+            line_words = next(word_iter, None) if word_iter is not None else None
+            builder.add(start, line_words if line_words else line_text)
+        return builder.build(tags)
+
+    # Consultas
+    def __len__(self) -> int:
+        return len(self.line_times)
+
+    @property
+    def word_count(self) -> int:
+        return len(self.word_times)
+
+    @property
+    def has_words(self) -> bool:
+        return len(self.word_times) > 0
+
+    def line(self, i: int) -> str:
+        return self.text[self.line_offsets[i]:self.line_offsets[i + 1]]
+
+    def line_time(self, i: int) -> float:
+        return self.line_times[i]
+
+    def line_end(self, i: int) -> float:
+        """Fin de la línea i: el inicio de la siguiente (infinito para la última)."""
+        return self.line_times[i + 1] if i + 1 < len(self.line_times) else float("inf")
+
+    def lines(self) -> Iterator[Tuple[float, str]]:
+        for i in range(len(self.line_times)):
+            yield self.line_times[i], self.line(i)
+
+    def words(self, i: int) -> List[Tuple[float, str]]:
+        """Palabras `(inicio, texto)` de la línea i (lista vacía si no tiene tiempos por palabra)."""
+        first, last = self.line_words[i], self.line_words[i + 1]
+        end = self.line_offsets[i + 1]
+        out = []
+        for j in range(first, last):
+            stop = self.word_offsets[j + 1] if j + 1 < last else end
+            out.append((self.word_times[j], self.text[self.word_offsets[j]:stop]))
+        return out
+
+    def line_at(self, t: float) -> int:
+        """Índice de la línea activa en `t` (-1 antes de la primera)."""
+        return bisect_right(self.line_times, t) - 1
+
+    def word_at(self, t: float) -> Tuple[int, int]:
+        """`(línea, palabra dentro de la línea)` activas en `t`; -1 donde no hay."""
+        i = self.line_at(t)
+        if i < 0:
+            return -1, -1
+        first, last = self.line_words[i], self.line_words[i + 1]
+        if first == last:
+            return i, -1
+        return i, bisect_right(self.word_times, t, first, last) - 1 - first
+
+    def plain_text(self) -> str:
+        return "\n".join(self.line(i) for i in range(len(self.line_times)))
+
+    # Transformaciones
+    def scaled(self, factor: float, offset: float = 0.0) -> "TimedLyrics":
+        """Copia con tiempos `t * factor + offset` (p. ej. tras cambiar la duración)."""
+        return TimedLyrics(
+            self.text,
+            array("d", (max(0.0, t * factor + offset) for t in self.line_times)),
+            self.line_offsets,
+            self.line_words,
+            array("d", (max(0.0, t * factor + offset) for t in self.word_times)),
+            self.word_offsets,
+            self.tags,
+        )
+
+    def shifted(self, seconds: float) -> "TimedLyrics":
+        return self.scaled(1.0, seconds)
+
+    # Serialización
+    def iter_lrc(self) -> Iterator[str]:
+        """Líneas LRC (sin salto de línea); tiempos por palabra como `<mm:ss.cc>`."""
+        for key, value in self.tags.items():
+            yield f"[{key}:{value}]"
+        for i in range(len(self.line_times)):
+            words = self.words(i)
+            if words:
+                body = "".join(f"<{format_timestamp(t)}>{w}" for t, w in words)
+            else:
+                body = self.line(i)
+            yield f"[{format_timestamp(self.line_times[i])}]{body}"
+
+    def to_lrc(self) -> str:
+        return "\n".join(self.iter_lrc()) + "\n"
+
+    def save_lrc(self, path: str, encoding: str = "utf-8") -> None:
+        with open(path, "w", encoding=encoding, newline="\n") as f:
+            for line in self.iter_lrc():
+                f.write(line + "\n")
+
+
+class _Builder:
+    """Acumula líneas en arreglos; reordena al final solo si hizo falta."""
+
+    def __init__(self) -> None:
+        self.parts: List[str] = []
+        self.size = 0
+        self.line_times = array("d")
+        self.line_offsets = array("q", [0])
+        self.line_words = array("q", [0])
+        self.word_times = array("d")
+        self.word_offsets = array("q")
+        self.sorted = True
+
+    def add(self, start: float, content) -> None:
+        """`content`: texto de la línea o lista de `(inicio, palabra)`."""
+        if self.line_times and start < self.line_times[-1]:
+            self.sorted = False
+        self.line_times.append(start)
+        if isinstance(content, str):
+            self._append_text(content)
+        else:
+            for word_start, word in sorted(content, key=lambda w: w[0]):
+                self.word_times.append(word_start)
+                self.word_offsets.append(self.size)
+                self._append_text(word)
+        self.line_offsets.append(self.size)
+        self.line_words.append(len(self.word_times))
+
+    def _append_text(self, text: str) -> None:
+        self.parts.append(text)
+        self.size += len(text)
+
+    def build(self, tags: Optional[Dict[str, str]] = None) -> TimedLyrics:
+        text = "".join(self.parts)
+        lyrics = TimedLyrics(
+            text, self.line_times, self.line_offsets, self.line_words, self.word_times, self.word_offsets, tags
+        )
+        if self.sorted:
+            return lyrics
+        # Marcas repetidas o fuera de orden: reconstruir en orden estable por tiempo
+        order = sorted(range(len(lyrics)), key=lyrics.line_times.__getitem__)
+        rebuilt = _Builder()
+        for i in order:
+            words = lyrics.words(i)
+            rebuilt.add(lyrics.line_times[i], words if words else lyrics.line(i))
+        return rebuilt.build(tags)
+
+
+def _parse_body(start: float, body: str):
+    """Texto de la línea o, si tiene marcas `<mm:ss>`, lista de `(inicio, palabra)`."""
+    matches = list(_WORD_TAG.finditer(body))
+    if not matches:
+        return body
+    words = []
+    lead = body[:matches[0].start()]
+    if lead:
+        words.append((start, lead))
+    for k, m in enumerate(matches):
+        end = matches[k + 1].start() if k + 1 < len(matches) else len(body)
+        word = body[m.end():end]
+        if word:
+            words.append((_seconds(*m.groups()), word))
+    return words or ""
+
+
+def parse_lrc(lines: Iterable[str]) -> TimedLyrics:
+    """Parsea LRC / LRC extendido línea a línea (cualquier iterable de líneas)."""
+    builder = _Builder()
+    tags: Dict[str, str] = {}
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        pos = 0
+        starts = []
+        while True:
+            m = _TIME_TAG.match(line, pos)
+            if m is None:
+                break
+            starts.append(_seconds(*m.groups()))
+            pos = m.end()
+        if not starts:
+            meta = _META_TAG.match(line.strip())
+            if meta is not None:
+                tags[meta.group(1).lower()] = meta.group(2).strip()
+            continue
+        content = _parse_body(starts[0], line[pos:])
+        for start in starts:
+            if isinstance(content, str) or start == starts[0]:
+                builder.add(start, content)
+            else:
+                # Estribillo repetido: las palabras se corren junto con la línea
+                builder.add(start, [(t + start - starts[0], w) for t, w in content])
+    offset = tags.pop("offset", "")
+    lyrics = builder.build(tags)
+    try:
+        # [offset:+500] adelanta la letra medio segundo
+        return lyrics.shifted(-int(offset) / 1000.0) if offset else lyrics
+    except ValueError:
+        lyrics.tags["offset"] = offset
+        return lyrics
+
+
+def load_lrc(path: str, encoding: str = "utf-8-sig") -> TimedLyrics:
+    with open(path, "r", encoding=encoding) as f:
+        return parse_lrc(f)
+
+
+def looks_like_lrc(text: str) -> bool:
+    """True si la primera línea con contenido empieza con una marca de tiempo."""
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped:
+            if _TIME_TAG.match(stripped):
+                return True
+            if not _META_TAG.match(stripped):
+                return False
+    return False
@@ -0,0 +1,248 @@
+"""Carátulas listas para incrustar, cargadas una vez y cacheadas por contenido.
+
+`CoverCache.load(ruta)` devuelve un `Cover` (bytes, MIME real y tamaño en
+píxeles). El MIME sale de la firma del archivo, no de la extensión: un PNG
+se etiqueta `image/png`. Si la imagen supera `max_size` píxeles de lado, o
+no es JPEG/PNG, se reescala y se recomprime (JPEG, o PNG si tiene
+transparencia) con `QImage`; si no, se incrusta tal cual para no perder
+calidad recomprimiendo. Lo que no es una imagen reconocible (o que QImage
+no logra decodificar) se rechaza con `ValueError` en lugar de incrustarse.
+
+Dos niveles de caché: en memoria por ruta/tamaño/mtime (un lote que repite
+la misma carátula no vuelve a leerla), LRU acotada en bytes para un
+servicio de larga vida, y en disco por hash del contenido y parámetros
+(`~/.cache/karioka_ok/covers`), compartida entre procesos del pool de
+lotes. `KARIOKA_COVER_MAX_SIZE` fija el lado máximo (0 = no reescalar).
+"""
+from __future__ import annotations
+
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+from karioka_ok.utils import instrumentation
+from karioka_ok.utils.hashing import hash_bytes
+from karioka_ok.utils.logging_config import get_logger
+from karioka_ok.utils.paths import cache_dir
+
+logger = get_logger("karioka_ok.metadata.covers")
+
+COVER_VERSION = 1
+DEFAULT_MAX_SIZE = 1200
+JPEG_QUALITY = 90
+MEMORY_BYTES = 32 * 1024 ** 2  # carátulas en memoria (LRU)
+MEMORY_FILES = 4096  # rutas recordadas (cada una apunta a un hash)
+EMBEDDABLE_MIMES = ("image/jpeg", "image/png")
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+
+@dataclass(frozen=True)
+class Cover:
+    """Imagen lista para APIC (MP3) o PICTURE (FLAC)."""
+    data: bytes
+    mime: str
+    width: int = 0
+    height: int = 0
+
+
+def sniff_mime(data: bytes) -> str:
+    """MIME por la firma de los primeros bytes; `ValueError` si no es una imagen conocida."""
+    for signature, mime in _SIGNATURES:
+        if data.startswith(signature):
+            return mime
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    raise ValueError("La carátula no es una imagen reconocible (JPEG, PNG, GIF, BMP o WebP)")
+
+
+def image_size(data: bytes) -> Tuple[int, int]:
+    """`(ancho, alto)` leyendo la cabecera (PNG, JPEG, GIF); `(0, 0)` si no se puede."""
+    try:
+        if data.startswith(b"\x89PNG\r\n\x1a\n") and data[12:16] == b"IHDR":
+            return struct.unpack(">II", data[16:24])
+        if data[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", data[6:10])
+        if data.startswith(b"\xff\xd8"):
+            pos = 2
+            while pos + 9 < len(data):
+                if data[pos] != 0xFF:
+                    pos += 1
+                    continue
+                marker = data[pos + 1]
+                if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                    pos += 2
+                    continue
+                length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+                # SOF0..SOF15 salvo DHT (C4), JPG (C8) y DAC (CC)
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    height, width = struct.unpack(">HH", data[pos + 5:pos + 9])
+                    return width, height
+                pos += 2 + length
+    except struct.error:
+        pass
+    return 0, 0
+
+
+def read_cover(path: str) -> Cover:
+    """La imagen tal cual, con su MIME real (sin reescalar ni cachear); `ValueError` si no es una imagen."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return Cover(data, sniff_mime(data), *image_size(data))
+
+
+def _rescale(data: bytes, max_size: int, quality: int) -> Optional[Cover]:
+    """Reescala a `max_size` de lado (si hace falta) y recomprime con QImage.
+
+    None si no hay PySide6; `ValueError` si la imagen no se puede decodificar.
+    """
+    try:
+        from PySide6 import QtCore, QtGui
+    except ImportError:
+        return None
+
+    image = QtGui.QImage.fromData(data)
+    if image.isNull():
+        raise ValueError("La carátula está dañada o en un formato que no se puede decodificar")
+    if max_size and max(image.width(), image.height()) > max_size:
+        image = image.scaled(max_size, max_size, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
+    fmt, mime = ("PNG", "image/png") if image.hasAlphaChannel() else ("JPG", "image/jpeg")
+    out = QtCore.QByteArray()
+    buffer = QtCore.QBuffer(out)
+    buffer.open(QtCore.QIODevice.WriteOnly)
+    if not image.save(buffer, fmt, quality if fmt == "JPG" else -1):
+        raise ValueError("No se pudo recomprimir la carátula")
+    return Cover(bytes(out), mime, image.width(), image.height())
+
+
+class CoverCache:
+    """Carátulas normalizadas, en memoria y en disco. Segura entre hilos."""
+
+    def __init__(
+        self, root: Optional[str] = None, max_size: int = DEFAULT_MAX_SIZE, quality: int = JPEG_QUALITY,
+        memory_bytes: int = MEMORY_BYTES,
+    ) -> None:
+        self.root = Path(root) if root else cache_dir("covers")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_size = int(max_size)
+        self.quality = int(quality)
+        self.memory_bytes = int(memory_bytes)
+        self._lock = threading.Lock()
+        self._by_file: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()  # -> hash
+        self._by_hash: "OrderedDict[str, Cover]" = OrderedDict()
+        self._bytes = 0
+
+    @classmethod
+    def default(cls) -> "CoverCache":
+        """Caché en la ruta estándar; `KARIOKA_COVER_MAX_SIZE` fija el lado máximo."""
+        return cls(max_size=int(os.environ.get("KARIOKA_COVER_MAX_SIZE", DEFAULT_MAX_SIZE)))
+
+    def load(self, path: str) -> Cover:
+        """Carátula de `path` lista para incrustar (lee el archivo solo si cambió).
+
+        `ValueError` si no es una imagen que se pueda incrustar.
+        """
+        info = os.stat(path)
+        stamp = (os.path.abspath(path), info.st_size, info.st_mtime_ns)
+        with self._lock:
+            key = self._by_file.get(stamp)
+            cover = self._recall(key) if key is not None else None
+        if cover is not None:
+            return cover
+        with open(path, "rb") as f:
+            data = f.read()
+        key = hash_bytes(data, f"|{self.max_size}|{self.quality}|{COVER_VERSION}".encode("ascii"))
+        with self._lock:
+            cover = self._recall(key)
+        if cover is None:
+            cover = self._read(key)
+        if cover is None:
+            with instrumentation.stage("metadata.cover", bytes_in=len(data)) as st:
+                cover = self._normalise(data)
+                st.set(bytes_out=len(cover.data), mime=cover.mime)
+            self._write(key, cover)
+        with self._lock:
+            self._remember(stamp, key, cover)
+        return cover
+
+    def _normalise(self, data: bytes) -> Cover:
+        mime = sniff_mime(data)
+        width, height = image_size(data)
+        if mime in EMBEDDABLE_MIMES and width and (not self.max_size or max(width, height) <= self.max_size):
+            return Cover(data, mime, width, height)
+        scaled = _rescale(data, self.max_size, self.quality)
+        if scaled is not None:
+            return scaled
+        if mime in EMBEDDABLE_MIMES and width:
+            logger.warning("Sin PySide6 no se puede reescalar la carátula (%s); se incrusta tal cual", mime)
+            return Cover(data, mime, width, height)
+        raise ValueError(f"Sin PySide6 no se puede convertir la carátula ({mime}) a JPEG o PNG")
+
+    # Memoria (con el lock tomado)
+    def _recall(self, key: str) -> Optional[Cover]:
+        cover = self._by_hash.get(key)
+        if cover is not None:
+            self._by_hash.move_to_end(key)
+        return cover
+
+    def _remember(self, stamp: Tuple[str, int, int], key: str, cover: Cover) -> None:
+        self._by_file[stamp] = key
+        self._by_file.move_to_end(stamp)
+        while len(self._by_file) > MEMORY_FILES:
+            self._by_file.popitem(last=False)
+        if key not in self._by_hash:
+            self._by_hash[key] = cover
+            self._bytes += len(cover.data)
+        self._by_hash.move_to_end(key)
+        # La más reciente se conserva aunque sola supere el presupuesto
+        while self._bytes > self.memory_bytes and len(self._by_hash) > 1:
+            _, old = self._by_hash.popitem(last=False)
+            self._bytes -= len(old.data)
+
+    # Disco
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.img"
+
+    def _read(self, key: str) -> Optional[Cover]:
+        try:
+            data = self._path(key).read_bytes()
+            return Cover(data, sniff_mime(data), *image_size(data))
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key: str, cover: Cover) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(cover.data)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            logger.warning("No se pudo guardar la carátula en caché: %s", e)
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+
+_shared: Optional[CoverCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_cover_cache() -> CoverCache:
+    """`CoverCache.default()` compartida por todo el proceso."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = CoverCache.default()
+        return _shared
@@ -1,69 +1,227 @@
-"""Edición de metadatos: carátula y descripción.
+"""Edición de metadatos: carátula, descripción y letra.
 
 Usa mutagen para escribir metadatos en archivos comunes (MP3, FLAC). Para WAV,
-los metadatos son limitados; este MVP se centra en MP3/FLAC.
+los metadatos son limitados; este MVP se centra en MP3/FLAC. mutagen se
+importa al escribir, no al importar el módulo (arranque de la GUI).
+
+La carátula pasa por `karioka_ok.metadata.covers`: MIME según el contenido
+(no siempre JPEG), reescalada si es muy grande y cacheada por hash.
+`set_metadata_many` etiqueta varios archivos a la vez (p. ej. todos los
+formatos de una exportación): cada carátula se carga una sola vez y cada
+archivo se guarda una vez, en un pool de hilos.
 """
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
 
-from mutagen.flac import FLAC, Picture
-from mutagen.id3 import ID3, APIC, COMM, error as ID3Error
+from karioka_ok.utils import instrumentation
+
+if TYPE_CHECKING:
+    from karioka_ok.lyrics.lyrics_loader import Lyrics
+    from karioka_ok.lyrics.timed import TimedLyrics
+    from karioka_ok.metadata.covers import Cover, CoverCache
+
+TAGGED_SUFFIXES = (".mp3", ".flac")
 
 
 @dataclass
 class TrackMetadata:
     description: Optional[str] = None
     cover_image_path: Optional[str] = None
+    lyrics: Optional["Lyrics"] = None
+
+    def retimed(self, factor: float, offset: float = 0.0) -> "TrackMetadata":
+        """Copia con la letra sincronizada reescalada a una pista `factor` veces más larga.
+
+        `offset` desplaza además los tiempos (p. ej. el silencio inicial recortado).
+        """
+        if self.lyrics is None or self.lyrics.timed is None:
+            return self
+        return replace(self, lyrics=self.lyrics.scaled(factor, offset))
+
+
+@dataclass
+class EmbeddedMetadata:
+    """Lo que ya trae un archivo (para la biblioteca): descripción, carátula y letra."""
+    description: Optional[str] = None
+    cover_mime: Optional[str] = None  # None si no tiene carátula
+    has_lyrics: bool = False
+
 
+def read_metadata(file_path: str) -> EmbeddedMetadata:
+    """Lee descripción, carátula y presencia de letra (MP3/FLAC; vacío en otros formatos)."""
+    suffix = Path(file_path).suffix.lower()
+
+    with instrumentation.stage("metadata.read", format=suffix.lstrip(".")):
+        if suffix == ".mp3":
+            return _read_mp3_metadata(file_path)
+        if suffix == ".flac":
+            return _read_flac_metadata(file_path)
+        return EmbeddedMetadata()
+
+
+def _read_mp3_metadata(file_path: str) -> EmbeddedMetadata:
+    from mutagen.id3 import ID3, ID3NoHeaderError
+
+    try:
+        tags = ID3(file_path)
+    except ID3NoHeaderError:
+        return EmbeddedMetadata()
+    comments = tags.getall("COMM")
+    # Preferir el comentario que escribe set_metadata (desc="desc")
+    comment = next((c for c in comments if c.desc == "desc"), comments[0] if comments else None)
+    pictures = tags.getall("APIC")
+    return EmbeddedMetadata(
+        description=str(comment.text[0]) if comment is not None and comment.text else None,
+        cover_mime=pictures[0].mime if pictures else None,
+        has_lyrics=bool(tags.getall("USLT") or tags.getall("SYLT")),
+    )
+
+
+def _read_flac_metadata(file_path: str) -> EmbeddedMetadata:
+    from mutagen.flac import FLAC
+
+    flac = FLAC(file_path)
+    description = flac.get("DESCRIPTION")
+    return EmbeddedMetadata(
+        description=description[0] if description else None,
+        cover_mime=flac.pictures[0].mime if flac.pictures else None,
+        has_lyrics="LYRICS" in flac,
+    )
 
-def set_metadata(file_path: str, meta: TrackMetadata) -> None:
+
+def _load_cover(meta: TrackMetadata, covers: Optional["CoverCache"]) -> Optional["Cover"]:
+    if not meta.cover_image_path:
+        return None
+    from karioka_ok.metadata.covers import shared_cover_cache
+
+    return (covers if covers is not None else shared_cover_cache()).load(meta.cover_image_path)
+
+
+def set_metadata(file_path: str, meta: TrackMetadata, covers: Optional["CoverCache"] = None) -> None:
     """Escribe metadatos básicos en el archivo si es compatible (MP3/FLAC).
 
-    - MP3: usa ID3 (APIC para carátula, COMM para comentario/descr.).
-    - FLAC: usa PICTURE block y tag "DESCRIPTION".
+    - MP3: usa ID3 (APIC para carátula, COMM para comentario/descr., USLT
+      para la letra y SYLT si está sincronizada).
+    - FLAC: usa PICTURE block y tags "DESCRIPTION" y "LYRICS" (LRC si está
+      sincronizada, texto plano si no).
+
+    La carátula sale de `covers` (por defecto, la caché compartida del proceso).
     """
     suffix = Path(file_path).suffix.lower()
-
-    if suffix == ".mp3":
-        _set_mp3_metadata(file_path, meta)
-    elif suffix == ".flac":
-        _set_flac_metadata(file_path, meta)
-    else:
+    if suffix not in TAGGED_SUFFIXES:
         # Para MVP: sin-op para formatos no soportados
         return
+    _write_tags(file_path, meta, _load_cover(meta, covers))
+
+
+def _write_tags(file_path: str, meta: TrackMetadata, cover: Optional["Cover"]) -> None:
+    suffix = Path(file_path).suffix.lower()
 
+    with instrumentation.stage("metadata.write", format=suffix.lstrip(".")):
+        if suffix == ".mp3":
+            _set_mp3_metadata(file_path, meta, cover)
+        elif suffix == ".flac":
+            _set_flac_metadata(file_path, meta, cover)
+
+
+def set_metadata_many(
+    items: Sequence[Tuple[str, TrackMetadata]],
+    covers: Optional["CoverCache"] = None,
+    workers: Optional[int] = None,
+) -> List[Optional[Exception]]:
+    """Etiqueta muchos `(archivo, metadatos)`; devuelve el error de cada uno (None si fue bien).
+
+    Cada carátula distinta se carga una vez antes de empezar; después cada
+    archivo se lee y se guarda una sola vez, en un pool de hilos (la E/S
+    de un archivo se solapa con el armado de etiquetas de otro).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from karioka_ok.metadata.covers import shared_cover_cache
+
+    covers = covers if covers is not None else shared_cover_cache()
+    errors: List[Optional[Exception]] = [None] * len(items)
+    tagged = []
+    loaded = {}
+    for i, (path, meta) in enumerate(items):
+        if Path(path).suffix.lower() not in TAGGED_SUFFIXES:
+            continue
+        try:
+            if meta.cover_image_path and meta.cover_image_path not in loaded:
+                loaded[meta.cover_image_path] = covers.load(meta.cover_image_path)
+            tagged.append((i, path, meta, loaded.get(meta.cover_image_path) if meta.cover_image_path else None))
+        except Exception as e:
+            errors[i] = e
+    if not tagged:
+        return errors
+
+    with instrumentation.stage("metadata.write_many", files=len(tagged), covers=len(loaded)):
+        with ThreadPoolExecutor(max_workers=workers or min(8, len(tagged))) as pool:
+            futures = [(i, pool.submit(_write_tags, path, meta, cover)) for i, path, meta, cover in tagged]
+            for i, fut in futures:
+                try:
+                    fut.result()
+                except Exception as e:
+                    errors[i] = e
+    return errors
+
+
+def _set_mp3_metadata(file_path: str, meta: TrackMetadata, cover: Optional["Cover"]) -> None:
+    from mutagen.id3 import ID3, APIC, COMM, SYLT, USLT, error as ID3Error
 
-def _set_mp3_metadata(file_path: str, meta: TrackMetadata) -> None:
     try:
         tags = ID3(file_path)
     except ID3Error:
         tags = ID3()
 
-    if meta.cover_image_path:
-        with open(meta.cover_image_path, "rb") as img:
-            apic = APIC(encoding=3, mime="image/jpeg", type=3, desc="Cover", data=img.read())
-            tags.add(apic)
+    if cover is not None:
+        tags.add(APIC(encoding=3, mime=cover.mime, type=3, desc="Cover", data=cover.data))
 
     if meta.description:
         comm = COMM(encoding=3, lang="eng", desc="desc", text=meta.description)
         tags.add(comm)
 
+    if meta.lyrics is not None:
+        tags.delall("USLT")
+        tags.add(USLT(encoding=3, lang="eng", desc="", text=meta.lyrics.text))
+        tags.delall("SYLT")
+        if meta.lyrics.timed is not None:
+            # format=2: tiempos en milisegundos; type=1: letra
+            tags.add(SYLT(encoding=3, lang="eng", format=2, type=1, desc="", text=_sylt_entries(meta.lyrics.timed)))
+
     tags.save(file_path)
 
 
-def _set_flac_metadata(file_path: str, meta: TrackMetadata) -> None:
+def _sylt_entries(timed: "TimedLyrics") -> List[Tuple[str, int]]:
+    """Pares `(texto, ms)` para SYLT: una entrada por palabra si hay tiempos por
+    palabra, si no una por línea; cada línea nueva empieza con salto de línea."""
+    entries = []
+    for i in range(len(timed)):
+        prefix = "\n" if i else ""
+        words = timed.words(i) or [(timed.line_time(i), timed.line(i))]
+        for k, (start, word) in enumerate(words):
+            entries.append(((prefix if k == 0 else "") + word, int(round(start * 1000))))
+    return entries
+
+
+def _set_flac_metadata(file_path: str, meta: TrackMetadata, cover: Optional["Cover"]) -> None:
+    from mutagen.flac import FLAC, Picture
+
     flac = FLAC(file_path)
     if meta.description:
         flac["DESCRIPTION"] = [meta.description]
-    if meta.cover_image_path:
+    if meta.lyrics is not None:
+        timed = meta.lyrics.timed
+        flac["LYRICS"] = [timed.to_lrc() if timed is not None else meta.lyrics.text]
+    if cover is not None:
         pic = Picture()
         pic.type = 3  # Cover (front)
-        pic.mime = "image/jpeg"
-        with open(meta.cover_image_path, "rb") as img:
-            pic.data = img.read()
+        pic.mime = cover.mime
+        pic.width, pic.height, pic.depth = cover.width, cover.height, 24
+        pic.data = cover.data
         flac.clear_pictures()
         flac.add_picture(pic)
     flac.save()
@@ -0,0 +1,101 @@
+"""Índice SQLite de resultados de análisis, por hash de contenido y por ruta.
+
+Base de `LoudnessIndex` y `KeyIndex`: cada subclase declara su tabla
+(`TABLE`, `COLUMNS`), la versión del análisis (`VERSION`, que invalida lo
+guardado al cambiar) y cómo pasar su resultado a columnas y de vuelta
+(`_encode` / `_decode`). La tabla `files` recuerda `(ruta, tamaño,
+mtime_ns, hash)` para que un catálogo ya analizado no vuelva a leer ni
+hashear los archivos que no cambiaron.
+
+Cada operación abre su propia conexión (modo WAL): el índice se usa desde
+hilos de trabajo y procesos del pool a la vez.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import ClassVar, Generic, Iterable, Optional, Sequence, Tuple, TypeVar
+
+from karioka_ok.utils.paths import cache_dir
+
+T = TypeVar("T")
+
+
+class ContentIndex(Generic[T]):
+    """Resultados en SQLite: por hash de contenido y, para catálogos, por ruta."""
+
+    NAME: ClassVar[str]  # subdirectorio de la caché
+    TABLE: ClassVar[str]
+    COLUMNS: ClassVar[Tuple[str, ...]]  # definiciones SQL, después de `hash` y `version`
+    VERSION: ClassVar[int]
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = Path(path) if path else cache_dir(self.NAME) / "index.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        columns = ", ".join(self.COLUMNS)
+        self._names = ", ".join(f"t.{c.split()[0]}" for c in self.COLUMNS)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.TABLE} (hash TEXT PRIMARY KEY, version INTEGER, {columns})"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, hash TEXT)"
+            )
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30.0)
+
+    # Conversión (subclases)
+    def _encode(self, value: T) -> Tuple:
+        raise NotImplementedError
+
+    def _decode(self, row: Sequence) -> T:
+        raise NotImplementedError
+
+    # Consultas
+    def get(self, content_hash: str) -> Optional[T]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                f"SELECT {self._names} FROM {self.TABLE} t WHERE t.hash = ? AND t.version = ?",
+                (content_hash, self.VERSION),
+            ).fetchone()
+        return self._decode(row) if row else None
+
+    def put(self, content_hash: str, value: T) -> None:
+        with closing(self._connect()) as conn:
+            self._store(conn, content_hash, value)
+            conn.commit()
+
+    def lookup(self, path: str) -> Optional[Tuple[str, T]]:
+        """`(hash, resultado)` si `path` no cambió (tamaño y mtime) desde que se analizó."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                f"SELECT f.hash, {self._names} FROM files f JOIN {self.TABLE} t ON t.hash = f.hash"
+                " WHERE f.path = ? AND f.size = ? AND f.mtime_ns = ? AND t.version = ?",
+                (os.path.abspath(path), st.st_size, st.st_mtime_ns, self.VERSION),
+            ).fetchone()
+        return (row[0], self._decode(row[1:])) if row else None
+
+    def put_files(self, rows: Iterable[Tuple[str, int, int, str, T]]) -> None:
+        """Guarda `(ruta, tamaño, mtime_ns, hash, resultado)` en una sola transacción."""
+        with closing(self._connect()) as conn:
+            for path, size, mtime_ns, content_hash, value in rows:
+                self._store(conn, content_hash, value)
+                conn.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                    (os.path.abspath(path), size, mtime_ns, content_hash),
+                )
+            conn.commit()
+
+    def _store(self, conn: sqlite3.Connection, content_hash: str, value: T) -> None:
+        values = (content_hash, self.VERSION) + tuple(self._encode(value))
+        marks = ", ".join("?" * len(values))
+        conn.execute(f"INSERT OR REPLACE INTO {self.TABLE} VALUES ({marks})", values)
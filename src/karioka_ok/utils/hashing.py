@@ -0,0 +1,38 @@
+"""Hashes de contenido para claves de caché.
+
+Se usa BLAKE2b de 128 bits: es más rápido que SHA-256 en CPU y suficiente
+para direccionar contenido local (no es un uso criptográfico).
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Iterable
+
+DIGEST_SIZE = 16
+FILE_CHUNK = 1 << 20
+
+
+def new_hasher():
+    return hashlib.blake2b(digest_size=DIGEST_SIZE)
+
+
+def hash_bytes(*parts: bytes) -> str:
+    """Hash hex de la concatenación de `parts` (bytes o buffers)."""
+    h = new_hasher()
+    for part in parts:
+        h.update(part)
+    return h.hexdigest()
+
+
+def hash_chunks(chunks: Iterable[bytes]) -> str:
+    """Hash hex de un flujo de bloques (no requiere tenerlos todos en memoria)."""
+    h = new_hasher()
+    for chunk in chunks:
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_file(path: str, chunk_size: int = FILE_CHUNK) -> str:
+    """Hash hex del contenido de un archivo, leído por bloques."""
+    with open(path, "rb") as f:
+        return hash_chunks(iter(lambda: f.read(chunk_size), b""))
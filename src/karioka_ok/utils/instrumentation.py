@@ -0,0 +1,305 @@
+"""Instrumentación ligera del pipeline: etapas, contadores, bytes y memoria.
+
+Desactivada por defecto; con `KARIOKA_TRACE=1` (o `configure(enabled=True)`)
+cada etapa emite un evento estructurado:
+
+    {"event": "stage", "name": "audio.export", "seconds": 0.41, "bytes": 5292044,
+     "peak_rss": 183500800, "job": "Exportar a.mp3", "parent": null, ...}
+
+- `stage(nombre, **campos)`: context manager; `st.add_bytes(n)` y `st.set(k=v)`.
+- `timed(nombre)`: decorador equivalente.
+- `count(nombre)`: contador por nombre; `summary()` agrega llamadas, tiempos y bytes.
+- Sink: JSON lines en `KARIOKA_TRACE_FILE`, o el logger `karioka_ok.metrics`.
+- `job_scope(nombre)`: asocia los eventos del hilo a un trabajo y, si
+  `KARIOKA_PROFILE_DIR` está definido, guarda un `.prof` de cProfile por
+  trabajo (pstats: snakeviz, `python -m pstats`...). Se perfila un trabajo
+  a la vez: los que arrancan mientras otro se perfila corren sin perfilar
+  (Python 3.12 no admite dos perfiladores activos). Para muestreo externo,
+  el evento `job` incluye pid y thread id (`py-spy dump --pid`).
+
+Con la instrumentación apagada, `stage()` devuelve un objeto nulo compartido
+y `timed` llama directamente a la función: el costo es una comprobación de
+bandera por llamada.
+"""
+from __future__ import annotations
+
+import functools
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+Event = Dict[str, Any]
+Sink = Callable[[Event], None]
+
+_TRUE = ("1", "true", "yes", "on")
+
+_enabled = os.environ.get("KARIOKA_TRACE", "").lower() in _TRUE
+_sink: Optional[Sink] = None
+_profile_dir: Optional[str] = os.environ.get("KARIOKA_PROFILE_DIR") or None
+_local = threading.local()
+_lock = threading.Lock()
+_profile_lock = threading.Lock()  # cProfile: un perfilador activo por proceso
+_counters: Dict[str, int] = {}
+_stats: Dict[str, Dict[str, float]] = {}
+
+
+# Sinks
+class JsonLinesSink:
+    """Agrega un evento JSON por línea a `path` (seguro entre hilos)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Event) -> None:
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class LoggingSink:
+    """Escribe cada evento como JSON en el logger `karioka_ok.metrics`."""
+
+    def __call__(self, event: Event) -> None:
+        from karioka_ok.utils.logging_config import get_logger
+
+        get_logger("karioka_ok.metrics").info(json.dumps(event, ensure_ascii=False, default=str))
+
+
+class MemorySink:
+    """Guarda los eventos en una lista (pruebas, benchmarks)."""
+
+    def __init__(self) -> None:
+        self.events: List[Event] = []
+
+    def __call__(self, event: Event) -> None:
+        self.events.append(event)
+
+
+def _default_sink() -> Sink:
+    path = os.environ.get("KARIOKA_TRACE_FILE")
+    return JsonLinesSink(path) if path else LoggingSink()
+
+
+# Configuración
+def enabled() -> bool:
+    return _enabled
+
+
+def configure(
+    enabled: Optional[bool] = None,
+    sink: Optional[Sink] = None,
+    profile_dir: Optional[str] = None,
+) -> None:
+    """Activa/desactiva la instrumentación y cambia el sink o el directorio de perfiles."""
+    global _enabled, _sink, _profile_dir
+    if enabled is not None:
+        _enabled = enabled
+    if sink is not None:
+        _sink = sink
+    if profile_dir is not None:
+        _profile_dir = profile_dir or None
+
+
+def emit(event: Event) -> None:
+    global _sink
+    if _sink is None:
+        _sink = _default_sink()
+    try:
+        _sink(event)
+    except Exception:
+        # La instrumentación nunca debe romper el pipeline
+        pass
+
+
+def peak_rss() -> Optional[int]:
+    """Pico de memoria residente del proceso en bytes (None si no se puede medir)."""
+    try:
+        import resource
+        import sys
+    except ImportError:  # pragma: no cover - Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+# Etapas
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def add_bytes(self, n: int) -> None:
+        pass
+
+    def set(self, **fields: Any) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Stage:
+    """Etapa cronometrada; emite su evento al salir."""
+
+    __slots__ = ("name", "fields", "bytes", "_start", "_parent")
+
+    def __init__(self, name: str, fields: Dict[str, Any]) -> None:
+        self.name = name
+        self.fields = fields
+        self.bytes = 0
+        self._start = 0.0
+        self._parent: Optional[str] = None
+
+    def add_bytes(self, n: int) -> None:
+        self.bytes += int(n)
+
+    def set(self, **fields: Any) -> None:
+        self.fields.update(fields)
+
+    def __enter__(self) -> "Stage":
+        stack = _stack()
+        self._parent = stack[-1] if stack else None
+        stack.append(self.name)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        seconds = time.perf_counter() - self._start
+        _stack().pop()
+        _record(self.name, seconds, self.bytes)
+        event = {
+            "event": "stage",
+            "name": self.name,
+            "seconds": round(seconds, 6),
+            "bytes": self.bytes,
+            "peak_rss": peak_rss(),
+            "job": getattr(_local, "job", None),
+            "parent": self._parent,
+            "thread": threading.current_thread().name,
+            "ok": exc_type is None,
+            "ts": time.time(),
+        }
+        if exc_type is not None:
+            event["error"] = exc_type.__name__
+        event.update(self.fields)
+        emit(event)
+
+
+def _stack() -> List[str]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def stage(name: str, **fields: Any):
+    """Context manager de una etapa. Sin instrumentación, devuelve un objeto nulo."""
+    if not _enabled:
+        return _NULL_STAGE
+    return Stage(name, fields)
+
+
+def timed(name: Optional[str] = None) -> Callable[[F], F]:
+    """Decorador: cronometra cada llamada como la etapa `name` (o el nombre calificado)."""
+
+    def decorator(fn: F) -> F:
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Stage(label, {}):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+# Contadores y agregados
+def count(name: str, n: int = 1) -> None:
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def _record(name: str, seconds: float, nbytes: int) -> None:
+    with _lock:
+        s = _stats.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "bytes": 0})
+        s["calls"] += 1
+        s["seconds"] += seconds
+        s["max_seconds"] = max(s["max_seconds"], seconds)
+        s["bytes"] += nbytes
+
+
+def summary() -> Dict[str, Any]:
+    """Agregado por etapa (llamadas, segundos, máximo, bytes) y contadores."""
+    with _lock:
+        return {
+            "stages": {k: dict(v) for k, v in _stats.items()},
+            "counters": dict(_counters),
+            "peak_rss": peak_rss(),
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+        _counters.clear()
+
+
+# Trabajos
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_")[:80] or "job"
+
+
+@contextmanager
+def job_scope(name: str) -> Iterator[None]:
+    """Asocia los eventos del hilo al trabajo `name` y, si se pidió, lo perfila."""
+    if not _enabled and _profile_dir is None:
+        yield
+        return
+    previous = getattr(_local, "job", None)
+    _local.job = name
+    profiler = None
+    if _profile_dir is not None and _profile_lock.acquire(blocking=False):
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except BaseException:
+            _profile_lock.release()
+            raise
+    start = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        seconds = time.perf_counter() - start
+        _local.job = previous
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+            os.makedirs(_profile_dir, exist_ok=True)  # type: ignore[arg-type]
+            path = os.path.join(_profile_dir, f"{_slug(name)}-{os.getpid()}-{int(time.time() * 1000)}.prof")  # type: ignore[arg-type]
+            profiler.dump_stats(path)
+        if _enabled:
+            emit({
+                "event": "job", "name": name, "seconds": round(seconds, 6), "ok": ok,
+                "pid": os.getpid(), "thread_id": threading.get_ident(), "peak_rss": peak_rss(), "ts": time.time(),
+            })
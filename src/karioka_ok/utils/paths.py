@@ -0,0 +1,26 @@
+"""Rutas de datos locales de la app (caché en disco).
+
+Por defecto se usa `$XDG_CACHE_HOME/karioka_ok` (o `~/.cache/karioka_ok`).
+La variable de entorno `KARIOKA_CACHE_DIR` permite redirigirla, p. ej. en
+Docker o en pruebas.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+
+def cache_root() -> Path:
+    """Directorio raíz de la caché de Karioka.ok (no se crea aquí)."""
+    env = os.environ.get("KARIOKA_CACHE_DIR")
+    if env:
+        return Path(env)
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "karioka_ok"
+
+
+def cache_dir(name: str) -> Path:
+    """Subdirectorio de caché `name`, creado si no existe."""
+    path = cache_root() / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
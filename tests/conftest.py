@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+# Igual que main.py: hacer importable el paquete desde `src/`
+SRC_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+
+@pytest.fixture
+def sine_audio():
+    """Fábrica de `AudioData` senoidal en memoria: un canal por frecuencia de `freqs`."""
+    import numpy as np
+
+    from karioka_ok.audio.audio_processor import AudioData
+    from karioka_ok.audio.buffers import array_to_segment
+
+    def make(seconds=1.0, sr=8000, freqs=(220.0,), path=None):
+        t = np.arange(int(sr * seconds)) / sr
+        seg = array_to_segment(0.3 * np.stack([np.sin(2 * np.pi * f * t) for f in freqs]), sr)
+        return AudioData(segment=seg, sample_rate=sr, channels=len(freqs), path=path)
+
+    return make
+
+
+@pytest.fixture
+def wav_file(sine_audio):
+    """Fábrica de WAV senoidales mono de 16 bits; devuelve la ruta como `str`."""
+
+    def write(path, seconds=0.5, sr=8000, freq=220.0):
+        sine_audio(seconds, sr, (freq,)).segment.export(str(path), format="wav")
+        return str(path)
+
+    return write
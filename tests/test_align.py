@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from karioka_ok.audio.audio_processor import AudioData
+from karioka_ok.audio.buffers import array_to_segment
+from karioka_ok.lyrics import align
+from karioka_ok.lyrics.align import FeatureCache, align_lyrics, compute_features, syllables
+from karioka_ok.lyrics.lyrics_loader import Lyrics
+
+SR = 22050
+LINES = [
+    "la la la la",
+    "mi corazón canta",
+    "sol",
+    "una noche de verano larga y clara",
+    "adiós amor",
+    "otra vez la misma canción",
+]
+
+
+def _sung_track(seed=0):
+    """Una "sílaba" (tono con ataque) por grupo de vocales, pausas entre líneas."""
+    rng = np.random.default_rng(seed)
+    noise = lambda s: 0.01 * rng.standard_normal(int(s * SR))  # noqa: E731
+    chunks, starts, t = [noise(1.5)], [], 1.5
+    for line in LINES:
+        starts.append(t)
+        for _ in range(syllables(line)):
+            tt = np.arange(int(0.25 * SR)) / SR
+            f0 = 200 + 100 * rng.random()
+            env = np.minimum(1, tt / 0.01) * np.exp(-3 * tt)
+            chunks += [0.4 * env * sum(np.sin(2 * np.pi * f0 * k * tt) / k for k in (1, 2, 3)), noise(0.05)]
+            t += 0.3
+        gap = 0.8 + rng.random()
+        chunks.append(noise(gap))
+        t += gap
+    y = np.concatenate(chunks)
+    audio = AudioData(segment=array_to_segment(y[None], SR), sample_rate=SR, channels=1)
+    return audio, starts
+
+
+def test_aligns_line_starts_near_truth():
+    audio, starts = _sung_track()
+    timed = align_lyrics(audio, Lyrics("\n\n".join(LINES) + "\n"))
+    assert [timed.line(i) for i in range(len(timed))] == LINES
+    np.testing.assert_allclose(list(timed.line_times), starts, atol=0.4)
+
+
+def test_features_are_chunk_invariant(monkeypatch):
+    audio, _ = _sung_track()
+    whole = compute_features(audio)
+    monkeypatch.setattr(align, "BLOCK_FRAMES", 37)
+    chunked = compute_features(audio)
+    np.testing.assert_allclose(chunked.energy, whole.energy, rtol=1e-4, atol=1e-3)
+    np.testing.assert_allclose(chunked.onset, whole.onset, atol=1e-4)
+    assert len(whole) == -(-audio.frame_count // int(round(0.02 * SR)))
+
+
+def test_feature_cache_round_trip(tmp_path, monkeypatch):
+    audio, _ = _sung_track()
+    cache = FeatureCache(str(tmp_path))
+    first = cache.get_or_compute(audio)
+    assert cache.path_for(audio).exists()
+    monkeypatch.setattr(align, "compute_features", lambda *a, **k: pytest.fail("no debería recalcular"))
+    second = cache.get_or_compute(audio)
+    np.testing.assert_array_equal(second.onset, first.onset)
+    assert second.hop_seconds == pytest.approx(first.hop_seconds)
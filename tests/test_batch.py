@@ -0,0 +1,110 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from karioka_ok.jobs.batch import BatchItem, build_items, is_up_to_date, load_manifest, run_batch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_manifest_csv_and_json(tmp_path):
+    (tmp_path / "m.csv").write_text(
+        "path,semitones,formats,description,cover,lyrics\n"
+        "a.wav,2,mp3;flac,Demo,cover.jpg,a.txt\n"
+        "b.wav,,,,,\n",
+        encoding="utf-8",
+    )
+    items = load_manifest(str(tmp_path / "m.csv"), default_semitones=-1, default_formats=["wav"])
+    assert items[0] == BatchItem(str(tmp_path / "a.wav"), 2, ["mp3", "flac"], "Demo",
+                                 str(tmp_path / "cover.jpg"), str(tmp_path / "a.txt"))
+    assert (items[1].semitones, items[1].formats, items[1].cover) == (-1, ["wav"], None)
+
+    (tmp_path / "m.json").write_text(json.dumps({"items": [{"path": "a.wav", "formats": ["WAV"]}]}))
+    assert load_manifest(str(tmp_path / "m.json"))[0].formats == ["wav"]
+
+
+def test_batch_isolates_failures_and_resumes(tmp_path, wav_file):
+    src, out = tmp_path / "src", tmp_path / "out"
+    src.mkdir()
+    wav_file(src / "a.wav")
+    wav_file(src / "b.wav")
+    (src / "broken.wav").write_bytes(b"not audio")
+
+    items = build_items(str(src), semitones=1, formats=["wav"])
+    summary = run_batch(items, str(out), workers=2)
+
+    assert [r.status for r in summary.results] == ["ok", "ok", "failed"]
+    assert os.path.exists(out / "a_+1.wav") and os.path.exists(out / "b_+1.wav")
+    assert summary.audio_seconds == 1.0
+    assert summary.tracks_per_minute > 0 and summary.realtime_factor > 0
+    assert is_up_to_date(items[0], str(out))
+
+    again = run_batch(items, str(out), workers=2)
+    assert [r.status for r in again.results] == ["skipped", "skipped", "failed"]
+
+
+def test_cli_batch_subcommand(tmp_path, wav_file):
+    src, out = tmp_path / "src", tmp_path / "out"
+    src.mkdir()
+    wav_file(src / "a.wav")
+    proc = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "main.py"), "batch", str(src), "--out", str(out),
+         "--formats", "wav", "--workers", "1"],
+        capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert "pistas/min" in proc.stdout
+    assert os.path.exists(out / "a.wav")
+
+
+def test_recursive_scan_mirrors_subfolders_and_skips_output(tmp_path, wav_file):
+    src = tmp_path / "src"
+    out = src / "salida"  # dentro de la fuente: no se vuelve a escanear
+    for folder in ("a", "b"):
+        (src / folder).mkdir(parents=True)
+        wav_file(src / folder / "tema.wav")
+
+    items = build_items(str(src), formats=["wav"], exclude=str(out))
+    summary = run_batch(items, str(out), workers=2)
+    assert [r.status for r in summary.results] == ["ok", "ok"]
+    assert os.path.exists(out / "a" / "tema.wav") and os.path.exists(out / "b" / "tema.wav")
+    assert len(build_items(str(src), formats=["wav"], exclude=str(out))) == 2
+
+    # Fuentes fuera de la carpeta del manifiesto con el mismo nombre: la segunda no pisa a la primera
+    (tmp_path / "lista").mkdir()
+    (tmp_path / "lista" / "m.csv").write_text(
+        f"path,formats\n{src / 'a' / 'tema.wav'},wav\n{src / 'b' / 'tema.wav'},wav\n", encoding="utf-8"
+    )
+    clash = run_batch(load_manifest(str(tmp_path / "lista" / "m.csv")), str(tmp_path / "plano"), workers=1)
+    assert [r.status for r in clash.results] == ["ok", "failed"] and "coinciden" in clash.results[1].error
+
+
+def test_manifest_semitones_accept_floats_and_report_bad_rows(tmp_path):
+    (tmp_path / "m.csv").write_text("path,semitones\na.wav,2.0\nb.wav,-3\nc.wav,13\n", encoding="utf-8")
+    with pytest.raises(ValueError, match=r"fila 3: semitonos inválidos '13'"):
+        load_manifest(str(tmp_path / "m.csv"))
+
+    (tmp_path / "m.json").write_text(json.dumps([{"path": "a.wav", "semitones": 2.0}, {"path": "b.wav", "semitones": 1.5}]))
+    with pytest.raises(ValueError, match="fila 2"):
+        load_manifest(str(tmp_path / "m.json"))
+
+    (tmp_path / "ok.csv").write_text("path,semitones\na.wav,2.0\nb.wav,-12\n", encoding="utf-8")
+    assert [i.semitones for i in load_manifest(str(tmp_path / "ok.csv"))] == [2, -12]
+
+
+def test_changed_settings_are_not_up_to_date(tmp_path, wav_file):
+    src, out = tmp_path / "src", tmp_path / "out"
+    src.mkdir()
+    wav_file(src / "a.wav")
+    (item,) = build_items(str(src), formats=["wav"])
+    assert run_batch([item], str(out), workers=1).results[0].status == "ok"
+    assert is_up_to_date(item, str(out))
+
+    for changed in (dict(chain="trim_silence"), dict(loudness=-14.0), dict(vocals="center")):
+        assert not is_up_to_date(BatchItem(item.path, formats=["wav"], **changed), str(out))
+    (tweaked,) = build_items(str(src), formats=["wav"], loudness=-14.0)
+    assert run_batch([tweaked], str(out), workers=1).results[0].status == "ok"
+    assert is_up_to_date(tweaked, str(out)) and not is_up_to_date(item, str(out))
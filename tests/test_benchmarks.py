@@ -0,0 +1,45 @@
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks import run  # noqa: E402
+from benchmarks.harness import compare, load_results, measure  # noqa: E402
+
+
+def test_compare_flags_only_regressions_over_threshold():
+    base = {"a": {"seconds": 1.0, "peak_bytes": 100}, "gone": {"seconds": 1.0, "peak_bytes": 1}}
+    cur = {"a": {"seconds": 1.05, "peak_bytes": 150}, "new": {"seconds": 2.0, "peak_bytes": 1}}
+
+    rows = {(r.id, r.metric): r for r in compare(base, cur, threshold=0.10)}
+
+    assert not rows[("a", "seconds")].regressed
+    assert rows[("a", "peak_bytes")].regressed
+    assert rows[("new", "seconds")].status == "nuevo"
+    assert rows[("gone", "seconds")].status == "ausente"
+    assert not rows[("gone", "seconds")].regressed
+
+
+def test_measure_reports_peak_memory():
+    stats = measure(lambda: bytearray(4 * 1024 * 1024), repeat=2)
+    assert stats["peak_bytes"] >= 4 * 1024 * 1024
+    assert 0 < stats["seconds"] <= stats["mean_seconds"]
+
+
+def test_runner_writes_json_and_detects_regression(tmp_path):
+    out = tmp_path / "bench.json"
+    assert run.main(["--quick", "--repeat", "1", "--filter", "change_pitch/resample", "--out", str(out)]) == 0
+    results = load_results(str(out))
+    assert results and all(r["case"] == "change_pitch/resample" for r in results.values())
+
+    # Una línea base 100 veces más rápida hace que la ejecución actual sea una regresión
+    data = json.loads(out.read_text())
+    for r in data["results"]:
+        r["seconds"] /= 100.0
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(data))
+    argv = ["--quick", "--repeat", "1", "--filter", "change_pitch/resample", "--compare", str(baseline)]
+    assert run.main(argv) == 1
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from pydub import AudioSegment
+
+from karioka_ok.audio.audio_processor import AudioData, change_pitch_semitones
+from karioka_ok.audio.buffers import (
+    array_to_segment,
+    segment_to_array,
+    segment_to_float,
+)
+
+
+def _stereo_segment(n=1000, sample_width=2, frame_rate=8000):
+    left = np.arange(n) % 100 - 50
+    right = -left
+    gain = 100 if sample_width > 1 else 1
+    ints = (np.stack([left, right]) * gain).astype(f"<i{sample_width}")
+    data = np.ascontiguousarray(ints.T).tobytes()
+    return AudioSegment(data=data, sample_width=sample_width, frame_rate=frame_rate, channels=2), ints
+
+
+def test_segment_to_array_is_view_over_raw_data():
+    seg, ints = _stereo_segment()
+    view = segment_to_array(seg)
+    assert view.shape == (2, 1000)
+    np.testing.assert_array_equal(view, ints)
+    # Sin copia: comparte memoria con los bytes del segmento
+    assert np.shares_memory(view, np.frombuffer(seg.raw_data, dtype=np.uint8))
+    assert not view.flags.writeable
+
+
+@pytest.mark.parametrize("sample_width", [1, 2, 4])
+def test_roundtrip_float_preserves_samples(sample_width):
+    seg, _ = _stereo_segment(sample_width=sample_width)
+    y = segment_to_float(seg)
+    assert y.dtype == np.float32
+    assert np.abs(y).max() <= 1.0
+    back = array_to_segment(y, seg.frame_rate, seg.sample_width)
+    assert back.raw_data == seg.raw_data
+    assert (back.channels, back.frame_rate, back.sample_width) == (2, 8000, sample_width)
+
+
+def test_float_is_clipped_on_conversion():
+    seg = array_to_segment(np.array([[2.0, -2.0, 0.5]]), 8000, 2)
+    assert list(segment_to_array(seg)[0]) == [32767, -32768, 16384]
+
+
+def test_change_pitch_keeps_layout_and_shifts_frequency():
+    pytest.importorskip("librosa")
+    sr = 22050
+    t = np.arange(sr) / sr
+    tone = 0.5 * np.sin(2 * np.pi * 440.0 * t)
+    seg = array_to_segment(np.stack([tone, tone]), sr, 2)
+    audio = AudioData(segment=seg, sample_rate=sr, channels=2)
+
+    shifted = change_pitch_semitones(audio, 12)
+
+    assert (shifted.channels, shifted.sample_rate) == (2, sr)
+    assert len(shifted.segment.raw_data) == len(seg.raw_data)
+    y = segment_to_float(shifted.segment)
+    spectrum = np.abs(np.fft.rfft(y[0]))
+    peak_hz = np.argmax(spectrum) * sr / y.shape[1]
+    assert abs(peak_hz - 880.0) < 10.0
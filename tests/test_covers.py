@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from karioka_ok.metadata import covers as covers_module
+from karioka_ok.metadata.covers import CoverCache, image_size, sniff_mime
+from karioka_ok.metadata.metadata_editor import TrackMetadata, read_metadata, set_metadata, set_metadata_many
+
+QtGui = pytest.importorskip("PySide6.QtGui")
+
+
+def _image(path, width, height, fmt, alpha=False):
+    image = QtGui.QImage(width, height, QtGui.QImage.Format_ARGB32 if alpha else QtGui.QImage.Format_RGB32)
+    image.fill(QtGui.QColor(200, 40, 90, 128 if alpha else 255))
+    assert image.save(str(path), fmt)
+    return str(path)
+
+
+def _silence(path):
+    sf.write(str(path), np.zeros((4000, 2), dtype=np.float32), 8000)
+    return str(path)
+
+
+def test_png_cover_is_tagged_as_png(tmp_path):
+    from mutagen.flac import FLAC
+    from mutagen.id3 import ID3
+
+    cover = _image(tmp_path / "cover.png", 300, 200, "PNG")
+    data = open(cover, "rb").read()
+    assert sniff_mime(data) == "image/png" and image_size(data) == (300, 200)
+    flac, mp3 = _silence(tmp_path / "a.flac"), _silence(tmp_path / "a.mp3")
+    meta = TrackMetadata(description="x", cover_image_path=cover)
+    cache = CoverCache(str(tmp_path / "cache"))
+    set_metadata(flac, meta, covers=cache)
+    set_metadata(mp3, meta, covers=cache)
+
+    picture = FLAC(flac).pictures[0]
+    assert (picture.mime, picture.width, picture.height, picture.data) == ("image/png", 300, 200, data)
+    assert ID3(mp3).getall("APIC")[0].mime == "image/png"
+    assert read_metadata(mp3).cover_mime == "image/png"
+
+
+def test_large_covers_are_resized_once_and_cached_on_disk(tmp_path, monkeypatch):
+    big = _image(tmp_path / "big.jpg", 3000, 1500, "JPG")
+    small = _image(tmp_path / "small.png", 100, 100, "PNG", alpha=True)
+    cache = CoverCache(str(tmp_path / "cache"), max_size=600)
+
+    cover = cache.load(big)
+    assert (cover.mime, cover.width, cover.height) == ("image/jpeg", 600, 300)
+    assert image_size(cover.data) == (600, 300)
+    assert cache.load(small).data == open(small, "rb").read()  # ya cabe: se incrusta sin recomprimir
+
+    # Otro proceso (otra instancia) la toma del disco sin volver a reescalar
+    def fail(*args):
+        raise AssertionError("no debería reescalar")
+
+    monkeypatch.setattr(covers_module, "_rescale", fail)
+    assert CoverCache(str(tmp_path / "cache"), max_size=600).load(big) == cover
+    assert CoverCache(str(tmp_path / "other"), max_size=0).load(small).mime == "image/png"
+
+
+def test_set_metadata_many_loads_each_cover_once_and_reports_errors(tmp_path):
+    cover = _image(tmp_path / "cover.jpg", 64, 64, "JPG")
+    loads = []
+
+    class CountingCache(CoverCache):
+        def load(self, path):
+            loads.append(path)
+            return super().load(path)
+
+    files = [_silence(tmp_path / f"t{i}.{fmt}") for i, fmt in enumerate(("flac", "mp3", "flac", "mp3"))]
+    meta = TrackMetadata(description="lote", cover_image_path=cover)
+    items = [(p, meta) for p in files]
+    items.append((str(tmp_path / "t.wav"), meta))  # sin etiquetas: se ignora
+    items.append((str(tmp_path / "missing.flac"), meta))
+
+    errors = set_metadata_many(items, covers=CountingCache(str(tmp_path / "cache")), workers=3)
+    assert loads == [cover]
+    assert errors[:5] == [None] * 5 and errors[5] is not None
+    for path in files:
+        embedded = read_metadata(path)
+        assert embedded.description == "lote" and embedded.cover_mime == "image/jpeg"
+
+
+def test_memory_cache_is_bounded_and_bad_images_are_rejected(tmp_path):
+    paths = [_image(tmp_path / f"c{i}.png", 50 + i, 50, "PNG") for i in range(4)]
+    size = max(len(open(p, "rb").read()) for p in paths)
+    cache = CoverCache(str(tmp_path / "cache"), memory_bytes=2 * size)
+    for p in paths:
+        cache.load(p)
+    assert len(cache._by_hash) == 2 and cache._bytes <= 2 * size
+
+    with pytest.raises(ValueError):
+        sniff_mime(b"no soy una imagen")
+    (tmp_path / "texto.jpg").write_bytes(b"no soy una imagen")
+    with pytest.raises(ValueError):
+        cache.load(str(tmp_path / "texto.jpg"))
+    # Firma de GIF pero contenido roto: QImage no la decodifica y no se incrusta cruda
+    (tmp_path / "rota.gif").write_bytes(b"GIF89a" + b"\x00" * 40)
+    with pytest.raises(ValueError):
+        cache.load(str(tmp_path / "rota.gif"))
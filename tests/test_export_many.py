@@ -0,0 +1,106 @@
+import os
+import shutil
+import time
+import wave
+
+import pytest
+from pydub import AudioSegment
+
+from karioka_ok.audio import audio_processor
+from karioka_ok.audio.audio_processor import export_many
+from karioka_ok.audio.encoders import EncoderError, FanOutEncoder, PCMEncoder
+from karioka_ok.audio.graph import Graph
+from karioka_ok.jobs.core import JobCancelled
+from karioka_ok.jobs.tasks import graph_export_job
+
+HAS_FFMPEG = shutil.which(AudioSegment.converter) is not None
+
+
+def _frames(path):
+    with wave.open(path, "rb") as wav:
+        return wav.readframes(wav.getnframes())
+
+
+def test_export_many_shifts_once_and_writes_every_target(tmp_path, monkeypatch, sine_audio):
+    audio = sine_audio(freqs=(220, 330))
+    calls = []
+    original = audio_processor._shift_pitch
+    monkeypatch.setattr(audio_processor, "_shift_pitch", lambda a, s: calls.append(s) or original(a, s))
+
+    targets = [str(tmp_path / "a.wav"), (str(tmp_path / "b.out"), "wav")]
+    paths = export_many(audio, targets, semitones=1)
+
+    assert calls == [1]
+    assert paths == [str(tmp_path / "a.wav"), str(tmp_path / "b.out")]
+    assert _frames(paths[0]) == _frames(paths[1])
+    assert len(_frames(paths[0])) == len(audio.segment.raw_data)
+
+
+@pytest.mark.skipif(not HAS_FFMPEG, reason="requiere ffmpeg")
+def test_export_many_encodes_formats_in_parallel(tmp_path, sine_audio):
+    paths = export_many(sine_audio(freqs=(220, 330)), [str(tmp_path / f"x.{fmt}") for fmt in ("wav", "mp3", "flac")])
+    for path in paths:
+        assert AudioSegment.from_file(path).channels == 2
+
+
+@pytest.mark.skipif(HAS_FFMPEG, reason="simula ffmpeg ausente")
+def test_failed_target_removes_partial_outputs(tmp_path, sine_audio):
+    with pytest.raises(EncoderError):
+        export_many(sine_audio(freqs=(220, 330)), [str(tmp_path / "a.wav"), str(tmp_path / "a.mp3")])
+    assert os.listdir(tmp_path) == []
+
+
+def test_cancelling_job_aborts_all_encoders(tmp_path, sine_audio):
+    targets = [(str(tmp_path / "a.wav"), "wav"), (str(tmp_path / "b.wav"), "wav")]
+    job = graph_export_job(sine_audio(5.0, freqs=(220, 330)), Graph(), targets)
+
+    def on_progress(p):
+        if p.stage == "render" and p.stage_fraction == 0.0:
+            job.cancel()
+
+    with pytest.raises(JobCancelled):
+        job.run(on_progress=on_progress)
+    assert os.listdir(tmp_path) == []
+
+
+class _SlowEncoder(PCMEncoder):
+    def __init__(self):
+        self.writing = False
+        self.events = []
+
+    def write(self, pcm):
+        self.writing = True
+        time.sleep(0.005)
+        self.events.append("write")
+        self.writing = False
+
+    def close(self):
+        self.events.append("close")
+
+    def abort(self):
+        # Un abort con un write en curso cerraría el archivo bajo los pies del hilo
+        assert not self.writing
+        self.events.append("abort")
+
+
+def test_fan_out_abort_joins_feeders_before_aborting():
+    encoders = [_SlowEncoder(), _SlowEncoder()]
+    fan = FanOutEncoder(encoders, max_pending=2)
+    for _ in range(6):
+        fan.write(b"\0\0")
+    fan.abort()
+    for enc in encoders:
+        assert enc.events[-1] == "abort" and "close" not in enc.events
+
+
+def test_graph_export_feeds_every_target_through_the_fan_out(tmp_path, monkeypatch, sine_audio):
+    from karioka_ok.audio import encoders
+
+    fans = []
+    monkeypatch.setattr(encoders, "FanOutEncoder", lambda encs: fans.append(FanOutEncoder(encs)) or fans[-1])
+    targets = [(str(tmp_path / "a.wav"), "wav"), (str(tmp_path / "b.wav"), "wav")]
+    audio = sine_audio(2.0, freqs=(220, 330))
+    Graph().export(audio, targets)
+
+    assert len(fans) == 1 and len(fans[0].encoders) == 2
+    assert _frames(targets[0][0]) == _frames(targets[1][0]) == audio.segment.raw_data
@@ -0,0 +1,116 @@
+import random
+
+import numpy as np
+import soundfile as sf
+
+from karioka_ok.jobs.batch import BatchItem, run_batch
+from karioka_ok.library.fingerprint import (
+    DEFAULT_MAX_DISTANCE,
+    decode_excerpt,
+    fingerprint_file,
+    group_duplicates,
+    hamming,
+)
+from karioka_ok.library.index import Library
+
+SR = 22050
+
+
+def _song(seed, seconds=40.0, sr=SR):
+    """Acordes, melodía y batería sintéticos: cada semilla es otra canción."""
+    rng = np.random.default_rng(seed)
+    beat = 60.0 / rng.uniform(80, 150)
+    t = np.arange(int(sr * seconds)) / sr
+    x = np.zeros_like(t)
+    chords, melody = rng.integers(0, 12, size=4), rng.integers(0, 24, size=16)
+    for i in range(int(seconds / beat) + 1):
+        a, b = int(i * beat * sr), int((i + 1) * beat * sr)
+        root = chords[(i // 4) % 4]
+        for interval in (0, 4, 7):
+            x[a:b] += 0.1 * np.sin(2 * np.pi * 110 * 2 ** ((root + interval) / 12) * t[a:b])
+        x[a:b] += 0.15 * np.sin(2 * np.pi * 220 * 2 ** (melody[i % 16] / 12) * t[a:b]) * np.exp(-(t[a:b] - t[a]) * 3)
+        n = min(int(0.08 * sr), len(x) - a)
+        if n > 0:
+            x[a:a + n] += rng.standard_normal(n) * np.exp(-np.arange(n) / sr * 40) * 0.4
+    return (0.8 * x / np.abs(x).max()).astype(np.float32)
+
+
+def _copy_from_other_source(x):
+    """Otra "edición": 48 kHz, -6 dB, 2 s de silencio al principio."""
+    from scipy.signal import resample_poly
+
+    y = resample_poly(x, 320, 147).astype(np.float32) * 0.5
+    return np.concatenate([np.zeros(2 * 48000, dtype=np.float32), y]), 48000
+
+
+def test_copies_are_close_and_other_songs_far(tmp_path):
+    x = _song(1)
+    sf.write(str(tmp_path / "a.wav"), np.stack([x, x]).T, SR, subtype="PCM_16")
+    y, sr = _copy_from_other_source(x)
+    sf.write(str(tmp_path / "a_copy.flac"), y, sr)
+    sf.write(str(tmp_path / "b.wav"), _song(2), SR, subtype="PCM_16")
+
+    # Solo se decodifica el tramo central
+    samples, rate, duration = decode_excerpt(str(tmp_path / "a.wav"), seconds=10.0)
+    assert rate == SR and len(samples) == 10 * SR and duration == 40.0
+    np.testing.assert_allclose(samples, x[15 * SR:25 * SR], atol=1e-4)
+
+    a, copy, other = (fingerprint_file(str(tmp_path / name))[1] for name in ("a.wav", "a_copy.flac", "b.wav"))
+    assert hamming(a, copy) <= DEFAULT_MAX_DISTANCE
+    assert hamming(a, other) > DEFAULT_MAX_DISTANCE
+
+
+def test_lsh_groups_near_fingerprints_keeping_first_as_representative():
+    rng = random.Random(7)
+    items = [(f"t{i}", rng.getrandbits(128), 200.0) for i in range(2000)]
+    expected = {}
+    for i in range(0, 100, 10):
+        fingerprint = items[i][1]
+        for bit in rng.sample(range(128), 10):
+            fingerprint ^= 1 << bit
+        items.append((f"dup{i}", fingerprint, 203.0))
+        expected[f"t{i}"] = [f"t{i}", f"dup{i}"]
+    items.append(("short", items[0][1], 60.0))  # misma huella, otra duración: no es la misma pista
+
+    groups = group_duplicates(items)
+    assert sorted(groups) == sorted(expected.values())
+
+
+def test_library_fingerprints_once_and_groups_duplicates(tmp_path):
+    music = tmp_path / "music"
+    music.mkdir()
+    x = _song(3)
+    sf.write(str(music / "uno.wav"), x, SR, subtype="PCM_16")
+    y, sr = _copy_from_other_source(x)
+    sf.write(str(music / "uno (remaster).flac"), y, sr)
+    sf.write(str(music / "dos.wav"), _song(4), SR, subtype="PCM_16")
+    library = Library(str(tmp_path / "lib.sqlite"))
+
+    first = library.scan([str(music)], fingerprint=True)
+    assert first.added == 3 and first.fingerprinted == 3 and not first.failed
+    groups = library.duplicates()
+    assert [[t.title for t in g] for g in groups] == [["uno (remaster)", "uno"]]
+
+    # Las huellas van por hash: un archivo copiado no se vuelve a analizar
+    (music / "copia.wav").write_bytes((music / "uno.wav").read_bytes())
+    again = library.scan([str(music)], fingerprint=True)
+    assert again.added == 1 and again.fingerprinted == 0
+    assert len(library.duplicates()[0]) == 3
+
+
+def test_batch_dedupe_renders_each_song_once(tmp_path):
+    x = _song(5)
+    sf.write(str(tmp_path / "a.wav"), x, SR, subtype="PCM_16")
+    sf.write(str(tmp_path / "a_again.wav"), x * 0.7, SR, subtype="PCM_16")
+    sf.write(str(tmp_path / "b.wav"), _song(6), SR, subtype="PCM_16")
+    items = [BatchItem(str(tmp_path / name), semitones=1, formats=["wav"]) for name in ("a.wav", "a_again.wav", "b.wav")]
+    items.append(BatchItem(str(tmp_path / "a_again.wav"), semitones=2, formats=["wav"]))  # otros ajustes
+    out = tmp_path / "out"
+
+    summary = run_batch(items, str(out), workers=2, dedupe=True, library=Library(str(tmp_path / "lib.sqlite")))
+    statuses = [(r.path.rsplit("/", 1)[-1], r.status) for r in summary.results]
+    assert sorted(statuses) == sorted([("a.wav", "ok"), ("a_again.wav", "duplicate"), ("b.wav", "ok"),
+                                       ("a_again.wav", "ok")])
+    duplicate = next(r for r in summary.results if r.status == "duplicate")
+    assert duplicate.duplicate_of == items[0].path and duplicate.outputs == [str(out / "a_+1.wav")]
+    assert sorted(p.name for p in out.iterdir() if not p.name.startswith(".")) == ["a_+1.wav", "a_again_+2.wav", "b_+1.wav"]
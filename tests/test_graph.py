@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from karioka_ok.audio.audio_processor import AudioData
+from karioka_ok.audio.buffers import array_to_segment, audio_to_float
+from karioka_ok.audio.graph import (
+    Gain,
+    Graph,
+    Normalize,
+    PitchShift,
+    Resample,
+    TrimSilence,
+    VocalReduction,
+)
+from karioka_ok.audio.vocals import reduce_vocals
+from karioka_ok.jobs.tasks import graph_export_job
+
+SR = 22050
+
+
+def _audio(x):
+    return AudioData(segment=array_to_segment(x, SR), sample_rate=SR, channels=x.shape[0])
+
+
+def _stereo(seconds=1.0):
+    t = np.arange(int(SR * seconds)) / SR
+    voice = 0.3 * np.sin(2 * np.pi * 440 * t)
+    side = 0.2 * np.sin(2 * np.pi * 660 * t)
+    return np.stack([voice + side, voice - side]).astype(np.float32)
+
+
+def test_spec_and_json_round_trip():
+    graph = Graph([PitchShift(2), VocalReduction("center", 0.8), Normalize(-16.0, "peak"), Resample(32000)])
+    assert Graph.parse(graph.to_spec()) == graph
+    assert Graph.from_json(graph.to_json()) == graph
+    assert Graph.parse("gain:db=3;trim_silence") == Graph([Gain(3.0), TrimSilence()])
+    with pytest.raises(ValueError):
+        Graph.parse("reverb:room=1")
+
+
+def test_plan_drops_identities_and_merges_neighbours():
+    audio = _audio(_stereo(0.2))
+    graph = Graph([PitchShift(0), Gain(3.0), Gain(-1.0), Resample(SR), Resample(16000), Resample(11025)])
+    plan = graph.plan(audio)
+    assert plan.nodes == [Gain(2.0), Resample(11025)]
+    assert (plan.sample_rate, plan.channels) == (11025, 2)
+    assert Graph([Gain(2.0), Gain(-2.0)]).plan(audio).nodes == []
+
+
+def test_center_chain_matches_separate_calls_and_normalizes():
+    audio = _audio(_stereo())
+    expected = audio_to_float(reduce_vocals(audio, "center"))
+    out = audio_to_float(Graph([VocalReduction("center")]).render(audio))
+    np.testing.assert_allclose(out, expected, atol=1e-4)
+
+    normalized = audio_to_float(Graph([VocalReduction("center"), Normalize(-6.0, "peak")]).render(audio))
+    assert 20 * np.log10(np.abs(normalized).max()) == pytest.approx(-6.0, abs=0.05)
+
+
+def test_trim_silence_keeps_padding_across_blocks():
+    x = np.zeros((1, SR * 2), dtype=np.float32)
+    x[0, SR // 2:SR] = 0.5
+    graph = Graph([TrimSilence(threshold_db=-40.0, pad_ms=100)])
+    blocks = [b.copy() for b in graph.stream(_audio(x), block_size=1000)]
+    out = np.concatenate(blocks, axis=1)
+    pad = SR // 10
+    assert out.shape[1] == SR // 2 + 2 * pad
+    assert np.abs(out[:, :pad]).max() < 1e-3 and np.abs(out[:, pad:pad + 10]).min() > 0.4
+
+
+@pytest.mark.parametrize("nodes", [[TrimSilence(-40.0, 100)], [TrimSilence(-40.0, 100), Normalize(-20.0, "rms")]])
+def test_export_job_moves_synced_lyrics_with_trimmed_silence(tmp_path, monkeypatch, nodes):
+    from karioka_ok.jobs import tasks
+    from karioka_ok.lyrics.lyrics_loader import Lyrics
+    from karioka_ok.lyrics.timed import parse_lrc
+    from karioka_ok.metadata.metadata_editor import TrackMetadata
+
+    x = np.zeros((1, SR * 3), dtype=np.float32)
+    x[0, SR:2 * SR] = 0.5
+    timed = parse_lrc(["[00:01.00]hola", "[00:01.50]chau"])
+    meta = TrackMetadata(lyrics=Lyrics(text=timed.plain_text(), timed=timed))
+    tagged = []
+    monkeypatch.setattr(tasks, "_tag_results", lambda results, m: tagged.append(m))
+    graph_export_job(_audio(x), Graph(nodes), [(str(tmp_path / "a.wav"), "wav")], meta=meta).run()
+    # Se recortaron 0.9 s de silencio inicial (queda 0.1 s de margen)
+    assert list(tagged[0].lyrics.timed.line_times) == pytest.approx([0.1, 0.6], abs=1e-6)
+
+
+def test_export_job_writes_all_targets_with_progress(tmp_path):
+    audio = _audio(_stereo())
+    targets = [(str(tmp_path / "a.wav"), "wav"), (str(tmp_path / "b.wav"), "wav")]
+    progress = []
+    job = graph_export_job(audio, Graph([VocalReduction("center"), Resample(16000)]), targets)
+    results = job.run(on_progress=lambda p: progress.append(p.stage))
+    assert [r.out_path for r in results] == [p for p, _ in targets]
+    assert "render" in progress
+
+    import soundfile as sf
+
+    for path, _ in targets:
+        data, sr = sf.read(path)
+        assert sr == 16000 and data.shape == (16000, 2)
@@ -0,0 +1,113 @@
+import json
+import os
+
+import pytest
+
+from karioka_ok.jobs.core import Job
+from karioka_ok.lyrics.lyrics_loader import load_lyrics
+from karioka_ok.utils import instrumentation as inst
+
+
+@pytest.fixture
+def sink():
+    sink = inst.MemorySink()
+    inst.reset()
+    inst.configure(enabled=True, sink=sink)
+    yield sink
+    inst.configure(enabled=False, sink=inst.LoggingSink(), profile_dir="")
+    inst.reset()
+
+
+def test_disabled_is_a_shared_no_op():
+    assert not inst.enabled()
+    assert inst.stage("a") is inst.stage("b")
+
+    calls = []
+
+    @inst.timed("x")
+    def f(v):
+        calls.append(v)
+        return v * 2
+
+    assert f(2) == 4 and calls == [2]
+    assert inst.summary()["stages"] == {}
+
+
+def test_stage_events_nest_and_aggregate(sink):
+    with inst.stage("outer", track="a") as st:
+        st.add_bytes(10)
+        with inst.stage("inner"):
+            inst.count("hits")
+    with pytest.raises(ValueError):
+        with inst.stage("outer"):
+            raise ValueError
+
+    inner, outer, failed = sink.events
+    assert inner["name"] == "inner" and inner["parent"] == "outer"
+    assert outer["bytes"] == 10 and outer["track"] == "a" and outer["ok"]
+    assert not failed["ok"] and failed["error"] == "ValueError"
+
+    summary = inst.summary()
+    assert summary["stages"]["outer"]["calls"] == 2
+    assert summary["counters"] == {"hits": 1}
+
+
+def test_pipeline_functions_report_stages(sink, tmp_path):
+    lyrics = tmp_path / "letra.txt"
+    lyrics.write_text("hola", encoding="utf-8")
+    load_lyrics(str(lyrics))
+
+    def run(ctx):
+        with ctx.stage("decode"):
+            return 1
+
+    Job("demo", run, [("decode", 1.0)]).run()
+
+    names = [(e["event"], e["name"]) for e in sink.events]
+    assert ("stage", "lyrics.load") in names
+    assert ("stage", "job.decode") in names
+    assert ("job", "demo") in names
+    decode = next(e for e in sink.events if e["name"] == "job.decode")
+    assert decode["job"] == "demo"
+    assert sink.events[0]["bytes"] == 4
+
+
+def test_json_lines_sink_and_profile_dump(tmp_path):
+    log = tmp_path / "trace.jsonl"
+    profiles = tmp_path / "prof"
+    inst.configure(enabled=True, sink=inst.JsonLinesSink(str(log)), profile_dir=str(profiles))
+    try:
+        Job("Exportar a.mp3", lambda ctx: sum(range(1000)), []).run()
+    finally:
+        inst.configure(enabled=False, sink=inst.LoggingSink(), profile_dir="")
+
+    event = json.loads(log.read_text().splitlines()[-1])
+    assert event["event"] == "job" and event["pid"] == os.getpid()
+    dumps = list(profiles.iterdir())
+    assert len(dumps) == 1 and dumps[0].name.startswith("Exportar_a.mp3-")
+
+
+def test_concurrent_jobs_profile_one_at_a_time(tmp_path):
+    import threading
+
+    profiles = tmp_path / "prof"
+    inst.configure(profile_dir=str(profiles))
+    inner_done = threading.Event()
+
+    def inner():
+        Job("interno", lambda ctx: None, []).run()
+        inner_done.set()
+
+    def outer(ctx):
+        # Otro hilo arranca un trabajo mientras este se perfila: no debe fallar
+        t = threading.Thread(target=inner)
+        t.start()
+        t.join()
+
+    try:
+        Job("externo", outer, []).run()
+    finally:
+        inst.configure(enabled=False, sink=inst.LoggingSink(), profile_dir="")
+
+    assert inner_done.is_set()
+    assert [p.name.split("-")[0] for p in profiles.iterdir()] == ["externo"]
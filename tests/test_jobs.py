@@ -0,0 +1,115 @@
+import os
+import wave
+
+import pytest
+
+from karioka_ok.audio.graph import Graph
+from karioka_ok.jobs.core import Job, JobCancelled
+from karioka_ok.jobs.tasks import graph_export_job, load_audio_job
+
+
+def test_progress_is_reported_per_stage_and_monotonic():
+    def run(ctx):
+        with ctx.stage("a"):
+            for i in range(5):
+                ctx.update(i / 5, force=True)
+        with ctx.stage("b"):
+            pass
+        return "ok"
+
+    events = []
+    assert Job("demo", run, [("a", 3.0), ("b", 1.0)]).run(on_progress=events.append) == "ok"
+
+    assert [e.stage for e in events][0] == "a" and events[-1].stage == "b"
+    overall = [e.overall for e in events]
+    assert overall == sorted(overall)
+    assert overall[-1] == pytest.approx(1.0)
+    assert max(e.overall for e in events if e.stage == "a") == pytest.approx(0.75)
+
+
+def test_cancel_before_stage_raises():
+    job = Job("demo", lambda ctx: ctx.stage("a").__enter__(), [("a", 1.0)])
+    job.cancel()
+    with pytest.raises(JobCancelled):
+        job.run()
+
+
+def test_load_and_export_jobs(tmp_path, sine_audio):
+    src = str(tmp_path / "in.wav")
+    sine_audio(2.0, path="in.wav").segment.export(src, format="wav")
+    audio = load_audio_job(src).run()
+    assert audio.path == src
+
+    out = str(tmp_path / "out.wav")
+    stages = []
+    (result,) = graph_export_job(audio, Graph(), [(out, "wav")]).run(on_progress=lambda p: stages.append(p.stage))
+    assert result.out_path == out
+    assert {"render", "tag"} <= set(stages)
+    with wave.open(out, "rb") as wav:
+        assert wav.readframes(wav.getnframes()) == audio.segment.raw_data
+
+
+def test_cancel_during_render_removes_partial_file(tmp_path, sine_audio):
+    out = str(tmp_path / "out.wav")
+    job = graph_export_job(sine_audio(2.0, path="in.wav"), Graph(), [(out, "wav")])
+
+    def on_progress(p):
+        if p.stage == "render":
+            job.cancel()
+
+    with pytest.raises(JobCancelled):
+        job.run(on_progress=on_progress)
+    assert not os.path.exists(out)
+
+
+def test_missing_shift_is_its_own_cancellable_stage(tmp_path, sine_audio):
+    from karioka_ok.audio.graph import PitchShift
+    from karioka_ok.audio.render_cache import RenderCache
+
+    cache = RenderCache(str(tmp_path / "cache"))
+    audio = sine_audio(20.0, path="in.wav")
+    out = str(tmp_path / "out.wav")
+    job = graph_export_job(audio, Graph([PitchShift(2)]), [(out, "wav")], cache=cache)
+    stages = []
+
+    def on_progress(p):
+        stages.append(p.stage)
+        if p.stage == "shift" and 0 < p.stage_fraction < 1:
+            job.cancel()
+
+    with pytest.raises(JobCancelled):
+        job.run(on_progress=on_progress)
+    assert set(stages) == {"shift"}
+    assert not os.path.exists(out) and not list(cache.root.iterdir())
+
+    graph_export_job(audio, Graph([PitchShift(2)]), [(out, "wav")], cache=cache).run()
+    assert os.path.exists(out) and cache.total_bytes() > 0
+
+
+def test_export_over_the_mapped_source_replaces_it_without_truncating(tmp_path, sine_audio):
+    from karioka_ok.audio.graph import Gain
+
+    src = str(tmp_path / "in.wav")
+    sine_audio(2.0).segment.export(src, format="wav")
+    audio = load_audio_job(src).run()
+    before = bytes(audio.raw_buffer())
+
+    # Cancelado: el origen queda intacto y no quedan temporales
+    job = graph_export_job(audio, Graph([Gain(-6.0)]), [(src, "wav")])
+
+    def on_progress(p):
+        if p.stage == "render" and p.stage_fraction > 0:
+            job.cancel()
+
+    with pytest.raises(JobCancelled):
+        job.run(on_progress=on_progress)
+    assert bytes(audio.raw_buffer()) == before
+    assert os.listdir(tmp_path) == ["in.wav"]
+
+    # Completo: el mapa viejo sigue legible y el archivo nuevo reemplaza al origen
+    (result,) = graph_export_job(audio, Graph([Gain(-6.0)]), [(src, "wav")]).run()
+    assert result.out_path == src
+    assert bytes(audio.raw_buffer()) == before
+    assert os.listdir(tmp_path) == ["in.wav"]
+    with wave.open(src, "rb") as wav:
+        assert wav.readframes(wav.getnframes()) != before
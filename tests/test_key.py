@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from karioka_ok.audio.audio_processor import AudioData
+from karioka_ok.audio.buffers import array_to_segment
+from karioka_ok.audio.key import (
+    MAJOR,
+    MELODY_LOW,
+    MINOR,
+    KeyAnalyzer,
+    KeyEstimate,
+    KeyIndex,
+    detect_key,
+    estimate_blocks,
+    parse_key,
+    parse_target,
+    parse_voice_range,
+    suggest_semitones,
+)
+from karioka_ok.jobs.analysis import analyze_catalog, analyze_key_file
+
+SR = 44100
+
+
+def _tone(midi, n, amp, cents=0.0):
+    t = np.arange(n) / SR
+    f = 440.0 * 2 ** ((midi + cents / 100.0 - 69) / 12)
+    return sum(amp * 0.6 ** (h - 1) * np.sin(2 * np.pi * f * h * t) for h in range(1, 6))
+
+
+def _song(tonic, mode, seconds=8.0, melody=60, cents=0.0):
+    """Progresión I-IV-V-I con una melodía de la escala alrededor de `melody + tonic`."""
+    third, sixth, seventh = (4, 9, 11) if mode == MAJOR else (3, 8, 10)
+    scale = (0, 2, third, 5, 7, sixth, seventh, 12)
+    chords = ((0, third, 7), (5, 5 + third, 12), (7, 11, 14), (0, third, 7))
+    tune = ((0, 2, 4, 2), (3, 5, 3, 1), (4, 6, 4, 1), (2, 1, 0, 0))  # grados de la escala por acorde
+    seg = int(SR * seconds / len(chords))
+    parts = []
+    for chord, degrees in zip(chords, tune):
+        pad = sum(_tone(48 + tonic + i, seg, 0.06, cents) for i in chord)
+        notes = [_tone(melody + tonic + scale[d], seg // 4, 0.2, cents) for d in degrees]
+        line = np.concatenate(notes)
+        parts.append(pad + np.pad(line, (0, seg - line.size)))
+    y = np.concatenate(parts)
+    return np.stack([y, y]).astype(np.float32)
+
+
+@pytest.mark.parametrize("tonic,mode", [(0, MAJOR), (9, MINOR), (2, MAJOR), (10, MINOR)])
+def test_detects_key_for_any_block_split_and_detuning(tonic, mode):
+    x = _song(tonic, mode, cents=-30.0)
+    whole = estimate_blocks([x], SR)
+    assert (whole.tonic, whole.mode) == (tonic, mode) and whole.confidence > 0
+    assert whole.tuning == pytest.approx(-30.0, abs=5.0)
+    lo, hi = whole.melody_range()
+    assert 60 + tonic <= lo and hi <= 72 + tonic
+
+    analyzer = KeyAnalyzer(SR)
+    pos = 0
+    for size in (1000, 77777, 3, 150000):
+        analyzer.process(x[:, pos:pos + size])
+        pos += size
+    analyzer.process(x[:, pos:])
+    split = analyzer.result()
+    assert (split.tonic, split.mode, split.melody) == (whole.tonic, whole.mode, whole.melody)
+    with pytest.raises(ValueError):
+        estimate_blocks([np.zeros((2, SR), dtype=np.float32)], SR)
+
+
+def test_suggestion_targets_key_and_voice_range():
+    melody = np.zeros(40)
+    melody[69 - MELODY_LOW:77 - MELODY_LOW] = 1.0  # La4 a Fa5
+    song = KeyEstimate(9, MINOR, 0.9, 0.3, 0.0, 200.0, tuple(melody))
+
+    assert suggest_semitones(song, target_key=parse_key("Do")) == 3
+    assert suggest_semitones(song, target_key=parse_key("Do mayor")) == 0  # La menor es su relativa
+    assert suggest_semitones(song, target_key=parse_key("Mib")) == -6  # a igual distancia, hacia abajo
+    assert suggest_semitones(song, voice_range=parse_voice_range("A2-E4")) == -12
+    assert suggest_semitones(song, voice_range=parse_voice_range("La3 a Sol5")) == 0  # ya cabe
+    assert suggest_semitones(song, *parse_target("C#m, A3-C5")) == -8
+    for bad in ("", "H2-C4", "E4-A2"):
+        with pytest.raises(ValueError):
+            parse_target(bad)
+
+
+def test_detect_key_reuses_index_by_content(tmp_path, monkeypatch):
+    index = KeyIndex(str(tmp_path / "index.sqlite"))
+    audio = AudioData(segment=array_to_segment(_song(7, MAJOR, seconds=4.0), SR), sample_rate=SR, channels=2)
+    estimate = detect_key(audio, index)
+    assert estimate.short_name == "G" and index.get(audio.content_hash()) == estimate
+
+    monkeypatch.setattr("karioka_ok.audio.key.estimate_blocks", lambda *a: pytest.fail("debería usar el índice"))
+    assert detect_key(audio, KeyIndex(str(tmp_path / "index.sqlite"))) == estimate
+
+
+def test_catalog_key_analysis_skips_unchanged_files(tmp_path):
+    import soundfile as sf
+
+    paths = []
+    for tonic, mode in ((4, MAJOR), (11, MINOR)):
+        path = tmp_path / f"{tonic}.wav"
+        sf.write(str(path), _song(tonic, mode, seconds=4.0).T, SR)
+        paths.append(str(path))
+    index = KeyIndex(str(tmp_path / "index.sqlite"))
+
+    first = analyze_catalog(paths, index, workers=1, analyze=analyze_key_file)
+    assert [(r.status, r.stats.short_name) for r in first] == [("ok", "E"), ("ok", "Bm")]
+    second = analyze_catalog(paths + [str(tmp_path / "missing.wav")], index, workers=1, analyze=analyze_key_file)
+    assert [r.status for r in second] == ["cached", "cached", "failed"]
+    assert second[1].stats == first[1].stats
@@ -0,0 +1,93 @@
+import os
+import wave
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from karioka_ok.audio.audio_processor import export_many, load_audio
+from karioka_ok.audio.buffers import array_to_segment, audio_to_array
+from karioka_ok.audio.lazy import LazyAudioData, probe
+
+SR = 8000
+
+
+def _signal(seconds=1.0):
+    t = np.arange(int(SR * seconds)) / SR
+    return 0.3 * np.stack([np.sin(2 * np.pi * 220 * t), np.sin(2 * np.pi * 330 * t)])
+
+
+def _write_wav(path, sample_width=2):
+    seg = array_to_segment(_signal(), SR, sample_width)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(sample_width)
+        wav.setframerate(SR)
+        wav.writeframes(seg.raw_data)
+    return seg
+
+
+def test_lazy_wav_reads_header_only_and_maps_data_chunk(tmp_path):
+    path = tmp_path / "a.wav"
+    seg = _write_wav(path)
+
+    audio = load_audio(str(path), lazy=True)
+    assert isinstance(audio, LazyAudioData)
+    assert audio.duration_seconds == pytest.approx(1.0)
+    assert (audio.sample_rate, audio.channels, audio.sample_width) == (SR, 2, 2)
+    assert not audio.pcm.decoded
+
+    assert audio.pcm.direct
+    assert bytes(audio.raw_buffer()) == seg.raw_data
+    assert audio.pcm.decoded and audio._segment is None
+    np.testing.assert_array_equal(audio.pcm[100:200], audio_to_array(audio)[:, 100:200])
+
+
+def test_lazy_and_eager_agree(tmp_path):
+    path = tmp_path / "a.wav"
+    _write_wav(path)
+    eager = load_audio(str(path))
+    lazy = load_audio(str(path), lazy=True)
+
+    assert lazy.content_hash() == eager.content_hash()
+    assert lazy.frame_count == eager.frame_count
+    assert lazy.segment.raw_data == eager.segment.raw_data
+
+
+def test_flac_is_decoded_once_to_a_temporary_file(tmp_path):
+    path = tmp_path / "a.flac"
+    sf.write(str(path), _signal().T, SR, subtype="PCM_16")
+
+    info = probe(str(path))
+    assert (info.sample_rate, info.channels, info.frames) == (SR, 2, SR)
+
+    audio = load_audio(str(path), lazy=True).map()
+    tmp = audio.pcm._tmp_path
+    assert tmp and os.path.exists(tmp)
+    assert audio.sample_width == 2
+    expected = sf.read(str(path), dtype="int16", always_2d=True)[0].T
+    np.testing.assert_array_equal(audio_to_array(audio), expected)
+
+    audio.pcm.close()
+    assert not os.path.exists(tmp)
+
+
+def test_8bit_wav_goes_through_decoder(tmp_path):
+    path = tmp_path / "a.wav"
+    _write_wav(path, sample_width=1)
+    audio = load_audio(str(path), lazy=True)
+    assert not audio.pcm.direct
+    assert audio.sample_width == 2
+    assert audio.frame_count == SR
+
+
+def test_export_from_lazy_audio_streams_from_the_map(tmp_path):
+    path = tmp_path / "a.wav"
+    seg = _write_wav(path)
+    audio = load_audio(str(path), lazy=True)
+
+    export_many(audio, [str(tmp_path / "out.wav")])
+
+    assert audio._segment is None
+    with wave.open(str(tmp_path / "out.wav"), "rb") as wav:
+        assert wav.readframes(wav.getnframes()) == seg.raw_data
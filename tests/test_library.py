@@ -0,0 +1,127 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import soundfile as sf
+
+from karioka_ok.library.index import Library
+from karioka_ok.metadata.metadata_editor import TrackMetadata, read_metadata, set_metadata
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_incremental_scan_tracks_changes_and_lyrics(tmp_path, wav_file):
+    music = tmp_path / "music"
+    (music / "sub").mkdir(parents=True)
+    wav_file(music / "a.wav")
+    wav_file(music / "sub" / "b.wav", seconds=1.0)
+    (music / "sub" / "b.lrc").write_text("[00:00.50]hola\n", encoding="utf-8")
+    library = Library(str(tmp_path / "lib.sqlite"))
+
+    first = library.scan([str(music)])
+    assert (first.added, first.updated, first.removed, first.unchanged) == (2, 0, 0, 0)
+    b = library.get(str(music / "sub" / "b.wav"))
+    assert b.duration == 1.0 and b.sample_rate == 8000 and b.channels == 1
+    assert b.lyrics_path == str(music / "sub" / "b.lrc")
+
+    again = library.scan([str(music)])
+    assert (again.added, again.updated, again.removed, again.unchanged) == (0, 0, 0, 2)
+
+    wav_file(music / "a.wav", seconds=2.0)
+    os.utime(music / "a.wav", ns=(1, 1))
+    (music / "sub" / "b.wav").unlink()
+    third = library.scan([str(music)])
+    assert (third.added, third.updated, third.removed, third.unchanged) == (0, 1, 1, 0)
+    assert library.count() == 1 and library.get(str(music / "a.wav")).duration == 2.0
+
+
+def test_search_count_and_paging(tmp_path, wav_file):
+    music = tmp_path / "music"
+    music.mkdir()
+    for i in range(12):
+        wav_file(music / f"{'rock' if i % 3 == 0 else 'pop'}_{i:02d}.wav", seconds=0.1)
+    library = Library(str(tmp_path / "lib.sqlite"))
+    library.scan([str(music)], workers=4)
+
+    assert library.count() == 12 and library.count("ROCK") == 4
+    pages = library.tracks(limit=5) + library.tracks(limit=5, offset=5) + library.tracks(limit=5, offset=10)
+    assert [t.title for t in pages] == sorted(t.title for t in pages)
+    assert len({t.path for t in pages}) == 12
+    # Los comodines de LIKE se buscan literalmente
+    assert library.count("%") == 0 and library.count("_1") == 2
+
+
+def test_renders_are_recorded_and_removed_with_the_track(tmp_path, wav_file):
+    music = tmp_path / "music"
+    music.mkdir()
+    src = music / "song.wav"
+    wav_file(src)
+    library = Library(str(tmp_path / "lib.sqlite"))
+
+    library.add_render(str(src), str(tmp_path / "song_+2.mp3"), "mp3", semitones=2, vocals="mask", chain="pitch(2)")
+    library.add_render(str(src), str(tmp_path / "song_+2.mp3"), "mp3", semitones=3)  # misma salida: se reemplaza
+    library.add_render(str(src), str(tmp_path / "song_+2.flac"), "flac", semitones=2)
+    assert [r.format for r in library.renders(str(src))] == ["mp3", "flac"]
+    assert library.renders(str(src))[0].semitones == 3
+    assert library.tracks()[0].render_count == 2
+    copy = library.find_by_hash(library.get(str(src)).content_hash)
+    assert [t.path for t in copy] == [str(src)]
+
+    src.unlink()
+    assert library.scan([str(music)]).removed == 1
+    assert library.renders(str(src)) == [] and library.count() == 0
+
+
+def test_embedded_description_and_cover_are_indexed(tmp_path):
+    src = tmp_path / "tagged.flac"
+    sf.write(str(src), np.zeros((4000, 2), dtype=np.float32), 8000)
+    cover = tmp_path / "cover.png"
+    cover.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\0" * 32)
+    set_metadata(str(src), TrackMetadata(description="Bolero en La menor", cover_image_path=str(cover)))
+    assert read_metadata(str(src)).description == "Bolero en La menor"
+
+    library = Library(str(tmp_path / "lib.sqlite"))
+    library.scan([str(tmp_path)])
+    track = library.get(str(src))
+    assert track.has_cover and track.description == "Bolero en La menor"
+    assert [t.path for t in library.tracks("la menor")] == [str(src)]
+
+
+def test_cli_library_subcommand(tmp_path, wav_file):
+    wav_file(tmp_path / "uno.wav")
+    db = tmp_path / "lib.sqlite"
+    cmd = [sys.executable, os.path.join(ROOT, "main.py"), "library", str(tmp_path), "--db", str(db), "--search", "uno"]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert "1 nuevas" in result.stdout and "uno.wav" in result.stdout
+
+
+def test_scan_keeps_tracks_it_could_not_walk(tmp_path, monkeypatch, wav_file):
+    music = tmp_path / "music"
+    (music / "sub").mkdir(parents=True)
+    wav_file(music / "a.wav")
+    wav_file(music / "sub" / "b.wav")
+    library = Library(str(tmp_path / "lib.sqlite"))
+    library.scan([str(music)])
+
+    # Sin recursión no se ven las subcarpetas: no es que sus pistas se hayan borrado
+    flat = library.scan([str(music)], recursive=False)
+    assert (flat.removed, flat.unchanged) == (0, 1) and library.count() == 2
+
+    scandir = os.scandir
+
+    def unreadable(path):
+        if os.path.abspath(path) == str(music / "sub"):
+            raise PermissionError("sin permiso")
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", unreadable)
+    assert library.scan([str(music)]).removed == 0 and library.count() == 2
+    monkeypatch.undo()
+
+    # Raíz desmontada o renombrada: se informa y se conserva todo
+    music.rename(tmp_path / "otra")
+    missing = library.scan([str(music)])
+    assert missing.removed == 0 and missing.failed == [(str(music), "No es un directorio")]
+    assert library.count() == 2
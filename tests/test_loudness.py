@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pytest
+
+from karioka_ok.audio.audio_processor import AudioData
+from karioka_ok.audio.buffers import array_to_segment, audio_to_float
+from karioka_ok.audio.graph import Graph, Normalize
+from karioka_ok.audio.loudness import LoudnessIndex, LoudnessMeter, measure_blocks, measure_loudness
+from karioka_ok.jobs.analysis import analyze_catalog
+
+SR = 48000
+
+
+def _sine(seconds, db, freq=997.0, channels=2, phase=0.0):
+    t = np.arange(int(SR * seconds)) / SR
+    tone = 10 ** (db / 20.0) * np.sin(2 * np.pi * freq * t + phase)
+    return np.stack([tone] * channels).astype(np.float32)
+
+
+def test_reference_tone_reads_minus_23_lufs_for_any_block_split():
+    x = _sine(10, -23.0)
+    whole = measure_blocks([x], SR, 2)
+    assert whole.integrated == pytest.approx(-23.0, abs=0.05)
+    meter = LoudnessMeter(SR, 2)
+    pos = 0
+    for size in (1000, 4799, 123457, 77, 400000):
+        meter.process(x[:, pos:pos + size])
+        pos += size
+    meter.process(x[:, pos:])
+    assert meter.result().integrated == pytest.approx(whole.integrated, abs=1e-6)
+    assert measure_blocks([np.zeros((2, SR))], SR, 2).integrated == -np.inf
+
+
+def test_loudness_range_and_true_peak():
+    x = np.concatenate([_sine(10, -20.0, 1000.0), _sine(10, -30.0, 1000.0)], axis=1)
+    assert measure_blocks([x], SR, 2).loudness_range == pytest.approx(10.0, abs=0.2)
+    # Seno a fs/4 desfasado 45°: las muestras caen a 1/√2 del pico real
+    stats = measure_blocks([_sine(1, -6.0, SR / 4, phase=np.pi / 4)], SR, 2)
+    assert stats.sample_peak == pytest.approx(-9.0, abs=0.1)
+    assert stats.true_peak == pytest.approx(-6.0, abs=0.2)
+
+
+def test_lufs_normalize_reuses_index_and_respects_ceiling(tmp_path):
+    index = LoudnessIndex(str(tmp_path / "index.sqlite"))
+    audio = AudioData(segment=array_to_segment(_sine(3, -30.0), SR), sample_rate=SR, channels=2)
+    out = Graph([Normalize(-18.0, "lufs")]).render(audio, loudness=index)
+    assert measure_blocks([audio_to_float(out)], SR, 2).integrated == pytest.approx(-18.0, abs=0.1)
+    assert index.get(audio.content_hash()) == measure_loudness(audio)
+
+    # Un objetivo más alto que lo que permite el techo de -1 dBTP queda limitado por el pico
+    loud = Graph([Normalize(0.0, "lufs", ceiling_db=-1.0)]).render(audio, loudness=index)
+    assert measure_blocks([audio_to_float(loud)], SR, 2).true_peak == pytest.approx(-1.0, abs=0.1)
+
+
+def test_catalog_analysis_skips_unchanged_files(tmp_path):
+    import soundfile as sf
+
+    paths = []
+    for i, db in enumerate((-20.0, -26.0)):
+        path = tmp_path / f"track{i}.wav"
+        sf.write(str(path), _sine(2, db).T, SR)
+        paths.append(str(path))
+    index = LoudnessIndex(str(tmp_path / "index.sqlite"))
+
+    first = analyze_catalog(paths, index, workers=1)
+    assert [r.status for r in first] == ["ok", "ok"]
+    assert first[0].stats.integrated - first[1].stats.integrated == pytest.approx(6.0, abs=0.05)
+
+    sf.write(paths[1], _sine(2, -14.0).T, SR)
+    os.utime(paths[1], ns=(0, 10 ** 18))
+    second = analyze_catalog(paths + [str(tmp_path / "missing.wav")], index, workers=1)
+    assert [r.status for r in second] == ["cached", "ok", "failed"]
+    assert second[1].stats.integrated == pytest.approx(-14.0 + (first[1].stats.integrated + 26.0), abs=0.05)
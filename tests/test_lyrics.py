@@ -0,0 +1,89 @@
+import pytest
+
+from karioka_ok.lyrics.lyrics_loader import Lyrics, load_lyrics
+from karioka_ok.lyrics.timed import format_timestamp, parse_lrc
+from karioka_ok.metadata.metadata_editor import TrackMetadata, set_metadata
+
+LRC = """\
+[ar:Artista]
+[ti:Canción]
+[offset:+500]
+[00:12.50]Primera línea
+[00:20.00]<00:20.00>Palabra <00:20.40>por <00:21.00>palabra
+[00:10.00][01:10.00]Estribillo
+[00:30.00]
+"""
+
+
+def test_parse_sorts_lines_applies_offset_and_keeps_words():
+    lyrics = parse_lrc(LRC.splitlines())
+    assert lyrics.tags == {"ar": "Artista", "ti": "Canción"}
+    assert [round(t, 2) for t, _ in lyrics.lines()] == [9.5, 12.0, 19.5, 29.5, 69.5]
+    assert [lyrics.line(i) for i in range(len(lyrics))] == [
+        "Estribillo", "Primera línea", "Palabra por palabra", "", "Estribillo"
+    ]
+    assert lyrics.words(2) == [(19.5, "Palabra "), (19.9, "por "), (20.5, "palabra")]
+    assert lyrics.words(0) == []
+
+
+def test_position_lookup():
+    lyrics = parse_lrc(LRC.splitlines())
+    assert lyrics.line_at(0.0) == -1
+    assert lyrics.line_at(9.5) == 0
+    assert lyrics.line_at(19.0) == 1
+    assert lyrics.word_at(20.0) == (2, 1)
+    assert lyrics.word_at(19.6) == (2, 0)
+    assert lyrics.word_at(15.0) == (1, -1)
+    assert lyrics.line_at(1000.0) == 4 and lyrics.line_end(4) == float("inf")
+
+
+def test_lrc_round_trip_and_rescale(tmp_path):
+    lyrics = parse_lrc(LRC.splitlines())
+    path = tmp_path / "out.lrc"
+    lyrics.save_lrc(str(path))
+    again = load_lyrics(str(path))
+    assert again.text == lyrics.plain_text()
+    assert list(again.timed.line_times) == pytest.approx(list(lyrics.line_times))
+    assert again.timed.words(2) == lyrics.words(2)
+
+    slower = Lyrics(lyrics.plain_text(), timed=lyrics).scaled(2.0)
+    assert slower.timed.line_time(1) == pytest.approx(24.0)
+    assert slower.timed.words(2)[1][0] == pytest.approx(39.8)
+    assert Lyrics("x").scaled(2.0).timed is None
+    assert format_timestamp(61.25) == "01:01.25" and format_timestamp(3600) == "60:00.00"
+
+
+def test_plain_text_file_stays_untimed(tmp_path):
+    path = tmp_path / "letra.txt"
+    path.write_text("[Coro]\nhola\n", encoding="utf-8")
+    lyrics = load_lyrics(str(path))
+    assert lyrics.timed is None and lyrics.text == "[Coro]\nhola\n"
+
+
+def test_embeds_lyrics_in_mp3_and_flac(tmp_path):
+    np = pytest.importorskip("numpy")
+    sf = pytest.importorskip("soundfile")
+    from mutagen.flac import FLAC
+    from mutagen.id3 import ID3
+
+    timed = parse_lrc(LRC.splitlines())
+    meta = TrackMetadata(lyrics=Lyrics(timed.plain_text(), timed=timed))
+    silence = np.zeros((4410, 1), dtype=np.float32)
+
+    flac = tmp_path / "a.flac"
+    sf.write(str(flac), silence, 44100)
+    set_metadata(str(flac), meta)
+    stored = FLAC(str(flac))["LYRICS"][0]
+    assert list(parse_lrc(stored.splitlines()).line_times) == pytest.approx(list(timed.line_times), abs=0.01)
+
+    mp3 = tmp_path / "a.mp3"
+    try:
+        sf.write(str(mp3), silence, 44100, format="MP3")
+    except (sf.LibsndfileError, TypeError, ValueError):
+        pytest.skip("libsndfile sin soporte MP3")
+    set_metadata(str(mp3), meta)
+    tags = ID3(str(mp3))
+    assert tags.getall("USLT")[0].text == timed.plain_text()
+    sylt = tags.getall("SYLT")[0].text
+    assert sylt[0] == ("Estribillo", 9500)
+    assert ("por ", 19900) in sylt and sylt[2][0].startswith("\n")
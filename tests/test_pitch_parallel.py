@@ -0,0 +1,100 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+librosa = pytest.importorskip("librosa")
+
+from karioka_ok.audio import audio_processor, pitch_parallel
+from karioka_ok.audio.audio_processor import AudioData, change_pitch_semitones
+from karioka_ok.audio.buffers import array_to_segment, segment_to_float
+from karioka_ok.audio.pitch_parallel import ONE_SHOT_TOLERANCE, SEAM_TOLERANCE, pitch_shift_segmented
+
+SR = 22050
+
+
+def _signal(seconds=2.5, channels=2):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(SR * seconds)) / SR
+    left = 0.4 * np.sin(2 * np.pi * 330 * t) + 0.1 * rng.standard_normal(t.size)
+    right = 0.3 * np.sin(2 * np.pi * 523 * t * (1 + 0.05 * np.sin(3 * t)))
+    return np.stack([left, right][:channels]).astype(np.float32)
+
+
+@pytest.mark.parametrize("semitones", [-12, -3, 2, 7])
+def test_segments_join_seamlessly(semitones):
+    y = _signal()
+    single = pitch_shift_segmented(y, SR, semitones, workers=1, segments=1)
+    split = pitch_shift_segmented(y, SR, semitones, workers=3, segments=5, executor_factory=ThreadPoolExecutor)
+    assert split.shape == single.shape == y.shape
+    # Uniones incluidas: los segmentos arrancan con la fase del cálculo continuo
+    assert np.max(np.abs(split - single)) < SEAM_TOLERANCE
+    ref = librosa.effects.pitch_shift(y, sr=SR, n_steps=float(semitones))
+    assert np.max(np.abs(split - ref)) < ONE_SHOT_TOLERANCE
+
+
+def test_mono_input_and_process_pool_leave_no_shared_memory():
+    before = set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+    y = _signal(seconds=1.5, channels=1)[0]
+    out = pitch_shift_segmented(y, SR, 4, workers=2, segments=3)
+    ref = librosa.effects.pitch_shift(y, sr=SR, n_steps=4.0)
+    assert out.shape == (1, y.size)
+    assert np.max(np.abs(out[0] - ref)) < ONE_SHOT_TOLERANCE
+    if os.path.isdir("/dev/shm"):
+        assert set(os.listdir("/dev/shm")) <= before
+
+
+def test_change_pitch_semitones_segments_only_long_tracks(monkeypatch):
+    y = _signal(seconds=2.0)
+    audio = AudioData(segment=array_to_segment(y, SR), sample_rate=SR, channels=2)
+    one_shot = audio_processor._shift_pitch
+
+    def fail(a, s):
+        raise AssertionError("debería ir por segmentos")
+
+    monkeypatch.setattr(pitch_parallel, "MIN_SEGMENT_SECONDS", 0.5)
+    monkeypatch.setattr(audio_processor, "_shift_pitch", fail)
+    shifted = change_pitch_semitones(audio, 3, workers=3)
+    assert shifted.frame_count == audio.frame_count
+    expected = segment_to_float(one_shot(audio, 3).segment)
+    assert np.max(np.abs(segment_to_float(shifted.segment) - expected)) < ONE_SHOT_TOLERANCE
+
+    # Más corta que dos segmentos mínimos: una sola llamada
+    monkeypatch.setattr(pitch_parallel, "MIN_SEGMENT_SECONDS", 1.5)
+    monkeypatch.setattr(audio_processor, "_shift_pitch", one_shot)
+    assert pitch_parallel.shift_segmented(audio, 3, workers=3) is None
+    assert change_pitch_semitones(audio, 3, workers=3).frame_count == audio.frame_count
+
+
+def test_graph_export_job_shifts_long_tracks_in_segments(tmp_path, monkeypatch):
+    import wave
+
+    from karioka_ok.audio.graph import Graph, PitchShift
+    from karioka_ok.audio.render_cache import RenderCache
+    from karioka_ok.jobs.tasks import graph_export_job
+
+    y = _signal(seconds=2.0)
+    audio = AudioData(segment=array_to_segment(y, SR), sample_rate=SR, channels=2)
+    calls = []
+    segmented = pitch_parallel.pitch_shift_segmented
+
+    def spy(*args, **kwargs):
+        calls.append(kwargs["workers"])
+        return segmented(*args, **kwargs)
+
+    monkeypatch.setenv("KARIOKA_PITCH_WORKERS", "3")
+    monkeypatch.setattr(pitch_parallel, "MIN_SEGMENT_SECONDS", 0.5)
+    monkeypatch.setattr(pitch_parallel, "_process_pool", ThreadPoolExecutor)
+    monkeypatch.setattr(pitch_parallel, "pitch_shift_segmented", spy)
+    out = str(tmp_path / "out.wav")
+    shift = []
+    job = graph_export_job(audio, Graph([PitchShift(3)]), [(out, "wav")], cache=RenderCache(str(tmp_path / "cache")))
+    job.run(on_progress=lambda p: shift.append(p.stage_fraction) if p.stage == "shift" else None)
+
+    assert calls == [3] and shift[-1] == 1.0
+    with wave.open(out, "rb") as wav:
+        written = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2").reshape(-1, 2).T / 32768.0
+    ref = librosa.effects.pitch_shift(segment_to_float(audio.segment), sr=SR, n_steps=3.0)
+    assert written.shape == ref.shape
+    assert np.max(np.abs(written - ref)) < ONE_SHOT_TOLERANCE + 2.0 / 32768
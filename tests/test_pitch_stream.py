@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+librosa = pytest.importorskip("librosa")
+
+from karioka_ok.audio.pitch_stream import ONE_SHOT_TOLERANCE, PitchShiftStream
+
+SR = 22050
+
+
+def _signal(seconds=2.3, channels=2):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(SR * seconds)) / SR
+    left = 0.4 * np.sin(2 * np.pi * 330 * t) + 0.1 * rng.standard_normal(t.size)
+    right = 0.3 * np.sin(2 * np.pi * 523 * t)
+    return np.stack([left, right][:channels]).astype(np.float32)
+
+
+def _run(stream, y, block_size):
+    parts = [stream.process(y[:, i:i + block_size]) for i in range(0, y.shape[1], block_size)]
+    return np.concatenate(parts + [stream.flush()], axis=1)
+
+
+@pytest.mark.parametrize("semitones", [-12, -3, 2, 7])
+@pytest.mark.parametrize("block_size", [777, 8192, 1 << 20])
+def test_stream_matches_one_shot_within_tolerance(semitones, block_size):
+    y = _signal()
+    ref = librosa.effects.pitch_shift(y, sr=SR, n_steps=float(semitones))
+    out = _run(PitchShiftStream(SR, semitones, channels=2), y, block_size)
+    assert out.shape == ref.shape
+    assert np.max(np.abs(out - ref)) < ONE_SHOT_TOLERANCE
+
+
+def test_stream_state_stays_bounded():
+    stream = PitchShiftStream(SR, 5, channels=1)
+    block = _signal(seconds=0.2, channels=1)
+    for _ in range(100):
+        stream.process(block)
+        assert stream._in.shape[1] <= stream.n_fft + block.shape[1]
+        assert len(stream._cols) <= 3
+        assert stream._stretched.shape[1] <= stream.n_fft
+        assert stream._pending.shape[1] <= stream.n_fft
+
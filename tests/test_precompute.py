@@ -0,0 +1,115 @@
+import os
+from concurrent.futures import Future
+
+import pytest
+
+from karioka_ok.audio.audio_processor import pitch_algorithm
+from karioka_ok.audio.precompute import LadderPrecomputer, ladder_order
+from karioka_ok.audio.render_cache import RenderCache, RenderKey
+
+
+class ManualExecutor:
+    """Ejecutor controlado a mano: los trabajos corren al llamar run_next()."""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.queue = []
+        self.submitted = []
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        fut = Future()
+        self.queue.append((fn, args, fut))
+        self.submitted.append(args[5])
+        return fut
+
+    def run_next(self):
+        fn, args, fut = self.queue.pop(0)
+        fut.set_result(fn(*args))
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+        for _, _, fut in self.queue:
+            fut.cancel()
+
+
+def test_ladder_order_goes_outward_from_zero():
+    assert ladder_order(-3, 3) == [1, -1, 2, -2, 3, -3]
+    assert len(ladder_order()) == 24
+
+
+def test_prioritize_bumps_selected_key(tmp_path, sine_audio):
+    executors = []
+    pre = LadderPrecomputer(
+        RenderCache(str(tmp_path)), max_workers=1,
+        executor_factory=lambda n: executors.append(ManualExecutor(n)) or executors[-1],
+    )
+    pre.start(sine_audio(0.25))
+    ex = executors[0]
+    assert ex.submitted == [1]
+
+    pre.prioritize(-7)
+    ex.run_next()
+    ex.run_next()
+    assert ex.submitted == [1, -7, -1]
+    assert pre.is_ready(1) and pre.is_ready(-7)
+
+
+class RunningExecutor(ManualExecutor):
+    """Como ManualExecutor, pero los trabajos enviados ya corren: no se pueden cancelar."""
+
+    def submit(self, fn, *args):
+        fut = super().submit(fn, *args)
+        fut.set_running_or_notify_cancel()
+        return fut
+
+
+def test_new_track_cancels_previous(tmp_path, sine_audio):
+    executors = []
+    pre = LadderPrecomputer(
+        RenderCache(str(tmp_path)), max_workers=2, semitone_range=(-2, 2),
+        executor_factory=lambda n: executors.append(RunningExecutor(n)) or executors[-1],
+    )
+    pre.start(sine_audio(0.25))
+    old_source = executors[0].queue[0][1][0]
+    pre.start(sine_audio(0.3))
+
+    # Un único pool: los renders en curso de la pista anterior ocupan sus huecos
+    assert len(executors) == 1 and not executors[0].shut_down
+    assert executors[0].submitted == [1, -1]
+    assert os.path.exists(old_source)
+
+    executors[0].run_next()
+    assert os.path.exists(old_source)
+    executors[0].run_next()
+    assert not os.path.exists(old_source)
+    assert not pre.is_ready(1) and executors[0].submitted == [1, -1, 1, -1]
+
+    pre.shutdown()
+    assert executors[0].shut_down
+
+
+def test_memory_cap_limits_concurrency(tmp_path, sine_audio):
+    audio = sine_audio(0.25)
+    per_job = len(audio.segment.raw_data) * 16
+    executors = []
+    pre = LadderPrecomputer(
+        RenderCache(str(tmp_path)), max_workers=8, max_memory_bytes=2 * per_job,
+        executor_factory=lambda n: executors.append(ManualExecutor(n)) or executors[-1],
+    )
+    pre.start(audio)
+    assert executors[0].workers == 8
+    assert len(executors[0].submitted) == 2
+
+
+def test_process_pool_fills_cache(tmp_path, sine_audio):
+    pytest.importorskip("librosa")
+    cache = RenderCache(str(tmp_path))
+    audio = sine_audio(0.25)
+    pre = LadderPrecomputer(cache, max_workers=2, semitone_range=(-1, 1))
+    pre.start(audio)
+    assert pre.wait(timeout=120)
+    for semis in (-1, 1):
+        assert pre.is_ready(semis)
+        assert cache.contains(RenderKey(audio.content_hash(), semis, pitch_algorithm(), 8000))
+    pre.shutdown()
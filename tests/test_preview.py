@@ -0,0 +1,72 @@
+import wave
+
+import numpy as np
+import pytest
+
+from karioka_ok.audio.buffers import audio_to_float
+from karioka_ok.audio.preview import FileSink, NullSink, PreviewEngine, RingBuffer
+
+pytest.importorskip("soxr")
+
+SR = 22050
+
+
+def test_ring_buffer_wraps_around():
+    ring = RingBuffer(1, 8)
+    ring.write(np.arange(6, dtype=np.float32)[None])
+    assert list(ring.read(4)[0]) == [0, 1, 2, 3]
+    assert ring.write(np.arange(6, 12, dtype=np.float32)[None]) == 6
+    assert ring.free == 0
+    assert list(ring.read(8)[0]) == [4, 5, 6, 7, 8, 9, 10, 11]
+
+
+def test_render_without_shift_is_the_source_and_seek_moves_index(sine_audio):
+    audio = sine_audio(1.0, SR, (220, 330))
+    src = audio_to_float(audio)
+    engine = PreviewEngine(audio, NullSink(realtime=False), semitones=0, block_size=512)
+    np.testing.assert_array_equal(engine.render(2000), src[:, :2000])
+
+    engine.seek(0.5)
+    np.testing.assert_array_equal(engine.render(1000), src[:, SR // 2:SR // 2 + 1000])
+
+
+def test_render_with_shift_matches_streaming_shifter(sine_audio):
+    from karioka_ok.audio.buffers import iter_audio_blocks
+    from karioka_ok.audio.pitch_stream import PitchShiftStream
+
+    audio = sine_audio(1.0, SR, (220, 330))
+    shifter = PitchShiftStream(SR, 3, channels=2)
+    ref = np.concatenate(list(shifter.stream(iter_audio_blocks(audio, 4096))), axis=1)
+    out = PreviewEngine(audio, NullSink(realtime=False), semitones=3, block_size=256).render(SR)
+    assert out.shape == ref.shape
+    np.testing.assert_allclose(out, ref, atol=1e-4)
+
+
+def test_live_key_change_is_fast_and_does_not_underrun(sine_audio):
+    sink = NullSink(realtime=True)
+    engine = PreviewEngine(sine_audio(0.6, SR, (220, 330)), sink, semitones=0, block_size=512)
+    engine.start()
+    try:
+        import time
+
+        time.sleep(0.2)
+        engine.set_semitones(-2)
+        assert engine.wait(timeout=5.0)
+    finally:
+        engine.stop()
+
+    assert engine.stats.last_change_latency is not None
+    assert engine.stats.last_change_latency < 0.1
+    assert engine.stats.underruns <= 1
+    assert sink.frames >= int(0.6 * SR)
+
+
+def test_file_sink_records_what_was_played(tmp_path, sine_audio):
+    path = tmp_path / "preview.wav"
+    engine = PreviewEngine(sine_audio(0.25, SR, (220, 330)), FileSink(str(path)), semitones=1, block_size=512)
+    engine.start()
+    assert engine.wait(timeout=5.0)
+    engine.stop()
+    with wave.open(str(path), "rb") as wav:
+        assert wav.getnchannels() == 2
+        assert wav.getnframes() >= int(0.25 * SR)
@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+import pytest
+
+from karioka_ok.audio import audio_processor
+from karioka_ok.audio.audio_processor import AudioData, change_pitch_semitones
+from karioka_ok.audio.buffers import array_to_segment
+from karioka_ok.audio.render_cache import RenderCache, RenderKey
+
+
+def _audio(seed=0, n=4000):
+    rng = np.random.default_rng(seed)
+    seg = array_to_segment(rng.uniform(-0.5, 0.5, size=(2, n)), 8000)
+    return AudioData(segment=seg, sample_rate=8000, channels=2, path="x.wav")
+
+
+def test_put_and_get_roundtrip(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    audio = _audio()
+    key = RenderKey(audio.content_hash(), 2, "test-1", 8000)
+
+    assert cache.get(key) is None
+    cache.put(key, audio)
+    hit = cache.get(key, path="y.wav")
+
+    # El acierto es una vista del archivo mapeado, no una copia
+    assert hit.pcm.direct and isinstance(hit.raw_buffer(), memoryview)
+    assert hit.raw_buffer() == audio.segment.raw_data
+    assert (hit.sample_rate, hit.channels, hit.path) == (8000, 2, "y.wav")
+    # Reemplazar la entrada no invalida lo ya mapeado
+    cache.put(key, _audio(seed=1))
+    assert bytes(hit.raw_buffer()) == audio.segment.raw_data
+
+
+def test_key_changes_with_every_component():
+    base = RenderKey("abc", 1, "alg-1", 44100)
+    variants = [
+        RenderKey("abd", 1, "alg-1", 44100),
+        RenderKey("abc", -1, "alg-1", 44100),
+        RenderKey("abc", 1, "alg-2", 44100),
+        RenderKey("abc", 1, "alg-1", 48000),
+    ]
+    assert len({base.digest()} | {v.digest() for v in variants}) == 5
+
+
+def test_lru_eviction_respects_budget(tmp_path):
+    audio = _audio()
+    cache = RenderCache(str(tmp_path))
+    keys = [RenderKey(audio.content_hash(), s, "t", 8000) for s in (1, 2, 3)]
+
+    cache.put(keys[0], audio)
+    nbytes = cache.total_bytes()
+    cache.max_bytes = 2 * nbytes
+    cache.put(keys[1], audio)
+    # Usar la primera la vuelve la más reciente
+    past = os.stat(tmp_path / f"{keys[1].digest()}.wav").st_mtime - 10
+    os.utime(tmp_path / f"{keys[0].digest()}.wav", (past, past))
+    assert cache.get(keys[0]) is not None
+    os.utime(tmp_path / f"{keys[1].digest()}.wav", (past - 10, past - 10))
+    cache.put(keys[2], audio)
+
+    assert cache.total_bytes() <= 2 * nbytes
+    assert cache.contains(keys[0]) and cache.contains(keys[2])
+    assert not cache.contains(keys[1])
+
+
+def test_change_pitch_hits_cache_before_dsp(tmp_path, monkeypatch):
+    cache = RenderCache(str(tmp_path))
+    audio = _audio()
+    first = change_pitch_semitones(audio, 1, cache=cache)
+
+    def boom(*args, **kwargs):
+        raise AssertionError("no debería recalcular")
+
+    monkeypatch.setattr(audio_processor, "_shift_pitch", boom)
+    second = change_pitch_semitones(audio, 1, cache=cache)
+    assert second.segment.raw_data == first.segment.raw_data
+    with pytest.raises(AssertionError):
+        change_pitch_semitones(audio, 2, cache=cache)
+
+
+def test_graph_export_stores_the_shift_it_renders(tmp_path, monkeypatch):
+    from karioka_ok.audio.graph import Gain, Graph, PitchShift
+    from karioka_ok.jobs.tasks import graph_export_job
+
+    cache = RenderCache(str(tmp_path / "cache"))
+    audio = _audio()
+    graph = Graph([PitchShift(1), Gain(-3.0)])
+    graph_export_job(audio, graph, [(str(tmp_path / "a.wav"), "wav")], cache=cache).run()
+    key = RenderKey(audio.content_hash(), 1, audio_processor.pitch_algorithm("hq"), 8000)
+    assert cache.contains(key)
+
+    def boom(*args, **kwargs):
+        raise AssertionError("no debería recalcular")
+
+    monkeypatch.setattr(PitchShift, "processor", boom)
+    graph_export_job(audio, graph, [(str(tmp_path / "b.wav"), "wav")], cache=cache).run()
+    assert (tmp_path / "a.wav").read_bytes() == (tmp_path / "b.wav").read_bytes()
+
+
+def test_content_hash_depends_on_samples_and_format():
+    a, b = _audio(seed=0), _audio(seed=1)
+    assert a.content_hash() != b.content_hash()
+    assert a.content_hash() == _audio(seed=0).content_hash()
+    other_rate = AudioData(segment=a.segment._spawn(a.segment.raw_data, overrides={"frame_rate": 16000}),
+                           sample_rate=16000, channels=2)
+    assert other_rate.content_hash() != a.content_hash()
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from karioka_ok.audio import audio_processor
+from karioka_ok.audio.audio_processor import AudioData, change_pitch_semitones, pitch_algorithm
+from karioka_ok.audio.buffers import array_to_segment, audio_to_float
+from karioka_ok.audio.graph import Graph, PitchShift
+from karioka_ok.audio.resample import PolyphaseResampler, parse_tier, resample
+from karioka_ok.jobs.batch import load_manifest
+
+SR = 44100
+
+
+def _sine(freq, n, sr=SR):
+    return np.sin(2 * np.pi * freq * np.arange(n) / sr).astype(np.float32)
+
+
+def _peak_hz(y, sr):
+    spectrum = np.abs(np.fft.rfft(y * np.hanning(y.size)))
+    return np.argmax(spectrum) * sr / y.size
+
+
+@pytest.mark.parametrize("tier", ["fast", "hq"])
+def test_any_block_split_gives_the_same_output(tier):
+    x = np.stack([_sine(440, SR), _sine(1000, SR)]) * 0.5
+    whole = resample(x, SR, 48000, tier)
+    assert whole.shape == (2, 48000) and whole.dtype == np.float32
+
+    stream, parts, pos = PolyphaseResampler(SR, 48000, 2, tier), [], 0
+    for size in (1, 999, 30000, 7):
+        parts.append(stream.process(x[:, pos:pos + size]))
+        pos += size
+    parts += [stream.process(x[:, pos:]), stream.flush()]
+    np.testing.assert_array_equal(np.concatenate(parts, axis=1), whole)
+
+    pcm = (x * 32767).astype(np.int16)
+    out = resample(pcm, SR, 22050, tier)
+    assert out.dtype == np.int16 and out.shape == (2, 22050)
+    np.testing.assert_allclose(out / 32768.0, resample(x, SR, 22050, tier), atol=2e-4)
+
+
+@pytest.mark.parametrize("tier,snr,alias", [("fast", 60, -60), ("hq", 100, -100)])
+def test_tiers_keep_tones_clean_and_reject_aliases(tier, snr, alias):
+    y = resample(_sine(1000, SR), SR, 48000, tier)[1000:-1000]
+    ref = _sine(1000, 48000, 48000)[1000:-1000]
+    assert 10 * np.log10(np.sum(ref ** 2) / np.sum((y - ref) ** 2)) > snr
+
+    # 15 kHz no cabe a 22.05 kHz: debe desaparecer, no plegarse a 7.05 kHz
+    folded = resample(_sine(15000, SR), SR, 22050, tier)[500:-500]
+    assert 20 * np.log10(np.abs(folded).max()) < alias
+    with pytest.raises(ValueError):
+        parse_tier("ultra")
+
+
+@pytest.mark.parametrize("tier", ["fast", "hq"])
+def test_fallback_without_librosa_keeps_duration(monkeypatch, tier):
+    monkeypatch.setattr(audio_processor, "_librosa", lambda: None)
+    audio = AudioData(segment=array_to_segment(0.5 * _sine(440, SR)[None, :], SR), sample_rate=SR, channels=1)
+    shifted = change_pitch_semitones(audio, 3, tier=tier)
+    assert shifted.frame_count == audio.frame_count and shifted.sample_rate == SR
+    y = audio_to_float(shifted)[0, SR // 4:-SR // 4]
+    assert _peak_hz(y, SR) == pytest.approx(440 * 2 ** (3 / 12), abs=4)
+    assert pitch_algorithm(tier) == f"numpy-vocoder-{tier}-1" != pitch_algorithm("hq" if tier == "fast" else "fast")
+
+
+def test_tier_reaches_graph_and_manifest(tmp_path):
+    graph = Graph.from_options(2, tier="fast").then(PitchShift(1, "fast"), PitchShift(1))
+    assert Graph.parse(graph.to_spec()) == graph
+    nodes = graph.plan(AudioData(segment=array_to_segment(np.zeros((1, 100)), SR), sample_rate=SR, channels=1)).nodes
+    assert nodes == [PitchShift(3, "fast"), PitchShift(1, "hq")]
+
+    (tmp_path / "m.csv").write_text("path,tier\na.wav,fast\nb.wav,\n", encoding="utf-8")
+    assert [i.tier for i in load_manifest(str(tmp_path / "m.csv"))] == ["fast", "hq"]
+    assert [i.tier for i in load_manifest(str(tmp_path / "m.csv"), default_tier="fast")] == ["fast", "fast"]
+    (tmp_path / "bad.csv").write_text("path,tier\na.wav,ultra\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_manifest(str(tmp_path / "bad.csv"))
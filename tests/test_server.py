@@ -0,0 +1,221 @@
+import asyncio
+import contextlib
+import http.client
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from karioka_ok.jobs import server as server_module
+from karioka_ok.jobs.server import HttpError, TranspositionQueue, TranspositionServer, item_from_fields, parse_range
+
+
+@contextlib.contextmanager
+def _serving(tmp_path, **kwargs):
+    """Servicio real en 127.0.0.1 (puerto libre), con su event loop en un hilo."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    queue = TranspositionQueue(str(tmp_path / "out"), roots=[str(tmp_path)], **kwargs)
+    server = asyncio.run_coroutine_threadsafe(TranspositionServer(queue).start("127.0.0.1", 0), loop).result(10)
+
+    async def stop():
+        server.close()
+        await server.wait_closed()
+        await queue.close()
+
+    try:
+        yield queue, server.sockets[0].getsockname()[1]
+    finally:
+        asyncio.run_coroutine_threadsafe(stop(), loop).result(10)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(10)
+        loop.close()
+
+
+def _request(port, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    if isinstance(body, dict):
+        body, headers = json.dumps(body).encode(), {"Content-Type": "application/json", **(headers or {})}
+    conn.request(method, path, body=body, headers=headers or {})
+    resp = conn.getresponse()
+    data = resp.read()
+    conn.close()
+    is_json = resp.getheader("Content-Type", "").startswith("application/json")
+    return resp.status, dict(resp.getheaders()), json.loads(data) if is_json else data
+
+
+def _wait(port, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status, _, job = _request(port, "GET", f"/jobs/{job_id}")
+        assert status == 200
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"el trabajo {job_id} no terminó")
+
+
+def test_job_from_path_is_processed_and_streamed_with_ranges(tmp_path, wav_file):
+    src = wav_file(tmp_path / "tema.wav")
+    with _serving(tmp_path, workers=2) as (queue, port):
+        status, headers, job = _request(port, "POST", "/jobs", {"path": src, "semitones": 1, "formats": "wav"})
+        assert status == 202 and headers["Location"] == f"/jobs/{job['id']}" and not job["deduplicated"]
+        done = _wait(port, job["id"])
+        assert done["status"] == "done" and list(done["files"]) == ["wav"]
+
+        status, headers, data = _request(port, "GET", done["files"]["wav"])
+        assert status == 200 and headers["Content-Type"] == "audio/wav" and headers["Accept-Ranges"] == "bytes"
+        assert data[:4] == b"RIFF" and len(data) == int(headers["Content-Length"])
+
+        status, headers, part = _request(port, "GET", done["files"]["wav"], headers={"Range": "bytes=10-19"})
+        assert status == 206 and part == data[10:20] and headers["Content-Range"] == f"bytes 10-19/{len(data)}"
+        status, _, tail = _request(port, "GET", done["files"]["wav"], headers={"Range": "bytes=-8"})
+        assert status == 206 and tail == data[-8:]
+        status, headers, _ = _request(port, "GET", done["files"]["wav"], headers={"Range": f"bytes={len(data)}-"})
+        assert status == 416 and headers["Content-Range"] == f"bytes */{len(data)}"
+
+        metrics = _request(port, "GET", "/metrics")[2]
+        assert (metrics["queued"], metrics["running"], metrics["completed"]) == (0, 0, 1)
+        assert metrics["latency_seconds"]["total"]["count"] == 1
+
+
+def test_identical_in_flight_requests_share_one_job(tmp_path, monkeypatch, wav_file):
+    gate = threading.Event()
+    calls = []
+    original = server_module.process_item
+
+    def gated(item, out_dir, force=False, cache_dir=None):
+        calls.append(item.path)
+        gate.wait(10)
+        return original(item, out_dir, force, cache_dir)
+
+    monkeypatch.setattr(server_module, "process_item", gated)
+    src = wav_file(tmp_path / "a.wav")
+    other = wav_file(tmp_path / "b.wav")
+    with _serving(tmp_path, workers=1, max_queue=1, executor_factory=ThreadPoolExecutor) as (queue, port):
+        request = {"path": src, "semitones": 2, "formats": ["wav"]}
+        first = _request(port, "POST", "/jobs", request)[2]
+        second = _request(port, "POST", "/jobs", dict(request, formats="WAV"))[2]
+        assert second["id"] == first["id"] and second["deduplicated"] and second["requests"] == 2
+        # Otros ajustes: otro trabajo, que espera a que se libere el único proceso
+        third = _request(port, "POST", "/jobs", dict(request, semitones=3))[2]
+        assert third["id"] != first["id"] and third["status"] == "queued"
+        status, headers, body = _request(port, "POST", "/jobs", {"path": other, "formats": "wav"})
+        assert status == 503 and headers["Retry-After"] and "llena" in body["error"]
+        # Una subida se rechaza sin leer ni guardar el cuerpo
+        status = _request(port, "POST", "/jobs?filename=b.wav&formats=wav", open(other, "rb").read())[0]
+        assert status == 503 and not list((tmp_path / "out" / "uploads").iterdir())
+        assert _request(port, "GET", f"/jobs/{third['id']}/files/wav")[0] == 409
+        assert _request(port, "GET", "/metrics")[2]["queued"] == 1
+
+        gate.set()
+        assert _wait(port, first["id"])["status"] == _wait(port, third["id"])["status"] == "done"
+        assert calls == [src, src]
+        metrics = _request(port, "GET", "/metrics")[2]
+        assert (metrics["submitted"], metrics["deduplicated"], metrics["rejected"]) == (4, 1, 2)
+
+
+def test_uploads_are_stored_by_content_and_validated(tmp_path, wav_file):
+    data = open(wav_file(tmp_path / "x.wav"), "rb").read()
+    with _serving(tmp_path, workers=1) as (queue, port):
+        status, _, job = _request(port, "POST", "/jobs?filename=subida.wav&semitones=-1&formats=wav", data,
+                                  {"Content-Type": "audio/wav"})
+        assert status == 202
+        done = _wait(port, job["id"])
+        assert done["status"] == "done" and done["source"].endswith("subida.wav")
+        assert _request(port, "GET", done["files"]["wav"])[2][:4] == b"RIFF"
+        again = _request(port, "POST", "/jobs?filename=subida.wav&semitones=-1&formats=wav", data)[2]
+        assert again["source"] == done["source"]
+
+        assert _request(port, "POST", "/jobs?filename=nota.txt", data)[0] == 400
+        assert _request(port, "POST", "/jobs", {"path": str(tmp_path / "falta.wav")})[0] == 400
+        assert _request(port, "POST", "/jobs", {"path": str(tmp_path / "x.wav"), "semitones": 40})[0] == 400
+        assert _request(port, "POST", "/jobs", b"{no", {"Content-Type": "application/json"})[0] == 400
+        assert _request(port, "GET", "/jobs/nada")[0] == 404
+        assert _request(port, "DELETE", "/jobs")[0] == 405
+        assert [j["id"] for j in _request(port, "GET", "/jobs")[2]["jobs"]][-1] == job["id"]
+
+
+def test_uploads_and_outputs_expire_with_the_history(tmp_path, monkeypatch, wav_file):
+    monkeypatch.setattr(server_module, "HISTORY", 1)
+    monkeypatch.setattr(server_module, "ORPHAN_GRACE_SECONDS", 0)
+    out = tmp_path / "out"
+    (out / "jobs" / "de-otra-vez").mkdir(parents=True)  # restos de una ejecución anterior
+    with _serving(tmp_path, workers=1) as (queue, port):
+        assert not (out / "jobs" / "de-otra-vez").exists()
+        jobs = []
+        for seconds in (0.5, 0.6):
+            data = open(wav_file(tmp_path / "x.wav", seconds=seconds), "rb").read()
+            job = _request(port, "POST", "/jobs?filename=x.wav&formats=wav", data)[2]
+            jobs.append(_wait(port, job["id"]))
+        first, second = jobs
+        assert _request(port, "GET", f"/jobs/{first['id']}")[0] == 404
+        assert [p.parent.name for p in (out / "uploads").glob("*/x.wav")] == [os.path.basename(
+            os.path.dirname(second["source"]))]
+        assert len(list((out / "jobs").iterdir())) == 1
+        assert _request(port, "GET", second["files"]["wav"])[0] == 200
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-", 100) == (0, 99)
+    assert parse_range("bytes=90-200", 100) == (90, 99)
+    assert parse_range("bytes=-30", 100) == (70, 99)
+    assert parse_range("bytes=-300", 100) == (0, 99)
+    assert parse_range("bytes=1-2,5-6", 100) is None  # varios tramos: archivo entero
+    assert parse_range("items=1-2", 100) is None
+    for bad in ("bytes=100-", "bytes=5-1", "bytes=-0"):
+        with pytest.raises(HttpError) as info:
+            parse_range(bad, 100)
+        assert info.value.status == 416
+
+
+def test_request_paths_are_confined_to_roots(tmp_path, wav_file):
+    root, outside = tmp_path / "musica", tmp_path / "privado"
+    root.mkdir()
+    outside.mkdir()
+    song = wav_file(root / "tema.wav")
+    secret = outside / "secreto.txt"
+    secret.write_text("clave")
+    (root / "enlace.txt").symlink_to(secret)
+    (root / "falsa.jpg").write_bytes(b"no es una imagen")
+    (root / "cadena.json").write_text('{"nodes": []}')
+    roots = [str(root)]
+
+    item = item_from_fields({"path": song, "chain": "trim_silence"}, roots=roots)
+    assert item.path == song and item.chain == "trim_silence"
+    bad = [
+        {"path": wav_file(outside / "otro.wav")},  # fuera de las raíces
+        {"path": str(root / ".." / "privado" / "otro.wav")},
+        {"path": song, "lyrics": str(secret)},
+        {"path": song, "lyrics": str(root / "enlace.txt")},  # el enlace apunta afuera
+        {"path": song, "cover": str(root / "falsa.jpg")},  # no se decodifica
+        {"path": song, "cover": str(secret)},
+        {"path": song, "chain": str(root / "cadena.json")},
+        {"path": song, "chain": "nodo_inexistente"},
+    ]
+    for fields in bad:
+        with pytest.raises(ValueError):
+            item_from_fields(fields, roots=roots)
+    with pytest.raises(ValueError):
+        item_from_fields({"path": song})  # sin raíces: solo subidas
+
+
+def test_download_names_are_encoded_and_cannot_inject_headers(tmp_path, wav_file):
+    from urllib.parse import quote, unquote
+
+    data = open(wav_file(tmp_path / "x.wav"), "rb").read()
+    cases = (("canción — ñ 😀.wav", "canci_n _ _ _.wav"), ('a"\r\nX-Evil: 1.wav', "aX-Evil: 1.wav"))
+    with _serving(tmp_path, workers=1) as (queue, port):
+        for name, fallback in cases:
+            job = _request(port, "POST", f"/jobs?filename={quote(name)}&formats=wav", data)[2]
+            done = _wait(port, job["id"])
+            assert done["status"] == "done"
+            status, headers, body = _request(port, "GET", done["files"]["wav"])
+            assert status == 200 and body[:4] == b"RIFF" and "X-Evil" not in headers
+            plain, encoded = headers["Content-Disposition"].split("; filename*=UTF-8''")
+            assert plain == f'attachment; filename="{fallback}"' and unquote(encoded) == name
@@ -0,0 +1,92 @@
+"""Presupuesto de arranque: la CLI y la GUI no deben cargar la pila de DSP.
+
+Se mide con `python -X importtime` en un subproceso limpio. Los límites de
+tiempo son holgados (máquinas de CI lentas); lo estricto es que librosa,
+scipy, numba y soundfile no aparezcan hasta el primer uso de DSP.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+
+HEAVY_MODULES = ("librosa", "scipy", "numba", "soundfile", "sklearn")
+CLI_IMPORT_BUDGET = 0.5  # segundos de importación para `main.py --no-gui`
+GUI_WINDOW_BUDGET = 3.0  # segundos hasta mostrar la ventana principal
+
+
+def _importtime(args, env=None):
+    """Ejecuta Python con `-X importtime`; devuelve (módulos, segundos de nivel superior)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT, env={**os.environ, **(env or {})}, capture_output=True, text=True, timeout=120,
+    )
+    modules, total_us = set(), 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+        if not name.startswith("  "):  # un espacio tras `|`: módulo de nivel superior
+            total_us += int(cumulative)
+    return proc, modules, total_us / 1e6
+
+
+def _heavy(modules):
+    return sorted(m for m in modules if m.split(".")[0] in HEAVY_MODULES)
+
+
+def test_cli_starts_without_dsp_stack():
+    proc, modules, seconds = _importtime(["main.py", "--no-gui"])
+    assert proc.returncode == 0, proc.stderr
+    assert _heavy(modules) == []
+    assert "numpy" not in modules
+    assert seconds < CLI_IMPORT_BUDGET
+
+
+def test_app_modules_defer_heavy_imports():
+    code = (
+        f"import sys; sys.path.insert(0, {SRC!r});"
+        "import karioka_ok.audio.audio_processor, karioka_ok.audio.render_cache, "
+        "karioka_ok.audio.precompute, karioka_ok.metadata.metadata_editor, "
+        "karioka_ok.lyrics.lyrics_loader, karioka_ok.jobs.tasks"
+    )
+    proc, modules, _ = _importtime(["-c", code])
+    assert proc.returncode == 0, proc.stderr
+    assert _heavy(modules) == []
+    assert not {"numpy", "pydub", "mutagen", "multiprocessing"} & modules
+
+
+def test_has_librosa_is_lazy():
+    code = (
+        f"import sys; sys.path.insert(0, {SRC!r});"
+        "from karioka_ok.audio import audio_processor as ap;"
+        "assert 'librosa' not in sys.modules;"
+        "print(ap.HAS_LIBROSA == ap.has_librosa())"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == "True"
+
+
+def test_gui_window_appears_within_budget(tmp_path):
+    pytest.importorskip("PySide6")
+    code = (
+        "import sys, time; t0 = time.perf_counter();"
+        f"sys.path.insert(0, {SRC!r});"
+        "from PySide6 import QtWidgets; app = QtWidgets.QApplication([]);"
+        "from karioka_ok.gui.app import MainWindow;"
+        "w = MainWindow(); w.show(); app.processEvents();"
+        "print(time.perf_counter() - t0)"
+    )
+    # La ventana abre la caché de renders: que no toque (ni limpie) la del usuario
+    env = {"QT_QPA_PLATFORM": "offscreen", "KARIOKA_CACHE_DIR": str(tmp_path)}
+    proc, modules, _ = _importtime(["-c", code], env=env)
+    if proc.returncode != 0:
+        # Igual que test_app.py: algunos entornos headless no pueden crear QApplication
+        pytest.skip(f"No se pudo iniciar Qt sin pantalla: {proc.stderr[-200:]}")
+    assert _heavy(modules) == []
+    assert float(proc.stdout.strip().splitlines()[-1]) < GUI_WINDOW_BUDGET
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from karioka_ok.audio import audio_processor
+from karioka_ok.audio.audio_processor import AudioData, process_audio
+from karioka_ok.audio.buffers import array_to_segment, audio_to_float
+from karioka_ok.audio.graph import Graph
+from karioka_ok.audio.vocals import VocalReducer, reduce_vocals
+from karioka_ok.jobs.tasks import graph_export_job
+
+SR = 22050
+
+
+def _mix(seconds=2.0):
+    """Voz al centro (440 Hz), instrumento lateral (660 Hz) y bajo al centro (60 Hz)."""
+    t = np.arange(int(SR * seconds)) / SR
+    voice = 0.3 * np.sin(2 * np.pi * 440 * t) * (1 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    side = 0.2 * np.sin(2 * np.pi * 660 * t)
+    bass = 0.3 * np.sin(2 * np.pi * 60 * t)
+    return np.stack([voice + side + bass, voice - side + bass]).astype(np.float32)
+
+
+def _amplitude(y, freq):
+    spectrum = np.abs(np.fft.rfft(y)) / (y.shape[-1] / 2)
+    return spectrum[np.argmin(np.abs(np.fft.rfftfreq(y.shape[-1], 1 / SR) - freq))]
+
+
+@pytest.mark.parametrize("mode", ["center", "mask"])
+def test_zero_strength_is_transparent_for_any_block_split(mode):
+    x = np.random.default_rng(0).standard_normal((2, 30000)).astype(np.float32) * 0.1
+    reducer = VocalReducer(SR, mode=mode, strength=0.0)
+    out, pos = [], 0
+    for size in (1000, 37, 5000, 100, 23863):
+        out.append(reducer.process(x[:, pos:pos + size]))
+        pos += size
+    out.append(reducer.flush())
+    np.testing.assert_allclose(np.concatenate(out, axis=1), x, atol=1e-6)
+
+
+def test_modes_remove_center_voice():
+    x = _mix()
+    center = np.concatenate(list(VocalReducer(SR, "center").stream([x])), axis=1)
+    mask = np.concatenate(list(VocalReducer(SR, "mask").stream([x[:, :7000], x[:, 7000:]])), axis=1)
+    assert center.shape == mask.shape == x.shape
+
+    assert _amplitude(center[0], 440) < 1e-3 and _amplitude(center[0], 60) < 1e-3
+    assert _amplitude(center[0], 660) == pytest.approx(0.2, abs=0.01)
+    # La máscara quita la voz pero conserva graves y contenido lateral
+    assert _amplitude(mask[0], 440) < 0.02
+    assert _amplitude(mask[0], 60) == pytest.approx(0.3, abs=0.02)
+    assert _amplitude(mask[0], 660) == pytest.approx(0.2, abs=0.02)
+
+
+def test_chain_shifts_and_removes_vocals_in_one_pass(tmp_path, monkeypatch):
+    audio = AudioData(segment=array_to_segment(_mix(), SR), sample_rate=SR, channels=2)
+    calls = []
+    monkeypatch.setattr(audio_processor, "_shift_pitch", lambda a, s: calls.append(s) or a)
+
+    out = process_audio(audio, semitones=2, vocals="center")
+    assert calls == [2] and out.frame_count == audio.frame_count
+    assert _amplitude(audio_to_float(out)[0], 440) < 1e-3
+
+    path = tmp_path / "karaoke.wav"
+    stages = []
+    job = graph_export_job(audio, Graph.from_options(vocals="mask"), [(str(path), "wav")])
+    job.run(on_progress=lambda p: stages.append(p.stage))
+    assert "render" in stages and path.exists()
+
+    mono = AudioData(segment=array_to_segment(_mix()[:1], SR), sample_rate=SR, channels=1)
+    with pytest.raises(ValueError):
+        reduce_vocals(mono)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from karioka_ok.audio import waveform
+from karioka_ok.audio.audio_processor import AudioData
+from karioka_ok.audio.buffers import array_to_segment, audio_to_float
+from karioka_ok.audio.waveform import WaveformCache, WaveformPyramid, build_pyramid
+
+SR = 8000
+
+
+def _audio(frames=SR * 3 + 77):
+    rng = np.random.default_rng(1)
+    t = np.arange(frames) / SR
+    env = np.linspace(0.05, 0.9, frames)
+    y = np.stack([env * np.sin(2 * np.pi * 110 * t), 0.3 * rng.uniform(-1, 1, frames)])
+    return AudioData(segment=array_to_segment(y, SR), sample_rate=SR, channels=2)
+
+
+def test_levels_match_brute_force():
+    audio = _audio()
+    y = audio_to_float(audio)
+    pyr = build_pyramid(audio, base_bucket=256)
+
+    assert [lvl.bucket for lvl in pyr.levels[:3]] == [256, 512, 1024]
+    assert len(pyr.levels[-1]) == 1
+    for lvl in pyr.levels[:4]:
+        for i in (0, len(lvl) // 2, len(lvl) - 1):
+            chunk = y[:, i * lvl.bucket:(i + 1) * lvl.bucket]
+            assert lvl.mins[i] == pytest.approx(chunk.min(), abs=1e-6)
+            assert lvl.maxs[i] == pytest.approx(chunk.max(), abs=1e-6)
+    # La RMS del nivel 0 es exacta; en los siguientes se combina por pares
+    chunk = y[:, :256]
+    assert pyr.levels[0].rms[0] == pytest.approx(np.sqrt(np.mean(chunk ** 2)), rel=1e-4)
+
+
+def test_query_is_bounded_by_pixels_and_matches_range():
+    audio = _audio()
+    y = audio_to_float(audio)
+    pyr = build_pyramid(audio)
+
+    mins, maxs, rms = pyr.query(0, pyr.frames, 100)
+    assert mins.shape == maxs.shape == rms.shape == (100,)
+    assert mins.min() == pytest.approx(y.min(), abs=1e-6)
+    assert maxs.max() == pytest.approx(y.max(), abs=1e-6)
+
+    # El nivel elegido nunca tiene más de ~2 buckets por píxel
+    for pixels in (10, 333, 5000):
+        level = pyr.level_for(pyr.frames / pixels)
+        assert len(level) <= 2 * pixels + 2 or level is pyr.levels[0]
+
+    # Zoom más allá del nivel 0: un valor por píxel, sin errores de índice
+    mins, maxs, _ = pyr.query(1000, 1100, 400)
+    assert mins.shape == (400,) and np.all(mins <= maxs)
+
+
+def test_sidecar_round_trip_and_cache(tmp_path, monkeypatch):
+    audio = _audio()
+    pyr = build_pyramid(audio)
+    again = WaveformPyramid.from_bytes(pyr.to_bytes())
+    assert len(again.levels) == len(pyr.levels) and again.frames == pyr.frames
+    np.testing.assert_allclose(again.levels[2].maxs, pyr.levels[2].maxs, atol=1.0 / 32767)
+
+    cache = WaveformCache(str(tmp_path))
+    first = cache.get_or_build(audio)
+    assert cache.path_for(audio).exists()
+    monkeypatch.setattr(waveform, "build_pyramid", lambda *a, **k: pytest.fail("no debería recalcular"))
+    second = cache.get_or_build(audio)
+    assert second.frames == first.frames
+
+    cache.path_for(audio).write_bytes(b"basura")
+    monkeypatch.undo()
+    assert cache.get_or_build(audio).frames == first.frames